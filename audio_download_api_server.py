@@ -4,66 +4,123 @@ Audio Download API server wrapper
 Provides a clean API endpoint for n8n integration to download audio files by reel
 """
 
-from flask import Flask, request, jsonify
-import subprocess
+from flask import Flask, Blueprint, request, jsonify
 import sys
 import os
 import logging
 import threading
 import queue
-import time
+from job_store import get_job_store, accepted_response, wait_response, jobs_blueprint, WorkerState, QUEUE_DEPTH, JOBS_RUNNING
+from metrics import metrics_blueprint, counter, histogram
+from pipeline_scheduler import get_scheduler
+from job_events import bind_job, run_with_events
 
 app = Flask(__name__)
 
+# Pipeline routes, also mounted by gateway_server.py
+audio_routes = Blueprint('audio_download', __name__)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Global queue for handling concurrent requests
 request_queue = queue.Queue()
-processing_lock = threading.Lock()
-is_processing = False
+worker_state = WorkerState()
+job_store = get_job_store()
+QUEUE_DEPTH.labels(service="audio_download").set_function(request_queue.qsize)
+JOBS_RUNNING.labels(service="audio_download").set_function(lambda: worker_state.active)
+scheduler = get_scheduler()
 
-def process_queue():
-    """Background thread to process requests one at a time"""
-    global is_processing
+# Audio downloads run in a subprocess, so these are filled from the events it relays
+AUDIO_DOWNLOADS_TOTAL = counter("audio_downloads_total", "Audio files downloaded", ["result"])
+AUDIO_BYTES_TOTAL = counter("audio_download_bytes_total", "Audio bytes downloaded from Drive")
+AUDIO_DOWNLOAD_SECONDS = histogram("audio_download_seconds", "Time to download one audio file")
+AUDIO_BYTES_PER_SECOND = histogram(
+    "audio_download_bytes_per_second", "Drive transfer speed per audio file",
+    buckets=(64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024, 64 * 1024 * 1024)
+)
+
+def record_audio_metrics(events):
+    """Update the audio metrics from a job's audio_saved / audio_failed events"""
+    for event in events:
+        if event['type'] == "audio_saved":
+            AUDIO_DOWNLOADS_TOTAL.labels(result="saved").inc()
+            AUDIO_BYTES_TOTAL.inc(event['bytes'])
+            AUDIO_DOWNLOAD_SECONDS.observe(event['seconds'])
+            if event.get('bytes_per_second'):
+                AUDIO_BYTES_PER_SECOND.observe(event['bytes_per_second'])
+        elif event['type'] == "audio_failed":
+            AUDIO_DOWNLOADS_TOTAL.labels(result="failed").inc()
+
+def build_response(reel_number, result):
+    """Turn the script's completed process into the endpoint's (payload, status code)"""
+    if result.returncode == 0:
+        # Extract success message from output
+        output_lines = result.stdout.strip().split('\n')
+        success_line = None
+        for line in output_lines:
+            if line.startswith('SUCCESS: '):
+                success_line = line
+                break
+        
+        if success_line:
+            logger.info(f"Audio files downloaded successfully for reel {reel_number}")
+            return {
+                "success": True,
+                "reel_number": reel_number,
+                "message": success_line,
+                "details": "Audio files downloaded and saved to organized folder structure",
+                "audio_directory": f"/Users/devanshc/Desktop/ProteinPapaPanda/{reel_number}/Audio"
+            }, 200
+        return {
+            "success": False,
+            "error": "Script completed but no success message found",
+            "stdout": result.stdout,
+            "stderr": result.stderr
+        }, 500
     
+    # Extract error from stderr or stdout
+    error_msg = result.stderr.strip() or result.stdout.strip()
+    logger.error(f"Audio download script failed: {error_msg}")
+    return {
+        "success": False,
+        "error": error_msg
+    }, 500
+
+def process_queue():
+    """Background thread to process jobs one at a time"""
     while True:
         try:
-            # Get next request from queue
-            request_data = request_queue.get(timeout=1)
-            if request_data is None:  # Shutdown signal
+            # Block until the next job arrives
+            job = request_queue.get()
+            if job is None:  # Shutdown signal
                 break
                 
-            with processing_lock:
-                is_processing = True
-                
-            try:
-                # Process the request
-                reel_number = request_data['reel_number']
-                logger.info(f"Processing audio download request for reel: {reel_number}")
-                
-                # Call the audio download script
-                script_path = os.path.join(os.path.dirname(__file__), 'download_reel_audio.py')
-                result = subprocess.run([
-                    sys.executable, script_path, str(reel_number)
-                ], capture_output=True, text=True, timeout=600)  # 10 minutes timeout
-                
-                # Store result for the waiting thread
-                request_data['result'] = result
-                request_data['completed'] = True
-                
-            except Exception as e:
-                logger.error(f"Error processing audio download request: {e}")
-                request_data['error'] = str(e)
-                request_data['completed'] = True
-                
-            finally:
-                with processing_lock:
-                    is_processing = False
+            with scheduler.job_slot(job.kind), worker_state.running(), bind_job(job):
+                try:
+                    # Process the request
+                    reel_number = job.params['reel_number']
+                    logger.info(f"Processing audio download request for reel: {reel_number}")
+                    job_store.start(job, stage="downloading audio")
+                    
+                    # Call the audio download script
+                    script_path = os.path.join(os.path.dirname(__file__), 'download_reel_audio.py')
+                    # Run the script, relaying its progress events to the job
+                    result = run_with_events([
+                        sys.executable, script_path, str(reel_number)
+                    ], job, timeout=600)  # 10 minutes timeout
+                    
+                    record_audio_metrics(job.events)
+                    
+                    # Finishing the job wakes any waiting request thread
+                    payload, status_code = build_response(reel_number, result)
+                    job_store.finish(job, payload, status_code)
+                    
+                except Exception as e:
+                    logger.error(f"Error processing audio download request: {e}")
+                    job_store.finish(job, {"success": False, "error": str(e)}, 500)
                     
-        except queue.Empty:
-            continue
         except Exception as e:
             logger.error(f"Error in queue processing: {e}")
 
@@ -80,10 +137,10 @@ def health_check():
         "message": "Audio Download API is running",
         "timestamp": "2025-08-05T17:50:00.000000",
         "queue_size": queue_size,
-        "is_processing": is_processing
+        "is_processing": worker_state.is_processing
     })
 
-@app.route('/download-reel-audio', methods=['POST'])
+@audio_routes.route('/download-reel-audio', methods=['POST'])
 def download_reel_audio():
     """Download audio files for a reel endpoint"""
     try:
@@ -107,73 +164,17 @@ def download_reel_audio():
         
         logger.info(f"Received audio download API request for reel: {reel_number}")
         
-        # Create request data
-        request_data = {
-            'reel_number': reel_number,
-            'completed': False,
-            'result': None,
-            'error': None
-        }
-        
-        # Add to queue
-        request_queue.put(request_data)
+        # Create the job and add it to the queue
+        job = job_store.create('download-reel-audio', {'reel_number': reel_number}, callback_url=data.get('callback_url'))
+        request_queue.put(job)
         logger.info(f"Audio download request queued. Queue size: {request_queue.qsize()}")
         
-        # Wait for completion (with timeout)
-        timeout = 600  # 10 minutes total timeout
-        start_time = time.time()
-        
-        while not request_data['completed'] and (time.time() - start_time) < timeout:
-            time.sleep(1)
-        
-        if not request_data['completed']:
-            return jsonify({
-                "success": False,
-                "error": "Request timed out after 10 minutes"
-            }), 408
+        # Return the job id straight away unless the caller asked to wait
+        if not data.get('wait'):
+            return accepted_response(job)
         
-        # Check for processing error
-        if request_data['error']:
-            return jsonify({
-                "success": False,
-                "error": request_data['error']
-            }), 500
-        
-        # Process result
-        result = request_data['result']
-        if result.returncode == 0:
-            # Extract success message from output
-            output_lines = result.stdout.strip().split('\n')
-            success_line = None
-            for line in output_lines:
-                if line.startswith('SUCCESS: '):
-                    success_line = line
-                    break
-            
-            if success_line:
-                logger.info(f"Audio files downloaded successfully for reel {reel_number}")
-                return jsonify({
-                    "success": True,
-                    "reel_number": reel_number,
-                    "message": success_line,
-                    "details": "Audio files downloaded and saved to organized folder structure",
-                    "audio_directory": f"/Users/devanshc/Desktop/ProteinPapaPanda/{reel_number}/Audio"
-                })
-            else:
-                return jsonify({
-                    "success": False,
-                    "error": "Script completed but no success message found",
-                    "stdout": result.stdout,
-                    "stderr": result.stderr
-                }), 500
-        else:
-            # Extract error from stderr or stdout
-            error_msg = result.stderr.strip() or result.stdout.strip()
-            logger.error(f"Audio download script failed: {error_msg}")
-            return jsonify({
-                "success": False,
-                "error": error_msg
-            }), 500
+        # The worker wakes us as soon as the job finishes; past the wait limit the caller gets the job id
+        return wait_response(job)
             
     except Exception as e:
         logger.error(f"Audio download API error: {e}")
@@ -182,11 +183,16 @@ def download_reel_audio():
             "error": f"Internal server error: {str(e)}"
         }), 500
 
+app.register_blueprint(audio_routes)
+app.register_blueprint(jobs_blueprint)
+app.register_blueprint(metrics_blueprint)
+
 if __name__ == '__main__':
     logger.info("Starting Audio Download API Server...")
     logger.info("API will be available at: http://localhost:5002")
     logger.info("Endpoints:")
     logger.info("  GET  /health - Health check")
-    logger.info("  POST /download-reel-audio - Download audio files for a reel")
+    logger.info("  POST /download-reel-audio - Queue audio download for a reel (returns a job id; \"wait\": true blocks)")
+    logger.info("  GET  /jobs/<job_id> - Job status, progress and result")
     logger.info("Queue system enabled - requests will be processed sequentially")
     app.run(host='0.0.0.0', port=5002, debug=False) 
\ No newline at end of file
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the chat-scanning and file-pairing hot paths
+
+Times get_images_after_prompts, _collect_last_n_image_srcs_with_scrolling
+and download_replies_bottom_up (the download loop of run_batch_in_whatsapp)
+against synthetic chats of 100 to 10,000 messages. Times get_file_pairs and
+DreaminaUploadAgent.get_available_files against reels of 10 to 1,000 files.
+The chat is an in-memory page that loads older messages a window at a time as
+it is scrolled. It counts every Playwright call it answers, and each call
+costs one browser round trip on a real page. So every case reports its
+round trips as well as its time.
+
+Results are compared with a JSON baseline. A case regresses when its median
+time grows past BENCH_THRESHOLD (default 1.25x) by more than
+BENCH_MIN_DELTA_SECONDS, or when it needs more round trips than before.
+
+Usage:
+    python3 bench_hot_paths.py [name_filter]        # run and compare with the baseline
+    python3 bench_hot_paths.py save [name_filter]   # run and store the results as the baseline
+
+Baselines are per machine (BENCH_BASELINE, default bench_baseline.json).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import statistics
+import tempfile
+
+import chatgpt_image_api_server as whatsapp
+import dreamina_upload_api_server as dreamina_server
+from dreamina_upload_agent import DreaminaUploadAgent
+from reel_manifest import record_file
+from sim_whatsapp import make_png
+from stage_ledger import StageLedger
+
+BASELINE_PATH = os.getenv("BENCH_BASELINE", "bench_baseline.json")
+REGRESSION_THRESHOLD = float(os.getenv("BENCH_THRESHOLD", "1.25"))
+# Timing noise below this is ignored, whatever the ratio
+MIN_DELTA_SECONDS = float(os.getenv("BENCH_MIN_DELTA_SECONDS", "0.002"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+
+# Messages WhatsApp keeps loaded at first and adds per scroll up
+CHAT_WINDOW = 100
+
+
+# ============ Synthetic WhatsApp chat ============
+
+class FakeImage:
+    def __init__(self, page, src):
+        self.page = page
+        self.src = src
+
+    def get_attribute(self, name):
+        self.page.round_trips += 1
+        return self.src if name == "src" else None
+
+    def click(self):
+        self.page.round_trips += 1
+        self.page.viewing = self.src
+
+
+class FakeBubble:
+    def __init__(self, page, src=None, text=""):
+        self.page = page
+        self.image = FakeImage(page, src) if src else None
+        self.text = text
+
+    def query_selector(self, selector):
+        self.page.round_trips += 1
+        return self.image
+
+    def inner_text(self):
+        self.page.round_trips += 1
+        return self.text
+
+
+class FakeDownload:
+    def __init__(self, page):
+        self.page = page
+
+    def path(self):
+        self.page.round_trips += 1
+        path = os.path.join(self.page.downloads_dir, f"{len(os.listdir(self.page.downloads_dir))}.png")
+        with open(path, "wb") as f:
+            f.write(self.page.image_bytes)
+        return path
+
+
+class FakeDownloadInfo:
+    def __init__(self, page):
+        self.page = page
+        self.value = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.value = FakeDownload(self.page)
+        return False
+
+
+class FakeKeyboard:
+    def __init__(self, page):
+        self.page = page
+
+    def press(self, key):
+        self.page.round_trips += 1
+        if key == "PageUp":
+            self.page.loaded = min(len(self.page.bubbles), self.page.loaded + self.page.window)
+
+
+class FakeChatPage:
+    """Incoming ChatGPT bubbles of which only the newest `window` are loaded until scrolled up"""
+
+    def __init__(self, messages, images, window=CHAT_WINDOW, downloads_dir=None):
+        self.window = window
+        self.downloads_dir = downloads_dir
+        self.image_bytes = make_png(8, 8, "bench")
+        self.keyboard = FakeKeyboard(self)
+        self.round_trips = 0
+        self.viewing = None
+        # Images spread evenly through the chat, so collecting all of them means scrolling to the top
+        every = max(messages // max(images, 1), 1)
+        image_indices = {messages - 1 - k * every for k in range(images)}
+        self.bubbles = [
+            FakeBubble(self, src=f"blob:https://web.whatsapp.com/{n}") if n in image_indices
+            else FakeBubble(self, text=f"message {n}")
+            for n in range(messages)
+        ]
+        self.loaded = min(window, messages)
+
+    def query_selector_all(self, selector):
+        self.round_trips += 1
+        return self.bubbles[len(self.bubbles) - self.loaded:]
+
+    def click(self, selector, timeout=None):
+        self.round_trips += 1
+
+    def wait_for_selector(self, selector, timeout=None):
+        self.round_trips += 1
+
+    def expect_download(self):
+        return FakeDownloadInfo(self)
+
+
+def chat_prompts(count):
+    return [{"prompt": f"prompt {n}", "line_no": f"{n:03d}", "reel_no": "1", "sent_at": time.time()}
+            for n in range(1, count + 1)]
+
+
+# ============ Synthetic reels ============
+
+def make_reel(base_dir, files, manifest=False):
+    """<base_dir>/Images/<n>.png and <base_dir>/Audio/<n>.mp3 for lines 1..files"""
+    images_dir = os.path.join(base_dir, "Images")
+    audio_dir = os.path.join(base_dir, "Audio")
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(audio_dir, exist_ok=True)
+    for n in range(1, files + 1):
+        for path in (os.path.join(images_dir, f"{n}.png"), os.path.join(audio_dir, f"{n}.mp3")):
+            with open(path, "wb") as f:
+                f.write(b"x")
+            if manifest:
+                record_file(os.path.dirname(path), n, path)
+
+
+def make_agent_library(base_dir, reels, files_per_reel):
+    """images/<reel>/<n>.png and audio/<reel>/<n>.mp3, the layout DreaminaUploadAgent reads"""
+    for reel in range(1, reels + 1):
+        for kind, ext in (("images", ".png"), ("audio", ".mp3")):
+            reel_dir = os.path.join(base_dir, kind, str(reel))
+            os.makedirs(reel_dir, exist_ok=True)
+            for n in range(1, files_per_reel + 1):
+                with open(os.path.join(reel_dir, f"{n}{ext}"), "wb") as f:
+                    f.write(b"x")
+
+
+# ============ Cases ============
+
+class Case:
+    """A benchmark: `setup()` builds fresh inputs, `run(inputs)` is timed and returns round trips (or None)"""
+
+    def __init__(self, name, setup, run, rounds=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.rounds = rounds or ROUNDS
+
+
+def chat_cases(workdir):
+    cases = []
+    for messages in (100, 1000, 10000):
+        replies = min(50, messages // 2)
+
+        def run(page, messages=messages, replies=replies):
+            whatsapp.get_images_after_prompts(page, messages - replies, replies)
+            return page.round_trips
+
+        cases.append(Case(f"get_images_after_prompts[{messages}]",
+                          lambda messages=messages: FakeChatPage(messages, messages, window=messages), run))
+
+    for messages, images in ((100, 10), (1000, 100), (10000, 100)):
+        def run(page, images=images):
+            whatsapp._collect_last_n_image_srcs_with_scrolling(page, images, max_scrolls=200)
+            return page.round_trips
+
+        cases.append(Case(f"collect_image_srcs[{messages}x{images}]",
+                          lambda messages=messages, images=images: FakeChatPage(messages, images), run))
+
+    ledger = StageLedger(os.path.join(workdir, "bench_ledger.db"))
+    downloads_dir = os.path.join(workdir, "downloads")
+    for messages, images in ((100, 10), (1000, 100), (10000, 100)):
+        def setup(messages=messages, images=images):
+            shutil.rmtree(downloads_dir, ignore_errors=True)
+            os.makedirs(downloads_dir)
+            return FakeChatPage(messages, images, downloads_dir=downloads_dir), chat_prompts(images)
+
+        def run(inputs):
+            page, prompts = inputs
+            whatsapp.download_replies_bottom_up(page, prompts, ledger)
+            return page.round_trips
+
+        cases.append(Case(f"download_replies_bottom_up[{messages}x{images}]", setup, run, rounds=min(ROUNDS, 3)))
+    return cases
+
+
+def pairing_cases(workdir):
+    cases = []
+    # get_file_pairs only reads the file system, so skip the browser and ledger setup in __init__
+    api = dreamina_server.DreaminaUploadAPI.__new__(dreamina_server.DreaminaUploadAPI)
+    for files in (10, 100, 1000):
+        for manifest in (False, True):
+            reel = f"{files}{'m' if manifest else ''}"
+            make_reel(os.path.join(workdir, "reels", reel), files, manifest=manifest)
+
+            def run(_, reel=reel):
+                api.get_file_pairs(reel)
+
+            cases.append(Case(f"get_file_pairs[{files}{',manifest' if manifest else ''}]", lambda: None, run))
+
+    for files in (10, 100, 1000):
+        library = os.path.join(workdir, f"library{files}")
+        make_agent_library(library, reels=max(files // 100, 1), files_per_reel=min(files, 100))
+        agent = DreaminaUploadAgent(user_data_dir=os.path.join(workdir, "agent_session"))
+        agent.images_dir = os.path.join(library, "images")
+        agent.audio_dir = os.path.join(library, "audio")
+
+        def run(_, agent=agent):
+            agent.get_available_files()
+
+        cases.append(Case(f"get_available_files[{files}]", lambda: None, run))
+    return cases
+
+
+# ============ Runner ============
+
+class _NoSleep:
+    """The hot paths pause between scrolls and downloads; benchmarks time the work, not the pauses"""
+
+    def __enter__(self):
+        self.sleep = time.sleep
+        time.sleep = lambda seconds: None
+
+    def __exit__(self, *exc):
+        time.sleep = self.sleep
+        return False
+
+
+def measure(case):
+    timings = []
+    round_trips = None
+    for _ in range(case.rounds):
+        inputs = case.setup()
+        start = time.perf_counter()
+        round_trips = case.run(inputs)
+        timings.append(time.perf_counter() - start)
+    return {
+        "rounds": len(timings),
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "mean_seconds": round(statistics.mean(timings), 6),
+        "round_trips": round_trips,
+    }
+
+
+def run_benchmarks(name_filter=None, workdir=None):
+    """Run every case whose name contains `name_filter` and return the results document"""
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_hot_paths_")
+    cwd = os.getcwd()
+    base_dir = dreamina_server.REELS_BASE_DIR
+    results = {}
+    # The download loop saves into images/ and records manifests relative to the working directory
+    os.chdir(workdir)
+    dreamina_server.REELS_BASE_DIR = os.path.join(workdir, "reels")
+    try:
+        with _NoSleep():
+            for case in chat_cases(workdir) + pairing_cases(workdir):
+                if name_filter and name_filter not in case.name:
+                    continue
+                results[case.name] = measure(case)
+                print(f"   {case.name:<46} median {results[case.name]['median_seconds'] * 1000:9.2f} ms"
+                      f"   round trips {results[case.name]['round_trips']}")
+    finally:
+        dreamina_server.REELS_BASE_DIR = base_dir
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "cases": results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD, min_delta=MIN_DELTA_SECONDS):
+    """List the cases that got slower than `threshold` times the baseline, or need more round trips"""
+    regressions = []
+    for name, result in current["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before:
+            continue
+        ratio = result["median_seconds"] / before["median_seconds"] if before["median_seconds"] else 1.0
+        if ratio > threshold and result["median_seconds"] - before["median_seconds"] > min_delta:
+            regressions.append(f"{name}: median {before['median_seconds']}s -> {result['median_seconds']}s ({ratio:.2f}x)")
+        if (before.get("round_trips") is not None and result["round_trips"] is not None
+                and result["round_trips"] > before["round_trips"]):
+            regressions.append(f"{name}: round trips {before['round_trips']} -> {result['round_trips']}")
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    args = sys.argv[1:]
+    save = bool(args) and args[0] == "save"
+    if save:
+        args = args[1:]
+    name_filter = args[0] if args else None
+
+    print("⏱️ Benchmarking hot paths...")
+    results = run_benchmarks(name_filter)
+    baseline_path = os.path.abspath(BASELINE_PATH)
+
+    if save:
+        baseline = load_baseline(baseline_path) or {"cases": {}}
+        baseline.update({k: v for k, v in results.items() if k != "cases"})
+        baseline["cases"].update(results["cases"])
+        save_baseline(baseline, baseline_path)
+        print(f"💾 Saved {len(results['cases'])} result(s) to {baseline_path}")
+        return
+
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        print(f"ℹ️ No baseline at {baseline_path}; run `python3 bench_hot_paths.py save` to create one")
+        return
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {baseline_path} (threshold {REGRESSION_THRESHOLD}x):")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    print(f"✅ No regressions against {baseline_path} (threshold {REGRESSION_THRESHOLD}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Warm browser pool for the automation servers
+
+Keeps browser sessions launched and parked on their working page between
+jobs, so a job starts straight at the form instead of paying for Chromium
+startup and navigation every time. Each slot health-checks its session before
+handing it out, recycles the page after a number of jobs and relaunches the
+browser when it has crashed.
+
+A session is any object with:
+    start_session()  -> None on success, or an error message
+    is_healthy()     -> True when it can take a job right now
+    recycle_page()   -> True when a fresh page is open on the working form
+    close()
+
+A session may also carry a `browser_lease` (resource_governor). The slot
+marks it idle while parked, and `close_if_reclaimed()` closes the browser
+when another service's launch asked for the room.
+
+Playwright's sync API is bound to the thread that started it, so a slot must
+only be used from one thread; run one worker thread per slot. Workers share a
+SlotQueue and block on `get_for(slot)` with no timeout: it returns the next
+job, or RECLAIM once the slot's lease is asked to close, and the worker then
+calls `close_if_reclaimed()`.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Open a fresh page after this many jobs to shed leaked DOM/JS memory
+DEFAULT_RECYCLE_AFTER = 10
+
+# Returned by SlotQueue.get_for() when the slot's browser was asked to close
+RECLAIM = object()
+
+
+class SlotQueue(queue.Queue):
+    """Job queue shared by a pool's workers that can also wake one idle worker for a reclaim"""
+
+    def get_for(self, slot):
+        """Block until a job arrives (returned) or `slot` is asked to close its browser (RECLAIM)"""
+        with self.not_empty:
+            while not self._qsize() and not slot.reclaim_event.is_set():
+                self.not_empty.wait()
+            if slot.reclaim_event.is_set():
+                return RECLAIM
+            item = self._get()
+            self.not_full.notify()
+            return item
+
+    def wake(self):
+        """Wake every waiting worker so the one whose slot was reclaimed sees it"""
+        with self.not_empty:
+            self.not_empty.notify_all()
+
+
+class WarmSlot:
+    """One warm browser session, owned by a single worker thread"""
+
+    def __init__(self, factory, name, recycle_after=DEFAULT_RECYCLE_AFTER, on_reclaim=None):
+        self.factory = factory
+        self.name = name
+        self.recycle_after = recycle_after
+        self.on_reclaim = on_reclaim
+        self.reclaim_event = threading.Event()
+        self.session = None
+        self.busy = False
+        self.jobs_on_page = 0
+        self.total_jobs = 0
+        self.launches = 0
+        self.recycles = 0
+        self.relaunches = 0
+        self.last_error = None
+        self.launched_at = None
+
+    def _launch(self):
+        """Create and start a new session; returns True on success"""
+        start_time = time.time()
+        session = self.factory()
+        error = session.start_session()
+        if error:
+            self.last_error = error
+            logger.error(f"❌ {self.name}: could not start browser session: {error}")
+            session.close()
+            return False
+        self.session = session
+        lease = self._lease()
+        if lease:
+            lease.on_reclaim(self._reclaim_requested)
+        self._mark_idle(True)
+        self.launches += 1
+        self.jobs_on_page = 0
+        self.launched_at = time.time()
+        logger.info(f"🔥 {self.name}: warm session ready in {time.time() - start_time:.1f}s")
+        return True
+
+    def _relaunch(self, reason):
+        """Throw away the current session and start a new one"""
+        logger.warning(f"♻️ {self.name}: relaunching browser ({reason})")
+        self.relaunches += 1
+        self.last_error = reason
+        if self.session:
+            try:
+                self.session.close()
+            except Exception as e:
+                logger.warning(f"⚠️ {self.name}: error closing dead session: {e}")
+            self.session = None
+        return self._launch()
+
+    def warm_up(self):
+        """Launch the session ahead of the first job"""
+        return self.session is not None or self._launch()
+
+    def acquire(self):
+        """Return a healthy session, relaunching it if the health check fails"""
+        if self.session is None:
+            ready = self._launch()
+        elif not self.session.is_healthy():
+            ready = self._relaunch("failed health check")
+        else:
+            ready = True
+        if not ready:
+            raise RuntimeError(f"No browser session available: {self.last_error}")
+        self.busy = True
+        self._mark_idle(False)
+        return self.session
+
+    def release(self, failed=False):
+        """Return the session after a job, recycling or relaunching it as needed"""
+        self.busy = False
+        self.total_jobs += 1
+        self.jobs_on_page += 1
+        if self.session is None:
+            return
+        if failed and not self.session.is_healthy():
+            self._relaunch("unhealthy after failed job")
+        elif self.jobs_on_page >= self.recycle_after:
+            self.recycle()
+        self._mark_idle(True)
+
+    def _lease(self):
+        return getattr(self.session, "browser_lease", None) if self.session else None
+
+    def _mark_idle(self, idle):
+        lease = self._lease()
+        if lease:
+            lease.set_idle(idle)
+
+    def _reclaim_requested(self):
+        # Called from the governor or a signal-handling thread, never the slot's own thread
+        self.reclaim_event.set()
+        if self.on_reclaim:
+            self.on_reclaim()
+
+    def close_if_reclaimed(self):
+        """Close the parked browser if a queued launch asked for its host slot; the next job relaunches"""
+        self.reclaim_event.clear()
+        lease = self._lease()
+        if self.busy or not lease or not lease.reclaim_requested():
+            return False
+        logger.info(f"🧮 {self.name}: closing idle browser to make room for another service")
+        self.close()
+        return True
+
+    def recycle(self):
+        """Replace the session's page with a fresh one, relaunching if that fails"""
+        logger.info(f"🧹 {self.name}: recycling page after {self.jobs_on_page} job(s)")
+        if self.session.recycle_page():
+            self.recycles += 1
+            self.jobs_on_page = 0
+        else:
+            self._relaunch("page recycle failed")
+
+    def close(self):
+        if self.session:
+            self.session.close()
+            self.session = None
+
+    def status(self):
+        return {
+            "name": self.name,
+            "warm": self.session is not None,
+            "busy": self.busy,
+            "jobs_on_page": self.jobs_on_page,
+            "total_jobs": self.total_jobs,
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "relaunches": self.relaunches,
+            "uptime_seconds": round(time.time() - self.launched_at, 1) if self.session and self.launched_at else 0,
+            "last_error": self.last_error
+        }
+
+
+class WarmBrowserPool:
+    """A fixed set of warm slots; `factory(index)` builds the session for slot `index`
+
+    Pass the workers' SlotQueue as `jobs` so a reclaimed slot wakes its worker.
+    """
+
+    def __init__(self, factory, size=1, recycle_after=DEFAULT_RECYCLE_AFTER, name="browser", jobs=None):
+        self.slots = [
+            WarmSlot(lambda index=index: factory(index), f"{name}-{index + 1}", recycle_after,
+                     on_reclaim=jobs.wake if jobs else None)
+            for index in range(size)
+        ]
+
+    def busy_count(self):
+        return sum(1 for slot in self.slots if slot.busy)
+
+    def status(self):
+        return [slot.status() for slot in self.slots]
@@ -13,31 +13,118 @@ Endpoints:
         1) { "rows": [{"prompt": str, "line_no": str|int, "reel_no": str|int}, ...], "wait_minutes"?: int }
         2) { "reel_number": str|int, "wait_minutes"?: int }
            Will fetch prompts from Google Sheets using `sheets.get_prompts_by_reel`.
+        3) { "reel_numbers": [str|int, ...], "chunk_size"?: int, "chunk_pause_seconds"?: int }
+           Fetches every reel's prompts from one sheet snapshot and runs them all
+           in one WhatsApp session, sending `chunk_size` prompts at a time with a
+           pause between chunks to stay under ChatGPT's rate limit. Images are
+           saved per reel under images/<reel>/.
+      "grid_size": 2 or 3 (or WHATSAPP_GRID_SIZE) packs up to 4 or 9 consecutive
+      prompts of a reel into one generation and splits the grid into per-line images.
+      "reference_image": path (or WHATSAPP_REFERENCE_IMAGE) uploads a style reference
+      once per chat context window; prompts then refer to it instead of restating the style.
+      Batches run one at a time on a background worker. The response is a job id
+      (HTTP 202) unless the body has "wait": true; "callback_url" receives the
+      finished job as a JSON POST.
+  - GET  /jobs/<job_id>
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify
 from playwright.sync_api import sync_playwright
 import os
 import time
 import shutil
+import queue
 import logging
+import threading
 from datetime import datetime
 
+from reel_manifest import record_file
+from job_store import get_job_store, accepted_response, wait_response, jobs_blueprint, WorkerState, QUEUE_DEPTH, JOBS_RUNNING
+from metrics import metrics_blueprint, counter, histogram
+from pipeline_scheduler import get_scheduler
+from job_events import bind_job, publish
+from tracing import span, traced, current_span
+from stage_ledger import get_stage_ledger, text_fingerprint, image_fingerprint, reference_sha256
+from rate_governor import get_governor, governors_blueprint
+from resource_governor import acquire_browser
+from har_replay import get_har_session
+from image_grid import GRID_SIZES, can_split_downloads, grid_prompt, split_grid_file
+
 try:
     # Optional import; only needed when using reel_number fetch
-    from sheets import get_prompts_by_reel
+    from sheets import get_prompts_by_reel, get_prompts_by_reels
 except Exception:
     get_prompts_by_reel = None
+    get_prompts_by_reels = None
 
 app = Flask(__name__)
 
+# Pipeline routes, also mounted by gateway_server.py
+batch_image_routes = Blueprint('batch_image_generation', __name__)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Batches share one WhatsApp session, so they run one at a time from this queue
+request_queue = queue.Queue()
+worker_state = WorkerState()
+job_store = get_job_store()
+QUEUE_DEPTH.labels(service="batch_image_generation").set_function(request_queue.qsize)
+JOBS_RUNNING.labels(service="batch_image_generation").set_function(lambda: worker_state.active)
+scheduler = get_scheduler()
+
+
+BROWSER_LAUNCH_SECONDS = histogram("pipeline_browser_launch_seconds", "Time to launch a persistent browser context", ["service"])
+CHAT_READY_SECONDS = histogram("whatsapp_chat_ready_seconds", "Time from opening WhatsApp Web to the ChatGPT chat being open")
+PROMPT_SEND_SECONDS = histogram("whatsapp_prompt_send_seconds", "Time to send one prompt, including retries")
+PROMPT_REPLY_SECONDS = histogram("whatsapp_prompt_reply_seconds", "Time from sending a prompt to finding its image in the chat")
+IMAGE_DOWNLOAD_SECONDS = histogram("whatsapp_image_download_seconds", "Time to download one generated image")
+IMAGES_TOTAL = counter("whatsapp_images_total", "Generated images handled", ["result"])
+REFERENCE_UPLOADS = counter("whatsapp_reference_uploads_total", "Style reference image uploads to the chat", ["result"])
+
+# Prompts sent back to back before pausing, and the pause, so large multi-reel
+# batches stay under ChatGPT's image rate limit
+PROMPT_CHUNK_SIZE = int(os.getenv("WHATSAPP_PROMPT_CHUNK_SIZE", "10"))
+CHUNK_PAUSE_SECONDS = int(os.getenv("WHATSAPP_CHUNK_PAUSE_SECONDS", "120"))
+
+# Prompt packing: 2 or 3 asks for a 2x2 or 3x3 grid of consecutive lines per
+# generation (0 sends one prompt per line)
+GRID_SIZE = int(os.getenv("WHATSAPP_GRID_SIZE", "0"))
+
+# Style reference image uploaded once per chat context window ("" = off), e.g.
+# ppp_reference_image/<house-style panda>.png. The context window rolls over
+# after this many prompts or hours, and the image is attached again.
+REFERENCE_IMAGE_PATH = os.getenv("WHATSAPP_REFERENCE_IMAGE", "")
+REFERENCE_WINDOW_PROMPTS = int(os.getenv("WHATSAPP_REFERENCE_WINDOW_PROMPTS", "20"))
+REFERENCE_WINDOW_HOURS = float(os.getenv("WHATSAPP_REFERENCE_WINDOW_HOURS", "6"))
+REFERENCE_CAPTION = (
+    "This is the style reference for the images I will ask for next. Match its art style, "
+    "character design and colour palette in every one of them. Reply with text only to this message."
+)
+REFERENCE_PREFIX = "Using the style reference image I sent earlier: "
+
+# WhatsApp Web address and browser mode (a local sim_whatsapp page runs headless)
+WHATSAPP_WEB_URL = os.getenv("WHATSAPP_WEB_URL", "https://web.whatsapp.com/")
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS") == "1"
+
+# How often the chat is checked for replies while waiting
+REPLY_POLL_SECONDS = 2
+
+# ChatGPT replies that mean a prompt was refused or failed
+REFUSAL_INDICATORS = (
+    "Sorry, I can't generate that image",
+    "I'm unable to create this image",
+    "Error generating image",
+    "Unable to process",
+    "Sorry, I can't do that"
+)
+
 
 # ============ Core WhatsApp helpers (adapted from chatgpt_image_gen.py) ============
 
+@traced("whatsapp.send_prompt")
+@PROMPT_SEND_SECONDS.time()
 def send_prompt_with_retry(page, prompt, max_retries=3):
     for attempt in range(max_retries):
         try:
@@ -49,6 +136,7 @@ def send_prompt_with_retry(page, prompt, max_retries=3):
             return True
         except Exception as e:
             logger.warning(f"Attempt {attempt + 1} failed: {e}")
+            current_span().add_event("send_failed", attempt=attempt + 1, error=str(e))
             if attempt < max_retries - 1:
                 time.sleep(5)
             else:
@@ -61,6 +149,180 @@ def get_message_count_before_prompts(page):
     return len(messages)
 
 
+# ============ Style reference image ============
+
+ATTACH_BUTTON_SELECTORS = ["span[data-icon='plus-rounded']", "span[data-icon='plus']", "span[data-icon='clip']"]
+IMAGE_INPUT_SELECTOR = "input[type='file'][accept*='image']"
+MEDIA_SEND_SELECTOR = "span[data-icon='send'], span[data-icon='wds-ic-send-filled']"
+
+
+@traced("whatsapp.upload_reference")
+def upload_reference_image(page, image_path, caption, reply_timeout=60):
+    """Send `image_path` with `caption` from the attach menu and wait for ChatGPT to acknowledge it.
+    Returns True once a new reply arrives, False if it was sent but not answered in time.
+    """
+    before = get_message_count_before_prompts(page)
+    for selector in ATTACH_BUTTON_SELECTORS:
+        try:
+            page.click(selector, timeout=3000)
+            break
+        except Exception:
+            continue
+    page.set_input_files(IMAGE_INPUT_SELECTOR, image_path)
+    page.wait_for_selector(MEDIA_SEND_SELECTOR, timeout=15000)
+    # The caption box has focus in the media preview
+    page.keyboard.type(caption)
+    page.click(MEDIA_SEND_SELECTOR)
+
+    deadline = time.time() + reply_timeout
+    while time.time() < deadline:
+        if get_message_count_before_prompts(page) > before:
+            return True
+        time.sleep(REPLY_POLL_SECONDS)
+    return False
+
+
+class ReferenceImageSession:
+    """Keeps a style reference image in the ChatGPT chat's context.
+
+    The image is uploaded the first time it is needed, then prompts only point
+    back at it. It is uploaded again when the window rolls over (too many
+    prompts or hours since the last upload) or when the file changes. State
+    lives in the process, so back-to-back batches share one upload.
+    """
+
+    def __init__(self, image_path, window_prompts=REFERENCE_WINDOW_PROMPTS,
+                 window_hours=REFERENCE_WINDOW_HOURS, uploader=upload_reference_image):
+        self.image_path = image_path
+        self.window_prompts = window_prompts
+        self.window_hours = window_hours
+        self.uploader = uploader
+        self.lock = threading.Lock()
+        self.attached_sha256 = None
+        self.attached_at = None
+        self.prompts_since = 0
+
+    def image_sha256(self):
+        return reference_sha256(self.image_path) or None
+
+    def rollover_reason(self, sha256=None):
+        """Why the image has to be attached (again), or None while the current upload still holds"""
+        sha256 = sha256 or self.image_sha256()
+        if self.attached_sha256 is None:
+            return "not attached yet"
+        if sha256 != self.attached_sha256:
+            return "reference image changed"
+        if self.window_prompts and self.prompts_since >= self.window_prompts:
+            return f"{self.prompts_since} prompts since the last upload"
+        if self.window_hours and time.time() - self.attached_at >= self.window_hours * 3600:
+            return f"over {self.window_hours:g}h since the last upload"
+        return None
+
+    def ensure(self, page):
+        """Upload the image if the window rolled over. Returns True when this call uploaded it
+        and ChatGPT replied, so the caller can count that reply.
+        """
+        with self.lock:
+            sha256 = self.image_sha256()
+            if sha256 is None:
+                logger.warning(f"⚠️ Reference image not found: {self.image_path}")
+                self.attached_sha256 = None
+                return False
+            reason = self.rollover_reason(sha256)
+            if reason is None:
+                return False
+            logger.info(f"🖼️ Attaching reference image ({reason})")
+            try:
+                acknowledged = self.uploader(page, self.image_path, REFERENCE_CAPTION)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not attach reference image: {e}")
+                REFERENCE_UPLOADS.labels(result="failed").inc()
+                self.attached_sha256 = None
+                return False
+            REFERENCE_UPLOADS.labels(result="attached").inc()
+            publish("reference_attached", path=self.image_path, reason=reason)
+            self.attached_sha256 = sha256
+            self.attached_at = time.time()
+            self.prompts_since = 0
+            return acknowledged
+
+    def wrap(self, prompt):
+        """The prompt as sent: pointing at the reference while one is attached"""
+        with self.lock:
+            return f"{REFERENCE_PREFIX}{prompt}" if self.attached_sha256 else prompt
+
+    def prompt_sent(self):
+        with self.lock:
+            self.prompts_since += 1
+
+    def fingerprint(self, prompt):
+        """Ledger fingerprint of a line generated against this reference"""
+        return image_fingerprint(prompt, reference_sha256(self.image_path))
+
+
+_reference_sessions = {}
+_reference_sessions_lock = threading.Lock()
+
+
+def get_reference_session(image_path):
+    """Return the process-wide reference session for an image, or None when no image is set"""
+    if not image_path:
+        return None
+    with _reference_sessions_lock:
+        if image_path not in _reference_sessions:
+            _reference_sessions[image_path] = ReferenceImageSession(image_path)
+        return _reference_sessions[image_path]
+
+
+def is_refusal(text):
+    text = (text or "").lower()
+    return any(indicator.lower() in text for indicator in REFUSAL_INDICATORS)
+
+
+def count_refusals(page, message_count_before_prompts):
+    """Refusals among the replies since `message_count_before_prompts`, read in one round trip"""
+    try:
+        texts = page.evaluate(
+            "start => [...document.querySelectorAll('.message-in')].slice(start).map(m => m.innerText || '')",
+            message_count_before_prompts
+        )
+    except Exception as e:
+        logger.warning(f"Could not scan replies for refusals: {e}")
+        return 0
+    return sum(1 for text in texts if is_refusal(text))
+
+
+@traced("whatsapp.wait_for_replies")
+def wait_for_replies(page, message_count_before_prompts, expected_count, wait_minutes):
+    """Wait until ChatGPT has answered every prompt (image or refusal) or `wait_minutes` pass.
+    Each refusal among the replies backs the WhatsApp governor off.
+    """
+    deadline = time.time() + wait_minutes * 60
+    replies = 0
+    received = False
+    while time.time() < deadline:
+        replies = page.evaluate(
+            "start => [...document.querySelectorAll('.message-in')].slice(start).length",
+            message_count_before_prompts
+        )
+        if replies >= expected_count:
+            logger.info(f"All {expected_count} replies received")
+            received = True
+            break
+        time.sleep(REPLY_POLL_SECONDS)
+    if not received:
+        logger.warning(f"Only {replies}/{expected_count} replies after {wait_minutes} minutes, collecting what arrived")
+
+    refusals = count_refusals(page, message_count_before_prompts)
+    if refusals:
+        logger.warning(f"Detected {refusals} refusal(s) among the replies")
+        governor = get_governor("whatsapp")
+        for _ in range(refusals):
+            governor.backoff("ChatGPT refused a prompt")
+    return received
+
+
+@traced("whatsapp.get_images_after_prompts")
 def get_images_after_prompts(page, message_count_before_prompts, expected_count):
     logger.info("Fetching images generated after prompts...")
     all_messages = page.query_selector_all(".message-in")
@@ -75,23 +337,21 @@ def get_images_after_prompts(page, message_count_before_prompts, expected_count)
                 new_images.append(img_src)
 
     # Basic error detection in new messages
-    error_indicators = [
-        "Sorry, I can't generate that image",
-        "I'm unable to create this image",
-        "Error generating image",
-        "Unable to process",
-        "Sorry, I can't do that"
-    ]
     error_count = 0
     for bubble in new_messages:
         try:
-            message_text = (bubble.inner_text() or "").lower()
+            message_text = bubble.inner_text()
         except Exception:
             message_text = ""
-        for indicator in error_indicators:
-            if indicator.lower() in message_text:
-                error_count += 1
-                break
+        if is_refusal(message_text):
+            error_count += 1
+
+    # Refusals slow the next batch down, clean images speed it up
+    governor = get_governor("whatsapp")
+    for _ in range(error_count):
+        governor.backoff("ChatGPT refused a prompt")
+    for _ in new_images[:expected_count]:
+        governor.success()
 
     if error_count:
         logger.warning(f"Detected {error_count} error message(s) after prompts")
@@ -101,6 +361,7 @@ def get_images_after_prompts(page, message_count_before_prompts, expected_count)
     return new_images
 
 
+@traced("whatsapp.download_image")
 def download_image_by_src(page, img_src, save_path):
     try:
         img_elem = page.query_selector(f"img[src='{img_src}']")
@@ -126,6 +387,7 @@ def download_image_by_src(page, img_src, save_path):
         return False
 
 
+@traced("whatsapp.download_image")
 def download_image_from_element(page, img_elem, save_path):
     """Download image by clicking a given image element and using the viewer's download button."""
     try:
@@ -195,6 +457,7 @@ def _scroll_chat_up(page):
     return False
 
 
+@traced("whatsapp.collect_images")
 def _collect_last_n_image_srcs_with_scrolling(page, n, max_scrolls=120):
     """Collect last n image srcs by scanning from bottom and scrolling up as needed."""
     images_collected = []
@@ -238,61 +501,294 @@ def _collect_last_n_image_srcs_with_scrolling(page, n, max_scrolls=120):
     return images_collected[:n]
 
 
-def run_batch_in_whatsapp(rows, wait_minutes=10):
+@traced("whatsapp.download_replies")
+def download_replies_bottom_up(page, prompts, ledger, on_image_saved=None, max_scrolls=200):
+    """Match image replies to `prompts` from the bottom of the chat up and download each one.
+    Scrolls up for older messages until every prompt has its image or `max_scrolls` is reached.
+    A packed prompt (one with "members") gets a grid reply, which is split into one image per member.
+    Returns (results, downloaded, missing): results and downloaded count lines, missing counts prompts.
+    """
+    logger.info("Collecting last N images by scrolling up from the bottom and downloading immediately...")
+    governor = get_governor("whatsapp")
+    expected = len(_lines(prompts))
+    next_prompt_index = len(prompts) - 1
+    downloaded = 0
+    seen_srcs = set()
+    results = []
+    scrolls = 0
+
+    while next_prompt_index >= 0 and scrolls <= max_scrolls:
+        try:
+            bubbles = page.query_selector_all(".message-in")
+            # Iterate bottom to top
+            for bubble in reversed(bubbles):
+                if next_prompt_index < 0:
+                    break
+                try:
+                    img_elem = bubble.query_selector("img[src^='blob:']")
+                except Exception:
+                    img_elem = None
+                if not img_elem:
+                    continue
+                try:
+                    img_src = img_elem.get_attribute('src')
+                except Exception:
+                    img_src = None
+                if img_src and img_src in seen_srcs:
+                    continue
+
+                item = prompts[next_prompt_index]
+                reel_no = item["reel_no"]
+                line_no = item["line_no"]
+                save_dir = os.path.join("images", str(reel_no))
+                if item.get("members"):
+                    image_path = os.path.join(save_dir, "grids", f"{line_no}.png")
+                else:
+                    image_path = os.path.join(save_dir, f"{line_no}.png")
+
+                publish("image_received", reel_no=reel_no, line_no=line_no)
+                PROMPT_REPLY_SECONDS.observe(time.time() - item["sent_at"])
+                with IMAGE_DOWNLOAD_SECONDS.time():
+                    ok = download_image_from_element(page, img_elem, image_path)
+                IMAGES_TOTAL.labels(result="saved" if ok else "failed").inc()
+                if ok:
+                    # A clean image reply lets the next prompts go out faster
+                    governor.success()
+                    next_prompt_index -= 1
+                    if item.get("members"):
+                        saved = _split_grid_reply(item, image_path, ledger)
+                    else:
+                        saved = [(item, image_path)]
+                    for line, line_path in saved:
+                        downloaded += 1
+                        if str(line["line_no"]).isdigit():
+                            record_file(save_dir, int(line["line_no"]), line_path)
+                        ledger.succeed(line["reel_no"], line["line_no"], "image", artifact_path=line_path,
+                                       fingerprint=line.get("fingerprint") or text_fingerprint(line["prompt"]))
+                        publish("image_saved", reel_no=line["reel_no"], line_no=line["line_no"], path=line_path,
+                                bytes=os.path.getsize(line_path), downloaded=downloaded, expected=expected)
+                        if on_image_saved:
+                            on_image_saved(line["reel_no"], line["line_no"], line_path)
+                else:
+                    saved = []
+                    publish("image_failed", reel_no=reel_no, line_no=line_no)
+                saved_lines = {line["line_no"]: line_path for line, line_path in saved}
+                for line in item.get("members") or [item]:
+                    results.append({
+                        "reel_no": line["reel_no"],
+                        "line_no": line["line_no"],
+                        "downloaded": line["line_no"] in saved_lines,
+                        "file_path": saved_lines.get(line["line_no"]),
+                    })
+                if img_src:
+                    seen_srcs.add(img_src)
+
+                if next_prompt_index < 0:
+                    break
+
+            if next_prompt_index < 0:
+                break
+
+            # Scroll up to load older messages
+            _scroll_chat_up(page)
+            scrolls += 1
+            time.sleep(0.5)
+        except Exception as e:
+            logger.warning(f"Error during bottom-up download loop: {e}")
+            time.sleep(0.5)
+
+    return results, downloaded, next_prompt_index + 1
+
+
+def _split_grid_reply(item, grid_path, ledger):
+    """Split a packed prompt's grid into images/<reel>/<line>.png per member; [(member, path)]"""
+    members = item["members"]
+    paths = [os.path.join("images", str(m["reel_no"]), f"{m['line_no']}.png") for m in members]
+    try:
+        split_grid_file(grid_path, paths, item["grid_size"])
+    except Exception as e:
+        logger.warning(f"⚠️ Could not split grid {grid_path}: {e}")
+        for member in members:
+            ledger.fail(member["reel_no"], member["line_no"], "image", f"Grid split failed: {e}")
+        return []
+    logger.info(f"🔲 Split {grid_path} into {len(members)} images")
+    return list(zip(members, paths))
+
+
+def pack_prompts(prompts, grid_size):
+    """Pack runs of consecutive same-reel prompts into one grid prompt of up to grid_size² lines.
+    A run of one line stays a plain prompt.
+    """
+    per_grid = grid_size * grid_size
+    packed = []
+    run = []
+
+    def flush():
+        for start in range(0, len(run), per_grid):
+            members = run[start:start + per_grid]
+            if len(members) == 1:
+                packed.append(members[0])
+                continue
+            packed.append({
+                "prompt": grid_prompt([m["prompt"] for m in members], grid_size),
+                "reel_no": members[0]["reel_no"],
+                "line_no": f"grid-{members[0]['line_no']}-{members[-1]['line_no']}",
+                "grid_size": grid_size,
+                "members": members,
+            })
+        run.clear()
+
+    for item in prompts:
+        if run and run[-1]["reel_no"] != item["reel_no"]:
+            flush()
+        run.append(item)
+    flush()
+    return packed
+
+
+def _lines(items):
+    """Expand packed prompts back into their lines"""
+    return [line for item in items for line in (item.get("members") or [item])]
+
+
+def _per_reel_summary(sent_prompts, results):
+    """Sent and downloaded counts per reel for multi-reel batches"""
+    reels = {}
+    for item in _lines(sent_prompts):
+        reels.setdefault(item["reel_no"], {"sent": 0, "downloaded": 0})["sent"] += 1
+    for result in results:
+        if result["downloaded"]:
+            reels[result["reel_no"]]["downloaded"] += 1
+    return reels
+
+
+@traced("whatsapp.run_batch")
+def run_batch_in_whatsapp(rows, wait_minutes=10, on_image_saved=None,
+                          chunk_size=PROMPT_CHUNK_SIZE, chunk_pause_seconds=None,
+                          grid_size=GRID_SIZE, reference_image=REFERENCE_IMAGE_PATH):
     """Core batch flow:
     - Opens WhatsApp Web (persistent session)
-    - Sends all prompts
-    - Waits `wait_minutes`
+    - With `reference_image`, attaches it when the chat's context window needs it
+    - With `grid_size` 2 or 3, packs consecutive lines of a reel into one grid prompt
+    - Sends all prompts, `chunk_size` at a time with `chunk_pause_seconds`
+      (CHUNK_PAUSE_SECONDS by default) between chunks
+    - Waits up to `wait_minutes` for a reply to every prompt
     - Collects the most recent N images and downloads them in order to images/<reel>/<line>.png
-    Returns a summary dict.
+    Lines the stage ledger already has an intact image for are skipped.
+    Calls `on_image_saved(reel_no, line_no, image_path)` as each image lands
+    (and for every skipped line). Returns a summary dict.
     """
-    whatsapp_url = "https://web.whatsapp.com/"
+    whatsapp_url = WHATSAPP_WEB_URL
+    if chunk_pause_seconds is None:
+        chunk_pause_seconds = CHUNK_PAUSE_SECONDS
     chat_name = "ChatGPT"
     user_data_dir = os.path.abspath("whatsapp_session")
     downloads_dir = os.path.abspath(".whatsapp_downloads")
 
+    reference = get_reference_session(reference_image)
+    # Images made against a different reference are out of date
+    reference_hash = reference_sha256(reference_image)
     prompts = []
     for row in rows:
         prompts.append({
             "prompt": row["prompt"],
             "line_no": str(row["line_no"]),
             "reel_no": str(row["reel_no"]),
+            "fingerprint": image_fingerprint(row["prompt"], reference_hash),
         })
 
+    # Skip lines a previous run already saved intact from the same prompt
+    ledger = get_stage_ledger()
+    already_saved = []
+    for item in prompts:
+        image_path = os.path.join("images", item["reel_no"], f"{item['line_no']}.png")
+        if ledger.done(item["reel_no"], item["line_no"], "image", artifact_path=image_path,
+                       fingerprint=item["fingerprint"]):
+            already_saved.append(item)
+            if on_image_saved:
+                on_image_saved(item["reel_no"], item["line_no"], image_path)
+    prompts = [item for item in prompts if item not in already_saved]
+    if already_saved:
+        logger.info(f"⏭️ Skipping {len(already_saved)} line(s) already generated")
+    if not prompts:
+        return {
+            "success": True,
+            "message": f"All {len(already_saved)} images were already generated.",
+            "sent": 0,
+            "downloaded": 0,
+            "skipped": len(already_saved),
+            "results": [],
+        }
+    total_lines = len(prompts)
+    if grid_size in GRID_SIZES and not can_split_downloads():
+        logger.warning("⚠️ Pillow is not installed, so JPEG grids cannot be split; sending one prompt per line")
+        grid_size = 0
+    if grid_size in GRID_SIZES:
+        prompts = pack_prompts(prompts, grid_size)
+        logger.info(f"🔲 Packed {total_lines} lines into {len(prompts)} prompt(s) of up to {grid_size}x{grid_size}")
+
     sent = 0
     downloaded = 0
     errors = []
 
     playwright_instance = None
     context = None
+    lease = None
+    har = get_har_session("whatsapp")
 
     try:
-        playwright_instance = sync_playwright().start()
-        context = playwright_instance.chromium.launch_persistent_context(
-            user_data_dir,
-            headless=False,
-            accept_downloads=True,
-            downloads_path=downloads_dir,
-        )
-        page = context.new_page()
-        page.goto(whatsapp_url)
-
-        chat_selector = f"span[title='{chat_name}']"
-        page.wait_for_selector(chat_selector, timeout=120000)
-        page.click(chat_selector)
+        # Wait for room on the host before adding another Chromium
+        lease = acquire_browser("whatsapp")
+        with BROWSER_LAUNCH_SECONDS.time(service="whatsapp"), span("whatsapp.launch_browser"):
+            playwright_instance = sync_playwright().start()
+            context = playwright_instance.chromium.launch_persistent_context(
+                user_data_dir,
+                headless=BROWSER_HEADLESS,
+                accept_downloads=True,
+                downloads_path=downloads_dir,
+                **(har.context_options() if har else {})
+            )
+            if har:
+                har.attach(context)
+        with CHAT_READY_SECONDS.time(), span("whatsapp.open_chat"):
+            page = context.new_page()
+            page.goto(whatsapp_url)
+
+            chat_selector = f"span[title='{chat_name}']"
+            page.wait_for_selector(chat_selector, timeout=120000)
+            page.click(chat_selector)
+        if har:
+            har.snapshot(page, "chat_open")
 
         # Record initial message count
         message_count_before_prompts = get_message_count_before_prompts(page)
 
         # Send all prompts
         successful_prompts = []
-        for item in prompts:
-            if send_prompt_with_retry(page, item["prompt"]):
+        reference_replies = 0
+        governor = get_governor("whatsapp")
+        for index, item in enumerate(prompts):
+            if index and chunk_size and index % chunk_size == 0:
+                logger.info(f"⏸️ Sent {index}/{len(prompts)} prompts, pausing {chunk_pause_seconds}s before the next chunk")
+                publish("chunk_paused", sent=index, total=len(prompts), seconds=chunk_pause_seconds)
+                time.sleep(chunk_pause_seconds)
+            if reference and reference.ensure(page):
+                # ChatGPT's acknowledgement is one more reply to wait for
+                reference_replies += 1
+            governor.wait()
+            if send_prompt_with_retry(page, reference.wrap(item["prompt"]) if reference else item["prompt"]):
+                item["sent_at"] = time.time()
+                if reference:
+                    reference.prompt_sent()
+                for line in _lines([item]):
+                    ledger.start(line["reel_no"], line["line_no"], "image")
                 successful_prompts.append(item)
-                sent += 1
-                time.sleep(10)
+                sent += len(_lines([item]))
+                publish("prompt_sent", reel_no=item["reel_no"], line_no=item["line_no"], sent=sent, total=total_lines)
             else:
+                governor.backoff("prompt could not be sent")
                 errors.append({"type": "send_failed", "item": item})
+                publish("prompt_failed", reel_no=item["reel_no"], line_no=item["line_no"])
                 break
 
         if not successful_prompts:
@@ -305,70 +801,23 @@ def run_batch_in_whatsapp(rows, wait_minutes=10):
                 "results": [],
             }
 
-        # Post-wait bottom-up retrieval with scrolling
-        logger.info("Collecting last N images by scrolling up from the bottom and downloading immediately...")
-        expected = len(successful_prompts)
-        next_prompt_index = expected - 1
-        seen_srcs = set()
-        results = []
-        scrolls = 0
-        max_scrolls = 200
-
-        while next_prompt_index >= 0 and scrolls <= max_scrolls:
-            try:
-                bubbles = page.query_selector_all(".message-in")
-                # Iterate bottom to top
-                for bubble in reversed(bubbles):
-                    if next_prompt_index < 0:
-                        break
-                    try:
-                        img_elem = bubble.query_selector("img[src^='blob:']")
-                    except Exception:
-                        img_elem = None
-                    if not img_elem:
-                        continue
-                    try:
-                        img_src = img_elem.get_attribute('src')
-                    except Exception:
-                        img_src = None
-                    if img_src and img_src in seen_srcs:
-                        continue
-
-                    reel_no = successful_prompts[next_prompt_index]["reel_no"]
-                    line_no = successful_prompts[next_prompt_index]["line_no"]
-                    save_dir = os.path.join("images", str(reel_no))
-                    image_path = os.path.join(save_dir, f"{line_no}.png")
-
-                    ok = download_image_from_element(page, img_elem, image_path)
-                    if ok:
-                        downloaded += 1
-                        next_prompt_index -= 1
-                    results.append({
-                        "reel_no": reel_no,
-                        "line_no": line_no,
-                        "downloaded": ok,
-                        "file_path": image_path if ok else None,
-                    })
-                    if img_src:
-                        seen_srcs.add(img_src)
-
-                    if next_prompt_index < 0:
-                        break
+        if har:
+            har.snapshot(page, "prompts_sent")
 
-                if next_prompt_index < 0:
-                    break
-
-                # Scroll up to load older messages
-                _scroll_chat_up(page)
-                scrolls += 1
-                time.sleep(0.5)
-            except Exception as e:
-                logger.warning(f"Error during bottom-up download loop: {e}")
-                time.sleep(0.5)
+        # Replies are matched to prompts bottom-up, so wait for all of them first
+        wait_for_replies(page, message_count_before_prompts, len(successful_prompts) + reference_replies, wait_minutes)
+        if har:
+            har.snapshot(page, "replies_received")
 
-        remaining = next_prompt_index + 1
+        # Post-wait bottom-up retrieval with scrolling
+        expected = len(_lines(successful_prompts))
+        results, downloaded, remaining = download_replies_bottom_up(page, successful_prompts, ledger, on_image_saved)
+        if har:
+            har.snapshot(page, "images_downloaded")
         if remaining > 0:
             logger.warning(f"Bottom-up retrieval ended with {remaining} image(s) still missing after scrolling.")
+            for item in _lines(successful_prompts[:remaining]):
+                ledger.fail(item["reel_no"], item["line_no"], "image", "Image not found in chat")
 
         return {
             "success": downloaded == expected,
@@ -377,6 +826,8 @@ def run_batch_in_whatsapp(rows, wait_minutes=10):
             "downloaded": downloaded,
             "results": results,
             "missing": remaining if remaining > 0 else 0,
+            "skipped": len(already_saved),
+            "reels": _per_reel_summary(successful_prompts, results),
         }
 
     except Exception as e:
@@ -400,6 +851,39 @@ def run_batch_in_whatsapp(rows, wait_minutes=10):
                 playwright_instance.stop()
         except Exception:
             pass
+        if lease:
+            lease.release()
+
+
+def process_queue():
+    """Background thread that runs queued batches one at a time"""
+    while True:
+        # Block until the next batch arrives
+        item = request_queue.get()
+        if item is None:  # Shutdown signal
+            break
+
+        job, rows = item
+        with scheduler.job_slot(job.kind), worker_state.running(), bind_job(job):
+            try:
+                job_store.start(job, stage="generating images", total_prompts=len(rows))
+                summary = run_batch_in_whatsapp(
+                    rows,
+                    wait_minutes=job.params['wait_minutes'],
+                    chunk_size=job.params['chunk_size'],
+                    chunk_pause_seconds=job.params['chunk_pause_seconds'],
+                    grid_size=job.params['grid_size'],
+                    reference_image=job.params['reference_image']
+                )
+                job_store.finish(job, summary, 200 if summary.get("success") else 500)
+            except Exception as e:
+                logger.exception("Batch job failed")
+                job_store.finish(job, {"success": False, "error": str(e)}, 500)
+
+
+# Start the background processing thread
+queue_thread = threading.Thread(target=process_queue, daemon=True)
+queue_thread.start()
 
 
 # ============ Flask endpoints ============
@@ -410,22 +894,60 @@ def health_check():
         "status": "healthy",
         "message": "ChatGPT Image Generation API is running",
         "timestamp": datetime.now().isoformat(),
+        "queue_size": request_queue.qsize(),
+        "is_processing": worker_state.is_processing
     })
 
 
-@app.route('/batch-generate-images', methods=['POST'])
+def rows_for_reels(prompts_by_reel):
+    """Flatten {reel: prompts} from sheets.get_prompts_by_reels into batch rows, reel by reel"""
+    return [
+        {"prompt": p["prompt"], "line_no": p["line_no"], "reel_no": str(reel)}
+        for reel, prompts in prompts_by_reel.items()
+        for p in prompts
+    ]
+
+
+@batch_image_routes.route('/batch-generate-images', methods=['POST'])
 def batch_generate_images():
     try:
         data = request.get_json(force=True)
         wait_minutes = int(data.get('wait_minutes', 10))
 
+        chunk_size = int(data.get('chunk_size', PROMPT_CHUNK_SIZE))
+        chunk_pause_seconds = int(data.get('chunk_pause_seconds', CHUNK_PAUSE_SECONDS))
+        grid_size = int(data.get('grid_size', GRID_SIZE))
+        reference_image = data.get('reference_image', REFERENCE_IMAGE_PATH) or ""
+        if reference_image and not os.path.isfile(reference_image):
+            return jsonify({
+                "success": False,
+                "error": f"'reference_image' not found: {reference_image}"
+            }), 400
+        if grid_size and grid_size not in GRID_SIZES:
+            return jsonify({
+                "success": False,
+                "error": f"'grid_size' must be 0 (off) or one of {list(GRID_SIZES)}"
+            }), 400
+        if grid_size and not can_split_downloads():
+            return jsonify({
+                "success": False,
+                "error": "'grid_size' needs Pillow to split WhatsApp's JPEG downloads (pip install -r requirements.txt)"
+            }), 400
+
         rows = data.get('rows')
         reel_number = data.get('reel_number')
+        reel_numbers = data.get('reel_numbers')
 
-        if rows is None and reel_number is None:
+        if rows is None and reel_number is None and reel_numbers is None:
             return jsonify({
                 "success": False,
-                "error": "Provide either 'rows' or 'reel_number' in request body"
+                "error": "Provide 'rows', 'reel_number' or 'reel_numbers' in request body"
+            }), 400
+
+        if reel_numbers is not None and (not isinstance(reel_numbers, list) or len(reel_numbers) == 0):
+            return jsonify({
+                "success": False,
+                "error": "'reel_numbers' must be a non-empty list"
             }), 400
 
         prepared_rows = []
@@ -454,6 +976,23 @@ def batch_generate_images():
                     "reel_no": str(row["reel_no"]).strip(),
                 })
 
+        if prepared_rows == [] and reel_numbers is not None:
+            if get_prompts_by_reels is None:
+                return jsonify({
+                    "success": False,
+                    "error": "Google Sheets integration not available in this environment"
+                }), 400
+            prompts_by_reel = get_prompts_by_reels(reel_numbers)
+            missing = [reel for reel, prompts in prompts_by_reel.items() if not prompts]
+            if len(missing) == len(prompts_by_reel):
+                return jsonify({
+                    "success": False,
+                    "error": f"No prompts found for reel_numbers={reel_numbers}"
+                }), 404
+            if missing:
+                logger.warning(f"No prompts found for reels {missing}, skipping them")
+            prepared_rows = rows_for_reels(prompts_by_reel)
+
         if prepared_rows == [] and reel_number is not None:
             if get_prompts_by_reel is None:
                 return jsonify({
@@ -473,9 +1012,23 @@ def batch_generate_images():
                     "reel_no": str(reel_number),
                 })
 
-        summary = run_batch_in_whatsapp(prepared_rows, wait_minutes=wait_minutes)
-        status_code = 200 if summary.get("success") else 500
-        return jsonify(summary), status_code
+        job = job_store.create('batch-generate-images', {
+            "reel_number": reel_number,
+            "reel_numbers": reel_numbers,
+            "rows": len(prepared_rows),
+            "wait_minutes": wait_minutes,
+            "chunk_size": chunk_size,
+            "chunk_pause_seconds": chunk_pause_seconds,
+            "grid_size": grid_size,
+            "reference_image": reference_image
+        }, callback_url=data.get('callback_url'))
+        request_queue.put((job, prepared_rows))
+
+        # Return the job id straight away unless the caller asked to wait
+        if not data.get('wait'):
+            return accepted_response(job)
+
+        return wait_response(job)
 
     except Exception as e:
         logger.exception("API error")
@@ -485,12 +1038,18 @@ def batch_generate_images():
         }), 500
 
 
+app.register_blueprint(batch_image_routes)
+app.register_blueprint(jobs_blueprint)
+app.register_blueprint(metrics_blueprint)
+app.register_blueprint(governors_blueprint)
+
 if __name__ == '__main__':
     logger.info("Starting ChatGPT Image Generation API Server...")
     logger.info("API will be available at: http://localhost:5003")
     logger.info("Endpoints:")
     logger.info("  GET  /health - Health check")
-    logger.info("  POST /batch-generate-images - Batch generate images from rows or a reel number")
+    logger.info("  POST /batch-generate-images - Queue a batch from rows or a reel number (returns a job id)")
+    logger.info("  GET  /jobs/<job_id> - Job status, progress and result")
     app.run(host='0.0.0.0', port=5003, debug=False)
 
 
@@ -2,9 +2,12 @@ import os
 from playwright.sync_api import sync_playwright
 import time
 import shutil
+from tracing import traced, current_span
+from rate_governor import get_governor
 
 REFERENCE_IMAGE_PATH = "ppp_reference_image/ChatGPT Image Jul 12 2025 Vegetarian Protein Consumption.png"
 
+@traced("whatsapp.send_prompt")
 def send_prompt_with_retry(page, prompt, max_retries=3):
     for attempt in range(max_retries):
         try:
@@ -16,6 +19,7 @@ def send_prompt_with_retry(page, prompt, max_retries=3):
             return True
         except Exception as e:
             print(f"Attempt {attempt + 1} failed: {e}")
+            current_span().add_event("send_failed", attempt=attempt + 1, error=str(e))
             if attempt < max_retries - 1:
                 time.sleep(5)  # Wait before retry
             else:
@@ -27,6 +31,7 @@ def get_message_count_before_prompts(page):
     messages = page.query_selector_all(".message-in")
     return len(messages)
 
+@traced("whatsapp.get_images_after_prompts")
 def get_images_after_prompts(page, message_count_before_prompts, expected_count):
     """
     Get images that were generated AFTER the prompts were sent
@@ -76,6 +81,12 @@ def get_images_after_prompts(page, message_count_before_prompts, expected_count)
                 print(f"   ⚠️  Error detected in message {message_count_before_prompts + i + 1}: {indicator}")
                 break
     
+    governor = get_governor("whatsapp")
+    for _ in range(error_count):
+        governor.backoff("ChatGPT refused a prompt")
+    for _ in new_images[:expected_count]:
+        governor.success()
+    
     if error_count > 0:
         print(f"   📊 Summary: {len(new_images)} images generated, {error_count} errors")
         print(f"   Expected: {expected_count} images, Actual: {len(new_images)} images")
@@ -89,6 +100,7 @@ def get_images_after_prompts(page, message_count_before_prompts, expected_count)
         print(f"   ⚠️  Only {len(new_images)} images available, returning all")
         return new_images
 
+@traced("whatsapp.download_image")
 def download_image_by_src(page, img_src, save_path):
     try:
         img_elem = page.query_selector(f"img[src='{img_src}']")
@@ -113,6 +125,7 @@ def download_image_by_src(page, img_src, save_path):
         print(f"Download failed: {e}")
         return False
 
+@traced("whatsapp.batch_generate")
 def batch_generate_images_via_whatsapp(rows):
     whatsapp_url = "https://web.whatsapp.com/"
     chat_name = "ChatGPT"
@@ -144,12 +157,14 @@ def batch_generate_images_via_whatsapp(rows):
 
             # Send all prompts with error handling
             successful_prompts = []
+            governor = get_governor("whatsapp")
             for idx, item in enumerate(prompts):
+                governor.wait()
                 print(f"Sending prompt {idx+1}/{len(prompts)}: {item['prompt'][:40]}")
                 if send_prompt_with_retry(page, item["prompt"]):
                     successful_prompts.append(item)
-                    time.sleep(10)
                 else:
+                    governor.backoff("prompt could not be sent")
                     print(f"Failed to send prompt {idx+1}, stopping...")
                     break
 
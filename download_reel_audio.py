@@ -12,6 +12,11 @@ import requests
 from urllib.parse import urlparse, parse_qs
 import re
 from sheets import get_prompts_by_reel
+from reel_manifest import record_file
+from job_events import publish
+from tracing import traced, current_span
+from stage_ledger import get_stage_ledger, text_fingerprint
+from rate_governor import get_governor
 
 # Configure logging with more detailed output
 logging.basicConfig(
@@ -24,6 +29,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Where Drive file ids are downloaded from (a local sim_drive server in simulations)
+DRIVE_BASE_URL = os.getenv("DRIVE_BASE_URL", "https://drive.google.com").rstrip("/")
+
+# Drive's files API, read for a shared file's checksum (a local sim_drive server in simulations)
+DRIVE_API_URL = os.getenv("DRIVE_API_URL", "https://www.googleapis.com/drive/v3").rstrip("/")
+
+# API key for reading public file metadata; without it a Drive file's version is unknown
+DRIVE_API_KEY = os.getenv("GOOGLE_DRIVE_API_KEY", "")
+
 def extract_file_id_from_google_drive_url(url):
     """Extract file ID from various Google Drive URL formats"""
     # Handle different Google Drive URL formats
@@ -48,7 +62,41 @@ def extract_file_id_from_google_drive_url(url):
 
 def get_direct_download_url(file_id):
     """Convert Google Drive file ID to direct download URL"""
-    return f"https://drive.google.com/uc?id={file_id}&export=download"
+    return f"{DRIVE_BASE_URL}/uc?id={file_id}&export=download"
+
+def drive_file_version(file_id):
+    """md5Checksum (or version) of a shared Drive file from the files API, None without an API key"""
+    if not DRIVE_API_KEY:
+        return None
+    response = requests.get(f"{DRIVE_API_URL}/files/{file_id}", timeout=15, params={
+        "fields": "md5Checksum,version", "supportsAllDrives": "true", "key": DRIVE_API_KEY})
+    response.raise_for_status()
+    metadata = response.json()
+    return metadata.get("md5Checksum") or metadata.get("version")
+
+def audio_source_fingerprint(url):
+    """Fingerprint an audio source by its Drive file id (or URL) plus its version.
+
+    Drive files are versioned by their metadata checksum; the download URL's
+    headers describe the virus-scan interstitial, not the file. Other URLs use
+    the ETag/Last-Modified/Content-Length of a HEAD request. Returns None when
+    the version can't be found; callers then treat the audio as stale and
+    download it again rather than assume it is unchanged.
+    """
+    file_id = extract_file_id_from_google_drive_url(url) if 'drive.google.com' in url else None
+    source = file_id or url
+    try:
+        if file_id:
+            version = drive_file_version(file_id)
+        else:
+            response = requests.head(url, allow_redirects=True, timeout=15)
+            response.raise_for_status()
+            version = (response.headers.get('ETag') or response.headers.get('Last-Modified')
+                       or response.headers.get('Content-Length'))
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"  ⚠️ Could not check audio version for {source}: {e}")
+        version = None
+    return text_fingerprint(source, version) if version else None
 
 def determine_audio_extension(url, content_type=None):
     """Determine the appropriate audio file extension"""
@@ -78,8 +126,12 @@ def determine_audio_extension(url, content_type=None):
     # Default to mp3 if we can't determine
     return '.mp3'
 
+@traced("audio.download_file")
 def download_audio_file(url, save_path, audio_number):
     """Download audio file from URL to specified path with improved error handling"""
+    start_time = time.time()
+    trace = current_span()
+    trace.set(audio_number=audio_number, google_drive='drive.google.com' in url)
     try:
         logger.info(f"⬇️  Downloading audio {audio_number}...")
         
@@ -92,6 +144,7 @@ def download_audio_file(url, save_path, audio_number):
                 logger.info(f"  📁 File ID: {file_id}")
             else:
                 logger.error(f"  ❌ Error: Could not extract file ID from Google Drive URL")
+                publish("audio_failed", audio_number=audio_number, error="Could not extract Google Drive file ID")
                 return False
         else:
             direct_url = url
@@ -105,12 +158,14 @@ def download_audio_file(url, save_path, audio_number):
         response = session.get(direct_url, stream=True, timeout=30)
         
         logger.info(f"  📊 Response status: {response.status_code}")
+        trace.add_event("response", status=response.status_code)
         logger.info(f"  📋 Content-Type: {response.headers.get('content-type', 'Unknown')}")
         
         if response.status_code == 200:
             # Check if it's a Google Drive confirmation page
             if 'drive.google.com' in url and 'text/html' in response.headers.get('content-type', ''):
                 logger.info(f"  ⚠️  Got HTML response (likely confirmation page)")
+                trace.add_event("drive_interstitial")
                 # Extract the actual download URL from the confirmation page
                 content = response.text
                 
@@ -143,9 +198,11 @@ def download_audio_file(url, save_path, audio_number):
                 if download_url_match:
                     logger.info(f"  🔄 Following confirmation link...")
                     response = session.get(download_url_match, stream=True, timeout=30)
+                    trace.add_event("confirmed_download", status=response.status_code)
                     logger.info(f"  📊 Second response status: {response.status_code}")
                 else:
                     logger.error(f"  ❌ Could not find download URL in confirmation page")
+                    publish("audio_failed", audio_number=audio_number, error="No download URL in confirmation page")
                     return False
             
             # Create directory if it doesn't exist
@@ -153,6 +210,8 @@ def download_audio_file(url, save_path, audio_number):
             
             # Download the file
             logger.info(f"  💾 Saving to: {save_path}")
+            transfer_start = time.time()
+            trace.add_event("transfer_started")
             with open(save_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     if chunk:
@@ -161,20 +220,29 @@ def download_audio_file(url, save_path, audio_number):
             # Verify file was downloaded
             if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
                 file_size = os.path.getsize(save_path)
+                transfer_seconds = time.time() - transfer_start
+                trace.set(bytes=file_size)
                 logger.info(f"  ✅ SUCCESS: Audio {audio_number} downloaded ({file_size:,} bytes)")
+                publish("audio_saved", audio_number=audio_number, path=save_path, bytes=file_size,
+                        seconds=round(time.time() - start_time, 2),
+                        bytes_per_second=round(file_size / transfer_seconds) if transfer_seconds > 0 else None)
                 return True
             else:
                 logger.error(f"  ❌ File was not saved properly")
+                publish("audio_failed", audio_number=audio_number, error="File was not saved properly")
                 return False
                 
         else:
             logger.error(f"  ❌ HTTP Error: {response.status_code}")
+            publish("audio_failed", audio_number=audio_number, error=f"HTTP {response.status_code}")
             return False
             
     except Exception as e:
         logger.error(f"  ❌ Download error: {e}")
+        publish("audio_failed", audio_number=audio_number, error=str(e))
         return False
 
+@traced("script.download_reel_audio")
 def main():
     """Main function"""
     if len(sys.argv) != 2:
@@ -234,10 +302,12 @@ def main():
         failed_downloads = 0
         total_size_downloaded = 0
         downloaded_files = []
+        ledger = get_stage_ledger()
         
         logger.info(f"📁 Audio files will be saved to: {base_dir}")
         
         # Download each audio file
+        governor = get_governor("drive")
         for audio_item in audio_data:
             audio_number = audio_item['audio_number']
             audio_url = audio_item['audio_url']
@@ -252,21 +322,32 @@ def main():
             logger.info(f"  📁 Save to: {save_path}")
             logger.info("-" * 40)
             
-            # Download the file
+            # Skip audio a previous run already downloaded intact from the same source
+            fingerprint = audio_source_fingerprint(audio_url)
+            # The ledger is keyed on the sheet line; the file keeps the reel's audio number
+            if fingerprint and ledger.done(reel_number, line_no, "audio", artifact_path=save_path, fingerprint=fingerprint):
+                successful_downloads += 1
+                downloaded_files.append(save_path)
+                logger.info(f"  ⏭️ Already downloaded: Audio {audio_number}")
+                continue
+            
+            # Download the file, paced by the Drive governor
+            governor.wait()
+            ledger.start(reel_number, line_no, "audio")
             if download_audio_file(audio_url, save_path, audio_number):
+                governor.success()
                 successful_downloads += 1
                 file_size = os.path.getsize(save_path)
                 total_size_downloaded += file_size
                 downloaded_files.append(save_path)
+                record_file(base_dir, audio_number, save_path, line_no=line_no)
+                ledger.succeed(reel_number, line_no, "audio", artifact_path=save_path, fingerprint=fingerprint)
                 logger.info(f"  ✅ SUCCESS: Audio {audio_number}")
             else:
                 failed_downloads += 1
+                governor.backoff("download failed")
+                ledger.fail(reel_number, line_no, "audio", "Download failed")
                 logger.info(f"  ❌ FAILED: Audio {audio_number}")
-            
-            # Small delay between downloads to be respectful
-            if audio_number < len(audio_data):  # Don't delay after the last file
-                logger.info(f"  ⏳ Waiting 1 second before next download...")
-                time.sleep(1)
         
         # Summary
         logger.info("\n" + "=" * 50)
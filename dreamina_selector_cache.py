@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Dreamina selector racing with a learned selector-preference cache
+
+The Dreamina UI uses hashed class names (e.g. `submit-button-bPnDkw`) that go
+stale whenever Dreamina ships a new build, so every element is located through
+a list of candidate selectors. Trying those one by one with a 5 second timeout
+each means a stale selector costs a full timeout before the next one is tried.
+
+`race_selectors` waits for ALL candidates at once with a single combined
+selector list, then picks the best matching candidate instantly. The winning
+selector for each UI element is persisted to a small JSON cache and tried
+first on the next lookup. `race_selector_tiers` races a specific tier before
+a generic one and only learns the winner once the caller confirms it (the
+submit button is confirmed by Dreamina's submit response).
+
+Usage: python3 dreamina_selector_cache.py   (prints hit rate / time stats)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv("DREAMINA_SELECTOR_CACHE", ".dreamina_selector_cache.json")
+
+
+class SelectorPreferenceCache:
+    """
+    Remembers which selector found each UI element and how much time each
+    candidate costs, persisted as JSON so preferences survive restarts.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = os.path.abspath(path)
+        self.lock = threading.Lock()
+        self.elements = self._load()
+
+    def _load(self):
+        """Load cached preferences, starting fresh if the file is missing or corrupt"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data.get('elements', {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable selector cache {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """Atomically write the cache to disk"""
+        with self.lock:
+            payload = json.dumps({'elements': self.elements}, indent=2, sort_keys=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save selector cache: {e}")
+
+    def _element(self, element):
+        return self.elements.setdefault(element, {
+            'preferred': None,
+            'lookups': 0,
+            'misses': 0,
+            'wait_ms': 0.0,
+            'saved_ms': 0.0,
+            'selectors': {}
+        })
+
+    def _selector(self, entry, selector):
+        return entry['selectors'].setdefault(selector, {
+            'hits': 0,
+            'probes': 0,
+            'time_lost_ms': 0.0
+        })
+
+    def order(self, element, selectors):
+        """Return candidates with the learned winner first, then by hit count.
+
+        Ties keep the original order, so an empty cache behaves exactly like
+        the hand-written priority list.
+        """
+        with self.lock:
+            entry = self.elements.get(element)
+            if not entry:
+                return list(selectors)
+            preferred = entry.get('preferred')
+            hits = {s: entry['selectors'].get(s, {}).get('hits', 0) for s in selectors}
+
+        ordered = sorted(selectors, key=lambda s: (s != preferred, -hits[s]))
+        return ordered
+
+    def record_hit(self, element, winner, probe_times, elapsed_ms, sequential_cost_ms):
+        """Record a successful lookup.
+
+        probe_times maps each selector probed before the winner to the time
+        (ms) spent on it; sequential_cost_ms is what the old one-by-one loop
+        would have spent on stale candidates listed before the winner.
+        """
+        with self.lock:
+            entry = self._element(element)
+            entry['preferred'] = winner
+            entry['lookups'] += 1
+            entry['wait_ms'] += elapsed_ms
+            entry['saved_ms'] += max(0.0, sequential_cost_ms - elapsed_ms)
+            self._selector(entry, winner)['hits'] += 1
+            for selector, spent_ms in probe_times.items():
+                stats = self._selector(entry, selector)
+                stats['probes'] += 1
+                if selector != winner:
+                    stats['time_lost_ms'] += spent_ms
+        self.save()
+
+    def record_miss(self, element, selectors, elapsed_ms):
+        """Record a lookup where no candidate matched before the timeout"""
+        with self.lock:
+            entry = self._element(element)
+            entry['lookups'] += 1
+            entry['misses'] += 1
+            entry['wait_ms'] += elapsed_ms
+            # Every candidate shares the blame for a full miss
+            share = elapsed_ms / max(1, len(selectors))
+            for selector in selectors:
+                stats = self._selector(entry, selector)
+                stats['probes'] += 1
+                stats['time_lost_ms'] += share
+        self.save()
+
+    def stats(self):
+        """Summarise hit rate and time lost per element and per selector"""
+        with self.lock:
+            summary = {}
+            for element, entry in self.elements.items():
+                lookups = entry['lookups']
+                selectors = {}
+                for selector, stats in entry['selectors'].items():
+                    selectors[selector] = {
+                        'hits': stats['hits'],
+                        'hit_rate': round(stats['hits'] / lookups, 3) if lookups else 0.0,
+                        'time_lost_ms': round(stats['time_lost_ms'], 1)
+                    }
+                summary[element] = {
+                    'preferred': entry['preferred'],
+                    'lookups': lookups,
+                    'hit_rate': round((lookups - entry['misses']) / lookups, 3) if lookups else 0.0,
+                    'avg_wait_ms': round(entry['wait_ms'] / lookups, 1) if lookups else 0.0,
+                    'saved_ms': round(entry['saved_ms'], 1),
+                    'selectors': selectors
+                }
+            return summary
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_selector_cache():
+    """Return the process-wide selector cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SelectorPreferenceCache()
+        return _cache
+
+
+def _race(page, element, selectors, timeout, cache):
+    """Race the candidates; returns (handle, selector, hit) where hit holds record_hit's arguments"""
+    ordered = cache.order(element, selectors)
+    start = time.time()
+
+    try:
+        page.wait_for_selector(", ".join(ordered), timeout=timeout)
+    except Exception:
+        elapsed_ms = (time.time() - start) * 1000
+        cache.record_miss(element, ordered, elapsed_ms)
+        return None, None, None
+
+    probe_times = {}
+    for selector in ordered:
+        probe_start = time.time()
+        try:
+            handle = page.query_selector(selector)
+            visible = bool(handle) and handle.is_visible()
+        except Exception:
+            handle, visible = None, False
+        probe_times[selector] = (time.time() - probe_start) * 1000
+
+        if visible:
+            elapsed_ms = (time.time() - start) * 1000
+            # The old loop paid a full timeout for every candidate ahead of the winner
+            sequential_cost_ms = selectors.index(selector) * timeout + elapsed_ms
+            return handle, selector, (element, selector, probe_times, elapsed_ms, sequential_cost_ms)
+
+    # Something matched the combined list but is not visible yet
+    elapsed_ms = (time.time() - start) * 1000
+    cache.record_miss(element, ordered, elapsed_ms)
+    return None, None, None
+
+
+def race_selectors(page, element, selectors, timeout=5000, cache=None):
+    """Wait for any candidate selector at once and return (handle, selector).
+
+    All candidates are raced with a single combined selector list, so stale
+    selectors no longer cost a timeout each. Once something matches, the
+    candidates are probed instantly in preference order (learned winner
+    first) and the first visible match wins. Returns (None, None) if nothing
+    matched within `timeout` milliseconds.
+    """
+    cache = cache or get_selector_cache()
+    handle, selector, hit = _race(page, element, selectors, timeout, cache)
+    if hit:
+        cache.record_hit(*hit)
+    return handle, selector
+
+
+def race_selector_tiers(page, element, tiers, timeout=5000, cache=None):
+    """Race `tiers` of candidates in order, moving on only after a tier misses.
+
+    Returns (handle, selector, confirm). The winner is not learned until
+    `confirm()` is called, so a generic selector that matched the wrong
+    element never becomes the preferred one. Returns (None, None, None) if
+    no tier matched.
+    """
+    cache = cache or get_selector_cache()
+    for selectors in tiers:
+        handle, selector, hit = _race(page, element, selectors, timeout, cache)
+        if handle:
+            return handle, selector, lambda: cache.record_hit(*hit)
+    return None, None, None
+
+
+def main():
+    """Print selector statistics from the persisted cache"""
+    stats = get_selector_cache().stats()
+    if not stats:
+        print("No selector statistics recorded yet")
+        return
+
+    for element, entry in sorted(stats.items()):
+        print(f"\n🎯 {element}: {entry['lookups']} lookups, "
+              f"hit rate {entry['hit_rate']:.0%}, avg wait {entry['avg_wait_ms']:.0f} ms, "
+              f"saved {entry['saved_ms'] / 1000:.1f}s")
+        print(f"   preferred: {entry['preferred']}")
+        for selector, s in sorted(entry['selectors'].items(), key=lambda kv: -kv[1]['hits']):
+            print(f"   {s['hits']:>4} hits ({s['hit_rate']:.0%})  "
+                  f"{s['time_lost_ms']:>8.0f} ms lost  {selector}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Dreamina generation tracker
+
+Listens to Dreamina's own XHR/fetch responses (`page.on('response')`) instead
+of polling DOM selectors, and records every generation task it sees - task id,
+state changes and completion time - in a local SQLite store. Submissions no
+longer have to block on generation, and the store gives real render-latency
+numbers for capacity planning.
+
+Usage: python3 dreamina_tracker.py [reel_number]   (prints tasks and latency)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("DREAMINA_TRACKER_DB", "dreamina_tasks.db")
+
+# Keys Dreamina uses for generation task ids and states in its API payloads
+TASK_ID_KEYS = ("history_record_id", "history_id", "task_id", "submit_id")
+STATE_KEYS = ("status", "task_status", "state")
+
+# Terminal states, compared as lower-case strings
+FINISHED_STATES = {"finished", "finish", "success", "succeed", "succeeded", "completed", "done", "50"}
+FAILED_STATES = {"failed", "fail", "error", "cancelled", "canceled", "30"}
+
+# Only responses from these hosts are inspected
+TRACKED_HOSTS = ("dreamina", "capcut")
+
+# URL fragments of the POST request Dreamina sends when a generation is submitted
+SUBMIT_RESPONSE_KEYWORDS = ("generate", "submit", "aigc")
+
+
+def is_submit_response(response):
+    """Match the network response of Dreamina's generation submit request"""
+    return response.request.method == "POST" and any(k in response.url for k in SUBMIT_RESPONSE_KEYWORDS)
+
+
+def _find_video_url(payload):
+    """Return the first video URL found anywhere in a JSON payload"""
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if isinstance(value, str) and value.startswith("http") and ("video" in key.lower() or ".mp4" in value):
+                return value
+        values = payload.values()
+    elif isinstance(payload, list):
+        values = payload
+    else:
+        return None
+    for value in values:
+        url = _find_video_url(value)
+        if url:
+            return url
+    return None
+
+
+def extract_tasks(payload):
+    """Walk a JSON payload and return [{'task_id', 'state', 'video_url'}] for every task record in it"""
+    tasks = []
+    if isinstance(payload, dict):
+        task_id = next((payload[k] for k in TASK_ID_KEYS if payload.get(k)), None)
+        if task_id is not None:
+            state = next((payload[k] for k in STATE_KEYS if k in payload), None)
+            tasks.append({
+                'task_id': str(task_id),
+                'state': str(state).lower() if state is not None else None,
+                'video_url': _find_video_url(payload)
+            })
+        children = payload.values()
+    elif isinstance(payload, list):
+        children = payload
+    else:
+        return tasks
+    for child in children:
+        tasks.extend(extract_tasks(child))
+    return tasks
+
+
+class DreaminaGenerationTracker:
+    """
+    Records Dreamina generation tasks observed in page network traffic.
+
+    Call `expect_submission(page, reel, pair)` right before submitting a pair:
+    the next new task id seen on that page is labelled with that reel/pair.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = os.path.abspath(db_path)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.page_tasks = {}
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        with self.lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    reel_number TEXT,
+                    pair_number INTEGER,
+                    state TEXT,
+                    video_url TEXT,
+                    submitted_at REAL,
+                    completed_at REAL,
+                    updated_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_events (
+                    task_id TEXT,
+                    state TEXT,
+                    observed_at REAL
+                )
+            """)
+
+    def attach(self, page):
+        """Start observing a page's network responses"""
+        page.on("response", lambda response: self._on_response(id(page), response))
+
+    def expect_submission(self, page, reel_number, pair_number):
+        """Label the next new task seen on this page with the given reel and pair"""
+        with self.lock:
+            self.pending[id(page)] = (str(reel_number), pair_number, time.time())
+            self.page_tasks.pop(id(page), None)
+
+    def submitted_task(self, page):
+        """Return the task id recorded for the page's last expected submission, if any"""
+        with self.lock:
+            return self.page_tasks.get(id(page))
+
+    def _on_response(self, page_key, response):
+        try:
+            request = response.request
+            if request.resource_type not in ("xhr", "fetch"):
+                return
+            if not any(host in response.url for host in TRACKED_HOSTS):
+                return
+            if "json" not in (response.headers.get("content-type") or ""):
+                return
+            payload = response.json()
+        except Exception:
+            return
+
+        # Only the submit POST can introduce the task we are waiting for; list/poll
+        # responses (Dreamina polls with POST too) may contain older tasks that must not take the label
+        is_submission = is_submit_response(response)
+        for task in extract_tasks(payload):
+            self.record(page_key, task['task_id'], task['state'], task['video_url'], is_submission)
+
+    def record(self, page_key, task_id, state, video_url=None, is_submission=True):
+        """Insert or update a task, logging a state-change event when the state moves"""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            row = conn.execute("SELECT state, completed_at FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+
+            if row is None:
+                pending = self.pending.pop(page_key, None) if is_submission else None
+                reel_number, pair_number, submitted_at = pending if pending else (None, None, now)
+                conn.execute(
+                    "INSERT INTO tasks (task_id, reel_number, pair_number, state, video_url, submitted_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (task_id, reel_number, pair_number, state, video_url, submitted_at, now)
+                )
+                conn.execute("INSERT INTO task_events VALUES (?, ?, ?)", (task_id, state, now))
+                if pending:
+                    self.page_tasks[page_key] = task_id
+                    logger.info(f"🛰️ Tracking Dreamina task {task_id} for reel {reel_number} pair {pair_number}")
+                completed_at = None
+            else:
+                previous_state, completed_at = row
+                if state and state != previous_state:
+                    conn.execute("INSERT INTO task_events VALUES (?, ?, ?)", (task_id, state, now))
+                    conn.execute("UPDATE tasks SET state = ?, updated_at = ? WHERE task_id = ?", (state, now, task_id))
+                if video_url:
+                    conn.execute("UPDATE tasks SET video_url = ? WHERE task_id = ?", (video_url, task_id))
+
+            if completed_at is None and (state in FINISHED_STATES or state in FAILED_STATES):
+                conn.execute("UPDATE tasks SET completed_at = ? WHERE task_id = ?", (now, task_id))
+                logger.info(f"🏁 Dreamina task {task_id} reached state '{state}'")
+
+    def tasks(self, reel_number=None):
+        """Return tracked tasks, optionally for one reel, ordered by pair"""
+        query = "SELECT task_id, reel_number, pair_number, state, video_url, submitted_at, completed_at FROM tasks"
+        params = ()
+        if reel_number is not None:
+            query += " WHERE reel_number = ?"
+            params = (str(reel_number),)
+        query += " ORDER BY reel_number, pair_number, submitted_at"
+        with self.lock, self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        keys = ("task_id", "reel_number", "pair_number", "state", "video_url", "submitted_at", "completed_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def pending_tasks(self, reel_number, since=None):
+        """Return the reel's tasks that have not reached a terminal state.
+
+        With `since`, only tasks submitted at or after that time count, so a run
+        doesn't wait on tasks an earlier run left unfinished.
+        """
+        return [t for t in self.tasks(reel_number)
+                if t['completed_at'] is None and (since is None or t['submitted_at'] >= since)]
+
+    def latency_stats(self, reel_number=None):
+        """Render latency (submission to completion) for finished tasks"""
+        latencies = sorted(
+            t['completed_at'] - t['submitted_at']
+            for t in self.tasks(reel_number)
+            # Unlabelled tasks were first seen mid-flight, so their submit time is unknown
+            if t['completed_at'] and t['state'] in FINISHED_STATES and t['reel_number'] is not None
+        )
+        if not latencies:
+            return {"finished": 0}
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+
+        return {
+            "finished": len(latencies),
+            "mean_seconds": round(sum(latencies) / len(latencies), 1),
+            "p50_seconds": percentile(0.5),
+            "p90_seconds": percentile(0.9),
+            "max_seconds": round(latencies[-1], 1)
+        }
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_generation_tracker():
+    """Return the process-wide generation tracker"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = DreaminaGenerationTracker()
+        return _tracker
+
+
+def main():
+    """Print tracked tasks and render latency"""
+    import sys
+    reel_number = sys.argv[1] if len(sys.argv) > 1 else None
+    tracker = get_generation_tracker()
+
+    tasks = tracker.tasks(reel_number)
+    if not tasks:
+        print("No Dreamina tasks tracked yet")
+        return
+
+    for task in tasks:
+        if task['completed_at']:
+            duration = f"{task['completed_at'] - task['submitted_at']:.0f}s"
+        else:
+            duration = "running"
+        print(f"🎬 reel {task['reel_number']} pair {task['pair_number']}: {task['task_id']} "
+              f"[{task['state']}] {duration}")
+
+    print(f"\n📊 Render latency: {json.dumps(tracker.latency_stats(reel_number))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ import glob
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
+from reel_manifest import pair_files
 
 load_dotenv()
 
@@ -471,17 +472,19 @@ class DreaminaUploadAgent:
             # Process each reel
             for reel in sorted(image_by_reel.keys()):
                 if reel in audio_by_reel:
-                    reel_images = sorted(image_by_reel[reel], key=lambda x: x['file'])
-                    reel_audios = sorted(audio_by_reel[reel], key=lambda x: x['file'])
+                    # Match files by line number so one missing file doesn't shift every pair
+                    reel_pairs = pair_files(
+                        os.path.join(self.images_dir, reel),
+                        os.path.join(self.audio_dir, reel)
+                    )
                     
-                    # Match files by line number
-                    for i, (img, audio) in enumerate(zip(reel_images, reel_audios)):
+                    for i, pair in enumerate(reel_pairs):
                         if max_files and successful_uploads >= max_files:
                             break
                         
-                        print(f"\n📦 Processing reel {reel}, pair {i+1}/{len(reel_images)}")
+                        print(f"\n📦 Processing reel {reel}, pair {i+1}/{len(reel_pairs)} (line {pair['number']})")
                         
-                        if self.upload_file_pair(img['path'], audio['path']):
+                        if self.upload_file_pair(pair['image'], pair['audio']):
                             successful_uploads += 1
                         else:
                             failed_uploads += 1
@@ -4,48 +4,163 @@ Dreamina Upload API Server
 Provides API endpoints for uploading image-audio pairs to Dreamina by reel number
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify
 import os
 import logging
 import threading
-import queue
 import time
-import glob
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
+from dreamina_selector_cache import get_selector_cache, race_selectors, race_selector_tiers
+from dreamina_tracker import get_generation_tracker, is_submit_response
+from reel_manifest import pair_files
+from job_store import get_job_store, accepted_response, wait_response, jobs_blueprint, WorkerState, QUEUE_DEPTH, JOBS_RUNNING
+from metrics import metrics_blueprint, histogram
+from pipeline_scheduler import get_scheduler
+from job_events import bind_job, publish
+from tracing import span, traced
+from stage_ledger import get_stage_ledger, files_fingerprint
+from rate_governor import get_governor, governors_blueprint
+from resource_governor import acquire_browser
+from browser_pool import WarmBrowserPool, SlotQueue, RECLAIM, DEFAULT_RECYCLE_AFTER
+from har_replay import get_har_session
 
 load_dotenv()
 
 app = Flask(__name__)
 
+# Pipeline routes, also mounted by gateway_server.py
+dreamina_routes = Blueprint('dreamina_upload', __name__)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Global queue for handling concurrent requests
-request_queue = queue.Queue()
-processing_lock = threading.Lock()
-is_processing = False
+request_queue = SlotQueue()
+worker_state = WorkerState()
+job_store = get_job_store()
+QUEUE_DEPTH.labels(service="dreamina_upload").set_function(request_queue.qsize)
+JOBS_RUNNING.labels(service="dreamina_upload").set_function(lambda: worker_state.active)
+scheduler = get_scheduler()
+
+# Each reel's Images/ and Audio/ folders live under <REELS_BASE_DIR>/<reel>
+REELS_BASE_DIR = os.getenv("REELS_BASE_DIR", "/Users/devanshc/Desktop/ProteinPapaPanda")
+
+DREAMINA_AI_AVATAR_URL = os.getenv("DREAMINA_AI_AVATAR_URL", "https://dreamina.capcut.com/ai-tool/generate?type=digitalHuman")
+
+# Headful by default; a local sim_dreamina form runs headless
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS") == "1"
+
+# Upload areas whose presence means the AI Avatar form is ready
+UPLOAD_FORM_SELECTOR = 'div[class*="reference-upload"]'
+
+# Elements shown inside an upload area while a file is still uploading
+UPLOAD_BUSY_SELECTOR = '[class*="progress"], [class*="loading"], [class*="uploading"]'
+
+# Uploads can be slow on large files, so allow up to 2 minutes per file
+UPLOAD_TIMEOUT = 120000
+
+# Number of AI Avatar tabs used to pipeline submissions (1 = serial), and the most one job may open
+MAX_TAB_COUNT = int(os.getenv("DREAMINA_MAX_TABS", "4"))
+DEFAULT_TAB_COUNT = min(int(os.getenv("DREAMINA_TABS", "1")), MAX_TAB_COUNT)
+
+# How long to wait for Dreamina to accept a submission (task id or error tip)
+SUBMISSION_CONFIRM_SECONDS = 15
+
+# How long to keep the page open after the last submission to record completions, and the most one job may ask for
+MAX_TRACK_SECONDS = int(os.getenv("DREAMINA_MAX_TRACK_SECONDS", "1800"))
+DEFAULT_TRACK_SECONDS = min(int(os.getenv("DREAMINA_TRACK_SECONDS", "0")), MAX_TRACK_SECONDS)
+
+# Warm browser sessions kept open between requests, and jobs before a page is recycled
+POOL_SIZE = int(os.getenv("DREAMINA_POOL_SIZE", "1"))
+POOL_RECYCLE_AFTER = int(os.getenv("DREAMINA_RECYCLE_AFTER", str(DEFAULT_RECYCLE_AFTER)))
+
+# Refuse to start a slot whose browser profile has never been logged in (0 for local fakes)
+REQUIRE_PROFILE_LOGIN = os.getenv("DREAMINA_REQUIRE_LOGIN", "1") != "0"
+
+# Chromium's cookie store inside a profile; it only exists once a site has set a cookie
+PROFILE_COOKIE_FILES = (os.path.join("Default", "Cookies"), os.path.join("Default", "Network", "Cookies"))
+
+BROWSER_LAUNCH_SECONDS = histogram("pipeline_browser_launch_seconds", "Time to launch a persistent browser context", ["service"])
+DREAMINA_STEP_SECONDS = histogram("dreamina_step_seconds", "Time spent in each Dreamina automation step", ["step"])
+
+def slot_profile(index):
+    """Browser profile directory of pool slot `index` (slot 0 keeps the original profile)"""
+    return "vpn_browser_session" if index == 0 else f"vpn_browser_session_{index + 1}"
+
+def profile_has_login(user_data_dir):
+    """Whether a browser profile has cookies, i.e. has been used to log in"""
+    return any(os.path.getsize(path) > 0 for path in
+               (os.path.join(user_data_dir, name) for name in PROFILE_COOKIE_FILES) if os.path.exists(path))
 
 class DreaminaUploadAPI:
     """
     API wrapper for Dreamina upload functionality
     """
     
-    def __init__(self, user_data_dir="vpn_browser_session", headless=False):
+    def __init__(self, user_data_dir="vpn_browser_session", headless=None, slot=0):
         self.user_data_dir = os.path.abspath(user_data_dir)
-        self.headless = headless
+        self.headless = BROWSER_HEADLESS if headless is None else headless
+        self.slot = slot
         self.context = None
         self.page = None
         self.playwright = None
+        self.owns_context = True
+        self.reel_number = None
+        # Pair number -> sheet line_no for the reel being uploaded; the stage ledger is keyed on the sheet line
+        self.pair_lines = {}
+        self.selector_cache = get_selector_cache()
+        self.tracker = get_generation_tracker()
+        self.ledger = get_stage_ledger()
+        self.governor = get_governor("dreamina")
+        self.har = get_har_session("dreamina", slot)
+        self.browser_lease = None
+        self.on_progress = None
         
         # Create directories
         os.makedirs(self.user_data_dir, exist_ok=True)
         
+    def find_element(self, element, selectors, timeout=5000):
+        """Race all candidate selectors for a UI element and return (handle, selector)"""
+        start_time = time.time()
+        with span("dreamina.find_element", element=element, candidates=len(selectors)) as trace:
+            handle, selector = race_selectors(self.page, element, selectors, timeout=timeout, cache=self.selector_cache)
+            trace.set(found=bool(handle), selector=selector)
+        if handle:
+            logger.info(f"⚡ Found {element} with selector: {selector} ({time.time() - start_time:.1f}s)")
+        return handle, selector
+    
+    def pair_line(self, pair_number):
+        """The sheet line a pair belongs to (its ledger key); pairs numbered by sheet line map to themselves"""
+        return self.pair_lines.get(pair_number, pair_number)
+    
+    def record_pair(self, pair_number, success, status_message, task_id=None, files=None):
+        """Record a pair's outcome in the stage ledger so a rerun skips accepted pairs.
+
+        `files` is the (image, audio) pair; its content fingerprint makes a
+        rerun resubmit the pair only if either file changed.
+        """
+        if success:
+            self.governor.success()
+            self.ledger.succeed(self.reel_number, self.pair_line(pair_number), "dreamina", detail=task_id or status_message,
+                                fingerprint=files_fingerprint(*files) if files else None)
+        else:
+            self.ledger.fail(self.reel_number, self.pair_line(pair_number), "dreamina", status_message)
+    
+    def report_progress(self, **progress):
+        """Pass upload progress to whoever is watching (the job store when run by the server)"""
+        if self.on_progress:
+            self.on_progress(**progress)
+    
+    @traced("dreamina.launch_browser")
+    @BROWSER_LAUNCH_SECONDS.time(service="dreamina")
     def launch_browser(self):
         """Launch browser with persistent session"""
         try:
+            # Wait for room on the host before adding another Chromium
+            self.browser_lease = acquire_browser("dreamina")
             self.playwright = sync_playwright().start()
             self.context = self.playwright.chromium.launch_persistent_context(
                 user_data_dir=self.user_data_dir,
@@ -57,10 +172,14 @@ class DreaminaUploadAPI:
                     "--disable-blink-features=AutomationControlled",
                     "--disable-web-security",
                     "--allow-running-insecure-content"
-                ]
+                ],
+                **(self.har.context_options() if self.har else {})
             )
+            if self.har:
+                self.har.attach(self.context)
             
             self.page = self.context.new_page()
+            self.tracker.attach(self.page)
             logger.info("✅ Browser launched successfully")
             return True
                 
@@ -68,21 +187,46 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Failed to launch browser: {e}")
             return False
     
+    def open_tab(self):
+        """Open another tab in the same persistent context, returned as its own API object"""
+        tab = DreaminaUploadAPI(user_data_dir=self.user_data_dir, headless=self.headless)
+        tab.context = self.context
+        tab.owns_context = False
+        tab.har = self.har
+        tab.reel_number = self.reel_number
+        tab.pair_lines = self.pair_lines
+        tab.page = self.context.new_page()
+        tab.tracker.attach(tab.page)
+        return tab
+    
+    def open_ai_avatar_form(self):
+        """Navigate this tab to the AI Avatar upload form"""
+        return self.navigate_to_dreamina() and self.navigate_to_create_tab() and self.navigate_to_ai_avatar()
+    
+    @traced("dreamina.navigate_to_dreamina")
+    @DREAMINA_STEP_SECONDS.time(step="navigate")
     def navigate_to_dreamina(self):
         """Navigate directly to Dreamina AI Avatar page"""
         try:
             logger.info("🌐 Navigating to Dreamina AI Avatar page...")
-            self.page.goto("https://dreamina.capcut.com/ai-tool/generate?type=digitalHuman")
+            self.page.goto(DREAMINA_AI_AVATAR_URL, wait_until="domcontentloaded")
             
-            # Wait for page to load
-            time.sleep(5)
+            # Wait for the upload form to render
+            try:
+                self.page.wait_for_selector(UPLOAD_FORM_SELECTOR, timeout=30000)
+            except Exception:
+                logger.warning("⚠️ Upload form not visible yet, continuing with navigation")
             logger.info("✅ Dreamina AI Avatar page loaded successfully")
+            if self.har:
+                self.har.snapshot(self.page, "form_loaded")
             return True
             
         except Exception as e:
             logger.error(f"❌ Failed to navigate to Dreamina: {e}")
             return False
     
+    @traced("dreamina.open_create_tab")
+    @DREAMINA_STEP_SECONDS.time(step="open_create_tab")
     def navigate_to_create_tab(self):
         """Ensure we're on the Create tab"""
         try:
@@ -95,19 +239,18 @@ class DreaminaUploadAPI:
                 'button[aria-label*="Create"]'
             ]
             
-            create_tab = None
-            for selector in create_tab_selectors:
-                try:
-                    create_tab = self.page.wait_for_selector(selector, timeout=5000)
-                    if create_tab:
-                        logger.info(f"✅ Found Create tab with selector: {selector}")
-                        break
-                except:
-                    continue
+            create_tab, _ = self.find_element('create_tab', create_tab_selectors, timeout=5000)
             
             if create_tab:
                 create_tab.click()
-                time.sleep(2)
+                # Wait for the Create panel (AI Avatar entry or upload form) to render
+                try:
+                    self.page.wait_for_selector(
+                        f'{UPLOAD_FORM_SELECTOR}, button:has-text("AI Avatar"), span:has-text("AI Avatar")',
+                        timeout=10000
+                    )
+                except Exception:
+                    logger.warning("⚠️ Create panel did not render, continuing anyway")
                 logger.info("✅ Clicked Create tab")
                 return True
             else:
@@ -118,6 +261,8 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error navigating to Create tab: {e}")
             return False
     
+    @traced("dreamina.open_ai_avatar")
+    @DREAMINA_STEP_SECONDS.time(step="open_ai_avatar")
     def navigate_to_ai_avatar(self):
         """Navigate to AI Avatar section"""
         try:
@@ -133,19 +278,15 @@ class DreaminaUploadAPI:
                 'span:has-text("AI Avatar")'
             ]
             
-            avatar_button = None
-            for selector in avatar_selectors:
-                try:
-                    avatar_button = self.page.wait_for_selector(selector, timeout=3000)
-                    if avatar_button:
-                        logger.info(f"✅ Found AI Avatar button with selector: {selector}")
-                        break
-                except:
-                    continue
+            avatar_button, _ = self.find_element('ai_avatar_button', avatar_selectors, timeout=3000)
             
             if avatar_button:
                 avatar_button.click()
-                time.sleep(3)
+                # Wait for the AI Avatar upload form to render
+                try:
+                    self.page.wait_for_selector(UPLOAD_FORM_SELECTOR, timeout=15000)
+                except Exception:
+                    logger.warning("⚠️ AI Avatar upload form did not render, continuing anyway")
                 logger.info("✅ Clicked AI Avatar button")
                 return True
             else:
@@ -156,6 +297,8 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error navigating to AI Avatar: {e}")
             return False
     
+    @traced("dreamina.upload_image")
+    @DREAMINA_STEP_SECONDS.time(step="upload_image")
     def upload_image(self, image_path):
         """Upload image file"""
         try:
@@ -170,15 +313,7 @@ class DreaminaUploadAPI:
                 'div:has-text("Avatar"):has(input[accept*="image"])'
             ]
             
-            avatar_button = None
-            for selector in avatar_button_selectors:
-                try:
-                    avatar_button = self.page.wait_for_selector(selector, timeout=5000)
-                    if avatar_button:
-                        logger.info(f"✅ Found Avatar button with selector: {selector}")
-                        break
-                except:
-                    continue
+            avatar_button, _ = self.find_element('avatar_upload', avatar_button_selectors, timeout=5000)
             
             if not avatar_button:
                 logger.error("❌ Could not find Avatar upload button")
@@ -186,15 +321,23 @@ class DreaminaUploadAPI:
             
             # Find the hidden file input within the Avatar button
             file_input = avatar_button.query_selector('input[type="file"][accept*="image"]')
+            if not file_input:
+                # A filled upload area may hide its input, so clear the form once and retry
+                logger.info("🔄 Image input hidden by previous upload, clearing form...")
+                self.remove_uploaded_files()
+                avatar_button, _ = self.find_element('avatar_upload', avatar_button_selectors, timeout=5000)
+                file_input = avatar_button.query_selector('input[type="file"][accept*="image"]') if avatar_button else None
             if not file_input:
                 logger.error("❌ Could not find image file input")
                 return False
             
-            # Set the file directly to the input
+            # Set the file directly to the input, replacing any previous pair's file
+            previous_html = avatar_button.inner_html()
             file_input.set_input_files(image_path)
             
-            # Wait for upload to complete
-            time.sleep(3)
+            # Wait for the thumbnail/progress to settle
+            if not self.wait_for_upload_complete(avatar_button, previous_html, "Avatar"):
+                return False
             logger.info("✅ Image upload completed")
             return True
                 
@@ -202,6 +345,8 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error uploading image: {e}")
             return False
     
+    @traced("dreamina.upload_audio")
+    @DREAMINA_STEP_SECONDS.time(step="upload_audio")
     def upload_audio(self, audio_path):
         """Upload audio file"""
         try:
@@ -216,15 +361,7 @@ class DreaminaUploadAPI:
                 'div:has-text("Speech"):has(input[accept*="audio"])'
             ]
             
-            audio_button = None
-            for selector in audio_button_selectors:
-                try:
-                    audio_button = self.page.wait_for_selector(selector, timeout=5000)
-                    if audio_button:
-                        logger.info(f"✅ Found Speech button with selector: {selector}")
-                        break
-                except:
-                    continue
+            audio_button, _ = self.find_element('speech_upload', audio_button_selectors, timeout=5000)
             
             if not audio_button:
                 logger.error("❌ Could not find Speech upload button")
@@ -232,15 +369,23 @@ class DreaminaUploadAPI:
             
             # Find the hidden file input within the Speech button
             file_input = audio_button.query_selector('input[type="file"][accept*="audio"]')
+            if not file_input:
+                # A filled upload area may hide its input, so clear the form once and retry
+                logger.info("🔄 Audio input hidden by previous upload, clearing form...")
+                self.remove_uploaded_files()
+                audio_button, _ = self.find_element('speech_upload', audio_button_selectors, timeout=5000)
+                file_input = audio_button.query_selector('input[type="file"][accept*="audio"]') if audio_button else None
             if not file_input:
                 logger.error("❌ Could not find audio file input")
                 return False
             
-            # Set the file directly to the input
+            # Set the file directly to the input, replacing any previous pair's file
+            previous_html = audio_button.inner_html()
             file_input.set_input_files(audio_path)
             
-            # Wait for upload to complete
-            time.sleep(3)
+            # Wait for the thumbnail/progress to settle
+            if not self.wait_for_upload_complete(audio_button, previous_html, "Speech"):
+                return False
             logger.info("✅ Audio upload completed")
             return True
                 
@@ -248,16 +393,22 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error uploading audio: {e}")
             return False
     
+    @traced("dreamina.submit")
+    @DREAMINA_STEP_SECONDS.time(step="submit")
     def submit_upload(self):
         """Submit the upload"""
         try:
             logger.info("🚀 Submitting upload...")
             
-            # Look for the submit button using the exact CSS classes
-            upload_selectors = [
+            # The exact submit button first; generic buttons are always on the page,
+            # so they are only tried once the specific ones miss
+            specific_selectors = [
                 'button.lv-btn.lv-btn-primary.lv-btn-size-default.lv-btn-shape-circle.lv-btn-icon-only.submit-button-bPnDkw',
                 'button.submit-button-bPnDkw',
-                'button.lv-btn-primary.lv-btn-shape-circle.lv-btn-icon-only',
+                'button[class*="submit-button-"]',
+                'button.lv-btn-primary.lv-btn-shape-circle.lv-btn-icon-only'
+            ]
+            generic_selectors = [
                 'button:has(svg[data-follow-fill="currentColor"])',
                 'button[type="button"]:has(svg)',
                 'button.lv-btn:has(svg)',
@@ -268,41 +419,42 @@ class DreaminaUploadAPI:
                 'button:has-text("Start")'
             ]
             
-            upload_button = None
-            for selector in upload_selectors:
-                try:
-                    upload_button = self.page.wait_for_selector(selector, timeout=5000)
-                    if upload_button:
-                        logger.info(f"✅ Found upload button with selector: {selector}")
-                        break
-                except:
-                    continue
+            start_time = time.time()
+            with span("dreamina.find_element", element="submit_button") as trace:
+                upload_button, selector, confirm_selector = race_selector_tiers(
+                    self.page, 'submit_button', [specific_selectors, generic_selectors],
+                    timeout=5000, cache=self.selector_cache)
+                trace.set(found=bool(upload_button), selector=selector)
             
             if not upload_button:
                 logger.error("❌ Could not find upload button")
                 return False
+            logger.info(f"⚡ Found submit_button with selector: {selector} ({time.time() - start_time:.1f}s)")
             
-            # Check if button is disabled
-            is_disabled = upload_button.get_attribute('disabled')
-            if is_disabled:
-                logger.warning("⚠️ Upload button is disabled, waiting for it to become enabled...")
-                # Wait for button to become enabled
-                try:
-                    self.page.wait_for_selector(f'{selector}:not([disabled])', timeout=30000)
-                    upload_button = self.page.query_selector(selector)
-                    if not upload_button:
-                        logger.error("❌ Upload button still not found after waiting")
-                        return False
-                except:
-                    logger.error("❌ Upload button did not become enabled within timeout")
-                    return False
-            
-            # Click the upload button
-            upload_button.click()
+            # Wait for the button to become enabled
+            try:
+                self.page.wait_for_function(
+                    "button => !button.disabled && !button.classList.contains('lv-btn-disabled')",
+                    arg=upload_button,
+                    timeout=30000
+                )
+            except Exception:
+                logger.error("❌ Upload button did not become enabled within timeout")
+                return False
             
-            # Wait for upload to process
-            logger.info("⏳ Upload submitted, waiting for processing...")
-            time.sleep(5)
+            # Click the upload button and wait for Dreamina's submit request to complete
+            clicked = False
+            try:
+                with self.page.expect_response(is_submit_response, timeout=30000) as response_info:
+                    upload_button.click()
+                    clicked = True
+                logger.info(f"📡 Submit response received (HTTP {response_info.value.status})")
+                # Only a button that really submitted is learned as the preferred selector
+                confirm_selector()
+            except Exception as e:
+                if not clicked:
+                    raise
+                logger.warning(f"⚠️ No submit response observed, continuing: {e}")
             
             logger.info("✅ Upload submitted successfully")
             return True
@@ -311,6 +463,29 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error submitting upload: {e}")
             return False
     
+    def wait_for_upload_complete(self, upload_area, previous_html, label, timeout=UPLOAD_TIMEOUT):
+        """Wait until an upload area shows the new file and no progress indicator.
+
+        Dreamina may re-render the area once the file lands; the detached
+        handle is then replaced by the upload area labelled `label`, so other
+        areas' progress indicators are never mistaken for this one's.
+        """
+        try:
+            self.page.wait_for_function(
+                """([area, before, busySelector, areaSelector, label]) => {
+                    const current = area.isConnected ? area : Array.from(document.querySelectorAll(areaSelector))
+                        .find(el => el.textContent.includes(label));
+                    if (!current || current.querySelector(busySelector)) return false;
+                    return current !== area || area.innerHTML !== before;
+                }""",
+                arg=[upload_area, previous_html, UPLOAD_BUSY_SELECTOR, UPLOAD_FORM_SELECTOR, label],
+                timeout=timeout
+            )
+            return True
+        except Exception as e:
+            logger.error(f"❌ Upload did not finish within {timeout / 1000:.0f}s: {e}")
+            return False
+    
     def check_for_errors(self):
         """Check if there are any error messages"""
         try:
@@ -332,6 +507,9 @@ class DreaminaUploadAPI:
                         error_text = error_element.inner_text()
                         if error_text and error_text.strip():
                             logger.error(f"❌ Error detected: {error_text}")
+                            self.governor.backoff(error_text.strip())
+                            if self.har:
+                                self.har.snapshot(self.page, "error_tip")
                             return True, error_text.strip()
                 except:
                     continue
@@ -391,7 +569,7 @@ class DreaminaUploadAPI:
     def get_file_pairs(self, reel_number):
         """Get image-audio file pairs for a reel"""
         try:
-            base_path = f"/Users/devanshc/Desktop/ProteinPapaPanda/{reel_number}"
+            base_path = os.path.join(REELS_BASE_DIR, str(reel_number))
             images_dir = f"{base_path}/Images"
             audio_dir = f"{base_path}/Audio"
             
@@ -404,29 +582,8 @@ class DreaminaUploadAPI:
                 logger.error(f"❌ Audio directory not found: {audio_dir}")
                 return []
             
-            # Get all image files
-            image_files = glob.glob(f"{images_dir}/*")
-            image_files = [f for f in image_files if os.path.isfile(f)]
-            image_files.sort()
-            
-            # Get all audio files
-            audio_files = glob.glob(f"{audio_dir}/*")
-            audio_files = [f for f in audio_files if os.path.isfile(f)]
-            audio_files.sort()
-            
-            # Create pairs (assuming files are numbered 1, 2, 3, etc.)
-            pairs = []
-            for i in range(1, max(len(image_files), len(audio_files)) + 1):
-                # Look for files with number i
-                matching_images = [f for f in image_files if str(i) in os.path.basename(f)]
-                matching_audios = [f for f in audio_files if str(i) in os.path.basename(f)]
-                
-                if matching_images and matching_audios:
-                    pairs.append({
-                        'number': i,
-                        'image': matching_images[0],
-                        'audio': matching_audios[0]
-                    })
+            # Join images and audio on line number (manifest first, file names as fallback)
+            pairs = pair_files(images_dir, audio_dir)
             
             logger.info(f"📁 Found {len(pairs)} file pairs for reel {reel_number}")
             return pairs
@@ -435,109 +592,241 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error getting file pairs: {e}")
             return []
     
+    @traced("dreamina.submit_pair")
+    def submit_file_pair(self, image_path, audio_path, pair_number):
+        """Fill the form with an image-audio pair and submit it, without waiting for generation"""
+        self.governor.wait()
+        logger.info(f"🔄 Uploading pair {pair_number}: {os.path.basename(image_path)} + {os.path.basename(audio_path)}")
+        
+        # Upload image
+        if not self.upload_image(image_path):
+            logger.error(f"❌ Failed to upload image for pair {pair_number}")
+            return False, "Failed to upload image"
+        
+        # Upload audio
+        if not self.upload_audio(audio_path):
+            logger.error(f"❌ Failed to upload audio for pair {pair_number}")
+            return False, "Failed to upload audio"
+        
+        # Submit upload, labelling the task Dreamina creates for it
+        self.ledger.start(self.reel_number, self.pair_line(pair_number), "dreamina")
+        self.tracker.expect_submission(self.page, self.reel_number, pair_number)
+        if not self.submit_upload():
+            logger.error(f"❌ Failed to submit upload for pair {pair_number}")
+            return False, "Failed to submit upload"
+        
+        publish("pair_submitted", reel_no=self.reel_number, pair_number=pair_number)
+        if self.har:
+            self.har.snapshot(self.page, f"pair_{pair_number}_submitted")
+        return True, None
+    
+    @traced("dreamina.confirm_submission")
+    @DREAMINA_STEP_SECONDS.time(step="wait")
+    def confirm_submission(self, pair_number, timeout=SUBMISSION_CONFIRM_SECONDS):
+        """Wait until Dreamina returns a task id for the submission or shows an error tip"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            task_id = self.tracker.submitted_task(self.page)
+            if task_id:
+                logger.info(f"✅ Pair {pair_number} accepted as Dreamina task {task_id}")
+                return True, "generation_started"
+            
+            has_error, error_message = self.check_for_errors()
+            if has_error:
+                return False, error_message
+            
+            # Let Playwright deliver network responses to the tracker
+            self.page.wait_for_timeout(500)
+        
+        logger.info(f"✅ No errors for {timeout}s - pair {pair_number} generation in progress")
+        return True, "generation_started"
+    
+    def track_generations(self, timeout, since=None):
+        """Keep the page open until the reel's tasks submitted since `since` finish or the timeout passes"""
+        logger.info(f"🛰️ Tracking generations for reel {self.reel_number} (up to {timeout}s)...")
+        deadline = time.time() + timeout
+        while time.time() < deadline and self.tracker.pending_tasks(self.reel_number, since=since):
+            self.page.wait_for_timeout(5000)
+        remaining = len(self.tracker.pending_tasks(self.reel_number, since=since))
+        logger.info(f"🛰️ Stopped tracking with {remaining} generation(s) still running")
+    
+    @traced("dreamina.upload_pair")
     def upload_file_pair(self, image_path, audio_path, pair_number):
         """Upload a single image-audio pair"""
         try:
-            logger.info(f"🔄 Uploading pair {pair_number}: {os.path.basename(image_path)} + {os.path.basename(audio_path)}")
-            
-            # Upload image
-            if not self.upload_image(image_path):
-                logger.error(f"❌ Failed to upload image for pair {pair_number}")
-                return False, "Failed to upload image"
-            
-            # Upload audio
-            if not self.upload_audio(audio_path):
-                logger.error(f"❌ Failed to upload audio for pair {pair_number}")
-                return False, "Failed to upload audio"
-            
-            # Submit upload
-            if not self.submit_upload():
-                logger.error(f"❌ Failed to submit upload for pair {pair_number}")
-                return False, "Failed to submit upload"
+            success, status_message = self.submit_file_pair(image_path, audio_path, pair_number)
+            if not success:
+                self.record_pair(pair_number, False, status_message)
+                publish("pair_error", reel_no=self.reel_number, pair_number=pair_number, error=status_message)
+                return False, status_message
             
-            # Wait for generation
-            success, status_message = self.wait_for_generation()
+            # Confirm Dreamina accepted it; the tracker records completion in the background,
+            # and the next pair's files replace these in place
+            success, status_message = self.confirm_submission(pair_number)
             if not success:
                 logger.error(f"❌ Generation failed for pair {pair_number}: {status_message}")
+                self.record_pair(pair_number, False, status_message)
+                publish("pair_error", reel_no=self.reel_number, pair_number=pair_number, error=status_message)
                 return False, status_message
             
-            # If generation is in progress, remove files and continue
-            if status_message == "generation_in_progress":
-                logger.info(f"✅ Pair {pair_number} generation started successfully")
-                if not self.remove_uploaded_files():
-                    logger.warning(f"⚠️ Failed to remove files for pair {pair_number}, but continuing...")
-                return True, "generation_started"
-            
-            logger.info(f"✅ Successfully uploaded pair {pair_number}")
-            return True, None
+            logger.info(f"✅ Pair {pair_number} generation started successfully")
+            task_id = self.tracker.submitted_task(self.page)
+            self.record_pair(pair_number, True, status_message, task_id=task_id, files=(image_path, audio_path))
+            publish("pair_accepted", reel_no=self.reel_number, pair_number=pair_number, task_id=task_id)
+            return True, status_message
             
         except Exception as e:
             logger.error(f"❌ Error uploading pair {pair_number}: {e}")
+            self.record_pair(pair_number, False, str(e))
+            publish("pair_error", reel_no=self.reel_number, pair_number=pair_number, error=str(e))
             return False, str(e)
     
-    def upload_reel_files(self, reel_number):
-        """Upload all file pairs for a reel"""
-        try:
-            logger.info(f"🎬 Starting upload for reel {reel_number}")
-            
-            # Launch browser
-            if not self.launch_browser():
-                return {"success": False, "error": "Failed to launch browser"}
-            
-            # Navigate to Dreamina
-            if not self.navigate_to_dreamina():
-                return {"success": False, "error": "Failed to navigate to Dreamina"}
-            
-            # Navigate to Create tab
-            if not self.navigate_to_create_tab():
-                return {"success": False, "error": "Failed to navigate to Create tab"}
-            
-            # Navigate to AI Avatar
-            if not self.navigate_to_ai_avatar():
-                return {"success": False, "error": "Failed to navigate to AI Avatar"}
-            
-            # Get file pairs
-            file_pairs = self.get_file_pairs(reel_number)
-            if not file_pairs:
-                return {"success": False, "error": "No file pairs found"}
+    @traced("dreamina.upload_pairs_in_order")
+    def upload_pairs_in_order(self, file_pairs):
+        """Upload pairs one after another, stopping at the first real failure"""
+        results = []
+        for pair in file_pairs:
+            pair_start = time.time()
+            success, status_message = self.upload_file_pair(
+                pair['image'], 
+                pair['audio'], 
+                pair['number']
+            )
+            pair_seconds = round(time.time() - pair_start, 1)
+            logger.info(f"⏱️ Pair {pair['number']} took {pair_seconds}s")
+            
+            results.append({
+                'pair_number': pair['number'],
+                'image': os.path.basename(pair['image']),
+                'audio': os.path.basename(pair['audio']),
+                'success': success,
+                'status': status_message,
+                'seconds': pair_seconds
+            })
+            self.report_progress(done_pairs=len(results), last_pair=pair['number'])
+            
+            # Stop only if there's a real error (not generation_in_progress)
+            if not success and status_message != "generation_started":
+                logger.warning(f"⚠️ Stopping upload due to failure in pair {pair['number']}")
+                break
             
-            # Upload each pair
+            # If generation started successfully, continue to next pair
+            if success and status_message == "generation_started":
+                logger.info(f"✅ Continuing to next pair after successful generation start for pair {pair['number']}")
+                continue
+        
+        return results
+    
+    @traced("dreamina.start_session")
+    def start_session(self):
+        """Launch the browser and open the AI Avatar form; returns None or an error message"""
+        # A fresh profile would reach a logged-out form and fail every pair, so stop here
+        if REQUIRE_PROFILE_LOGIN and not profile_has_login(self.user_data_dir):
+            return (f"Browser profile {self.user_data_dir} has never logged in to Dreamina; "
+                    f"log it in with: python3 open_dreamina_session.py {self.slot + 1}")
+        
+        # Launch browser
+        if not self.launch_browser():
+            return "Failed to launch browser"
+        
+        # Navigate to Dreamina
+        if not self.navigate_to_dreamina():
+            return "Failed to navigate to Dreamina"
+        
+        # Navigate to Create tab
+        if not self.navigate_to_create_tab():
+            return "Failed to navigate to Create tab"
+        
+        # Navigate to AI Avatar
+        if not self.navigate_to_ai_avatar():
+            return "Failed to navigate to AI Avatar"
+        return None
+    
+    def is_healthy(self):
+        """Check the browser still responds and the AI Avatar form is on screen"""
+        try:
+            if not self.page or self.page.is_closed():
+                return False
+            self.page.evaluate("1")
+            if self.page.query_selector(UPLOAD_FORM_SELECTOR):
+                return True
+            logger.info("🔄 Upload form not on screen, reopening AI Avatar...")
+            return self.open_ai_avatar_form() and self.page.query_selector(UPLOAD_FORM_SELECTOR) is not None
+        except Exception as e:
+            logger.warning(f"⚠️ Browser health check failed: {e}")
+            return False
+    
+    @traced("dreamina.recycle_page")
+    def recycle_page(self):
+        """Swap the current tab for a fresh one on the AI Avatar form"""
+        try:
+            old_page = self.page
+            self.page = self.context.new_page()
+            self.tracker.attach(self.page)
+            old_page.close()
+            return self.open_ai_avatar_form()
+        except Exception as e:
+            logger.error(f"❌ Failed to recycle page: {e}")
+            return False
+    
+    @traced("dreamina.upload_reel_pairs")
+    def upload_reel_pairs(self, reel_number, tab_count=DEFAULT_TAB_COUNT, track_seconds=DEFAULT_TRACK_SECONDS):
+        """Upload all file pairs for a reel from an already open AI Avatar form"""
+        self.reel_number = str(reel_number)
+        started_at = time.time()
+        logger.info(f"🎬 Starting upload for reel {reel_number} ({tab_count} tab(s))")
+        
+        # Get file pairs
+        file_pairs = self.get_file_pairs(reel_number)
+        if not file_pairs:
+            return {"success": False, "error": "No file pairs found"}
+        self.pair_lines = {p['number']: p['line_no'] for p in file_pairs}
+        
+        # Pairs Dreamina already accepted in an earlier run (with the same files) are not submitted again
+        already_submitted = [
+            p['number'] for p in file_pairs
+            if self.ledger.done(self.reel_number, p['line_no'], "dreamina", fingerprint=files_fingerprint(p['image'], p['audio']))
+        ]
+        if already_submitted:
+            logger.info(f"⏭️ Skipping pairs already accepted by Dreamina: {already_submitted}")
+            file_pairs = [p for p in file_pairs if p['number'] not in already_submitted]
+        self.report_progress(stage="uploading pairs", total_pairs=len(file_pairs), done_pairs=0,
+                             skipped_pairs=len(already_submitted))
+        
+        # Pipeline pairs across several tabs when requested, otherwise upload in order
+        if not file_pairs:
             results = []
-            for pair in file_pairs:
-                success, status_message = self.upload_file_pair(
-                    pair['image'], 
-                    pair['audio'], 
-                    pair['number']
-                )
-                
-                results.append({
-                    'pair_number': pair['number'],
-                    'image': os.path.basename(pair['image']),
-                    'audio': os.path.basename(pair['audio']),
-                    'success': success,
-                    'status': status_message
-                })
-                
-                # Stop only if there's a real error (not generation_in_progress)
-                if not success and status_message != "generation_started":
-                    logger.warning(f"⚠️ Stopping upload due to failure in pair {pair['number']}")
-                    break
-                
-                # If generation started successfully, continue to next pair
-                if success and status_message == "generation_started":
-                    logger.info(f"✅ Continuing to next pair after successful generation start for pair {pair['number']}")
-                    continue
+        elif tab_count > 1:
+            results = MultiTabSubmitter(self, tab_count=tab_count).run(file_pairs)
+        else:
+            results = self.upload_pairs_in_order(file_pairs)
+        
+        # Optionally keep observing so completion times land in the tracker
+        if track_seconds > 0:
+            self.track_generations(track_seconds, since=started_at)
+        
+        return {
+            "success": True,
+            "reel_number": reel_number,
+            "total_pairs": len(file_pairs) + len(already_submitted),
+            "uploaded_pairs": len([r for r in results if r['success']]),
+            "skipped_pairs": already_submitted,
+            "average_pair_seconds": round(sum(r['seconds'] for r in results) / len(results), 1) if results else 0,
+            "results": results
+        }
+    
+    def upload_reel_files(self, reel_number, tab_count=DEFAULT_TAB_COUNT, track_seconds=DEFAULT_TRACK_SECONDS):
+        """Upload all file pairs for a reel in a fresh browser session"""
+        try:
+            error = self.start_session()
+            if error:
+                return {"success": False, "error": error}
+            
+            result = self.upload_reel_pairs(reel_number, tab_count=tab_count, track_seconds=track_seconds)
             
             # Close browser
             self.close()
-            
-            return {
-                "success": True,
-                "reel_number": reel_number,
-                "total_pairs": len(file_pairs),
-                "uploaded_pairs": len([r for r in results if r['success']]),
-                "results": results
-            }
+            return result
             
         except Exception as e:
             logger.error(f"❌ Error uploading reel {reel_number}: {e}")
@@ -548,13 +837,18 @@ class DreaminaUploadAPI:
     def close(self):
         """Close browser"""
         try:
-            if self.context:
+            if self.context and self.owns_context:
                 self.context.close()
+            elif self.page:
+                self.page.close()
             if self.playwright:
                 self.playwright.stop()
             logger.info("✅ Browser closed")
         except Exception as e:
             logger.error(f"❌ Error closing browser: {e}")
+        if self.browser_lease:
+            self.browser_lease.release()
+            self.browser_lease = None
 
     def remove_uploaded_files(self):
         """Click remove buttons to clear uploaded image and audio files"""
@@ -588,7 +882,11 @@ class DreaminaUploadAPI:
                 try:
                     button.click()
                     logger.info(f"✅ Clicked remove button {i+1}")
-                    time.sleep(1)  # Small delay between clicks
+                    # Wait for the removed file's button to disappear
+                    try:
+                        button.wait_for_element_state("hidden", timeout=5000)
+                    except Exception:
+                        logger.warning(f"⚠️ Remove button {i+1} still visible after click")
                 except Exception as e:
                     logger.error(f"❌ Failed to click remove button {i+1}: {e}")
             
@@ -599,50 +897,206 @@ class DreaminaUploadAPI:
             logger.error(f"❌ Error removing uploaded files: {e}")
             return False
 
-def process_queue():
-    """Background thread to process requests one at a time"""
-    global is_processing
+class MultiTabSubmitter:
+    """
+    Fills and submits image-audio pairs across several AI Avatar tabs of one
+    persistent browser context.
+    
+    Playwright's sync API must stay on one thread, so tabs are pipelined rather
+    than threaded: while one tab's submission sits in its error-watch window,
+    the next free tab is filled and submitted. Each tab tracks its own errors
+    and results are merged back in pair order.
+    """
+    
+    def __init__(self, api, tab_count=3, watch_seconds=SUBMISSION_CONFIRM_SECONDS, max_tab_errors=2):
+        self.api = api
+        self.tab_count = min(tab_count, MAX_TAB_COUNT)
+        self.watch_seconds = watch_seconds
+        self.max_tab_errors = max_tab_errors
+        self.tabs = []
+    
+    def open_tabs(self):
+        """Use the api's own page as the first tab and open the rest alongside it"""
+        self.tabs = [{'id': 1, 'api': self.api, 'pair': None, 'errors': [], 'consecutive_errors': 0}]
+        for tab_id in range(2, self.tab_count + 1):
+            tab_api = self.api.open_tab()
+            if not tab_api.open_ai_avatar_form():
+                logger.warning(f"⚠️ Tab {tab_id} could not open the AI Avatar form, skipping it")
+                tab_api.close()
+                continue
+            self.tabs.append({'id': tab_id, 'api': tab_api, 'pair': None, 'errors': [], 'consecutive_errors': 0})
+        logger.info(f"🗂️ Submitting with {len(self.tabs)} AI Avatar tab(s)")
+    
+    def _finish(self, tab, results, success, status_message):
+        """Record the outcome of the tab's current pair and free the tab"""
+        pair = tab['pair']
+        results[pair['number']] = {
+            'pair_number': pair['number'],
+            'image': os.path.basename(pair['image']),
+            'audio': os.path.basename(pair['audio']),
+            'success': success,
+            'status': status_message,
+            'seconds': round(time.time() - pair['started_at'], 1),
+            'tab': tab['id']
+        }
+        self.api.report_progress(done_pairs=len(results), last_pair=pair['number'])
+        self.api.record_pair(pair['number'], success, status_message,
+                             task_id=tab['api'].tracker.submitted_task(tab['api'].page) if success else None,
+                             files=(pair['image'], pair['audio']))
+        if success:
+            publish("pair_accepted", reel_no=self.api.reel_number, pair_number=pair['number'], tab=tab['id'])
+            tab['consecutive_errors'] = 0
+        else:
+            publish("pair_error", reel_no=self.api.reel_number, pair_number=pair['number'], tab=tab['id'],
+                    error=status_message)
+            tab['errors'].append({'pair_number': pair['number'], 'error': status_message})
+            tab['consecutive_errors'] += 1
+            # Reload so the stale error tip doesn't leak into the tab's next pair
+            tab['api'].open_ai_avatar_form()
+        tab['pair'] = None
+    
+    @traced("dreamina.multi_tab_submit")
+    def run(self, file_pairs):
+        """Submit all pairs and return per-pair results in pair order"""
+        self.open_tabs()
+        pending = list(file_pairs)
+        results = {}
+        
+        while pending or any(tab['pair'] for tab in self.tabs):
+            usable = [t for t in self.tabs if t['consecutive_errors'] < self.max_tab_errors]
+            if not usable and not any(tab['pair'] for tab in self.tabs):
+                logger.warning("⚠️ Every tab hit repeated errors, stopping")
+                break
+            
+            # Fill and submit on every free tab
+            for tab in usable:
+                if tab['pair'] or not pending:
+                    continue
+                pair = dict(pending.pop(0), started_at=time.time())
+                tab['pair'] = pair
+                tab['api'].page.bring_to_front()
+                try:
+                    success, status_message = tab['api'].submit_file_pair(pair['image'], pair['audio'], pair['number'])
+                except Exception as e:
+                    success, status_message = False, str(e)
+                if success:
+                    pair['submitted_at'] = time.time()
+                    logger.info(f"📤 Tab {tab['id']} submitted pair {pair['number']}")
+                else:
+                    self._finish(tab, results, False, status_message)
+            
+            # Watch every busy tab for errors until its window passes
+            for tab in self.tabs:
+                pair = tab['pair']
+                if not pair:
+                    continue
+                has_error, error_message = tab['api'].check_for_errors()
+                if has_error:
+                    logger.error(f"❌ Tab {tab['id']} pair {pair['number']} failed: {error_message}")
+                    self._finish(tab, results, False, error_message)
+                elif tab['api'].tracker.submitted_task(tab['api'].page):
+                    logger.info(f"✅ Tab {tab['id']} pair {pair['number']} accepted by Dreamina")
+                    self._finish(tab, results, True, "generation_started")
+                elif time.time() - pair['submitted_at'] >= self.watch_seconds:
+                    logger.info(f"✅ Tab {tab['id']} pair {pair['number']} generation started successfully")
+                    self._finish(tab, results, True, "generation_started")
+            
+            if any(tab['pair'] for tab in self.tabs):
+                # Let Playwright process page events between checks
+                self.api.page.wait_for_timeout(1000)
+        
+        for pair in pending:
+            results[pair['number']] = {
+                'pair_number': pair['number'],
+                'image': os.path.basename(pair['image']),
+                'audio': os.path.basename(pair['audio']),
+                'success': False,
+                'status': "skipped: all tabs failing",
+                'seconds': 0
+            }
+        
+        for tab in self.tabs[1:]:
+            tab['api'].close()
+        
+        for tab in self.tabs:
+            if tab['errors']:
+                logger.warning(f"⚠️ Tab {tab['id']} errors: {tab['errors']}")
+        
+        return [results[number] for number in sorted(results)]
+
+def slot_session(index):
+    """Build the Dreamina session for pool slot `index`; extra slots use their own profile"""
+    return DreaminaUploadAPI(user_data_dir=slot_profile(index), slot=index)
+
+# Warm browser sessions kept on the AI Avatar form between requests (one worker thread per slot)
+browser_pool = WarmBrowserPool(slot_session, size=POOL_SIZE, recycle_after=POOL_RECYCLE_AFTER, name="dreamina",
+                               jobs=request_queue)
+
+def process_queue(slot, warm_up=False):
+    """Background thread that processes jobs one at a time on its warm browser slot"""
+    if warm_up:
+        slot.warm_up()
     
     while True:
         try:
-            # Get next request from queue
-            request_data = request_queue.get(timeout=1)
-            if request_data is None:  # Shutdown signal
+            # Wait for the next job; a reclaim wakes this worker to close the parked browser
+            job = request_queue.get_for(slot)
+            if job is RECLAIM:
+                slot.close_if_reclaimed()
+                continue
+            if job is None:  # Shutdown signal
+                slot.close()
                 break
                 
-            with processing_lock:
-                is_processing = True
-                
-            try:
-                # Process the request
-                reel_number = request_data['reel_number']
-                logger.info(f"Processing Dreamina upload request for reel: {reel_number}")
-                
-                # Create upload agent and process
-                agent = DreaminaUploadAPI(headless=False)
-                result = agent.upload_reel_files(reel_number)
-                
-                # Store result for the waiting thread
-                request_data['result'] = result
-                request_data['completed'] = True
-                
-            except Exception as e:
-                logger.error(f"Error processing Dreamina upload request: {e}")
-                request_data['error'] = str(e)
-                request_data['completed'] = True
-                
-            finally:
-                with processing_lock:
-                    is_processing = False
+            with scheduler.job_slot(job.kind), worker_state.running(), bind_job(job):
+                failed = False
+                try:
+                    # Process the request on the warm session, starting at the upload form
+                    reel_number = job.params['reel_number']
+                    logger.info(f"Processing Dreamina upload request for reel: {reel_number} ({slot.name})")
+                    job_store.start(job, stage="preparing browser", slot=slot.name)
+                    
+                    agent = slot.acquire()
+                    agent.on_progress = lambda **progress: job_store.update(job, **progress)
+                    result = agent.upload_reel_pairs(
+                        reel_number,
+                        tab_count=job.params['tabs'],
+                        track_seconds=job.params['track_seconds']
+                    )
+                    failed = not result.get('success')
+                    
+                    # Finishing the job wakes any waiting request thread
+                    job_store.finish(job, result, 200 if result.get('success') else 500)
+                    
+                except Exception as e:
+                    logger.error(f"Error processing Dreamina upload request: {e}")
+                    failed = True
+                    job_store.finish(job, {"success": False, "error": str(e)}, 500)
+                    
+                finally:
+                    if slot.busy:
+                        slot.session.on_progress = None
+                        slot.release(failed=failed)
                     
-        except queue.Empty:
-            continue
         except Exception as e:
             logger.error(f"Error in queue processing: {e}")
 
-# Start the background processing thread
-queue_thread = threading.Thread(target=process_queue, daemon=True)
-queue_thread.start()
+# Start one background processing thread per pool slot; warm them up when run as a server
+# (or when DREAMINA_WARM_POOL=1, as set by gateway_server.py)
+warm_on_start = __name__ == '__main__' or os.getenv("DREAMINA_WARM_POOL") == "1"
+queue_threads = [
+    threading.Thread(target=process_queue, args=(slot, warm_on_start), daemon=True)
+    for slot in browser_pool.slots
+]
+for queue_thread in queue_threads:
+    queue_thread.start()
+
+def stop_queue_workers(timeout=30):
+    """Stop every slot's worker (one shutdown signal each) and close their browsers"""
+    for _ in queue_threads:
+        request_queue.put(None)
+    for queue_thread in queue_threads:
+        queue_thread.join(timeout)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -653,10 +1107,10 @@ def health_check():
         "message": "Dreamina Upload API is running",
         "timestamp": "2025-08-05T17:50:00.000000",
         "queue_size": queue_size,
-        "is_processing": is_processing
+        "is_processing": worker_state.is_processing
     })
 
-@app.route('/upload-reel-to-dreamina', methods=['POST'])
+@dreamina_routes.route('/upload-reel-to-dreamina', methods=['POST'])
 def upload_reel_to_dreamina():
     """Upload image-audio pairs to Dreamina for a reel endpoint"""
     try:
@@ -670,38 +1124,46 @@ def upload_reel_to_dreamina():
             }), 400
         
         reel_number = data['reel_number']
-        
-        # Check if already processing
-        if is_processing:
+        try:
+            tab_count = int(data.get('tabs', DEFAULT_TAB_COUNT))
+        except (TypeError, ValueError):
+            tab_count = 0
+        if tab_count < 1:
+            return jsonify({
+                "success": False,
+                "error": f"'tabs' must be a whole number from 1 to {MAX_TAB_COUNT}"
+            }), 400
+        if tab_count > MAX_TAB_COUNT:
+            logger.warning(f"⚠️ {tab_count} tabs requested, using {MAX_TAB_COUNT}")
+            tab_count = MAX_TAB_COUNT
+        try:
+            track_seconds = int(data.get('track_seconds', DEFAULT_TRACK_SECONDS))
+        except (TypeError, ValueError):
+            track_seconds = -1
+        if track_seconds < 0:
             return jsonify({
                 "success": False,
-                "error": "Another upload is currently in progress. Please wait.",
-                "queue_position": request_queue.qsize() + 1
-            }), 429
+                "error": f"'track_seconds' must be a whole number from 0 to {MAX_TRACK_SECONDS}"
+            }), 400
+        if track_seconds > MAX_TRACK_SECONDS:
+            logger.warning(f"⚠️ {track_seconds}s of tracking requested, using {MAX_TRACK_SECONDS}s")
+            track_seconds = MAX_TRACK_SECONDS
         
-        # Add request to queue
-        request_data = {
+        # Queue the job; busy sessions mean it waits its turn instead of being rejected
+        job = job_store.create('upload-reel-to-dreamina', {
             'reel_number': reel_number,
-            'completed': False,
-            'result': None,
-            'error': None
-        }
-        
-        request_queue.put(request_data)
+            'tabs': tab_count,
+            'track_seconds': track_seconds
+        }, callback_url=data.get('callback_url'))
+        request_queue.put(job)
         logger.info(f"Added reel {reel_number} to upload queue")
         
-        # Wait for completion
-        while not request_data['completed']:
-            time.sleep(1)
-        
-        # Return result
-        if request_data['error']:
-            return jsonify({
-                "success": False,
-                "error": request_data['error']
-            }), 500
+        # Return the job id straight away unless the caller asked to wait
+        if not data.get('wait'):
+            return accepted_response(job)
         
-        return jsonify(request_data['result'])
+        # Wait for completion (bounded); the worker wakes us as soon as the job finishes
+        return wait_response(job)
         
     except Exception as e:
         logger.error(f"Error in upload_reel_to_dreamina endpoint: {e}")
@@ -710,23 +1172,67 @@ def upload_reel_to_dreamina():
             "error": str(e)
         }), 500
 
-@app.route('/upload-status', methods=['GET'])
+@dreamina_routes.route('/upload-status', methods=['GET'])
 def upload_status():
     """Get current upload status"""
     return jsonify({
-        "is_processing": is_processing,
+        "is_processing": worker_state.is_processing,
         "queue_size": request_queue.qsize(),
         "message": "Dreamina Upload API Status"
     })
 
+@dreamina_routes.route('/generation-tasks', methods=['GET'])
+def generation_tasks():
+    """List tracked Dreamina generation tasks and their render latency"""
+    reel_number = request.args.get('reel_number')
+    tracker = get_generation_tracker()
+    return jsonify({
+        "success": True,
+        "tasks": tracker.tasks(reel_number),
+        "latency": tracker.latency_stats(reel_number)
+    })
+
+@dreamina_routes.route('/browser-pool', methods=['GET'])
+def browser_pool_status():
+    """Get the state of the warm browser sessions"""
+    return jsonify({
+        "success": True,
+        "slots": browser_pool.status()
+    })
+
+@dreamina_routes.route('/selector-stats', methods=['GET'])
+def selector_stats():
+    """Get hit rate and time lost per Dreamina UI selector"""
+    return jsonify({
+        "success": True,
+        "elements": get_selector_cache().stats()
+    })
+
+app.register_blueprint(dreamina_routes)
+app.register_blueprint(jobs_blueprint)
+app.register_blueprint(metrics_blueprint)
+app.register_blueprint(governors_blueprint)
+
 if __name__ == '__main__':
     logger.info("🎬 Starting Dreamina Upload API Server...")
     logger.info("📋 Features:")
-    logger.info("   ✅ Queue system for concurrent requests")
-    logger.info("   ✅ Sequential file pair upload")
+    logger.info("   ✅ Queue system for concurrent requests (returns a job id; \"wait\": true blocks)")
+    logger.info("   ✅ Job status and progress (GET /jobs/<job_id>), optional callback_url")
+    logger.info("   ✅ Sequential or multi-tab pipelined file pair upload (\"tabs\")")
     logger.info("   ✅ Error handling and recovery")
     logger.info("   ✅ Progress tracking")
     logger.info("   ✅ Browser automation")
+    logger.info("   ✅ Raced selectors with learned preferences (GET /selector-stats)")
+    logger.info("   ✅ Adaptive upload pacing that backs off on error tips (GET /governors)")
+    logger.info(f"   ✅ Warm browser pool: {POOL_SIZE} session(s), page recycled every {POOL_RECYCLE_AFTER} jobs (GET /browser-pool)")
     logger.info("==================================================")
     
-    app.run(host='0.0.0.0', port=5678, debug=False) 
\ No newline at end of file
+    for index in range(POOL_SIZE):
+        if REQUIRE_PROFILE_LOGIN and not profile_has_login(slot_profile(index)):
+            logger.error(f"❌ Slot {index + 1} profile {slot_profile(index)} is not logged in; "
+                         f"run: python3 open_dreamina_session.py {index + 1}")
+    
+    try:
+        app.run(host='0.0.0.0', port=5678, debug=False)
+    finally:
+        stop_queue_workers() 
\ No newline at end of file
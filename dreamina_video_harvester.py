@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Harvester for finished Dreamina avatar videos
+Usage: python3 dreamina_video_harvester.py <reel_number>
+
+Takes the finished tasks' video URLs recorded by the generation tracker (read
+from the page's own network responses) and downloads them concurrently. Large
+files are fetched as several HTTP Range segments at once into a `.part` file,
+with a small JSON state file so an interrupted download resumes where each
+segment stopped. The state keeps a SHA-256 of each segment's saved bytes, and
+a resumed segment re-reads and checks them first, so a part file that was
+deleted, replaced or lost writes is fetched again instead of kept. Videos are saved as `<reel>/Videos/<pair>.mp4` next to a
+`manifest.json` of SHA-256 checksums.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from dreamina_tracker import FINISHED_STATES, get_generation_tracker
+
+logger = logging.getLogger(__name__)
+
+REELS_BASE_DIR = os.getenv("REELS_BASE_DIR", "/Users/devanshc/Desktop/ProteinPapaPanda")
+
+# Files smaller than this are fetched in one request
+MIN_RANGED_BYTES = 8 * 1024 * 1024
+
+CHUNK_SIZE = 256 * 1024
+
+# Segment progress is persisted after roughly this many bytes
+STATE_SAVE_BYTES = 4 * 1024 * 1024
+
+
+def probe_download(session, url):
+    """Return (size, supports_ranges) by asking for the first byte"""
+    response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=30)
+    try:
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code == 206 and "/" in content_range:
+            total = content_range.rsplit("/", 1)[1]
+            return (int(total) if total.isdigit() else None), True
+        if response.status_code == 200:
+            length = response.headers.get("Content-Length")
+            return (int(length) if length else None), False
+        response.raise_for_status()
+        return None, False
+    finally:
+        response.close()
+
+
+def _load_state(state_path, part_path, size, segments):
+    """Load resumable segment state, or plan fresh segments for a file of `size` bytes.
+
+    Each segment's saved bytes are checked against their checksum when it
+    resumes (see _verified_digest); here the state is only dropped when the
+    part file is gone or the remote size changed.
+    """
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state['size'] == size and all('start' in s and 'end' in s and 'done' in s for s in state['segments']):
+            if os.path.exists(part_path):
+                return state
+            logger.info(f"  🗑️ Dropping saved progress for {os.path.basename(part_path)}: part file missing")
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    segment_size = -(-size // segments)
+    return {
+        'size': size,
+        'segments': [
+            {'start': start, 'end': min(start + segment_size, size) - 1, 'done': 0}
+            for start in range(0, size, segment_size)
+        ]
+    }
+
+
+def _save_state(state_path, state, lock):
+    with lock:
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+
+def _verified_digest(fd, segment):
+    """SHA-256 of the segment's saved bytes read back from the part file, or None if they don't match the state"""
+    digest = hashlib.sha256()
+    offset, end = segment['start'], segment['start'] + segment['done']
+    while offset < end:
+        chunk = os.pread(fd, min(CHUNK_SIZE, end - offset), offset)
+        if not chunk:
+            return None
+        digest.update(chunk)
+        offset += len(chunk)
+    if segment['done'] and digest.hexdigest() != segment.get('sha256'):
+        return None
+    return digest
+
+
+def _download_segment(session, url, fd, segment, state_path, state, lock):
+    """Fetch one byte range into the shared part file, recording progress as it goes"""
+    digest = _verified_digest(fd, segment)
+    if digest is None:
+        logger.info(f"  🗑️ Saved bytes {segment['start']:,}-{segment['start'] + segment['done'] - 1:,} "
+                    f"no longer match, refetching them")
+        digest = hashlib.sha256()
+        with lock:
+            segment['done'] = 0
+            segment['sha256'] = digest.hexdigest()
+    start = segment['start'] + segment['done']
+    if start > segment['end']:
+        return
+    headers = {"Range": f"bytes={start}-{segment['end']}"}
+    try:
+        with session.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code != 206:
+                raise IOError(f"Range request returned HTTP {response.status_code}")
+            offset = last_saved = start
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+                with lock:
+                    digest.update(chunk)
+                    segment['done'] = offset - segment['start']
+                    segment['sha256'] = digest.hexdigest()
+                if offset - last_saved >= STATE_SAVE_BYTES:
+                    _save_state(state_path, state, lock)
+                    last_saved = offset
+    finally:
+        # Persist progress even when the segment fails, so a rerun resumes here
+        _save_state(state_path, state, lock)
+
+
+def download_ranged(url, save_path, segments=4, session=None):
+    """Download `url` to `save_path` using parallel Range segments with resume support.
+
+    Returns the number of bytes written. Servers without Range support (or
+    small files) fall back to a single streaming request.
+    """
+    session = session or requests.Session()
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    part_path = f"{save_path}.part"
+    state_path = f"{save_path}.part.json"
+
+    size, supports_ranges = probe_download(session, url)
+
+    if not supports_ranges or size is None:
+        with session.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+        os.replace(part_path, save_path)
+        # Segment state from an earlier ranged attempt no longer describes anything
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return os.path.getsize(save_path)
+
+    # Small files still use the resumable path, as a single segment
+    state = _load_state(state_path, part_path, size, segments if size >= MIN_RANGED_BYTES else 1)
+    lock = threading.Lock()
+    resumed = sum(s['done'] for s in state['segments'])
+    if resumed:
+        logger.info(f"  🔁 Resuming {os.path.basename(save_path)} at {resumed:,}/{size:,} bytes")
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        with ThreadPoolExecutor(max_workers=len(state['segments'])) as pool:
+            futures = [
+                pool.submit(_download_segment, session, url, fd, segment, state_path, state, lock)
+                for segment in state['segments']
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+
+    if sum(s['done'] for s in state['segments']) != size:
+        raise IOError(f"Incomplete download: expected {size} bytes")
+
+    os.replace(part_path, save_path)
+    os.remove(state_path)
+    return size
+
+
+def sha256_file(path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def harvest_videos(reel_number, videos, base_dir=REELS_BASE_DIR, max_files=3, segments=4):
+    """Download `videos` ([{'pair_number', 'video_url', 'task_id'?}]) for a reel.
+
+    Files land in <base_dir>/<reel>/Videos/<pair>.mp4 and a checksum manifest is
+    written to <base_dir>/<reel>/Videos/manifest.json. Returns a summary dict.
+    """
+    videos_dir = os.path.join(base_dir, str(reel_number), "Videos")
+    manifest_path = os.path.join(videos_dir, "manifest.json")
+    os.makedirs(videos_dir, exist_ok=True)
+
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    def fetch(video):
+        pair = str(video['pair_number'])
+        save_path = os.path.join(videos_dir, f"{pair}.mp4")
+        entry = manifest.get(pair)
+        if entry and os.path.exists(save_path) and entry.get('url') == video['video_url']:
+            logger.info(f"  ⏭️ Pair {pair} already harvested")
+            return pair, entry
+        logger.info(f"  ⬇️ Downloading video for pair {pair}...")
+        size = download_ranged(video['video_url'], save_path, segments=segments)
+        return pair, {
+            'file': os.path.basename(save_path),
+            'size': size,
+            'sha256': sha256_file(save_path),
+            'url': video['video_url'],
+            'task_id': video.get('task_id')
+        }
+
+    downloaded, failed = [], []
+    with ThreadPoolExecutor(max_workers=max_files) as pool:
+        futures = {pool.submit(fetch, video): video for video in videos}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                pair, entry = future.result()
+                manifest[pair] = entry
+                downloaded.append(pair)
+                logger.info(f"  ✅ Pair {pair}: {entry['size']:,} bytes")
+            except Exception as e:
+                logger.error(f"  ❌ Pair {video['pair_number']} failed: {e}")
+                failed.append({'pair_number': video['pair_number'], 'error': str(e)})
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return {
+        "success": not failed,
+        "reel_number": str(reel_number),
+        "videos_dir": videos_dir,
+        "downloaded": sorted(downloaded, key=int),
+        "failed": failed
+    }
+
+
+def finished_videos(reel_number):
+    """Return the tracker's finished tasks with a video URL for a reel"""
+    return [
+        task for task in get_generation_tracker().tasks(reel_number)
+        if task['state'] in FINISHED_STATES and task['video_url'] and task['pair_number'] is not None
+    ]
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) != 2:
+        print("Usage: python3 dreamina_video_harvester.py <reel_number>")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    reel_number = sys.argv[1]
+
+    videos = finished_videos(reel_number)
+    if not videos:
+        print(f"ERROR: No finished videos tracked for reel {reel_number}")
+        sys.exit(1)
+
+    logger.info(f"🎬 Harvesting {len(videos)} videos for reel {reel_number}")
+    summary = harvest_videos(reel_number, videos)
+    if summary['success']:
+        print(f"SUCCESS: Downloaded {len(summary['downloaded'])} videos for reel {reel_number}")
+        sys.exit(0)
+    print(f"ERROR: {len(summary['failed'])} videos failed for reel {reel_number}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
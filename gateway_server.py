@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Pipeline Gateway Server
+Hosts the image, batch image, audio and Dreamina endpoints in one process
+
+All four route sets are mounted on one Flask app that shares one job store
+and one scheduler, so per-resource limits (WhatsApp session, Dreamina
+session, downloads, browsers on this machine) hold across every endpoint. The
+app is served on each legacy port (5001, 5002, 5003, 5678) so existing n8n
+workflows keep working unchanged; stop the standalone servers first.
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+# Warm the Dreamina browser pool as soon as its workers start
+os.environ.setdefault("DREAMINA_WARM_POOL", "1")
+
+import simple_http_server
+import audio_download_api_server
+import chatgpt_image_api_server
+import dreamina_upload_api_server
+from job_store import jobs_blueprint
+from metrics import metrics_blueprint
+from rate_governor import governors_blueprint
+from resource_governor import get_resource_governor
+from pipeline_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Ports the standalone servers used; the gateway answers on all of them
+LEGACY_PORTS = [5001, 5002, 5003, 5678]
+
+SERVICES = {
+    "image_generation": simple_http_server,
+    "audio_download": audio_download_api_server,
+    "batch_image_generation": chatgpt_image_api_server,
+    "dreamina_upload": dreamina_upload_api_server,
+}
+
+app = Flask(__name__)
+app.register_blueprint(simple_http_server.image_routes)
+app.register_blueprint(audio_download_api_server.audio_routes)
+app.register_blueprint(chatgpt_image_api_server.batch_image_routes)
+app.register_blueprint(dreamina_upload_api_server.dreamina_routes)
+app.register_blueprint(jobs_blueprint)
+app.register_blueprint(metrics_blueprint)
+app.register_blueprint(governors_blueprint)
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check for every mounted service"""
+    return jsonify({
+        "status": "healthy",
+        "message": "Pipeline Gateway is running",
+        "timestamp": datetime.now().isoformat(),
+        "services": {
+            name: {
+                "queue_size": module.request_queue.qsize(),
+                "is_processing": module.worker_state.is_processing
+            }
+            for name, module in SERVICES.items()
+        },
+        "scheduler": get_scheduler().status()
+    })
+
+
+@app.route('/scheduler', methods=['GET'])
+def scheduler_status():
+    """Running and waiting jobs per resource lane, plus the host's browser leases"""
+    return jsonify({
+        "success": True,
+        "lanes": get_scheduler().status(),
+        "host": get_resource_governor().status()
+    })
+
+
+def serve(ports=None, host='0.0.0.0'):
+    """Serve the gateway app on each port; blocks until interrupted"""
+    ports = ports or [int(p) for p in os.getenv("GATEWAY_PORTS", ",".join(map(str, LEGACY_PORTS))).split(",")]
+    servers = [make_server(host, port, app, threaded=True) for port in ports]
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        logger.info("⏹️ Gateway stopped by user")
+    finally:
+        for server in servers[1:]:
+            server.shutdown()
+        dreamina_upload_api_server.stop_queue_workers()
+
+
+if __name__ == '__main__':
+    logger.info("🚪 Starting Pipeline Gateway...")
+    logger.info(f"   Ports: {os.getenv('GATEWAY_PORTS', ','.join(map(str, LEGACY_PORTS)))}")
+    logger.info("   POST /generate-reel-images, /download-reel-audio, /batch-generate-images, /upload-reel-to-dreamina")
+    logger.info("   GET  /jobs/<job_id>, /health, /scheduler, /metrics, /governors")
+    for name, lane in get_scheduler().status().items():
+        logger.info(f"   🚦 {name}: {lane['limit']} at a time")
+    serve()
@@ -11,6 +11,12 @@ import shutil
 import logging
 from playwright.sync_api import sync_playwright
 from sheets import get_prompts_by_reel
+from reel_manifest import record_file
+from job_events import publish
+from tracing import traced
+from stage_ledger import get_stage_ledger, text_fingerprint
+from resource_governor import browser_lease
+from rate_governor import get_governor
 
 # Configure logging with more detailed output
 logging.basicConfig(
@@ -23,6 +29,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ChatGPT replies that mean a prompt was refused; each one slows the WhatsApp governor
+REFUSAL_INDICATORS = (
+    "Sorry, I can't generate that image",
+    "I'm unable to create this image",
+    "Error generating image",
+    "Unable to process",
+    "Sorry, I can't do that"
+)
+
+def image_save_path(reel_number, image_number):
+    """Where image `image_number` of a reel is saved"""
+    return f"/Users/devanshc/Desktop/ProteinPapaPanda/{reel_number}/images/{image_number}.png"
+
+@traced("script.generate_reel_images")
 def main():
     """Main function"""
     if len(sys.argv) != 2:
@@ -55,6 +75,21 @@ def main():
         print(f"ERROR: Failed to fetch prompts - {str(e)}")
         sys.exit(1)
     
+    # Skip images a previous run already saved intact (the ledger is keyed on the sheet line)
+    ledger = get_stage_ledger()
+    remaining = [
+        prompt_data for prompt_data in prompts
+        if not ledger.done(reel_number, prompt_data['line_no'], "image",
+                           artifact_path=image_save_path(reel_number, prompt_data['image_number']),
+                           fingerprint=text_fingerprint(prompt_data['prompt']))
+    ]
+    if len(remaining) < len(prompts):
+        logger.info(f"⏭️ {len(prompts) - len(remaining)} images already generated, {len(remaining)} to go")
+    if not remaining:
+        print(f"SUCCESS: All {len(prompts)} images already generated for reel {reel_number}")
+        sys.exit(0)
+    prompts = remaining
+    
     try:
         whatsapp_url = "https://web.whatsapp.com/"
         chat_name = "ChatGPT"
@@ -63,7 +98,7 @@ def main():
         
         logger.info("🌐 Initializing WhatsApp session...")
         
-        with sync_playwright() as p:
+        with browser_lease("whatsapp"), sync_playwright() as p:
             context = p.chromium.launch_persistent_context(
                 user_data_dir, 
                 headless=False, 
@@ -91,15 +126,16 @@ def main():
             input_box_selector = 'div[contenteditable="true"][data-tab="10"]'
             page.wait_for_selector(input_box_selector, timeout=10000)
             
+            governor = get_governor("whatsapp")
             for i, prompt_data in enumerate(prompts, 1):
                 prompt = prompt_data['prompt']
+                governor.wait()
                 logger.info(f"📤 Sending prompt {i}/{len(prompts)}: {prompt[:40]}...")
                 
                 page.fill(input_box_selector, prompt)
                 page.keyboard.press("Enter")
-                
-                # Small delay between prompts
-                time.sleep(2)
+                ledger.start(reel_number, prompt_data['line_no'], "image")
+                publish("prompt_sent", reel_no=str(reel_number), index=i, total=len(prompts))
             
             logger.info("✅ All prompts sent successfully!")
             
@@ -147,8 +183,16 @@ def main():
                         logger.warning(f"    ⚠️  Image element found but no src attribute")
                 else:
                     logger.info(f"    ❌ No image found in message {i+1}")
+                    message_text = (bubble.inner_text() or "").lower()
+                    if any(indicator.lower() in message_text for indicator in REFUSAL_INDICATORS):
+                        logger.warning(f"    🚫 ChatGPT refused a prompt in message {i+1}")
+                        governor.backoff("ChatGPT refused a prompt")
             
+            # Clean replies speed the next reel's prompts up
+            for _ in image_messages[:len(prompts)]:
+                governor.success()
             logger.info(f"📊 Found {len(image_messages)} images in new messages")
+            publish("images_received", reel_no=str(reel_number), found=len(image_messages), expected=len(prompts))
             
             if len(image_messages) < len(prompts):
                 logger.warning(f"⚠️  Expected {len(prompts)} images but found {len(image_messages)}")
@@ -181,9 +225,9 @@ def main():
                     download_path = download.path()
                     logger.info(f"    📁 Downloaded to: {download_path}")
                     
-                    # Define save path with image number
-                    image_number = i + 1
-                    save_path = f"/Users/devanshc/Desktop/ProteinPapaPanda/{reel_number}/images/{image_number}.png"
+                    # Define save path with the prompt's image number
+                    image_number = prompts[i]['image_number']
+                    save_path = image_save_path(reel_number, image_number)
                     
                     # Create directory if it doesn't exist
                     os.makedirs(os.path.dirname(save_path), exist_ok=True)
@@ -191,6 +235,12 @@ def main():
                     # Move downloaded file to target location
                     shutil.move(download_path, save_path)
                     downloaded_files.append(save_path)
+                    line_no = prompts[i]['line_no']
+                    record_file(os.path.dirname(save_path), image_number, save_path, line_no=line_no)
+                    ledger.succeed(reel_number, line_no, "image", artifact_path=save_path,
+                                   fingerprint=text_fingerprint(prompts[i]['prompt']))
+                    publish("image_saved", reel_no=str(reel_number), line_no=line_no, image_number=image_number,
+                            path=save_path, bytes=os.path.getsize(save_path))
                     
                     logger.info(f"    ✅ Saved image {image_number}: {save_path}")
                     
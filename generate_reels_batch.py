@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Generate images for several reels in one WhatsApp/ChatGPT session
+
+Prompts for every reel come from one sheet snapshot and are sent through one
+browser session in chunks (WHATSAPP_PROMPT_CHUNK_SIZE prompts, then a
+WHATSAPP_CHUNK_PAUSE_SECONDS pause), followed by a single wait window.
+Each image is saved to images/<reel>/<line>.png.
+
+Usage: python3 generate_reels_batch.py <reel_number> [<reel_number> ...]
+"""
+
+import sys
+import logging
+
+from sheets import get_prompts_by_reels
+from chatgpt_image_api_server import run_batch_in_whatsapp, rows_for_reels
+from tracing import traced
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@traced("script.generate_reels_batch")
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 generate_reels_batch.py <reel_number> [<reel_number> ...]")
+        print("Example: python3 generate_reels_batch.py 12 13 14")
+        sys.exit(1)
+
+    reel_numbers = sys.argv[1:]
+    prompts_by_reel = get_prompts_by_reels(reel_numbers)
+    for reel_number, prompts in prompts_by_reel.items():
+        if not prompts:
+            logger.warning(f"⚠️ No prompts found for reel {reel_number}, skipping it")
+    rows = rows_for_reels(prompts_by_reel)
+    if not rows:
+        print(f"ERROR: No prompts found for reels {', '.join(reel_numbers)}")
+        sys.exit(1)
+
+    logger.info(f"🎨 {len(rows)} prompts across {len(reel_numbers)} reels in one session")
+    summary = run_batch_in_whatsapp(rows)
+    for reel_number, counts in summary.get("reels", {}).items():
+        logger.info(f"📊 Reel {reel_number}: {counts['downloaded']}/{counts['sent']} images saved")
+
+    if summary.get("success"):
+        print(f"SUCCESS: {summary.get('message')}")
+        sys.exit(0)
+    print(f"ERROR: {summary.get('message')}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
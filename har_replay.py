@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+HAR record-and-replay for the WhatsApp and Dreamina browser flows
+
+With HAR_MODE=record, a browser session records all of its HTTP traffic
+into `<HAR_DIR>/<flow>/session.har`, with response bodies embedded. It also
+saves a DOM snapshot at each step of the flow (form loaded, pair submitted,
+replies received...). With HAR_MODE=replay, the same flow is answered from
+that HAR through Playwright routing, so it runs offline without uploads,
+credits or generation waits. Repeated requests to one URL get the recorded
+responses in the order they were recorded, so polling loops (task status,
+new chat messages) see the same sequence they saw live. Requests missing from
+the HAR are aborted (HAR_NOT_FOUND=fallback sends them to the network
+instead). Requests are matched without their volatile query parameters
+(signatures, tokens, timestamps), which change on every run. Each step's time
+from launch is saved next to its snapshot, so a replay can be compared with
+the recording, or with an earlier replay after a code change:
+
+    HAR_MODE=record python3 start_dreamina_server.py     # one real upload
+    HAR_MODE=replay python3 start_dreamina_server.py     # same flow, offline
+    python3 har_replay.py dreamina                       # recorded vs replayed step times
+
+Every browser slot has its own session (`dreamina`, `dreamina-2`, ...), and
+each browser launch within a session records its own HAR (`session.har`,
+`session-2.har`, ...) while the step snapshots of all launches are kept.
+
+Service workers are blocked in both modes so every request goes through the
+routes. Real WhatsApp Web delivers chat messages over a WebSocket, which HAR
+does not capture. Its recordings give DOM snapshots and step times, but no
+replayable chat. A recording against sim_whatsapp.py, which polls over
+plain HTTP, replays in full.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+HAR_MODE = os.getenv("HAR_MODE", "")
+HAR_DIR = os.getenv("HAR_DIR", "har_sessions")
+HAR_NOT_FOUND = os.getenv("HAR_NOT_FOUND", "abort")
+
+MODES = ("record", "replay")
+
+# Recorded bodies are stored decoded, so these no longer describe them
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+# Query parameters that change on every run (request signing, tokens, cache busters);
+# HAR_VOLATILE_PARAMS adds more, comma separated
+VOLATILE_QUERY_PARAMS = {name.strip().lower() for name in (
+    "msToken,X-Bogus,a_bogus,_signature,signature,sign,token,access_token,verifyFp,fp,"
+    "nonce,ts,timestamp,_t,_,expires,Policy,Key-Pair-Id," + os.getenv("HAR_VOLATILE_PARAMS", "")
+).split(",") if name.strip()}
+
+# Signed URL parameter families (S3, CDN edge signatures)
+VOLATILE_QUERY_PREFIXES = ("x-amz-", "x-expires", "x-signature")
+
+
+def _volatile(name):
+    name = name.lower()
+    return name in VOLATILE_QUERY_PARAMS or name.startswith(VOLATILE_QUERY_PREFIXES)
+
+
+def replay_key(method, url):
+    """(method, url) with the fragment and volatile query parameters removed and the rest sorted"""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _volatile(name))
+    return method, urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+class HarReplayRouter:
+    """Route handler answering each (method, url) with its recorded responses in recorded order"""
+
+    def __init__(self, har_path, not_found="abort"):
+        with open(har_path, encoding="utf-8") as f:
+            entries = json.load(f)["log"]["entries"]
+        self.not_found = not_found
+        self.lock = threading.Lock()
+        self.responses = {}
+        self.served = {}
+        self.missed = []
+        for entry in entries:
+            key = replay_key(entry["request"]["method"], entry["request"]["url"])
+            self.responses.setdefault(key, []).append(entry["response"])
+
+    def next_response(self, method, url):
+        """The recorded response for this request; the last one repeats once they run out"""
+        key = replay_key(method, url)
+        with self.lock:
+            responses = self.responses.get(key)
+            if not responses:
+                self.missed.append(f"{method} {url}")
+                return None
+            index = self.served.get(key, 0)
+            self.served[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
+
+    def __call__(self, route, request):
+        response = self.next_response(request.method, request.url)
+        if response is None:
+            logger.warning(f"📼 Not in the recording: {request.method} {request.url}")
+            if self.not_found == "fallback":
+                route.fallback()
+            else:
+                route.abort()
+            return
+        content = response.get("content", {})
+        body = content.get("text", "")
+        body = base64.b64decode(body) if content.get("encoding") == "base64" else body.encode("utf-8")
+        headers = {h["name"]: h["value"] for h in response.get("headers", [])
+                   if h["name"].lower() not in DROPPED_HEADERS}
+        route.fulfill(status=response["status"], headers=headers, body=body)
+
+
+class HarSession:
+    """Records or replays one flow's traffic and step snapshots"""
+
+    def __init__(self, flow, mode, base_dir=HAR_DIR, not_found=HAR_NOT_FOUND):
+        if mode not in MODES:
+            raise ValueError(f"HAR mode must be one of {MODES}, got {mode!r}")
+        self.flow = flow
+        self.mode = mode
+        self.not_found = not_found
+        self.flow_dir = os.path.abspath(os.path.join(base_dir, flow))
+        self.har_path = os.path.join(self.flow_dir, "session.har")
+        self.lock = threading.Lock()
+        self.steps = []
+        self.launches = 0
+        self.started_at = None
+        self.router = None
+
+    @property
+    def steps_dir(self):
+        return os.path.join(self.flow_dir, "recorded" if self.mode == "record" else "replayed")
+
+    def launch_har_path(self, launch):
+        """HAR file of the session's `launch`-th browser launch"""
+        return self.har_path if launch == 1 else os.path.join(self.flow_dir, f"session-{launch}.har")
+
+    def context_options(self):
+        """Extra launch options: keep service workers from bypassing the routes"""
+        return {"service_workers": "block"}
+
+    def attach(self, context):
+        """Start recording into, or replaying from, this launch's HAR on a new browser context.
+
+        Steps from earlier launches in this process are kept; the first launch
+        clears those of a previous run.
+        """
+        if self.mode == "replay" and not os.path.exists(self.har_path):
+            raise FileNotFoundError(f"No recording for {self.flow} at {self.har_path}; record one with HAR_MODE=record")
+        os.makedirs(self.steps_dir, exist_ok=True)
+        with self.lock:
+            self.launches += 1
+            launch = self.launches
+            if launch == 1:
+                for name in os.listdir(self.steps_dir):
+                    os.remove(os.path.join(self.steps_dir, name))
+                self.steps = []
+            self.started_at = time.time()
+        har_path = self.launch_har_path(launch)
+
+        if self.mode == "record":
+            # Written when the context closes
+            context.route_from_har(har_path, update=True, update_content="embed", update_mode="full")
+            logger.info(f"🎙️ Recording {self.flow} traffic to {har_path}")
+        else:
+            if not os.path.exists(har_path):
+                # More launches than the recording had: replay the first one again
+                har_path = self.har_path
+            self.router = HarReplayRouter(har_path, not_found=self.not_found)
+            context.route("**/*", self.router)
+            logger.info(f"📼 Replaying {self.flow} traffic from {har_path}")
+
+    def snapshot(self, page, label):
+        """Save the page's DOM for this step and the step's time since attach()"""
+        if self.started_at is None:
+            return None
+        try:
+            html = page.content()
+            url = page.url
+        except Exception as e:
+            logger.warning(f"⚠️ Could not snapshot {label}: {e}")
+            return None
+        with self.lock:
+            number = len(self.steps) + 1
+            path = os.path.join(self.steps_dir, f"{number:03d}-{label}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            self.steps.append({"step": number, "label": label, "url": url, "launch": self.launches,
+                               "seconds": round(time.time() - self.started_at, 3)})
+            steps_path = os.path.join(self.steps_dir, "steps.json")
+            with open(f"{steps_path}.tmp", "w") as f:
+                json.dump(self.steps, f, indent=2)
+            os.replace(f"{steps_path}.tmp", steps_path)
+        return path
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_har_session(flow, slot=0):
+    """Return the process-wide HAR session for a flow's browser slot, or None when HAR_MODE is unset"""
+    if not HAR_MODE:
+        return None
+    name = flow if slot == 0 else f"{flow}-{slot + 1}"
+    with _sessions_lock:
+        if name not in _sessions:
+            _sessions[name] = HarSession(name, HAR_MODE)
+        return _sessions[name]
+
+
+def load_steps(flow, which, base_dir=HAR_DIR):
+    path = os.path.join(base_dir, flow, which, "steps.json")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_steps(recorded, replayed):
+    """Pair up steps by order and label: [(label, recorded_seconds, replayed_seconds)]"""
+    rows = []
+    for index in range(max(len(recorded), len(replayed))):
+        before = recorded[index] if index < len(recorded) else None
+        after = replayed[index] if index < len(replayed) else None
+        label = (before or after)["label"]
+        if before and after and before["label"] != after["label"]:
+            label = f"{before['label']} / {after['label']}"
+        rows.append((label, before and before["seconds"], after and after["seconds"]))
+    return rows
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 har_replay.py <whatsapp|dreamina|dreamina-N>")
+        return
+    flow = sys.argv[1]
+    rows = compare_steps(load_steps(flow, "recorded"), load_steps(flow, "replayed"))
+    if not rows:
+        print(f"No steps recorded for {flow} under {os.path.abspath(HAR_DIR)}")
+        return
+    print(f"{'step':<40} {'recorded':>10} {'replayed':>10}")
+    for label, recorded, replayed in rows:
+        recorded = f"{recorded:.1f}s" if recorded is not None else "-"
+        replayed = f"{replayed:.1f}s" if replayed is not None else "-"
+        print(f"{label:<40} {recorded:>10} {replayed:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Prompt packing: one ChatGPT generation for a grid of consecutive lines
+
+Asking for a 2x2 or 3x3 grid of panels (one per prompt, in one shared style)
+costs one generation instead of four or nine. The downloaded grid is split
+back into per-line images with NumPy slicing. Cut lines are found per axis
+near each expected panel boundary:
+- a gutter is a run of near-uniform columns (or rows), and each tile stops at
+  its edge;
+- a seamless grid is cut at the strongest edge;
+- if neither is found, the image is divided evenly.
+Uniform margins around the whole grid are trimmed as well.
+
+WhatsApp's media viewer downloads JPEG, which is read with Pillow (a
+requirement of this mode). PNG is decoded and encoded with zlib and NumPy
+alone, so tests and synthetic grids run without it.
+"""
+
+import zlib
+import struct
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # PNG works without Pillow; WhatsApp's JPEG downloads need it
+    Image = None
+
+# Grid sizes the packing mode accepts (panels per row)
+GRID_SIZES = (2, 3)
+
+# A column/row whose pixel standard deviation is below this is gutter
+GUTTER_STD = 6.0
+
+# How far from the even split (as a share of one panel) a cut may move
+SEARCH_SHARE = 0.2
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def can_split_downloads():
+    """Whether grids downloaded from WhatsApp (JPEG) can be read here"""
+    return Image is not None
+
+
+def grid_layout(count, grid_size):
+    """(rows, cols) for `count` panels packed `grid_size` per row"""
+    cols = min(count, grid_size)
+    return -(-count // cols), cols
+
+
+def grid_prompt(prompts, grid_size):
+    """One prompt asking for a grid with a panel per prompt, left to right, top to bottom"""
+    rows, cols = grid_layout(len(prompts), grid_size)
+    lines = [
+        f"Create one image laid out as a {rows}x{cols} grid of {rows * cols} equal panels "
+        f"separated by thin plain white gutters. Use one consistent art style, colour palette, "
+        f"lighting and character design across every panel. No text, numbers or frames inside the panels."
+    ]
+    for index, prompt in enumerate(prompts):
+        lines.append(f"Panel {index + 1} (row {index // cols + 1}, column {index % cols + 1}): {prompt}")
+    if len(prompts) < rows * cols:
+        lines.append("Leave the remaining panel(s) plain white.")
+    return "\n".join(lines)
+
+
+# ============ PNG without an imaging library ============
+
+def _unfilter(raw, height, stride, bpp):
+    """Undo PNG scanline filters; returns a (height, stride) uint8 array"""
+    out = np.zeros((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.uint8)
+    offset = 0
+    for y in range(height):
+        kind = raw[offset]
+        line = np.frombuffer(raw, dtype=np.uint8, count=stride, offset=offset + 1)
+        offset += stride + 1
+        if kind == 0:
+            row = line.copy()
+        elif kind == 2:
+            row = line + previous
+        elif kind == 1:
+            # Sub: a running sum per channel, which cumsum handles modulo 256
+            row = np.cumsum(line.reshape(-1, bpp).astype(np.uint32), axis=0).astype(np.uint8).reshape(-1)
+        else:
+            row = bytearray(line.tobytes())
+            up = previous.tobytes()
+            for x in range(stride):
+                left = row[x - bpp] if x >= bpp else 0
+                above = up[x]
+                if kind == 3:
+                    row[x] = (row[x] + ((left + above) >> 1)) & 0xFF
+                else:
+                    upper_left = up[x - bpp] if x >= bpp else 0
+                    estimate = left + above - upper_left
+                    pa, pb, pc = abs(estimate - left), abs(estimate - above), abs(estimate - upper_left)
+                    predictor = left if pa <= pb and pa <= pc else above if pb <= pc else upper_left
+                    row[x] = (row[x] + predictor) & 0xFF
+            row = np.frombuffer(bytes(row), dtype=np.uint8)
+        out[y] = row
+        previous = out[y]
+    return out
+
+
+def decode_png(data):
+    """8-bit, non-interlaced PNG bytes -> (height, width, channels) uint8 array (RGB or RGBA)"""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    position = len(PNG_SIGNATURE)
+    header, palette, idat = None, None, []
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        position += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"PLTE":
+            palette = np.frombuffer(body, dtype=np.uint8).reshape(-1, 3)
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        raise ValueError(f"Unsupported PNG (bit depth {bit_depth}, colour type {color_type}, interlace {interlace})")
+    channels = PNG_CHANNELS[color_type]
+    pixels = _unfilter(zlib.decompress(b"".join(idat)), height, width * channels, channels)
+    pixels = pixels.reshape(height, width, channels)
+    if color_type == 3:
+        return palette[pixels[:, :, 0]]
+    if channels <= 2:
+        gray = np.repeat(pixels[:, :, :1], 3, axis=2)
+        return gray if channels == 1 else np.concatenate([gray, pixels[:, :, 1:]], axis=2)
+    return pixels
+
+
+def encode_png(array):
+    """(height, width, 3|4) uint8 array -> PNG bytes"""
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    height, width, channels = array.shape
+    rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), array.reshape(height, width * channels)], axis=1)
+
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6 if channels == 4 else 2, 0, 0, 0)
+    return (PNG_SIGNATURE + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def read_image(path):
+    """Any image file -> (height, width, 3|4) uint8 array"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(PNG_SIGNATURE) and Image is None:
+        return decode_png(data)
+    if Image is None:
+        raise ValueError(f"{path} is not a PNG; install Pillow to split other image formats")
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGBA" if "A" in image.getbands() else "RGB"))
+
+
+def write_png(path, array):
+    with open(path, "wb") as f:
+        f.write(encode_png(array))
+
+
+# ============ Cut detection ============
+
+def _runs(mask):
+    """[(start, end)] of consecutive True values, end exclusive"""
+    padded = np.concatenate([[False], mask, [False]])
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(changes[::2], changes[1::2]))
+
+
+def axis_spans(array, axis, parts):
+    """Split one axis (0 = rows, 1 = columns) into `parts` (start, end) spans that avoid gutters"""
+    other = 1 - axis
+    values = array[:, :, :3].astype(np.float32)
+    # Spread of each column (axis=1) or row (axis=0) across the other axis and the channels
+    spread = values.std(axis=(other, 2))
+    means = values.mean(axis=other)
+    # Change between neighbouring columns/rows; a seam between panels shows up as a peak
+    edges = np.abs(np.diff(means, axis=0)).sum(axis=1)
+    length = spread.shape[0]
+    gutter = spread < GUTTER_STD
+
+    # Trim uniform margins around the whole grid
+    start, end = 0, length
+    while start < end and gutter[start]:
+        start += 1
+    while end > start and gutter[end - 1]:
+        end -= 1
+    if end - start < parts:
+        start, end = 0, length
+
+    panel = (end - start) / parts
+    window = max(int(panel * SEARCH_SHARE), 1)
+    bounds = [(start, start)]
+    for k in range(1, parts):
+        expected = int(round(start + k * panel))
+        low, high = max(expected - window, start + 1), min(expected + window, end - 1)
+        runs = [(a + low, b + low) for a, b in _runs(gutter[low:high + 1])]
+        if runs:
+            a, b = min(runs, key=lambda run: abs((run[0] + run[1]) / 2 - expected))
+            bounds.append((a, b))
+        elif high > low:
+            # edges[i] sits between index i and i + 1
+            cut = low + int(np.argmax(edges[low - 1:high]))
+            bounds.append((cut, cut))
+        else:
+            bounds.append((expected, expected))
+    bounds.append((end, end))
+    return [(bounds[i][1], bounds[i + 1][0]) for i in range(parts)]
+
+
+def split_grid(array, rows, cols):
+    """Cut a grid image into rows * cols tiles, row by row"""
+    row_spans = axis_spans(array, 0, rows)
+    col_spans = axis_spans(array, 1, cols)
+    return [array[top:bottom, left:right] for top, bottom in row_spans for left, right in col_spans]
+
+
+def split_grid_file(grid_path, out_paths, grid_size):
+    """Split a downloaded grid into one PNG per line; `out_paths` are the lines in panel order"""
+    rows, cols = grid_layout(len(out_paths), grid_size)
+    tiles = split_grid(read_image(grid_path), rows, cols)
+    for tile, path in zip(tiles, out_paths):
+        write_png(path, tile)
+    return out_paths
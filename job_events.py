@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Progress events for pipeline jobs
+
+Code deep inside a job (sending a prompt, saving an image, finishing an audio
+download, submitting a Dreamina pair) calls `publish("image_saved", ...)`
+without knowing which job it belongs to:
+
+- On a server worker thread, the job bound with `bind_job()` receives the
+  event and `GET /jobs/<id>/events` streams it.
+- In a script that a server runs as a subprocess (`PIPELINE_EVENTS=stdout`),
+  the event is printed as an `EVENT: {json}` line; `run_with_events()` in the
+  server reads those lines and adds them to the job.
+- Anywhere else (plain CLI runs) events are dropped.
+
+`bind_job()` also opens the job's root tracing span (trace id = job id), and
+`run_with_events()` hands the trace to the script so its spans nest under it.
+"""
+
+import os
+import json
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from tracing import span, current_span, trace_parent_env
+
+EVENT_PREFIX = "EVENT: "
+
+_current = threading.local()
+
+
+@contextmanager
+def bind_job(job):
+    """Send events published on this thread to `job` for the duration of the block"""
+    previous = getattr(_current, "job", None)
+    _current.job = job
+    try:
+        with span(f"job {job.kind}", trace_id=job.id, job_id=job.id, params=job.params) as root:
+            try:
+                yield job
+            finally:
+                root.set(status=job.status)
+    finally:
+        _current.job = previous
+
+
+def publish(event_type, **data):
+    """Record a progress event for the current job, if there is one"""
+    # Also mark it on the open tracing span so waterfalls show where it happened
+    current_span().add_event(event_type, **data)
+    job = getattr(_current, "job", None)
+    if job is None and os.getenv("PIPELINE_EVENTS") != "stdout":
+        return
+    event = {"type": event_type, "time": time.time(), **data}
+    if job is not None:
+        job.add_event(event)
+    else:
+        print(EVENT_PREFIX + json.dumps(event, default=str), flush=True)
+
+
+def run_with_events(args, job, timeout=None):
+    """Run a script like `subprocess.run(capture_output=True, text=True)`, relaying its events to `job`.
+
+    `EVENT:` lines are removed from the returned stdout. Raises
+    subprocess.TimeoutExpired when the script runs longer than `timeout`.
+    """
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+        env=dict(os.environ, PIPELINE_EVENTS="stdout", **trace_parent_env())
+    )
+
+    # Drain stderr on its own thread so a chatty script can't block on a full pipe
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+
+    stdout_lines = []
+    try:
+        for line in process.stdout:
+            if line.startswith(EVENT_PREFIX):
+                try:
+                    job.add_event(json.loads(line[len(EVENT_PREFIX):]))
+                    continue
+                except ValueError:
+                    pass
+            stdout_lines.append(line)
+        process.wait()
+        stderr_reader.join()
+    finally:
+        if timer:
+            timer.cancel()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(args, timeout)
+    return subprocess.CompletedProcess(args, process.returncode, "".join(stdout_lines), "".join(stderr_chunks))
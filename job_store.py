@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+In-memory job store shared by the API servers
+
+Every long-running endpoint registers a job here and returns its id straight
+away (HTTP 202). Clients poll `GET /jobs/<id>` for status and progress, or pass
+a `callback_url` that receives the finished job as a JSON POST. Jobs are also
+the queue items: a worker blocks on its queue for the next job, and anything
+waiting on a job is woken by its completion event the moment it finishes.
+Progress events published while a job runs (see `job_events.py`) are kept on
+the job and streamed live by `GET /jobs/<id>/events` as Server-Sent Events.
+"""
+
+import os
+import json
+import bisect
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+
+import requests
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 500
+
+# Events kept per job for late subscribers
+MAX_JOB_EVENTS = 2000
+
+# Seconds between SSE keep-alive comments while a job is quiet
+SSE_KEEPALIVE_SECONDS = 15
+
+# Longest a "wait": true request holds its connection before it gets the 202 job body instead
+MAX_WAIT_SECONDS = int(os.getenv("JOB_WAIT_SECONDS", "900"))
+
+CALLBACK_ATTEMPTS = 3
+CALLBACK_TIMEOUT = 10
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+QUEUE_WAIT_SECONDS = histogram("pipeline_queue_wait_seconds", "Time a job waits in its queue before a worker starts it", ["kind"])
+JOB_SECONDS = histogram("pipeline_job_seconds", "Run time of finished jobs", ["kind", "status"])
+JOBS_TOTAL = counter("pipeline_jobs_total", "Finished jobs", ["kind", "status"])
+QUEUE_DEPTH = gauge("pipeline_queue_depth", "Jobs waiting in a server's queue", ["service"])
+JOBS_RUNNING = gauge("pipeline_jobs_running", "Jobs a server's workers are running", ["service"])
+
+
+class Job:
+    """One queued request and everything a client can poll about it"""
+
+    def __init__(self, kind, params, callback_url=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.callback_url = callback_url
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.status_code = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.callback_status = None
+        self.done = threading.Event()
+        self.events = []
+        self.next_event_id = 0
+        self.events_changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False if `timeout` seconds pass first"""
+        return self.done.wait(timeout)
+
+    def add_event(self, event):
+        """Append a progress event and wake any streams following the job.
+
+        Past MAX_JOB_EVENTS the oldest middle event is dropped, so the first
+        events and the newest (including `job_finished`) are always kept.
+        Event ids keep counting, so gaps show where events were dropped.
+        """
+        with self.events_changed:
+            event = dict(event, id=self.next_event_id)
+            self.next_event_id += 1
+            self.events.append(event)
+            if len(self.events) > MAX_JOB_EVENTS:
+                del self.events[MAX_JOB_EVENTS // 2]
+            self.events_changed.notify_all()
+        return event
+
+    def events_since(self, event_id, timeout=None):
+        """Return (kept events with id >= `event_id`, finished), waiting up to `timeout` for something new"""
+        with self.events_changed:
+            if self.next_event_id <= event_id and not self.finished:
+                self.events_changed.wait(timeout)
+            start = bisect.bisect_left(self.events, event_id, key=lambda event: event['id'])
+            return self.events[start:], self.finished
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": round((self.started_at or time.time()) - self.created_at, 1),
+            "run_seconds": round((self.finished_at or time.time()) - self.started_at, 1) if self.started_at else None,
+            "callback_url": self.callback_url,
+            "callback_status": self.callback_status,
+            "event_count": len(self.events)
+        }
+
+
+class JobStore:
+    """Thread-safe registry of jobs with completion callbacks"""
+
+    def __init__(self, max_finished=MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def create(self, kind, params, callback_url=None):
+        job = Job(kind, params, callback_url)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        logger.info(f"🆕 Job {job.id} ({kind}) queued")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self, kind=None):
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if kind is None or job.kind == kind]
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def queue_position(self, job):
+        """1-based position among queued jobs of the same kind, or 0 once started"""
+        if job.status != "queued":
+            return 0
+        with self.lock:
+            return 1 + sum(
+                1 for other in self.jobs.values()
+                if other.kind == job.kind and other.status == "queued" and other.created_at < job.created_at
+            )
+
+    def start(self, job, **progress):
+        with self.lock:
+            job.status = "running"
+            job.started_at = time.time()
+            job.progress.update(progress)
+        QUEUE_WAIT_SECONDS.labels(kind=job.kind).observe(job.started_at - job.created_at)
+        job.add_event({"type": "job_started", "time": job.started_at, **progress})
+
+    def update(self, job, **progress):
+        with self.lock:
+            job.progress.update(progress)
+
+    def finish(self, job, result, status_code=200, error=None):
+        """Store the job's response payload and fire its callback"""
+        with self.lock:
+            job.result = result
+            job.status_code = status_code
+            job.error = error or (result.get("error") if isinstance(result, dict) and status_code >= 400 else None)
+            job.status = "succeeded" if status_code < 400 else "failed"
+            job.finished_at = time.time()
+        job.add_event({"type": "job_finished", "time": job.finished_at, "status": job.status})
+        JOBS_TOTAL.labels(kind=job.kind, status=job.status).inc()
+        if job.started_at:
+            JOB_SECONDS.labels(kind=job.kind, status=job.status).observe(job.finished_at - job.started_at)
+        job.done.set()
+        logger.info(f"🏁 Job {job.id} ({job.kind}) {job.status} in {job.finished_at - job.created_at:.1f}s")
+        if job.callback_url:
+            threading.Thread(target=self._send_callback, args=(job,), daemon=True).start()
+
+    def _send_callback(self, job):
+        """POST the finished job to its callback URL, retrying with backoff"""
+        for attempt in range(1, CALLBACK_ATTEMPTS + 1):
+            try:
+                response = requests.post(job.callback_url, json=job.to_dict(), timeout=CALLBACK_TIMEOUT)
+                job.callback_status = response.status_code
+                if response.status_code < 500:
+                    return
+            except Exception as e:
+                job.callback_status = f"error: {e}"
+                logger.warning(f"⚠️ Callback for job {job.id} failed (attempt {attempt}): {e}")
+            if attempt < CALLBACK_ATTEMPTS:
+                time.sleep(2 ** attempt)
+
+    def _prune(self):
+        finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job.id]
+
+
+class WorkerState:
+    """Count of jobs a server's workers are running, safe to read from request threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+
+    @contextmanager
+    def running(self):
+        """Mark one job as running for the duration of the block"""
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    @property
+    def active(self):
+        with self._lock:
+            return self._active
+
+    @property
+    def is_processing(self):
+        return self.active > 0
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Return the process-wide job store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+
+def accepted_response(job):
+    """The 202 body returned when a job is queued"""
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "queue_position": get_job_store().queue_position(job)
+    }), 202
+
+
+def wait_response(job, timeout=None):
+    """The finished job's result, or the 202 body once `timeout` (MAX_WAIT_SECONDS) passes first"""
+    if job.wait(MAX_WAIT_SECONDS if timeout is None else timeout):
+        return jsonify(job.result), job.status_code
+    logger.info(f"⏳ Job {job.id} still {job.status} after the wait limit, returning its job id")
+    return accepted_response(job)
+
+
+jobs_blueprint = Blueprint("jobs", __name__)
+
+
+@jobs_blueprint.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a job's status, progress and (once finished) its result"""
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job: {job_id}"}), 404
+    return jsonify(dict(job.to_dict(), success=True, queue_position=store.queue_position(job)))
+
+
+@jobs_blueprint.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Stream a job's progress events as Server-Sent Events until it finishes"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job: {job_id}"}), 404
+
+    # Resume after the last event a reconnecting client saw
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', '-1'))
+    start = max(int(last_id) + 1, 0) if last_id.lstrip('-').isdigit() else 0
+
+    def stream():
+        next_id = start
+        while True:
+            events, finished = job.events_since(next_id, timeout=SSE_KEEPALIVE_SECONDS)
+            for event in events:
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if events:
+                next_id = events[-1]['id'] + 1
+            if finished and not events:
+                yield f"event: end\ndata: {json.dumps({'job_id': job.id, 'status': job.status})}\n\n"
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+@jobs_blueprint.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List known jobs, optionally filtered by ?kind= and ?status="""
+    status = request.args.get('status')
+    jobs = get_job_store().list(request.args.get('kind'))
+    return jsonify({
+        "success": True,
+        "jobs": [job.to_dict() for job in jobs if status is None or job.status == status]
+    })
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Load-test the pipeline HTTP endpoints with stubbed workers
+
+Serves the gateway app (all four route sets, one job store, one scheduler)
+on a local port. The workers are replaced by stubs that take a random
+service time instead of running a browser or script:
+- the image and audio scripts (`run_with_events`)
+- `run_batch_in_whatsapp`
+- the Dreamina browser session
+Requests are then sent to /generate-reel-images, /download-reel-audio,
+/upload-reel-to-dreamina and /batch-generate-images as Poisson arrivals at
+the given rates. The queues, scheduler lanes, job store and request threads
+are real, so changes to server concurrency can be checked under load.
+
+Reported per endpoint:
+- status codes and the 429 (rejection) rate
+- HTTP accept time
+- queue wait and service time (from the job store)
+- end-to-end latency at p50/p95/p99
+Reported for the process: thread count and RSS memory at the start, at the
+peak and at the end.
+
+Usage: python3 load_test_servers.py [duration_seconds] [endpoint=rate,...]
+    python3 load_test_servers.py 30                      # every endpoint at LOAD_RATE (1/s)
+    python3 load_test_servers.py 60 audio=4,batch=0.5    # only these, in requests per second
+
+Endpoints: images, audio, dreamina, batch.
+
+Settings (environment):
+    LOAD_RATE               default requests per second per endpoint (1)
+    LOAD_SERVICE_SECONDS    mean stub service time (0.2, exponentially distributed)
+    LOAD_WAIT=1             hold each request open until its job finishes ("wait": true)
+    LOAD_DRAIN_SECONDS      how long to wait for queued jobs after the last arrival (120)
+    LOAD_SEED               seed for arrivals and service times (0)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import resource
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    import psutil
+except ImportError:  # only the peak RSS is reported without psutil
+    psutil = None
+
+# Keep the gateway from launching real browsers for the Dreamina pool
+os.environ["DREAMINA_WARM_POOL"] = "0"
+
+import gateway_server
+import simple_http_server
+import audio_download_api_server
+import chatgpt_image_api_server
+import dreamina_upload_api_server
+from job_store import get_job_store
+from run_simulation import LocalServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = float(os.getenv("LOAD_RATE", "1"))
+SERVICE_SECONDS = float(os.getenv("LOAD_SERVICE_SECONDS", "0.2"))
+WAIT_MODE = os.getenv("LOAD_WAIT") == "1"
+DRAIN_SECONDS = float(os.getenv("LOAD_DRAIN_SECONDS", "120"))
+SEED = int(os.getenv("LOAD_SEED", "0"))
+
+# Client threads are named so they can be left out of the server's thread count
+CLIENT_THREAD_PREFIX = "loadgen"
+MAX_CLIENTS = 512
+SAMPLE_SECONDS = 0.25
+
+
+def _batch_payload(n):
+    return {"rows": [{"prompt": f"load test prompt {n}", "line_no": "001", "reel_no": f"load{n}"}], "wait_minutes": 1}
+
+
+ENDPOINTS = {
+    "images": {"path": "/generate-reel-images", "kind": "generate-reel-images",
+               "payload": lambda n: {"reel_number": f"load{n}"}},
+    "audio": {"path": "/download-reel-audio", "kind": "download-reel-audio",
+              "payload": lambda n: {"reel_number": f"load{n}"}},
+    "dreamina": {"path": "/upload-reel-to-dreamina", "kind": "upload-reel-to-dreamina",
+                 "payload": lambda n: {"reel_number": f"load{n}"}},
+    "batch": {"path": "/batch-generate-images", "kind": "batch-generate-images", "payload": _batch_payload},
+}
+
+
+# ============ Stub workers ============
+
+class ServiceTime:
+    """Seeded, exponentially distributed stub work"""
+
+    def __init__(self, mean_seconds, seed=0):
+        self.mean_seconds = mean_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sleep(self):
+        with self.lock:
+            seconds = self.random.expovariate(1.0 / self.mean_seconds) if self.mean_seconds > 0 else 0
+        time.sleep(seconds)
+        return seconds
+
+
+class StubDreaminaSession:
+    """Stands in for DreaminaUploadAPI in the warm browser pool"""
+
+    def __init__(self, service_time):
+        self.service_time = service_time
+        self.on_progress = None
+
+    def start_session(self):
+        return None
+
+    def is_healthy(self):
+        return True
+
+    def recycle_page(self):
+        return True
+
+    def close(self):
+        pass
+
+    def upload_reel_pairs(self, reel_number, tab_count=1, track_seconds=0):
+        self.service_time.sleep()
+        return {"success": True, "reel_number": reel_number, "results": []}
+
+
+def install_stubs(service_time):
+    """Swap every worker for a stub; returns a function that puts the real ones back"""
+    def run_script(args, job, timeout=None):
+        service_time.sleep()
+        return subprocess.CompletedProcess(args, 0, stdout="SUCCESS: stub worker\n", stderr="")
+
+    def run_batch(rows, wait_minutes=10, on_image_saved=None, chunk_size=None, chunk_pause_seconds=None,
+                  grid_size=0, reference_image=""):
+        service_time.sleep()
+        return {"success": True, "sent": len(rows), "downloaded": len(rows), "results": []}
+
+    originals = [
+        (simple_http_server, "run_with_events", simple_http_server.run_with_events),
+        (audio_download_api_server, "run_with_events", audio_download_api_server.run_with_events),
+        (chatgpt_image_api_server, "run_batch_in_whatsapp", chatgpt_image_api_server.run_batch_in_whatsapp),
+    ]
+    simple_http_server.run_with_events = run_script
+    audio_download_api_server.run_with_events = run_script
+    chatgpt_image_api_server.run_batch_in_whatsapp = run_batch
+    slots = dreamina_upload_api_server.browser_pool.slots
+    factories = [slot.factory for slot in slots]
+    for slot in slots:
+        slot.factory = lambda: StubDreaminaSession(service_time)
+
+    def restore():
+        for module, name, original in originals:
+            setattr(module, name, original)
+        for slot, factory in zip(slots, factories):
+            slot.factory = factory
+            slot.session = None
+
+    return restore
+
+
+# ============ Measurements ============
+
+def percentiles(values):
+    """p50/p95/p99 and max of a list of seconds"""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def percentile(p):
+        return round(values[min(len(values) - 1, int(p * len(values)))], 4)
+
+    return {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99),
+            "max": round(values[-1], 4), "count": len(values)}
+
+
+def rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    # ru_maxrss is the peak, in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def server_threads():
+    return sum(1 for thread in threading.enumerate() if not thread.name.startswith(CLIENT_THREAD_PREFIX))
+
+
+class ProcessSampler:
+    """Samples the server's thread count and the process RSS while the test runs"""
+
+    def __init__(self, interval=SAMPLE_SECONDS):
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"{CLIENT_THREAD_PREFIX}-sampler", daemon=True)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.samples.append((time.time(), server_threads(), rss_mb()))
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.samples.append((time.time(), server_threads(), rss_mb()))
+        return False
+
+    def summary(self):
+        threads = [s[1] for s in self.samples]
+        memory = [s[2] for s in self.samples]
+        return {
+            "threads": {"start": threads[0], "peak": max(threads), "end": threads[-1], "growth": threads[-1] - threads[0]},
+            "rss_mb": {"start": round(memory[0], 1), "peak": round(max(memory), 1), "end": round(memory[-1], 1),
+                       "growth": round(memory[-1] - memory[0], 1), "source": "psutil" if psutil else "ru_maxrss"},
+        }
+
+
+# ============ Load generation ============
+
+def arrival_schedule(rates, duration, seed=SEED):
+    """Poisson arrivals per endpoint: sorted [(offset_seconds, endpoint)]"""
+    rng = random.Random(seed)
+    schedule = []
+    for name, rate in rates.items():
+        offset = rng.expovariate(rate) if rate > 0 else duration
+        while offset < duration:
+            schedule.append((offset, name))
+            offset += rng.expovariate(rate)
+    return sorted(schedule)
+
+
+def send_request(base_url, name, number, deadline, wait_mode=WAIT_MODE):
+    """POST one request; in 202 mode also wait for its job. Returns the client-side record"""
+    endpoint = ENDPOINTS[name]
+    payload = dict(endpoint["payload"](number), wait=True) if wait_mode else endpoint["payload"](number)
+    record = {"endpoint": name, "sent_at": time.time(), "status": None, "job_id": None}
+    try:
+        response = requests.post(base_url + endpoint["path"], json=payload, timeout=max(deadline - time.time(), 1))
+        record["status"] = response.status_code
+        record["accept_seconds"] = time.time() - record["sent_at"]
+        if wait_mode:
+            record["latency_seconds"] = record["accept_seconds"]
+        elif response.status_code == 202:
+            record["job_id"] = response.json()["job_id"]
+            job = get_job_store().get(record["job_id"])
+            if job is not None and job.wait(max(deadline - time.time(), 0)):
+                record["latency_seconds"] = job.finished_at - record["sent_at"]
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def endpoint_report(name, records, jobs):
+    statuses = {}
+    for record in records:
+        key = str(record["status"]) if record["status"] is not None else "error"
+        statuses[key] = statuses.get(key, 0) + 1
+    finished = [job for job in jobs if job.finished_at]
+    return {
+        "requests": len(records),
+        "statuses": statuses,
+        "rejection_rate": round(statuses.get("429", 0) / len(records), 4) if records else 0,
+        "completed": sum(1 for record in records if "latency_seconds" in record),
+        "accept_seconds": percentiles([r["accept_seconds"] for r in records if "accept_seconds" in r]),
+        "queue_wait_seconds": percentiles([job.started_at - job.created_at for job in jobs if job.started_at]),
+        "service_seconds": percentiles([job.finished_at - job.started_at for job in finished if job.started_at]),
+        "latency_seconds": percentiles([r["latency_seconds"] for r in records if "latency_seconds" in r]),
+    }
+
+
+def run_load_test(rates, duration, service_seconds=SERVICE_SECONDS, wait_mode=WAIT_MODE,
+                  drain_seconds=DRAIN_SECONDS, seed=SEED):
+    """Drive the gateway with Poisson arrivals at `rates` (requests/second per endpoint) and report"""
+    unknown = set(rates) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoint(s) {sorted(unknown)}; choose from {sorted(ENDPOINTS)}")
+
+    schedule = arrival_schedule(rates, duration, seed)
+    restore = install_stubs(ServiceTime(service_seconds, seed))
+    started_at = time.time()
+    records = []
+    try:
+        with LocalServer(gateway_server.app) as server, ProcessSampler() as sampler, \
+                ThreadPoolExecutor(max_workers=MAX_CLIENTS, thread_name_prefix=CLIENT_THREAD_PREFIX) as clients:
+            deadline = started_at + duration + drain_seconds
+            futures = []
+            for number, (offset, name) in enumerate(schedule, 1):
+                delay = started_at + offset - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(clients.submit(send_request, server.url, name, number, deadline, wait_mode))
+            records = [future.result() for future in futures]
+        elapsed = time.time() - started_at
+    finally:
+        restore()
+
+    jobs = [job for job in get_job_store().list() if job.created_at >= started_at]
+    endpoints = {
+        name: endpoint_report(name, [r for r in records if r["endpoint"] == name],
+                              [job for job in jobs if job.kind == ENDPOINTS[name]["kind"]])
+        for name in rates
+    }
+    rejected = sum(report["statuses"].get("429", 0) for report in endpoints.values())
+    return {
+        "duration_seconds": duration,
+        "elapsed_seconds": round(elapsed, 1),
+        "rates": rates,
+        "service_seconds": service_seconds,
+        "wait_mode": wait_mode,
+        "requests": len(records),
+        "rejection_rate": round(rejected / len(records), 4) if records else 0,
+        "endpoints": endpoints,
+        "process": sampler.summary(),
+    }
+
+
+def parse_rates(text):
+    """'audio=4,batch=0.5' -> {'audio': 4.0, 'batch': 0.5}"""
+    rates = {}
+    for part in text.split(","):
+        name, _, rate = part.partition("=")
+        rates[name.strip()] = float(rate) if rate else DEFAULT_RATE
+    return rates
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    rates = parse_rates(sys.argv[2]) if len(sys.argv) > 2 else {name: DEFAULT_RATE for name in ENDPOINTS}
+
+    print(f"🔥 Load testing {', '.join(f'{n}={r}/s' for n, r in rates.items())} for {duration:.0f}s "
+          f"(stub service time {SERVICE_SECONDS}s{', wait mode' if WAIT_MODE else ''})...")
+    report = run_load_test(rates, duration)
+    print(json.dumps(report, indent=2))
+
+    print(f"\n📈 {report['requests']} requests in {report['elapsed_seconds']}s, "
+          f"{report['rejection_rate'] * 100:.1f}% rejected (429)")
+    for name, endpoint in report["endpoints"].items():
+        latency = endpoint["latency_seconds"] or {}
+        queue_wait = endpoint["queue_wait_seconds"] or {}
+        print(f"   {name:<9} {endpoint['completed']}/{endpoint['requests']} done   "
+              f"latency p50 {latency.get('p50', '-')}s p95 {latency.get('p95', '-')}s p99 {latency.get('p99', '-')}s   "
+              f"queue wait p95 {queue_wait.get('p95', '-')}s")
+    process = report["process"]
+    print(f"   threads {process['threads']['start']} -> peak {process['threads']['peak']} -> {process['threads']['end']}   "
+          f"RSS {process['rss_mb']['start']} -> {process['rss_mb']['end']} MB")
+
+
+if __name__ == "__main__":
+    main()
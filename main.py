@@ -1,24 +1,189 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline for one reel: images, audio and Dreamina submissions
+
+Each line gets three tasks in a stage DAG (see pipeline_dag.py):
+
+    image:<line>  ─┐
+                   ├─> dreamina:<line>
+    audio:<line>  ─┘
+
+All images come from one WhatsApp batch, and each line's image task is marked
+done the moment its file is saved. Audio downloads run alongside on their own
+pool, so they finish during the WhatsApp wait. Each line is submitted to
+Dreamina as soon as both its files exist, so line 1 is submitting while later
+images are still rendering.
+
+Every stage checks the stage ledger (stage_ledger.py) first, so re-running a
+reel after a crash or an edit only does the work that hasn't finished or whose
+inputs changed (see reel_rebuild.py for the plan).
+
+Usage: python3 main.py <reel_number>   (no argument prints the sheet rows)
+"""
+
+import os
+import sys
+import json
+import logging
+
 from sheets import get_sheet_data
-# import os
-# from dotenv import load_dotenv
-# import gspread
-# from oauth2client.service_account import ServiceAccountCredentials
+from pipeline_dag import PipelineDAG
+from stage_ledger import get_stage_ledger, files_fingerprint
+from rate_governor import get_governor
+from tracing import span
 
-# from chatgpt_image_gen import generate_image
-# from audio_downloader import download_audio
-# from dreamina_uploader import upload_to_dreamina
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Concurrent tasks per stage: one WhatsApp batch, parallel Drive downloads,
+# one Dreamina browser session
+STAGE_LIMITS = {
+    "images": 1,
+    "audio": int(os.getenv("PIPELINE_AUDIO_SLOTS", "4")),
+    "dreamina": 1,
+}
+
+# Give up on a reel after this long
+PIPELINE_TIMEOUT_SECONDS = int(os.getenv("PIPELINE_TIMEOUT_SECONDS", str(2 * 60 * 60)))
+
+
+class DreaminaStage:
+    """Lazily started Dreamina session shared by every dreamina task (always on the stage's one thread)"""
+
+    def __init__(self):
+        self.api = None
+        self.error = None
+
+    def upload(self, reel_no, line_no, image_path, audio_path):
+        from dreamina_upload_api_server import DreaminaUploadAPI
+
+        entry = get_stage_ledger().done(reel_no, line_no, "dreamina",
+                                        fingerprint=files_fingerprint(image_path, audio_path))
+        if entry:
+            logger.info(f"⏭️ Line {line_no} already accepted by Dreamina")
+            return entry["detail"]
+        if self.api is None and self.error is None:
+            self.api = DreaminaUploadAPI()
+            self.error = self.api.start_session()
+        if self.error:
+            raise RuntimeError(self.error)
+        self.api.reel_number = str(reel_no)
+        success, status_message = self.api.upload_file_pair(image_path, audio_path, int(line_no))
+        if not success:
+            raise RuntimeError(status_message)
+        return status_message
+
+    def close(self):
+        if self.api:
+            self.api.close()
+
+
+def line_image_path(row):
+    """Where a line's image is saved (the layout run_batch_in_whatsapp uses)"""
+    return os.path.join("images", str(row["reel_no"]), f"{row['line_no']}.png")
+
+
+def line_audio_path(row):
+    """Where a line's audio is saved"""
+    from download_reel_audio import determine_audio_extension
+
+    return os.path.join("audio", str(row["reel_no"]), f"{row['line_no']}{determine_audio_extension(row['audio_link'])}")
+
+
+def download_line_audio(reel_no, line_no, url, path):
+    """Download one line's audio unless the ledger already has it intact from the same source version"""
+    from download_reel_audio import download_audio_file, audio_source_fingerprint
+
+    ledger = get_stage_ledger()
+    fingerprint = audio_source_fingerprint(url)
+    # An unknown source version may have changed, so it is downloaded again
+    if fingerprint and ledger.done(reel_no, line_no, "audio", artifact_path=path, fingerprint=fingerprint):
+        logger.info(f"⏭️ Line {line_no} audio already downloaded")
+        return path
+    governor = get_governor("drive")
+    governor.wait()
+    ledger.start(reel_no, line_no, "audio")
+    if not download_audio_file(url, path, int(line_no)):
+        governor.backoff("download failed")
+        ledger.fail(reel_no, line_no, "audio", "Download failed")
+        raise RuntimeError(f"Audio download failed for line {line_no}")
+    governor.success()
+    ledger.succeed(reel_no, line_no, "audio", artifact_path=path, fingerprint=fingerprint)
+    return path
+
+
+def build_reel_dag(rows, dreamina):
+    """Per-line image, audio and Dreamina tasks for the given sheet rows"""
+    from chatgpt_image_api_server import run_batch_in_whatsapp
+
+    dag = PipelineDAG(STAGE_LIMITS)
+    image_tasks = []
 
-def main():
-    rows = get_sheet_data()
     for row in rows:
-        print(row)
-    # for row in rows:
-    #     line_no = row["line_no"]
-    #     prompt = row["prompt"]
-    #     audio_url = row["audio_link"]
-    #     generate_image(prompt, line_no)
-    #     download_audio(audio_url, line_no)
-    #     upload_to_dreamina(f"images/{line_no}.png", f"audio/{line_no}.mp3")
+        line_no = row["line_no"]
+        reel_no = row["reel_no"]
+        audio_path = line_audio_path(row)
+
+        def download(reel_no=reel_no, line_no=line_no, url=row["audio_link"], path=audio_path):
+            return download_line_audio(reel_no, line_no, url, path)
+
+        image_tasks.append(dag.add(f"image:{line_no}", "images").name)
+        dag.add(f"audio:{line_no}", "audio", download)
+
+        def upload(reel_no=reel_no, line_no=line_no, audio_path=audio_path):
+            image_path = dag.tasks[f"image:{line_no}"].result
+            return dreamina.upload(reel_no, line_no, image_path, audio_path)
+
+        dag.add(f"dreamina:{line_no}", "dreamina", upload, deps=[f"image:{line_no}", f"audio:{line_no}"])
+
+    def generate_images():
+        summary = run_batch_in_whatsapp(
+            rows,
+            on_image_saved=lambda reel_no, line_no, path: dag.complete(f"image:{line_no}", path)
+        )
+        return {key: summary.get(key) for key in ("success", "sent", "downloaded", "message")}
+
+    dag.add("images:batch", "images", generate_images, produces=image_tasks)
+    return dag
+
+
+def reel_rows(reel_number):
+    return [row for row in get_sheet_data() if row["reel_no"] == str(reel_number)]
+
+
+def run_reel(reel_number, rows=None):
+    rows = rows if rows is not None else reel_rows(reel_number)
+    if not rows:
+        logger.error(f"No rows found for reel {reel_number}")
+        return {"success": False, "error": f"No rows found for reel {reel_number}"}
+
+    logger.info(f"🎬 Running reel {reel_number}: {len(rows)} lines, stage limits {STAGE_LIMITS}")
+    dreamina = DreaminaStage()
+    dag = build_reel_dag(rows, dreamina)
+    try:
+        with span("pipeline.reel", reel=str(reel_number), lines=len(rows)):
+            summary = dag.run(timeout=PIPELINE_TIMEOUT_SECONDS)
+    finally:
+        # The Dreamina browser belongs to the dreamina stage's thread
+        dag.run_on_stage("dreamina", dreamina.close)
+        dag.shutdown()
+
+    for stage, counts in summary["stages"].items():
+        logger.info(f"📊 {stage}: {counts['succeeded']} succeeded, {counts['failed']} failed, {counts['skipped']} skipped")
+    return summary
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 main.py <reel_number>")
+        for row in get_sheet_data():
+            print(row)
+        return
+
+    summary = run_reel(sys.argv[1])
+    print(json.dumps(summary, indent=2))
+    sys.exit(0 if summary.get("success") else 1)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
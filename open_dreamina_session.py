@@ -2,13 +2,18 @@
 """
 Dreamina Browser Session Launcher
 Opens a persistent browser session for Dreamina login and automation
+
+Usage: python3 open_dreamina_session.py [slot]
+Each warm pool slot (DREAMINA_POOL_SIZE) has its own profile; pass the slot
+number to log that profile in (slot 1 is vpn_browser_session).
 """
 
 import os
+import sys
 import time
 from playwright.sync_api import sync_playwright
 
-def open_dreamina_session():
+def open_dreamina_session(profile="vpn_browser_session"):
     """Open persistent browser session for Dreamina"""
     print("🎬 Opening Dreamina Browser Session...")
     print("=" * 60)
@@ -17,7 +22,7 @@ def open_dreamina_session():
     print("=" * 60)
     
     # Use the same user data directory as VPN setup
-    user_data_dir = os.path.abspath("vpn_browser_session")
+    user_data_dir = os.path.abspath(profile)
     downloads_dir = os.path.abspath(".dreamina_downloads")
     
     # Create directories
@@ -65,7 +70,7 @@ def open_dreamina_session():
                     time.sleep(1)
             except KeyboardInterrupt:
                 print("\n✅ Dreamina session setup complete!")
-                print("🔒 Browser session saved to: vpn_browser_session/")
+                print(f"🔒 Browser session saved to: {profile}/")
                 print("📝 Login and settings will persist for automation")
                 print("🎬 Ready to create Dreamina upload automation agent")
                 
@@ -92,6 +97,11 @@ def test_dreamina_upload_flow():
     print("=" * 50)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        slot = int(sys.argv[1])
+        open_dreamina_session("vpn_browser_session" if slot <= 1 else f"vpn_browser_session_{slot}")
+        sys.exit(0)
+    
     print("🎬 Dreamina Session Options")
     print("=" * 40)
     print("1. Open Dreamina browser session")
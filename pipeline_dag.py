@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Stage DAG executor for the end-to-end pipeline
+
+Work is added as named tasks with dependencies, each in a stage (images,
+audio, dreamina). A task starts as soon as everything it depends on has
+succeeded, and each stage runs on its own bounded thread pool, so stages
+overlap instead of running one after another:
+
+    dag = PipelineDAG({"audio": 4, "dreamina": 1})
+    dag.add("audio:001", "audio", lambda: download(...))
+    dag.add("image:001", "images")                    # completed from outside
+    dag.add("dreamina:001", "dreamina", upload, deps=["image:001", "audio:001"])
+    summary = dag.run()
+
+Tasks without a function are completed from outside with `complete()` /
+`fail()`. This is how one WhatsApp batch task reports each line's image as
+soon as it is saved. A task that lists them in `produces` fails whichever
+ones it didn't complete. When a dependency fails, everything downstream is
+skipped.
+
+A stage with a limit of 1 always runs on the same thread, which Playwright's
+sync API needs for sessions shared between tasks (see `run_on_stage`).
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, SKIPPED)
+
+
+class StageTask:
+    """One unit of work in the DAG"""
+
+    def __init__(self, name, stage, func=None, deps=(), produces=()):
+        self.name = name
+        self.stage = stage
+        self.func = func
+        self.deps = list(deps)
+        self.produces = list(produces)
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "status": self.status,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "seconds": round(self.finished_at - self.started_at, 1) if self.started_at and self.finished_at else None
+        }
+
+
+class PipelineDAG:
+    """Runs stage tasks as their dependencies finish, with bounded concurrency per stage"""
+
+    def __init__(self, limits=None):
+        self.limits = dict(limits or {})
+        self.tasks = {}
+        self.executors = {}
+        self.changed = threading.Condition()
+        self.context = None
+
+    def add(self, name, stage, func=None, deps=(), produces=()):
+        """Add a task; `func=None` makes it an external task finished via complete()/fail()"""
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task {name}")
+        task = self.tasks[name] = StageTask(name, stage, func, deps, produces)
+        return task
+
+    def _executor(self, stage):
+        executor = self.executors.get(stage)
+        if executor is None:
+            executor = self.executors[stage] = ThreadPoolExecutor(
+                max_workers=self.limits.get(stage, 1),
+                thread_name_prefix=f"stage-{stage}"
+            )
+        return executor
+
+    # ---- state changes (callers hold self.changed) ----
+
+    def _finish(self, task, status, result=None, error=None):
+        if task.finished:
+            return
+        task.status = status
+        task.result = result
+        task.error = error
+        task.finished_at = time.time()
+        if task.started_at is None:
+            task.started_at = task.finished_at
+        if status == SUCCEEDED:
+            logger.info(f"✅ {task.name} done")
+        elif status == FAILED:
+            logger.error(f"❌ {task.name} failed: {error}")
+        else:
+            logger.info(f"⏭️ {task.name} skipped: {error}")
+        for produced in task.produces:
+            self._finish(self.tasks[produced], FAILED, error=f"Not produced by {task.name}")
+        self.changed.notify_all()
+
+    def _schedule_ready(self):
+        """Queue every pending task whose dependencies succeeded; skip those whose dependencies didn't"""
+        progress = True
+        while progress:
+            progress = False
+            for task in self.tasks.values():
+                if task.status != PENDING:
+                    continue
+                deps = [self.tasks[name] for name in task.deps]
+                blocked = [dep for dep in deps if dep.status in (FAILED, SKIPPED)]
+                if blocked:
+                    self._finish(task, SKIPPED, error=f"{blocked[0].name} {blocked[0].status}")
+                    progress = True
+                elif task.func and all(dep.status == SUCCEEDED for dep in deps):
+                    task.status = QUEUED
+                    self._executor(task.stage).submit(self.context.copy().run, self._run_task, task)
+
+    def _run_task(self, task):
+        with self.changed:
+            task.status = RUNNING
+            task.started_at = time.time()
+        logger.info(f"▶️ {task.name} started")
+        try:
+            with span(f"dag.{task.stage}", task=task.name):
+                result = task.func()
+        except Exception as e:
+            with self.changed:
+                self._finish(task, FAILED, error=str(e))
+                self._schedule_ready()
+            return
+        with self.changed:
+            self._finish(task, SUCCEEDED, result=result)
+            self._schedule_ready()
+
+    # ---- external tasks ----
+
+    def complete(self, name, result=None):
+        """Mark an external task done (e.g. an image saved by the WhatsApp batch)"""
+        with self.changed:
+            task = self.tasks[name]
+            if task.started_at is None:
+                task.started_at = time.time()
+            self._finish(task, SUCCEEDED, result=result)
+            self._schedule_ready()
+
+    def fail(self, name, error):
+        with self.changed:
+            self._finish(self.tasks[name], FAILED, error=error)
+            self._schedule_ready()
+
+    # ---- running ----
+
+    def run(self, timeout=None):
+        """Run until every task has finished or `timeout` passes; returns a summary"""
+        for task in self.tasks.values():
+            for name in task.deps + task.produces:
+                if name not in self.tasks:
+                    raise ValueError(f"{task.name} refers to unknown task {name}")
+
+        self.context = contextvars.copy_context()
+        deadline = time.time() + timeout if timeout else None
+        with self.changed:
+            self._schedule_ready()
+            while not all(task.finished for task in self.tasks.values()):
+                remaining = deadline - time.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    for task in self.tasks.values():
+                        if task.status == PENDING:
+                            self._finish(task, SKIPPED, error="Pipeline timed out")
+                    break
+                self.changed.wait(timeout=min(remaining, 5) if remaining else 5)
+        return self.summary()
+
+    def run_on_stage(self, stage, func):
+        """Run `func` on the stage's thread pool and return its result (e.g. closing a stage's browser)"""
+        return self._executor(stage).submit(func).result()
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        self.executors = {}
+
+    def summary(self):
+        with self.changed:
+            tasks = {name: task.to_dict() for name, task in self.tasks.items()}
+        stages = {}
+        for task in tasks.values():
+            counts = stages.setdefault(task["stage"], {state: 0 for state in FINISHED_STATES + (PENDING, QUEUED, RUNNING)})
+            counts[task["status"]] += 1
+        return {
+            "success": all(task["status"] == SUCCEEDED for task in tasks.values()),
+            "stages": stages,
+            "tasks": tasks
+        }
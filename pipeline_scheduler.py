@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Shared scheduler for the pipeline servers
+
+Every worker holds a slot on the resource lanes its job needs (the WhatsApp
+session, the Dreamina session, network downloads, and a host-wide browser lane)
+for as long as the job runs. When the servers are mounted together in
+`gateway_server.py` they share one scheduler, so two browser-heavy jobs from
+different endpoints wait for each other instead of running at once. Run as
+separate processes, each server gets its own scheduler with the same limits.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Concurrent jobs allowed per resource
+DEFAULT_LIMITS = {
+    # One WhatsApp Web profile is shared by both image generation endpoints
+    "whatsapp": 1,
+    # One job per warm Dreamina browser session
+    "dreamina": int(os.getenv("DREAMINA_POOL_SIZE", "1")),
+    # Google Drive / video downloads over the network
+    "downloads": int(os.getenv("SCHEDULER_DOWNLOAD_SLOTS", "2")),
+    # Browser-heavy jobs running at once on this machine
+    "browser": int(os.getenv("SCHEDULER_BROWSER_SLOTS", "1")),
+}
+
+# Lanes each kind of job needs
+JOB_RESOURCES = {
+    "generate-reel-images": ("whatsapp", "browser"),
+    "batch-generate-images": ("whatsapp", "browser"),
+    "download-reel-audio": ("downloads",),
+    "upload-reel-to-dreamina": ("dreamina", "browser"),
+}
+
+
+class Lane:
+    """A counted resource with a concurrency limit"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        with self.lock:
+            self.waiting += 1
+        start_time = time.time()
+        self.semaphore.acquire()
+        waited = time.time() - start_time
+        with self.lock:
+            self.waiting -= 1
+            self.running += 1
+            self.wait_seconds += waited
+        if waited > 1:
+            logger.info(f"🚦 Waited {waited:.1f}s for the {self.name} lane")
+
+    def release(self):
+        with self.lock:
+            self.running -= 1
+            self.completed += 1
+        self.semaphore.release()
+
+    def status(self):
+        with self.lock:
+            return {
+                "limit": self.limit,
+                "running": self.running,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "average_wait_seconds": round(self.wait_seconds / self.completed, 1) if self.completed else 0
+            }
+
+
+class PipelineScheduler:
+    """Per-resource concurrency limits shared by every worker in the process"""
+
+    def __init__(self, limits=None):
+        self.lanes = {name: Lane(name, limit) for name, limit in (limits or DEFAULT_LIMITS).items()}
+
+    @contextmanager
+    def slot(self, *resources):
+        """Hold one slot on each named lane for the duration of the block.
+
+        Lanes are always taken in name order, so jobs needing overlapping
+        resources cannot deadlock each other.
+        """
+        acquired = []
+        try:
+            for name in sorted(set(resources)):
+                lane = self.lanes[name]
+                lane.acquire()
+                acquired.append(lane)
+            yield
+        finally:
+            for lane in reversed(acquired):
+                lane.release()
+
+    def job_slot(self, kind):
+        """Hold the lanes a job of `kind` needs (see JOB_RESOURCES)"""
+        return self.slot(*JOB_RESOURCES.get(kind, ()))
+
+    def status(self):
+        return {name: lane.status() for name, lane in self.lanes.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PipelineScheduler()
+        return _scheduler
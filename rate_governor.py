@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Adaptive pacing for the external services the pipeline drives
+
+Each service (ChatGPT on WhatsApp, Google Drive, Dreamina) gets an AIMD
+governor in place of a fixed sleep between requests:
+
+    governor = get_governor("whatsapp")
+    governor.wait()        # before each prompt / download / upload
+    governor.success()     # the service answered cleanly
+    governor.backoff(why)  # an error detector fired (refusal, error tip, failed download)
+
+Every clean reply adds `increase` requests/second to the rate, up to
+`max_rate`. Every backoff multiplies it by `decrease` and pushes the next
+request out by one new interval. Throughput climbs while things go well and
+halves as soon as the service pushes back. The governors are process-wide,
+so callers on different threads share one pace per service. Their state is
+exported as metrics and on `GET /governors`.
+"""
+
+import os
+import time
+import logging
+import threading
+
+from flask import Blueprint, jsonify
+
+from metrics import gauge, counter
+
+logger = logging.getLogger(__name__)
+
+GOVERNOR_INTERVAL = gauge("rate_governor_interval_seconds", "Current gap between requests per service", ["service"])
+GOVERNOR_BACKOFFS = counter("rate_governor_backoffs_total", "Times a service's rate was cut", ["service"])
+GOVERNOR_WAIT_SECONDS = counter("rate_governor_wait_seconds_total", "Time spent waiting for a service's pace", ["service"])
+
+# Starting gap, fastest and slowest gap (seconds) per service. The starting
+# gaps are the fixed sleeps the pipeline used before.
+DEFAULT_SETTINGS = {
+    "whatsapp": {"interval": float(os.getenv("WHATSAPP_PROMPT_INTERVAL", "10")), "min_interval": 3, "max_interval": 120},
+    "drive": {"interval": float(os.getenv("DRIVE_DOWNLOAD_INTERVAL", "1")), "min_interval": 0.1, "max_interval": 30},
+    "dreamina": {"interval": float(os.getenv("DREAMINA_UPLOAD_INTERVAL", "2")), "min_interval": 0.5, "max_interval": 60},
+}
+
+
+class RateGovernor:
+    """Additive-increase / multiplicative-decrease pacing for one service"""
+
+    def __init__(self, name, interval, min_interval, max_interval, increase=None, decrease=0.5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self.min_rate = 1.0 / max_interval
+        self.max_rate = 1.0 / min_interval
+        self.rate = min(max(1.0 / interval, self.min_rate), self.max_rate)
+        # By default ten clean replies take the starting rate up by its own size again
+        self.increase = increase if increase is not None else self.rate / 10
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+        self.successes = 0
+        self.backoffs = 0
+        self.waited_seconds = 0.0
+        self.last_backoff = None
+        GOVERNOR_INTERVAL.labels(service=name).set_function(lambda: self.interval)
+
+    @property
+    def interval(self):
+        return 1.0 / self.rate
+
+    def wait(self):
+        """Block until this caller may send its next request; returns the seconds waited"""
+        with self.lock:
+            now = self.clock()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+            delay = start - now
+            self.waited_seconds += delay
+        if delay > 0:
+            GOVERNOR_WAIT_SECONDS.labels(service=self.name).inc(delay)
+            self.sleep(delay)
+        return delay
+
+    def success(self):
+        """A request got a clean reply: speed up additively"""
+        with self.lock:
+            self.successes += 1
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def backoff(self, reason=None):
+        """The service pushed back: slow down multiplicatively and hold off for one new interval"""
+        with self.lock:
+            self.backoffs += 1
+            self.rate = max(self.rate * self.decrease, self.min_rate)
+            self.next_at = max(self.next_at, self.clock() + self.interval)
+            self.last_backoff = {"reason": reason, "at": time.time()}
+            interval = self.interval
+        GOVERNOR_BACKOFFS.labels(service=self.name).inc()
+        logger.warning(f"🐢 Slowing {self.name} to one request every {interval:.1f}s ({reason or 'error'})")
+
+    def status(self):
+        with self.lock:
+            return {
+                "interval_seconds": round(self.interval, 2),
+                "requests_per_minute": round(self.rate * 60, 2),
+                "min_interval_seconds": round(1.0 / self.max_rate, 2),
+                "max_interval_seconds": round(1.0 / self.min_rate, 2),
+                "successes": self.successes,
+                "backoffs": self.backoffs,
+                "waited_seconds": round(self.waited_seconds, 1),
+                "last_backoff": self.last_backoff,
+            }
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(name):
+    """Return the process-wide governor for a service (see DEFAULT_SETTINGS)"""
+    with _governors_lock:
+        if name not in _governors:
+            _governors[name] = RateGovernor(name, **DEFAULT_SETTINGS[name])
+        return _governors[name]
+
+
+def governors_status():
+    """Every service's current pace"""
+    return {name: get_governor(name).status() for name in DEFAULT_SETTINGS}
+
+
+governors_blueprint = Blueprint("governors", __name__)
+
+
+@governors_blueprint.route('/governors', methods=['GET'])
+def governors_endpoint():
+    """Current pace, successes and backoffs per external service"""
+    return jsonify({
+        "success": True,
+        "governors": governors_status()
+    })
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Per-reel asset manifests and image/audio pairing
+
+The image and audio stages record every file they save in a `manifest.json`
+inside the output directory (line number -> path, sha256, size). Pairing is
+then a dictionary join on line numbers instead of substring matching, so `1`
+never matches `10.png` and a missing file only drops its own pair.
+Every directory also gets one `os.scandir` pass that parses numeric file
+stems; manifest entries are laid over it, so unrecorded files still pair.
+
+File numbers are positions within the reel folder. When a file's sheet line
+differs (the standalone scripts number a reel's files 1..N), its entry also
+records `line_no`, and each pair carries it: the stage ledger is keyed on the
+sheet line, whichever entry point built the files.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a')
+
+_manifest_lock = threading.Lock()
+
+
+def parse_line_number(filename):
+    """Return the line number encoded in a file name (`7.png`, `007.mp3`, `image_7.png`), or None"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if stem.isdigit():
+        return int(stem)
+    match = re.search(r'(\d+)$', stem)
+    return int(match.group(1)) if match else None
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(directory):
+    """Return {line_number: entry} from a directory's manifest, or None if it has none"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning(f"⚠️ Ignoring unreadable manifest {path}: {e}")
+        return None
+    try:
+        manifest = {int(line): entry for line, entry in data.items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        # A hand-edited key like "1a" (or a non-object file) would otherwise break pairing for the whole reel
+        logger.warning(f"⚠️ Ignoring malformed manifest {path}: {e}")
+        return None
+    if not all(isinstance(entry, dict) and 'path' in entry for entry in manifest.values()):
+        logger.warning(f"⚠️ Ignoring malformed manifest {path}: entries without a path")
+        return None
+    return manifest
+
+
+def record_file(directory, line_number, path, line_no=None):
+    """Add or replace a file's entry in the directory manifest (path, hash, size, and sheet `line_no` if given)"""
+    entry = {
+        'path': os.path.abspath(path),
+        'sha256': file_sha256(path),
+        'size': os.path.getsize(path)
+    }
+    if line_no is not None:
+        entry['line_no'] = str(line_no)
+    try:
+        line_number = int(line_number)
+    except (TypeError, ValueError):
+        logger.warning(f"⚠️ Not recording {path} in the manifest: {line_number!r} is not a line number")
+        return entry
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with _manifest_lock:
+        manifest = load_manifest(directory) or {}
+        manifest[line_number] = entry
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({str(k): v for k, v in sorted(manifest.items())}, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    return entry
+
+
+def scan_numbered_files(directory, extensions):
+    """Map line number -> path with a single os.scandir pass over `directory`"""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(extensions) or not entry.is_file():
+                continue
+            line_number = parse_line_number(entry.name)
+            if line_number is None:
+                continue
+            # Keep the lexically first name when two files claim one line
+            if line_number not in files or entry.path < files[line_number]:
+                files[line_number] = entry.path
+    return files
+
+
+def numbered_files(directory, extensions):
+    """Map line number -> path from file names, with manifest entries laid over the scan.
+    Files saved before the manifest existed, or copied in by hand, are still found.
+    """
+    return _numbered_files(directory, extensions)[0]
+
+
+def _numbered_files(directory, extensions):
+    """(line number -> path, line number -> recorded sheet line_no) for a directory"""
+    files = scan_numbered_files(directory, extensions)
+    manifest = load_manifest(directory)
+    if manifest is None:
+        return files, {}
+
+    for line_number, entry in manifest.items():
+        path = entry['path']
+        if not os.path.isabs(path):
+            path = os.path.join(directory, path)
+        if os.path.exists(path):
+            files[line_number] = path
+        else:
+            logger.warning(f"⚠️ Manifest entry {line_number} points at missing file {path}")
+    lines = {line_number: entry['line_no'] for line_number, entry in manifest.items() if entry.get('line_no')}
+    return files, lines
+
+
+def pair_files(images_dir, audio_dir):
+    """Join images and audio on line number and return pairs in line order.
+
+    Each pair's `line_no` is the sheet line recorded for it, or its number.
+    """
+    images, image_lines = _numbered_files(images_dir, IMAGE_EXTENSIONS)
+    audios, audio_lines = _numbered_files(audio_dir, AUDIO_EXTENSIONS)
+    lines = {**audio_lines, **image_lines}
+
+    unmatched = sorted(set(images) ^ set(audios))
+    if unmatched:
+        logger.warning(f"⚠️ Lines without a matching image/audio file: {unmatched}")
+
+    return [
+        {'number': number, 'line_no': lines.get(number, str(number)), 'image': images[number], 'audio': audios[number]}
+        for number in sorted(images.keys() & audios.keys())
+    ]
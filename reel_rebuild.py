@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Make-style incremental rebuild of a reel
+
+Each line's outputs are fingerprinted from their inputs:
+
+- image:    the prompt text, plus the style reference image when one is set
+- audio:    the Drive file id plus the file's ETag
+- dreamina: the hashes of the line's image and audio files
+
+The plan compares those fingerprints (and the outputs on disk) with the stage
+ledger and marks what must be rebuilt. A changed image or audio also rebuilds
+that line's Dreamina submission. Running the plan reuses main.run_reel,
+whose stages skip every line that is still up to date, so editing one prompt
+regenerates one image and resubmits one pair.
+
+Planning makes no network calls: audio is judged by the fingerprint the
+ledger recorded when it was downloaded. `--refresh` checks every audio
+source's current version first (one Drive metadata or HEAD request per line).
+Audio whose version is unknown, when recorded or when refreshed, is stale
+and is downloaded again; its Dreamina pair is only resubmitted if the file's
+content actually changed.
+
+Usage: python3 reel_rebuild.py <reel_number> [--refresh]          (print the plan, then rebuild)
+       python3 reel_rebuild.py <reel_number> --plan [--refresh]   (print the plan only)
+"""
+
+import os
+import sys
+import logging
+
+from stage_ledger import get_stage_ledger, files_fingerprint, image_fingerprint, reference_sha256
+
+logger = logging.getLogger(__name__)
+
+# The style reference run_batch_in_whatsapp generates against by default
+REFERENCE_IMAGE_PATH = os.getenv("WHATSAPP_REFERENCE_IMAGE", "")
+
+STAGES = ("image", "audio", "dreamina")
+
+
+def plan_reel(rows, ledger=None, reference_image=REFERENCE_IMAGE_PATH, refresh_audio=False):
+    """Return [{'line_no', 'stage', 'rebuild', 'reason'}] for every line and stage.
+
+    With `refresh_audio`, each line's audio source is checked for a new version.
+    """
+    from main import line_image_path, line_audio_path
+    from download_reel_audio import audio_source_fingerprint
+
+    ledger = ledger or get_stage_ledger()
+    reference_hash = reference_sha256(reference_image)
+    plan = []
+    for row in rows:
+        reel_no, line_no = row["reel_no"], row["line_no"]
+        image_path, audio_path = line_image_path(row), line_audio_path(row)
+
+        image_entry, image_reason = ledger.check(reel_no, line_no, "image", image_path,
+                                                 image_fingerprint(row["prompt"], reference_hash))
+        audio_fingerprint = audio_source_fingerprint(row["audio_link"]) if refresh_audio else None
+        audio_entry, audio_reason = ledger.check(reel_no, line_no, "audio", audio_path, audio_fingerprint)
+        if audio_entry and (audio_entry["fingerprint"] is None or (refresh_audio and audio_fingerprint is None)):
+            audio_entry, audio_reason = None, "source version unknown"
+        if image_entry is None or audio_entry is None:
+            dreamina_entry = None
+            if image_entry is None:
+                dreamina_reason = "image changes"
+            else:
+                dreamina_reason = "if audio changes" if audio_reason == "source version unknown" else "audio changes"
+        else:
+            dreamina_entry, dreamina_reason = ledger.check(reel_no, line_no, "dreamina",
+                                                           fingerprint=files_fingerprint(image_path, audio_path))
+
+        for stage, entry, reason in (("image", image_entry, image_reason),
+                                     ("audio", audio_entry, audio_reason),
+                                     ("dreamina", dreamina_entry, dreamina_reason)):
+            plan.append({"line_no": line_no, "stage": stage, "rebuild": entry is None, "reason": reason})
+    return plan
+
+
+def format_plan(plan):
+    """One line per line number with each stage's action"""
+    lines = []
+    by_line = {}
+    for step in plan:
+        by_line.setdefault(step["line_no"], {})[step["stage"]] = step
+    for line_no, steps in by_line.items():
+        cells = []
+        for stage in STAGES:
+            step = steps[stage]
+            cells.append(f"{'🔨' if step['rebuild'] else '✔️'} {stage}: {step['reason']}")
+        lines.append(f"line {line_no:>4}  " + "  |  ".join(cells))
+    counts = {stage: sum(1 for step in plan if step["stage"] == stage and step["rebuild"]) for stage in STAGES}
+    lines.append("Plan: " + ", ".join(f"{count} {stage}" for stage, count in counts.items()) + " to rebuild")
+    return "\n".join(lines)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 reel_rebuild.py <reel_number> [--plan] [--refresh]")
+        sys.exit(1)
+
+    import main as pipeline
+
+    reel_number = sys.argv[1]
+    rows = pipeline.reel_rows(reel_number)
+    if not rows:
+        print(f"ERROR: No rows found for reel {reel_number}")
+        sys.exit(1)
+
+    plan = plan_reel(rows, refresh_audio="--refresh" in sys.argv[2:])
+    print(format_plan(plan))
+    if "--plan" in sys.argv[2:]:
+        return
+    if not any(step["rebuild"] for step in plan):
+        print(f"✅ Reel {reel_number} is up to date")
+        return
+
+    summary = pipeline.run_reel(reel_number, rows)
+    print("SUCCESS" if summary.get("success") else "ERROR", f"rebuilding reel {reel_number}")
+    sys.exit(0 if summary.get("success") else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Host-wide admission control for Chromium launches
+
+Every headful browser the pipeline opens (WhatsApp, Dreamina, the VPN agent)
+takes a lease here first and holds it until the browser closes:
+
+    lease = acquire_browser("dreamina")   # waits until the host has room
+    ...
+    lease.release()
+
+    with browser_lease("whatsapp"):
+        ...
+
+A launch is admitted when:
+
+- fewer than HOST_MAX_BROWSERS browsers hold leases,
+- free memory, minus what recently admitted browsers have reserved but not
+  yet allocated, still covers this service's reservation plus
+  HOST_MIN_FREE_MB, and
+- the 1-minute load average per CPU is under HOST_MAX_LOAD_PER_CPU.
+
+Otherwise the launch waits and checks again. Leases are small files under
+`.browser_leases/`, shared by every server process on the machine. A lock
+file makes admission atomic, and leases left by dead processes are removed.
+
+Warm pool slots keep their browser (and lease) open between jobs. They mark
+the lease idle while parked. When a launch is refused for the browser cap,
+the oldest idle lease is asked to close: the lease file is flagged and its
+process gets RECLAIM_SIGNAL (SIGUSR1), which runs the callbacks registered
+with `lease.on_reclaim()`. The slot's worker wakes and closes its browser,
+so a WhatsApp batch never waits behind parked Dreamina browsers, and idle
+workers never have to poll.
+"""
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import signal
+import logging
+import threading
+from contextlib import contextmanager
+
+from metrics import gauge, counter
+
+try:
+    import psutil
+except ImportError:  # memory checks are skipped without psutil
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+LEASE_DIR = os.getenv("BROWSER_LEASE_DIR", ".browser_leases")
+MAX_BROWSERS = int(os.getenv("HOST_MAX_BROWSERS", "2"))
+MIN_FREE_MB = int(os.getenv("HOST_MIN_FREE_MB", "1024"))
+MAX_LOAD_PER_CPU = float(os.getenv("HOST_MAX_LOAD_PER_CPU", "1.5"))
+ADMIT_TIMEOUT_SECONDS = int(os.getenv("BROWSER_ADMIT_TIMEOUT_SECONDS", str(30 * 60)))
+POLL_SECONDS = 2
+
+# Memory a freshly launched browser grows into over its first WARMUP_SECONDS
+# (persistent profile, WhatsApp/Dreamina web app, downloads)
+RESERVATIONS_MB = {
+    "whatsapp": int(os.getenv("WHATSAPP_BROWSER_MB", "1200")),
+    "dreamina": int(os.getenv("DREAMINA_BROWSER_MB", "1500")),
+    "vpn": int(os.getenv("VPN_BROWSER_MB", "1000")),
+}
+DEFAULT_RESERVATION_MB = 1000
+WARMUP_SECONDS = 60
+
+# Sent to a process when one of its idle browsers is asked to close
+RECLAIM_SIGNAL = signal.SIGUSR1
+
+BROWSERS_RUNNING = gauge("host_browsers_running", "Browsers holding a host lease")
+ADMISSION_WAIT_SECONDS = counter("browser_admission_wait_seconds_total",
+                                 "Time browser launches waited for host resources", ["service"])
+
+
+class HostProbe:
+    """Live free memory and load; swapped out in tests"""
+
+    def free_mb(self):
+        if psutil is None:
+            return None
+        return psutil.virtual_memory().available / (1024 * 1024)
+
+    def load_per_cpu(self):
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return 0.0
+
+
+def _pid_alive(pid):
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class BrowserLease:
+    """A host slot held for the lifetime of one browser"""
+
+    def __init__(self, governor, path, service):
+        self.governor = governor
+        self.path = path
+        self.service = service
+
+    def _update(self, **fields):
+        with self.governor._locked():
+            try:
+                with open(self.path) as f:
+                    lease = json.load(f)
+            except (OSError, ValueError, TypeError):
+                return
+            lease.update(fields)
+            self.governor._write_lease(self.path, lease)
+
+    def set_idle(self, idle):
+        """Mark a warm browser parked (idle) or in use; in-use leases are never reclaimed"""
+        if self.path is not None:
+            self._update(idle=idle, reclaim=False)
+
+    def on_reclaim(self, callback):
+        """Call `callback()` when a queued launch asks this browser to close (from any process)"""
+        if self.path is not None:
+            with _reclaim_lock:
+                _reclaim_callbacks[self.path] = callback
+
+    def reclaim_requested(self):
+        """True when a queued launch asked this idle browser to close"""
+        if self.path is None:
+            return False
+        try:
+            with open(self.path) as f:
+                return bool(json.load(f).get("reclaim"))
+        except (OSError, ValueError):
+            return False
+
+    def release(self):
+        if self.path is None:
+            return
+        with _reclaim_lock:
+            _reclaim_callbacks.pop(self.path, None)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        logger.info(f"🧮 Released {self.service} browser lease")
+        self.path = None
+
+
+class ResourceGovernor:
+    """Admits browser launches against host memory, load and a browser cap"""
+
+    def __init__(self, lease_dir=LEASE_DIR, max_browsers=MAX_BROWSERS, min_free_mb=MIN_FREE_MB,
+                 max_load_per_cpu=MAX_LOAD_PER_CPU, reservations=None, probe=None,
+                 poll_seconds=POLL_SECONDS, sleep=time.sleep):
+        self.lease_dir = os.path.abspath(lease_dir)
+        self.max_browsers = max_browsers
+        self.min_free_mb = min_free_mb
+        self.max_load_per_cpu = max_load_per_cpu
+        self.reservations = reservations or RESERVATIONS_MB
+        self.probe = probe or HostProbe()
+        self.poll_seconds = poll_seconds
+        self.sleep = sleep
+        os.makedirs(self.lease_dir, exist_ok=True)
+
+    def reservation_mb(self, service):
+        return self.reservations.get(service, DEFAULT_RESERVATION_MB)
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.lease_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def leases(self):
+        """Live leases on this host, dropping those whose process has died"""
+        leases = []
+        for name in os.listdir(self.lease_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.lease_dir, name)
+            try:
+                with open(path) as f:
+                    lease = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(lease["pid"]):
+                logger.info(f"🧹 Removing {lease['service']} browser lease left by dead process {lease['pid']}")
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            lease["path"] = path
+            leases.append(lease)
+        return leases
+
+    def _write_lease(self, path, lease):
+        lease = {key: value for key, value in lease.items() if key != "path"}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(lease, f)
+        os.replace(tmp_path, path)
+
+    def _reclaim_idle(self, service, leases):
+        """Ask the oldest idle warm browser to close so `service` can launch; returns its service"""
+        idle = [lease for lease in leases if lease.get("idle")]
+        if not idle or any(lease.get("reclaim") for lease in idle):
+            return None
+        oldest = min(idle, key=lambda lease: lease["admitted_at"])
+        oldest["reclaim"] = True
+        self._write_lease(oldest["path"], oldest)
+        logger.info(f"🧮 Asking an idle {oldest['service']} browser to close for a {service} launch")
+        _notify_reclaim(oldest)
+        return oldest["service"]
+
+    def _refusal(self, service, leases):
+        """Why a launch can't start right now, or None when it can"""
+        if len(leases) >= self.max_browsers:
+            return f"{len(leases)}/{self.max_browsers} browsers running"
+        free_mb = self.probe.free_mb()
+        if free_mb is not None:
+            # Browsers admitted moments ago haven't allocated their memory yet
+            now = time.time()
+            pending_mb = sum(lease["reserved_mb"] for lease in leases if now - lease["admitted_at"] < WARMUP_SECONDS)
+            needed_mb = self.reservation_mb(service) + self.min_free_mb
+            if free_mb - pending_mb < needed_mb:
+                return f"{free_mb - pending_mb:.0f} MB free, {needed_mb} MB needed"
+        load = self.probe.load_per_cpu()
+        if load >= self.max_load_per_cpu:
+            return f"load {load:.2f} per CPU"
+        return None
+
+    def try_acquire(self, service):
+        """Take a lease if the host has room; returns (lease, None) or (None, reason)"""
+        with self._locked():
+            leases = self.leases()
+            reason = self._refusal(service, leases)
+            if reason:
+                if len(leases) >= self.max_browsers:
+                    reclaimed = self._reclaim_idle(service, leases)
+                    if reclaimed:
+                        reason = f"{reason}, waiting for an idle {reclaimed} browser to close"
+                return None, reason
+            path = os.path.join(self.lease_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+            self._write_lease(path, {"service": service, "pid": os.getpid(), "reserved_mb": self.reservation_mb(service),
+                                     "admitted_at": time.time(), "idle": False, "signal": _reclaim_handler_installed})
+        return BrowserLease(self, path, service), None
+
+    def acquire(self, service, timeout=ADMIT_TIMEOUT_SECONDS):
+        """Wait until a browser for `service` may launch and return its lease"""
+        start_time = time.time()
+        logged_reason = None
+        while True:
+            lease, reason = self.try_acquire(service)
+            waited = time.time() - start_time
+            if lease:
+                if waited > 1:
+                    ADMISSION_WAIT_SECONDS.labels(service=service).inc(waited)
+                    logger.info(f"🧮 {service} browser admitted after {waited:.0f}s")
+                return lease
+            if waited >= timeout:
+                ADMISSION_WAIT_SECONDS.labels(service=service).inc(waited)
+                raise TimeoutError(f"No room to launch a {service} browser after {waited:.0f}s ({reason})")
+            if reason != logged_reason:
+                logger.info(f"⏳ {service} browser launch queued: {reason}")
+                logged_reason = reason
+            self.sleep(self.poll_seconds)
+
+    def status(self):
+        leases = self.leases()
+        free_mb = self.probe.free_mb()
+        return {
+            "max_browsers": self.max_browsers,
+            "browsers": [{"service": lease["service"], "pid": lease["pid"], "reserved_mb": lease["reserved_mb"],
+                          "idle": lease.get("idle", False)}
+                         for lease in leases],
+            "free_mb": round(free_mb) if free_mb is not None else None,
+            "load_per_cpu": round(self.probe.load_per_cpu(), 2),
+        }
+
+
+# Lease path -> callback for this process's leases that can be asked to close
+_reclaim_callbacks = {}
+_reclaim_lock = threading.Lock()
+_reclaim_handler_installed = False
+
+
+def dispatch_reclaims():
+    """Run the callback of every lease in this process that has been asked to close"""
+    with _reclaim_lock:
+        callbacks = list(_reclaim_callbacks.items())
+    for path, callback in callbacks:
+        try:
+            with open(path) as f:
+                requested = json.load(f).get("reclaim")
+        except (OSError, ValueError):
+            continue
+        if requested:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"⚠️ Reclaim callback failed: {e}")
+
+
+def _notify_reclaim(lease):
+    """Tell the process holding `lease` that it was asked to close"""
+    if lease["pid"] == os.getpid():
+        dispatch_reclaims()
+    elif lease.get("signal"):
+        try:
+            os.kill(lease["pid"], RECLAIM_SIGNAL)
+        except (ProcessLookupError, PermissionError) as e:
+            logger.warning(f"⚠️ Could not signal process {lease['pid']} to close its browser: {e}")
+
+
+def _on_reclaim_signal(signum, frame):
+    # Handlers run on the main thread between bytecodes; callbacks take locks, so run them elsewhere
+    threading.Thread(target=dispatch_reclaims, daemon=True).start()
+
+
+def install_reclaim_handler():
+    """Listen for RECLAIM_SIGNAL; only possible from the main thread. Returns True when listening"""
+    global _reclaim_handler_installed
+    if not _reclaim_handler_installed:
+        try:
+            signal.signal(RECLAIM_SIGNAL, _on_reclaim_signal)
+            _reclaim_handler_installed = True
+        except ValueError:
+            logger.warning("⚠️ resource_governor imported off the main thread; idle browsers can't be reclaimed from other processes")
+    return _reclaim_handler_installed
+
+
+install_reclaim_handler()
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_resource_governor():
+    """Return the process's view of the host governor (leases are shared across processes)"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ResourceGovernor()
+            BROWSERS_RUNNING.set_function(lambda: len(_governor.leases()))
+        return _governor
+
+
+def acquire_browser(service):
+    """Wait for room on the host and return a lease to release when the browser closes"""
+    return get_resource_governor().acquire(service)
+
+
+@contextmanager
+def browser_lease(service):
+    """Hold a host lease for a browser opened and closed inside the block"""
+    lease = acquire_browser(service)
+    try:
+        yield lease
+    finally:
+        lease.release()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Run the whole pipeline offline against local stand-ins
+
+Starts the fake WhatsApp chat (sim_whatsapp.py), Drive (sim_drive.py) and
+Dreamina form (sim_dreamina.py) on local ports. It installs the fake Sheets
+client (sim_sheets.py) and points the pipeline at them by setting the module
+attributes behind the settings a real deployment uses (WHATSAPP_WEB_URL,
+DRIVE_BASE_URL, DREAMINA_AI_AVATAR_URL, BROWSER_HEADLESS). The ledger,
+tracker, selector cache, browser leases and rate governors are swapped for
+scratch ones, so the run works whether or not the pipeline modules are
+already imported, and everything is restored afterwards. Then main.run_reel
+runs one generated reel in a scratch directory. Randomness comes from the
+seed, so two runs with the same settings and seed see the same replies,
+refusals and rejections. Compare their timings to benchmark a change.
+
+Needs Playwright's Chromium (`playwright install chromium`); no accounts,
+network or display.
+
+Usage: python3 run_simulation.py [lines] [seed]
+
+Settings (environment):
+    SIM_REPLY_SECONDS        ChatGPT reply time per prompt (default 2)
+    SIM_REFUSAL_RATE         share of prompts ChatGPT refuses (default 0)
+    SIM_DRIVE_DELAY_SECONDS  Drive latency per request (default 0.2)
+    SIM_DRIVE_FAILURE_RATE   share of Drive requests that fail (default 0)
+    SIM_UPLOAD_SECONDS       Dreamina upload time per file (default 0.5)
+    SIM_RENDER_SECONDS       Dreamina render time (default 5)
+    SIM_REJECTION_RATE       share of Dreamina submissions rejected (default 0)
+    SIM_KEEP_WORKDIR=1       keep the scratch directory for inspection
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager, ExitStack
+
+from werkzeug.serving import make_server
+
+from sim_whatsapp import FakeWhatsApp
+from sim_drive import FakeDrive
+from sim_sheets import FakeSheetsClient, reel_records
+from sim_dreamina import FakeDreamina
+
+logger = logging.getLogger(__name__)
+
+SIM_REEL = "sim"
+
+# Pacing for local fakes; the real services keep rate_governor's defaults
+SIM_GOVERNOR_SETTINGS = {
+    "whatsapp": {"interval": 0.5, "min_interval": 0.1, "max_interval": 10},
+    "drive": {"interval": 0.05, "min_interval": 0.01, "max_interval": 5},
+    "dreamina": {"interval": 0.2, "min_interval": 0.05, "max_interval": 10},
+}
+
+
+class LocalServer:
+    """A Flask app served on a free local port from a background thread"""
+
+    def __init__(self, app, host="127.0.0.1"):
+        self.server = make_server(host, 0, app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        return False
+
+
+@contextmanager
+def patched(module, **values):
+    """Set module attributes for the duration of the block, restoring them afterwards"""
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield module
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+@contextmanager
+def sim_governors():
+    """Fresh rate governors with the simulation's pacing; the real settings and governors come back after"""
+    import rate_governor
+
+    with rate_governor._governors_lock:
+        settings = copy.deepcopy(rate_governor.DEFAULT_SETTINGS)
+        governors = dict(rate_governor._governors)
+        rate_governor.DEFAULT_SETTINGS.update(copy.deepcopy(SIM_GOVERNOR_SETTINGS))
+        rate_governor._governors.clear()
+    try:
+        yield rate_governor
+    finally:
+        with rate_governor._governors_lock:
+            rate_governor.DEFAULT_SETTINGS.clear()
+            rate_governor.DEFAULT_SETTINGS.update(settings)
+            rate_governor._governors.clear()
+            rate_governor._governors.update(governors)
+
+
+@contextmanager
+def sim_sheets(client):
+    import sheets
+
+    sheets.use_client(client)
+    try:
+        yield
+    finally:
+        sheets.use_client(None)
+
+
+def point_pipeline_at(stack, workdir, whatsapp_url, drive_url, dreamina_url):
+    """Point the pipeline's modules at the local fakes and scratch state until `stack` closes"""
+    import chatgpt_image_api_server
+    import download_reel_audio
+    import dreamina_upload_api_server
+    import resource_governor
+    import stage_ledger
+    import dreamina_tracker
+    import dreamina_selector_cache
+
+    stack.enter_context(patched(chatgpt_image_api_server, WHATSAPP_WEB_URL=whatsapp_url + "/",
+                                BROWSER_HEADLESS=True, CHUNK_PAUSE_SECONDS=1))
+    stack.enter_context(patched(download_reel_audio, DRIVE_BASE_URL=drive_url,
+                                DRIVE_API_URL=drive_url + "/drive/v3", DRIVE_API_KEY="sim"))
+    stack.enter_context(patched(dreamina_upload_api_server,
+                                DREAMINA_AI_AVATAR_URL=dreamina_url + "/ai-tool/generate?type=digitalHuman",
+                                BROWSER_HEADLESS=True, REQUIRE_PROFILE_LOGIN=False))
+    stack.enter_context(patched(resource_governor, _governor=resource_governor.ResourceGovernor(
+        lease_dir=os.path.join(workdir, ".browser_leases"), min_free_mb=0, max_load_per_cpu=1000)))
+    stack.enter_context(patched(stage_ledger, _ledger=stage_ledger.StageLedger(
+        os.path.join(workdir, "pipeline_ledger.db"))))
+    stack.enter_context(patched(dreamina_tracker, _tracker=dreamina_tracker.DreaminaGenerationTracker(
+        os.path.join(workdir, "dreamina_tasks.db"))))
+    stack.enter_context(patched(dreamina_selector_cache, _cache=dreamina_selector_cache.SelectorPreferenceCache(
+        os.path.join(workdir, ".dreamina_selector_cache.json"))))
+
+
+def sim_prompts(lines):
+    return [f"Protein Papa Panda scene {n}: a panda chef plating tofu, studio light" for n in range(1, lines + 1)]
+
+
+def stage_report(summary, started_at):
+    """Succeeded/failed counts and finish times (seconds from start) per stage"""
+    report = {}
+    for name, task in summary["tasks"].items():
+        stage = report.setdefault(task["stage"], {"succeeded": 0, "failed": 0, "skipped": 0, "finished": []})
+        if task["status"] in ("succeeded", "failed", "skipped"):
+            stage[task["status"]] += 1
+        if task["finished_at"]:
+            stage["finished"].append(task["finished_at"] - started_at)
+    for stage in report.values():
+        finished = sorted(stage.pop("finished"))
+        stage["first_done_seconds"] = round(finished[0], 1) if finished else None
+        stage["last_done_seconds"] = round(finished[-1], 1) if finished else None
+    return report
+
+
+def run_simulation(lines=6, seed=0, workdir=None):
+    """Run one simulated reel end to end and return its timings and the fakes' counters"""
+    whatsapp = FakeWhatsApp(reply_seconds=float(os.getenv("SIM_REPLY_SECONDS", "2")),
+                            failure_rate=float(os.getenv("SIM_REFUSAL_RATE", "0")), seed=seed)
+    drive = FakeDrive(delay_seconds=float(os.getenv("SIM_DRIVE_DELAY_SECONDS", "0.2")),
+                      failure_rate=float(os.getenv("SIM_DRIVE_FAILURE_RATE", "0")), seed=seed)
+    dreamina = FakeDreamina(upload_seconds=float(os.getenv("SIM_UPLOAD_SECONDS", "0.5")),
+                            render_seconds=float(os.getenv("SIM_RENDER_SECONDS", "5")),
+                            failure_rate=float(os.getenv("SIM_REJECTION_RATE", "0")), seed=seed)
+    audio_links = [drive.add_file(f"sim{seed}-{n}") for n in range(1, lines + 1)]
+    sheets_client = FakeSheetsClient(reel_records(SIM_REEL, sim_prompts(lines), audio_links))
+
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="pipeline_sim_"))
+    cwd = os.getcwd()
+    with ExitStack() as stack:
+        whatsapp_server = stack.enter_context(LocalServer(whatsapp.create_app()))
+        drive_server = stack.enter_context(LocalServer(drive.create_app()))
+        dreamina_server = stack.enter_context(LocalServer(dreamina.create_app()))
+        point_pipeline_at(stack, workdir, whatsapp_server.url, drive_server.url, dreamina_server.url)
+        rate_governor = stack.enter_context(sim_governors())
+        stack.enter_context(sim_sheets(sheets_client))
+        import main as pipeline
+
+        os.chdir(workdir)
+        try:
+            logger.info(f"🧪 Simulating reel of {lines} lines (seed {seed}) in {workdir}")
+            started_at = time.time()
+            summary = pipeline.run_reel(SIM_REEL)
+            seconds = time.time() - started_at
+            governors = rate_governor.governors_status()
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "lines": lines,
+        "seed": seed,
+        "success": summary.get("success", False),
+        "seconds": round(seconds, 1),
+        "stages": stage_report(summary, started_at) if "tasks" in summary else {},
+        "services": {
+            "whatsapp": whatsapp.stats(),
+            "drive": drive.stats(),
+            "sheets": sheets_client.stats(),
+            "dreamina": dreamina.stats(),
+            "governors": governors,
+        },
+        "workdir": workdir,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    result = run_simulation(lines, seed)
+    if os.getenv("SIM_KEEP_WORKDIR") != "1":
+        shutil.rmtree(result["workdir"], ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    print(f"\n📈 {lines} lines in {result['seconds']}s ({'SUCCESS' if result['success'] else 'FAILED'})")
+    for stage, counts in result["stages"].items():
+        print(f"   {stage:<9} {counts['succeeded']} ok, {counts['failed']} failed, {counts['skipped']} skipped, "
+              f"first done {counts['first_done_seconds']}s, last done {counts['last_done_seconds']}s")
+    sys.exit(0 if result["success"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,39 @@ import os
 from dotenv import load_dotenv
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+from tracing import span, traced
 
 load_dotenv()
 
-def get_sheet_data():
+# A gspread-compatible client used instead of the service account (see use_client)
+_client_override = None
+
+def use_client(client):
+    """Read sheets through `client` (e.g. sim_sheets.FakeSheetsClient); None restores gspread"""
+    global _client_override
+    _client_override = client
+
+def authorize():
+    """Return a gspread client for the service account"""
+    if _client_override is not None:
+        return _client_override
     scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
     creds_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", "service_account.json")
-    sheet_id = os.getenv("GOOGLE_SHEET_ID")
 
-    creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-    client = gspread.authorize(creds)
+    with span("sheets.authorize"):
+        creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
+        return gspread.authorize(creds)
+
+@traced("sheets.get_sheet_data")
+def get_sheet_data():
+    sheet_id = os.getenv("GOOGLE_SHEET_ID")
+    client = authorize()
 
     # Open the second worksheet (index 1)
-    sheet = client.open_by_key(sheet_id).get_worksheet(1)
-    data = sheet.get_all_records()
+    with span("sheets.fetch_records") as fetch:
+        sheet = client.open_by_key(sheet_id).get_worksheet(1)
+        data = sheet.get_all_records()
+        fetch.set(rows=len(data))
 
     result = []
     for idx, row in enumerate(data, start=1):
@@ -34,31 +53,39 @@ def get_sheet_data():
 
     return result
 
-def get_prompts_by_reel(reel_number):
-    """Get all image prompts for a specific reel number"""
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    creds_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", "service_account.json")
-    sheet_id = os.getenv("GOOGLE_SHEET_ID")
-
-    creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-    client = gspread.authorize(creds)
-
-    # Open the second worksheet (index 1)
-    sheet = client.open_by_key(sheet_id).get_worksheet(1)
-    data = sheet.get_all_records()
-
-    prompts = []
+def prompts_by_reel_from_records(data, reel_numbers):
+    """Group sheet records into {reel_number: [prompt, ...]} for the requested reels"""
+    wanted = [str(reel_number) for reel_number in reel_numbers]
+    grouped = {reel_number: [] for reel_number in wanted}
     for idx, row in enumerate(data, start=1):
         prompt = row.get("Image Prompt", "").strip()
         audio_link = row.get("Audio File", "").strip()
         reel_no = str(row.get("Reel #", "")).strip()
 
-        if prompt and reel_no == str(reel_number):
+        if prompt and reel_no in grouped:
+            prompts = grouped[reel_no]
             prompts.append({
                 "line_no": str(idx).zfill(3),
                 "prompt": prompt,
                 "audio_url": audio_link,  # Include audio URL
                 "image_number": len(prompts) + 1  # Sequential image number starting from 1
             })
+    return grouped
+
+@traced("sheets.get_prompts_by_reels")
+def get_prompts_by_reels(reel_numbers):
+    """Get image prompts for several reels from one sheet snapshot"""
+    sheet_id = os.getenv("GOOGLE_SHEET_ID")
+    client = authorize()
 
-    return prompts 
\ No newline at end of file
+    # Open the second worksheet (index 1)
+    with span("sheets.fetch_records") as fetch:
+        sheet = client.open_by_key(sheet_id).get_worksheet(1)
+        data = sheet.get_all_records()
+        fetch.set(rows=len(data), reels=len(reel_numbers))
+
+    return prompts_by_reel_from_records(data, reel_numbers)
+
+def get_prompts_by_reel(reel_number):
+    """Get all image prompts for a specific reel number"""
+    return get_prompts_by_reels([reel_number])[str(reel_number)]
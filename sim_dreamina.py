@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Dreamina's AI Avatar form
+
+Serves a form built from the class names our selectors target:
+`reference-upload-vSJ7So` areas labelled Avatar and Speech (`label-TlzdqP`)
+with hidden file inputs, the `submit-button-bPnDkw` button, remove buttons,
+and `error-tips-Smo0rk` error tips. An upload shows an "uploading"
+indicator for `upload_seconds`. Submitting POSTs to an `aigc_draft/generate`
+endpoint, which answers with a `history_record_id`, or with an error tip at
+`failure_rate`. The page then polls the task until it finishes after
+`render_seconds`, so the generation tracker sees the same traffic shape as on
+the real site.
+
+    dreamina = FakeDreamina(upload_seconds=0.5, failure_rate=0.05, seed=7)
+    app = dreamina.create_app()   # serve it and set DREAMINA_AI_AVATAR_URL to <base>/ai-tool/generate?type=digitalHuman
+
+Used by run_simulation.py.
+"""
+
+import time
+import random
+import threading
+
+from flask import Flask, Response, jsonify, request
+
+RATE_LIMIT_TEXT = "Too many requests. Please try again later."
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<title>Dreamina AI Avatar</title>
+<style>
+  body { font-family: sans-serif; margin: 20px; }
+  .reference-upload-vSJ7So { border: 1px dashed #888; padding: 12px; margin: 8px 0; width: 320px; }
+  .remove-button-dh1E0f { display: inline-block; cursor: pointer; padding: 2px 6px; }
+  .lv-btn { width: 40px; height: 40px; border-radius: 20px; }
+  .error-tips-Smo0rk { color: #c00; margin-top: 8px; }
+</style>
+</head>
+<body>
+<div class="top-nav">
+  <div class="create-tab">Create</div>
+  <div class="ai-avatar-button">AI Avatar</div>
+</div>
+<div class="form-wrapper">
+  <div class="reference-upload-vSJ7So" data-kind="image">
+    <span class="label-TlzdqP">Avatar</span>
+    <input type="file" accept="image/*" style="display: none">
+    <div class="preview-area"></div>
+  </div>
+  <div class="reference-upload-vSJ7So" data-kind="audio">
+    <span class="label-TlzdqP">Speech</span>
+    <input type="file" accept="audio/*" style="display: none">
+    <div class="preview-area"></div>
+  </div>
+  <button type="button" disabled
+          class="lv-btn lv-btn-primary lv-btn-size-default lv-btn-shape-circle lv-btn-icon-only submit-button-bPnDkw lv-btn-disabled">
+    <svg data-follow-fill="currentColor" width="16" height="16" viewBox="0 0 16 16"><path d="M2 8h12" fill="currentColor"></path></svg>
+  </button>
+  <div class="tips-area"></div>
+</div>
+<script>
+  const UPLOAD_MS = __UPLOAD_MS__;
+  const submit = document.querySelector(".submit-button-bPnDkw");
+  const tips = document.querySelector(".tips-area");
+  const uploaded = {image: null, audio: null};
+  let uploads = 0;
+
+  function refreshSubmit() {
+    const ready = uploaded.image && uploaded.audio;
+    submit.disabled = !ready;
+    submit.classList.toggle("lv-btn-disabled", !ready);
+  }
+
+  document.querySelectorAll(".reference-upload-vSJ7So").forEach((area) => {
+    const input = area.querySelector("input");
+    const preview = area.querySelector(".preview-area");
+    const kind = area.dataset.kind;
+    area.addEventListener("click", (event) => {
+      if (event.target === area) input.click();
+    });
+    input.addEventListener("change", () => {
+      const file = input.files[0];
+      if (!file) return;
+      tips.innerHTML = "";
+      uploaded[kind] = null;
+      refreshSubmit();
+      uploads += 1;
+      const upload = uploads;
+      preview.innerHTML = '<div class="uploading-indicator">Uploading ' + file.name + '</div>';
+      setTimeout(() => {
+        uploaded[kind] = file.name;
+        preview.innerHTML = '<span class="file-name" data-upload="' + upload + '">' + file.name + '</span>' +
+          '<div class="remove-button-container-yw3VKU"><div class="remove-button-dh1E0f">x</div></div>';
+        preview.querySelector(".remove-button-dh1E0f").addEventListener("click", () => {
+          uploaded[kind] = null;
+          preview.innerHTML = "";
+          input.value = "";
+          refreshSubmit();
+        });
+        refreshSubmit();
+      }, UPLOAD_MS);
+    });
+  });
+
+  async function track(taskId) {
+    const response = await fetch("/dreamina/mweb/v1/get_history_by_ids?ids=" + taskId);
+    const data = await response.json();
+    if (data.data[taskId].status !== "finished") setTimeout(() => track(taskId), 1000);
+  }
+
+  submit.addEventListener("click", async () => {
+    submit.disabled = true;
+    const response = await fetch("/dreamina/mweb/v1/aigc_draft/generate", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({image: uploaded.image, audio: uploaded.audio})
+    });
+    const data = await response.json();
+    if (data.ret !== "0") {
+      tips.innerHTML = '<div class="error-tips-Smo0rk"><span class="error-tips-text-xJxpf1">' + data.errmsg + '</span></div>';
+    } else {
+      track(data.data.aigc_data.history_record_id);
+    }
+    refreshSubmit();
+  });
+</script>
+</body>
+</html>
+"""
+
+
+class FakeDreamina:
+    """AI Avatar form that accepts submissions, sometimes rejects them, and renders them over time"""
+
+    def __init__(self, upload_seconds=0.5, render_seconds=5.0, failure_rate=0.0, seed=0):
+        self.upload_seconds = upload_seconds
+        self.render_seconds = render_seconds
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.rejections = 0
+
+    def submit(self, image, audio):
+        """Return the JSON Dreamina answers a generate request with"""
+        with self.lock:
+            if self.random.random() < self.failure_rate:
+                self.rejections += 1
+                return {"ret": "1180", "errmsg": RATE_LIMIT_TEXT}
+            task_id = str(7000000000 + len(self.tasks) + 1)
+            self.tasks[task_id] = {"image": image, "audio": audio, "submitted_at": time.time()}
+        return {"ret": "0", "data": {"aigc_data": {"history_record_id": task_id, "status": "processing"}}}
+
+    def task_state(self, task_id):
+        with self.lock:
+            task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        record = {"history_record_id": task_id, "status": "processing"}
+        if time.time() - task["submitted_at"] >= self.render_seconds:
+            record.update(status="finished", video_url=f"https://sim.dreamina.local/video/{task_id}.mp4")
+        return record
+
+    def stats(self):
+        with self.lock:
+            return {"submissions": len(self.tasks), "rejections": self.rejections}
+
+    def create_app(self):
+        app = Flask(__name__)
+        page = PAGE.replace("__UPLOAD_MS__", str(int(self.upload_seconds * 1000)))
+
+        @app.route('/ai-tool/generate', methods=['GET'])
+        def form():
+            return Response(page, mimetype="text/html")
+
+        @app.route('/dreamina/mweb/v1/aigc_draft/generate', methods=['POST'])
+        def generate():
+            data = request.get_json(force=True)
+            return jsonify(self.submit(data.get("image"), data.get("audio")))
+
+        @app.route('/dreamina/mweb/v1/get_history_by_ids', methods=['GET'])
+        def history():
+            ids = [task_id for task_id in request.args.get("ids", "").split(",") if task_id]
+            return jsonify({"ret": "0", "data": {task_id: self.task_state(task_id) for task_id in ids}})
+
+        return app
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Google Drive audio downloads
+
+Answers `/uc?id=<file_id>&export=download` the way Drive does for large
+files. The first request returns the "can't scan this file for viruses" HTML
+page, and its download link (with `confirm=t`) returns the audio bytes with
+an ETag. `/drive/v3/files/<file_id>` answers like the files API with the
+file's md5Checksum. Requests can be delayed and can fail at a seeded random rate.
+
+    drive = FakeDrive(delay_seconds=0.2, seed=7)
+    url = drive.add_file("abc123")   # https://drive.google.com/file/d/abc123/view
+    app = drive.create_app()         # serve it and set DRIVE_BASE_URL to its address
+                                     # (DRIVE_API_URL to <address>/drive/v3)
+
+Used by run_simulation.py.
+"""
+
+import time
+import random
+import hashlib
+import threading
+
+from flask import Flask, Response, jsonify, request
+
+INTERSTITIAL_PAGE = """<!DOCTYPE html>
+<html><head><title>Google Drive - Virus scan warning</title></head>
+<body>
+<p>Google Drive can't scan this file for viruses.</p>
+<p>{name} is too large for Google to scan for viruses. Would you still like to download this file?</p>
+<a id="uc-download-link" href="{base}uc?export=download&confirm=t&id={file_id}">Download anyway</a>
+</body></html>
+"""
+
+
+class FakeDrive:
+    """Shared audio files behind Drive's download interstitial"""
+
+    def __init__(self, delay_seconds=0.0, failure_rate=0.0, interstitial=True, seed=0, file_bytes=64 * 1024):
+        self.delay_seconds = delay_seconds
+        self.failure_rate = failure_rate
+        self.interstitial = interstitial
+        self.random = random.Random(seed)
+        self.file_bytes = file_bytes
+        self.lock = threading.Lock()
+        self.files = {}
+        self.interstitials = 0
+        self.downloads = 0
+        self.failures = 0
+
+    def add_file(self, file_id, data=None):
+        """Share an audio file and return its Drive link"""
+        if data is None:
+            data = b"ID3" + bytes(self.random.getrandbits(8) for _ in range(self.file_bytes))
+        with self.lock:
+            self.files[file_id] = data
+        return f"https://drive.google.com/file/d/{file_id}/view?usp=sharing"
+
+    def stats(self):
+        with self.lock:
+            return {"files": len(self.files), "interstitials": self.interstitials,
+                    "downloads": self.downloads, "failures": self.failures}
+
+    def create_app(self):
+        app = Flask(__name__)
+
+        @app.route('/uc', methods=['GET'])
+        def download():
+            file_id = request.args.get("id")
+            with self.lock:
+                data = self.files.get(file_id)
+                failed = request.method == "GET" and self.random.random() < self.failure_rate
+            if data is None:
+                return Response("Not found", status=404)
+            if self.delay_seconds:
+                time.sleep(self.delay_seconds)
+            etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+
+            if request.method == "GET" and failed:
+                with self.lock:
+                    self.failures += 1
+                return Response("Too many requests", status=503)
+
+            if self.interstitial and request.args.get("confirm") != "t":
+                if request.method == "GET":
+                    with self.lock:
+                        self.interstitials += 1
+                page = INTERSTITIAL_PAGE.format(name=f"{file_id}.mp3", base=request.host_url, file_id=file_id)
+                return Response(page, mimetype="text/html", headers={"ETag": etag})
+
+            if request.method == "GET":
+                with self.lock:
+                    self.downloads += 1
+            return Response(data, mimetype="audio/mpeg", headers={"ETag": etag})
+
+        @app.route('/drive/v3/files/<file_id>', methods=['GET'])
+        def metadata(file_id):
+            with self.lock:
+                data = self.files.get(file_id)
+            if data is None:
+                return jsonify({"error": {"code": 404, "message": f"File not found: {file_id}"}}), 404
+            return jsonify({"id": file_id, "md5Checksum": hashlib.md5(data).hexdigest()})
+
+        return app
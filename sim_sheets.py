@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the gspread client
+
+Implements the calls sheets.py makes (`open_by_key(...).get_worksheet(i)
+.get_all_records()`), with an optional delay per fetch. Install it with
+`sheets.use_client(FakeSheetsClient(...))`.
+
+    client = FakeSheetsClient(reel_records("7", prompts, audio_links))
+
+Used by run_simulation.py.
+"""
+
+import time
+import threading
+
+
+def reel_records(reel_number, prompts, audio_links):
+    """Sheet rows for one reel, in the columns sheets.py reads"""
+    return [
+        {"Reel #": reel_number, "Image Prompt": prompt, "Audio File": audio_link}
+        for prompt, audio_link in zip(prompts, audio_links)
+    ]
+
+
+class FakeWorksheet:
+    def __init__(self, client, records):
+        self.client = client
+        self.records = records
+
+    def get_all_records(self):
+        if self.client.fetch_delay_seconds:
+            time.sleep(self.client.fetch_delay_seconds)
+        with self.client.lock:
+            self.client.fetches += 1
+        return [dict(record) for record in self.records]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, worksheets):
+        self.client = client
+        self.worksheets = worksheets
+
+    def get_worksheet(self, index):
+        return FakeWorksheet(self.client, self.worksheets[index])
+
+
+class FakeSheetsClient:
+    """gspread-like client whose second worksheet holds `records` (as in the real sheet)"""
+
+    def __init__(self, records, fetch_delay_seconds=0.0):
+        self.worksheets = [[], list(records)]
+        self.fetch_delay_seconds = fetch_delay_seconds
+        self.lock = threading.Lock()
+        self.fetches = 0
+
+    def open_by_key(self, key):
+        return FakeSpreadsheet(self, self.worksheets)
+
+    def stats(self):
+        with self.lock:
+            return {"rows": len(self.worksheets[1]), "fetches": self.fetches}
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for WhatsApp Web's ChatGPT chat
+
+Serves a page with the elements the WhatsApp helpers look for: the
+`span[title='ChatGPT']` chat entry, the `data-tab="10"` input, `.message-in`
+bubbles with `blob:` images, and the media viewer's `download-refreshed`
+button. Every prompt gets one reply, in order, after a seeded random delay.
+The reply is either a generated PNG or, at `failure_rate`, one of the refusals
+in the helpers' `error_indicators`.
+
+    fake = FakeWhatsApp(reply_seconds=2, failure_rate=0.1, seed=7)
+    app = fake.create_app()   # serve it and set WHATSAPP_WEB_URL to its address
+
+Used by run_simulation.py.
+"""
+
+import time
+import zlib
+import struct
+import random
+import hashlib
+import threading
+
+from flask import Flask, Response, jsonify, request
+
+REFUSAL_TEXT = "Sorry, I can't generate that image. It may violate our content policies."
+
+
+def make_png(width, height, seed_text):
+    """A valid RGB PNG with a gradient coloured by `seed_text` (no imaging library needed)"""
+    digest = hashlib.sha256(seed_text.encode("utf-8")).digest()
+    red, green, blue = digest[0], digest[1], digest[2]
+    rows = []
+    for y in range(height):
+        shade = y * 255 // max(height - 1, 1)
+        pixel = bytes(((red + shade) % 256, (green + shade // 2) % 256, blue))
+        rows.append(b"\x00" + pixel * width)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"".join(rows))) + chunk(b"IEND", b""))
+
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<title>WhatsApp</title>
+<style>
+  body { font-family: sans-serif; margin: 0; display: flex; height: 100vh; }
+  #side { width: 240px; border-right: 1px solid #ccc; padding: 12px; }
+  #main { flex: 1; display: none; flex-direction: column; }
+  div[aria-label='Message list'] { flex: 1; overflow-y: auto; padding: 12px; }
+  .message-in, .message-out { margin: 6px 0; padding: 6px; border-radius: 6px; max-width: 60%; }
+  .message-in { background: #eee; }
+  .message-out { background: #dcf8c6; margin-left: auto; }
+  .message-in img { width: 160px; cursor: pointer; }
+  div[contenteditable] { border: 1px solid #999; padding: 8px; min-height: 20px; margin: 8px; }
+  #viewer { display: none; position: fixed; inset: 0; background: rgba(0, 0, 0, 0.8); }
+  #viewer span { color: white; font-size: 32px; cursor: pointer; margin: 20px; display: inline-block; }
+</style>
+</head>
+<body>
+<div id="side"><span title="ChatGPT">ChatGPT</span></div>
+<div id="main">
+  <div role="application">
+    <div aria-label="Message list" tabindex="-1"></div>
+  </div>
+  <div contenteditable="true" data-tab="10"></div>
+</div>
+<div id="viewer"><span data-icon="download-refreshed">&#8595;</span></div>
+<script>
+  const list = document.querySelector("div[aria-label='Message list']");
+  const input = document.querySelector("div[data-tab='10']");
+  const viewer = document.getElementById("viewer");
+  let rendered = 0;
+  let viewing = null;
+
+  document.querySelector("span[title='ChatGPT']").addEventListener("click", () => {
+    document.getElementById("main").style.display = "flex";
+    input.focus();
+  });
+
+  input.addEventListener("keydown", async (event) => {
+    if (event.key !== "Enter") return;
+    event.preventDefault();
+    const text = input.innerText.trim();
+    input.innerText = "";
+    if (text) {
+      await fetch("api/send", {method: "POST", headers: {"Content-Type": "application/json"},
+                               body: JSON.stringify({text})});
+    }
+  });
+
+  async function bubble(message) {
+    const div = document.createElement("div");
+    div.className = message.direction === "in" ? "message-in" : "message-out";
+    if (message.image) {
+      const blob = await (await fetch("api/images/" + message.image)).blob();
+      const img = document.createElement("img");
+      img.src = URL.createObjectURL(blob);
+      img.addEventListener("click", () => { viewing = img.src; viewer.style.display = "block"; });
+      div.appendChild(img);
+    } else {
+      const span = document.createElement("span");
+      span.className = "selectable-text";
+      span.innerText = message.text;
+      div.appendChild(span);
+    }
+    list.appendChild(div);
+    list.scrollTop = list.scrollHeight;
+  }
+
+  async function poll() {
+    try {
+      const messages = await (await fetch("api/messages?since=" + rendered)).json();
+      for (const message of messages) {
+        await bubble(message);
+        rendered += 1;
+      }
+    } finally {
+      setTimeout(poll, 250);
+    }
+  }
+
+  viewer.querySelector("span").addEventListener("click", () => {
+    const link = document.createElement("a");
+    link.href = viewing;
+    link.download = "image.png";
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+  });
+
+  document.addEventListener("keydown", (event) => {
+    if (event.key === "Escape") viewer.style.display = "none";
+  });
+
+  poll();
+</script>
+</body>
+</html>
+"""
+
+
+class FakeWhatsApp:
+    """ChatGPT chat that answers each prompt with an image or a refusal"""
+
+    def __init__(self, reply_seconds=2.0, reply_jitter=1.0, failure_rate=0.0, seed=0, image_size=64):
+        self.reply_seconds = reply_seconds
+        self.reply_jitter = reply_jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.image_size = image_size
+        self.lock = threading.Lock()
+        self.messages = []
+        self.images = {}
+        self.last_reply_at = 0.0
+        self.prompts = 0
+        self.refusals = 0
+
+    def send(self, text):
+        """Record a prompt and queue its reply behind the earlier ones"""
+        now = time.time()
+        with self.lock:
+            self.prompts += 1
+            self.messages.append({"direction": "out", "text": text, "ready_at": now})
+            ready_at = max(self.last_reply_at, now) + self.reply_seconds + self.random.uniform(0, self.reply_jitter)
+            self.last_reply_at = ready_at
+            if self.random.random() < self.failure_rate:
+                self.refusals += 1
+                reply = {"direction": "in", "text": REFUSAL_TEXT, "ready_at": ready_at}
+            else:
+                image_id = f"{len(self.images) + 1}.png"
+                self.images[image_id] = make_png(self.image_size, self.image_size, text)
+                reply = {"direction": "in", "image": image_id, "ready_at": ready_at}
+            self.messages.append(reply)
+
+    def visible_messages(self, since=0):
+        """Messages whose reply time has come, oldest first, starting at index `since`"""
+        now = time.time()
+        with self.lock:
+            # Sorted by arrival, a message only ever appears after those already shown
+            ready = sorted((m for m in self.messages if m["ready_at"] <= now), key=lambda m: m["ready_at"])
+        return [{key: value for key, value in message.items() if key != "ready_at"} for message in ready[since:]]
+
+    def stats(self):
+        with self.lock:
+            return {"prompts": self.prompts, "images": len(self.images), "refusals": self.refusals}
+
+    def create_app(self):
+        app = Flask(__name__)
+
+        @app.route('/', methods=['GET'])
+        def page():
+            return Response(PAGE, mimetype="text/html")
+
+        @app.route('/api/send', methods=['POST'])
+        def send():
+            self.send(request.get_json(force=True)["text"])
+            return jsonify({"success": True})
+
+        @app.route('/api/messages', methods=['GET'])
+        def messages():
+            return jsonify(self.visible_messages(int(request.args.get("since", 0))))
+
+        @app.route('/api/images/<image_id>', methods=['GET'])
+        def image(image_id):
+            with self.lock:
+                data = self.images.get(image_id)
+            if data is None:
+                return Response(status=404)
+            return Response(data, mimetype="image/png")
+
+        return app
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Crash-safe ledger of per-line pipeline stages
+
+Every stage (image, audio, dreamina) records each line it handles in a local
+SQLite table keyed by (reel, line, stage): status, artifact path and sha256,
+attempts and timestamps. Stages check the ledger before acting, so re-running
+a reel after a crash skips the lines that already finished and continues
+where it stopped.
+
+A line only counts as done when its recorded artifact is still on disk with
+the same hash, so a deleted or overwritten file is simply redone. Each outcome
+is one SQLite transaction, written after the artifact itself is in place.
+
+Stages can also record the fingerprint of the inputs they were built from
+(prompt text, audio source, the two asset hashes). When a check passes a
+different fingerprint, the inputs changed and the line is rebuilt
+(see reel_rebuild.py).
+
+Usage: python3 stage_ledger.py [reel_number]            (print the ledger)
+       python3 stage_ledger.py reset <reel_number> [stage]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from reel_manifest import file_sha256
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("PIPELINE_LEDGER_DB", "pipeline_ledger.db")
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+COLUMNS = ("reel_number", "line_no", "stage", "status", "artifact_path", "artifact_sha256",
+           "fingerprint", "detail", "error", "attempts", "started_at", "finished_at", "updated_at")
+
+
+def line_key(line_no):
+    """Normalise line numbers so `007`, `7` and 7 share one row"""
+    line = str(line_no).strip()
+    return str(int(line)) if line.isdigit() else line
+
+
+def text_fingerprint(*parts):
+    """SHA-256 of the given strings, e.g. a prompt or two asset hashes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def files_fingerprint(*paths):
+    """Fingerprint of several files' contents (a Dreamina pair's image and audio)"""
+    return text_fingerprint(*(file_sha256(path) for path in paths))
+
+
+def reference_sha256(image_path):
+    """Content hash of a style reference image: None when no reference is used, "" when it is missing"""
+    if not image_path:
+        return None
+    return file_sha256(image_path) if os.path.isfile(image_path) else ""
+
+
+def image_fingerprint(prompt, reference_hash=None):
+    """Fingerprint of a generated image: its prompt, plus the reference image's hash when one is used"""
+    if reference_hash is None:
+        return text_fingerprint(prompt)
+    return text_fingerprint(prompt, reference_hash)
+
+
+class StageLedger:
+    """Per-(reel, line, stage) outcomes stored in SQLite"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = os.path.abspath(db_path)
+        self.lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        with self.lock, self._connect() as conn:
+            # WAL keeps the file consistent if the process dies mid-write
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stages (
+                    reel_number TEXT,
+                    line_no TEXT,
+                    stage TEXT,
+                    status TEXT,
+                    artifact_path TEXT,
+                    artifact_sha256 TEXT,
+                    fingerprint TEXT,
+                    detail TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    started_at REAL,
+                    finished_at REAL,
+                    updated_at REAL,
+                    PRIMARY KEY (reel_number, line_no, stage)
+                )
+            """)
+            # Ledgers written before fingerprints were recorded
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(stages)")]
+            if "fingerprint" not in columns:
+                conn.execute("ALTER TABLE stages ADD COLUMN fingerprint TEXT")
+
+    def get(self, reel_number, line_no, stage):
+        """Return the recorded entry as a dict, or None"""
+        with self.lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM stages WHERE reel_number = ? AND line_no = ? AND stage = ?",
+                (str(reel_number), line_key(line_no), stage)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def check(self, reel_number, line_no, stage, artifact_path=None, fingerprint=None):
+        """Return (entry, reason): the entry when the line's stage is up to date, else None and why not.
+
+        Pass `artifact_path` to only accept work saved at that path, and
+        `fingerprint` to only accept work built from the same inputs.
+        """
+        entry = self.get(reel_number, line_no, stage)
+        if not entry:
+            return None, "never built"
+        if entry["status"] != SUCCEEDED:
+            return None, f"last attempt {entry['status']}"
+        recorded = entry["artifact_path"]
+        if artifact_path and recorded != os.path.abspath(artifact_path):
+            return None, "saved elsewhere"
+        if recorded:
+            if not os.path.exists(recorded):
+                return None, "output missing"
+            if file_sha256(recorded) != entry["artifact_sha256"]:
+                return None, "output changed"
+        if fingerprint is not None and entry["fingerprint"] != fingerprint:
+            return None, "inputs changed"
+        return entry, "up to date"
+
+    def done(self, reel_number, line_no, stage, artifact_path=None, fingerprint=None):
+        """Return the entry if this line's stage is up to date (see check), else None"""
+        entry, reason = self.check(reel_number, line_no, stage, artifact_path, fingerprint)
+        if entry is None and reason not in ("never built", "saved elsewhere"):
+            logger.info(f"♻️ {stage} for reel {reel_number} line {line_no}: {reason}, redoing")
+        return entry
+
+    def start(self, reel_number, line_no, stage):
+        """Mark a line's stage as running and count the attempt"""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO stages (reel_number, line_no, stage, status, attempts, started_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (reel_number, line_no, stage) DO UPDATE SET "
+                "status = excluded.status, attempts = attempts + 1, error = NULL, "
+                "started_at = excluded.started_at, finished_at = NULL, updated_at = excluded.updated_at",
+                (str(reel_number), line_key(line_no), stage, RUNNING, now, now)
+            )
+
+    def succeed(self, reel_number, line_no, stage, artifact_path=None, detail=None, fingerprint=None):
+        """Record success, hashing the artifact (call once the file is fully written)"""
+        path = os.path.abspath(artifact_path) if artifact_path else None
+        sha256 = file_sha256(path) if path else None
+        self._finish(reel_number, line_no, stage, SUCCEEDED, path, sha256, fingerprint, detail, None)
+
+    def fail(self, reel_number, line_no, stage, error):
+        self._finish(reel_number, line_no, stage, FAILED, None, None, None, None, str(error))
+
+    def _finish(self, reel_number, line_no, stage, status, path, sha256, fingerprint, detail, error):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO stages (reel_number, line_no, stage, status, artifact_path, artifact_sha256, "
+                "fingerprint, detail, error, attempts, started_at, finished_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (reel_number, line_no, stage) DO UPDATE SET "
+                "status = excluded.status, artifact_path = excluded.artifact_path, "
+                "artifact_sha256 = excluded.artifact_sha256, fingerprint = excluded.fingerprint, "
+                "detail = excluded.detail, error = excluded.error, "
+                "finished_at = excluded.finished_at, updated_at = excluded.updated_at",
+                (str(reel_number), line_key(line_no), stage, status, path, sha256, fingerprint, detail, error,
+                 now, now, now)
+            )
+
+    def entries(self, reel_number=None, stage=None):
+        """Return recorded entries, optionally for one reel and/or stage"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM stages"
+        clauses, params = [], []
+        if reel_number is not None:
+            clauses.append("reel_number = ?")
+            params.append(str(reel_number))
+        if stage is not None:
+            clauses.append("stage = ?")
+            params.append(stage)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY reel_number, stage, CAST(line_no AS INTEGER), line_no"
+        with self.lock, self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def reset(self, reel_number, stage=None):
+        """Forget a reel's recorded work (or one stage of it) so it runs again"""
+        query = "DELETE FROM stages WHERE reel_number = ?"
+        params = [str(reel_number)]
+        if stage:
+            query += " AND stage = ?"
+            params.append(stage)
+        with self.lock, self._connect() as conn:
+            return conn.execute(query, params).rowcount
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_stage_ledger():
+    """Return the process-wide stage ledger"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = StageLedger()
+        return _ledger
+
+
+def main():
+    ledger = get_stage_ledger()
+    if len(sys.argv) >= 3 and sys.argv[1] == "reset":
+        stage = sys.argv[3] if len(sys.argv) > 3 else None
+        removed = ledger.reset(sys.argv[2], stage)
+        print(f"🧹 Removed {removed} ledger entries for reel {sys.argv[2]}" + (f" ({stage})" if stage else ""))
+        return
+
+    reel_number = sys.argv[1] if len(sys.argv) > 1 else None
+    entries = ledger.entries(reel_number)
+    if not entries:
+        print("No stages recorded yet")
+        return
+    icons = {SUCCEEDED: "✅", FAILED: "❌", RUNNING: "⏳"}
+    for entry in entries:
+        outcome = entry["artifact_path"] or entry["detail"] or entry["error"] or ""
+        print(f"{icons.get(entry['status'], '?')} reel {entry['reel_number']} line {entry['line_no']:>4} "
+              f"{entry['stage']:<9} attempts {entry['attempts']}  {outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the hot-path benchmark suite
+Runs the small cases against the synthetic chat - no browser needed
+"""
+
+import os
+import tempfile
+
+import chatgpt_image_api_server as whatsapp
+from bench_hot_paths import FakeChatPage, _NoSleep, chat_prompts, compare, run_benchmarks
+from stage_ledger import StageLedger
+
+
+def test_download_loop_on_synthetic_chat():
+    """The newest image belongs to the last prompt, and older ones need scrolling"""
+    print("\n💬 Testing the download loop on a synthetic chat...")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            os.makedirs("downloads")
+            page = FakeChatPage(300, 3, window=50, downloads_dir=os.path.abspath("downloads"))
+            ledger = StageLedger("ledger.db")
+            with _NoSleep():
+                results, downloaded, missing = whatsapp.download_replies_bottom_up(page, chat_prompts(3), ledger)
+            assert (downloaded, missing) == (3, 0)
+            assert [r["line_no"] for r in results] == ["003", "002", "001"]
+            assert all(os.path.exists(os.path.join("images", "1", f"00{n}.png")) for n in (1, 2, 3))
+            assert page.loaded > 200
+        finally:
+            os.chdir(cwd)
+    print("✅ Images matched bottom-up after scrolling to the top")
+
+
+def test_small_cases_run():
+    """Every case reports a median time, and chat cases their round trips"""
+    print("\n⏱️ Running the [100x10] cases...")
+    results = run_benchmarks("[100x10]")
+    assert set(results["cases"]) == {"collect_image_srcs[100x10]", "download_replies_bottom_up[100x10]"}
+    for result in results["cases"].values():
+        assert result["median_seconds"] >= 0 and result["round_trips"] > 0
+    print("✅ Cases ran and reported round trips")
+
+
+def test_regression_check():
+    """Slower medians past the threshold and extra round trips are regressions; noise is not"""
+    baseline = {"cases": {
+        "slow": {"median_seconds": 0.100, "round_trips": 10},
+        "noisy": {"median_seconds": 0.0001, "round_trips": None},
+        "chatty": {"median_seconds": 0.050, "round_trips": 10},
+    }}
+    current = {"cases": {
+        "slow": {"median_seconds": 0.200, "round_trips": 10},
+        "noisy": {"median_seconds": 0.0005, "round_trips": None},
+        "chatty": {"median_seconds": 0.050, "round_trips": 11},
+        "new": {"median_seconds": 1.0, "round_trips": 1},
+    }}
+    regressions = compare(current, baseline, threshold=1.25, min_delta=0.002)
+    assert len(regressions) == 2, regressions
+    assert regressions[0].startswith("slow: median") and regressions[1] == "chatty: round trips 10 -> 11"
+    assert compare(current, current) == []
+    print("✅ Regressions flagged, noise and new cases ignored")
+
+
+if __name__ == "__main__":
+    test_download_loop_on_synthetic_chat()
+    test_small_cases_run()
+    test_regression_check()
+    print("\n🎉 All benchmark suite tests passed!")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for the warm browser pool
+Uses fake sessions - no browser needed
+"""
+
+import os
+import queue
+import tempfile
+import threading
+
+import dreamina_upload_api_server as dreamina
+from browser_pool import WarmBrowserPool, WarmSlot
+
+
+class FakeSession:
+    """Stands in for DreaminaUploadAPI and records what the pool did with it"""
+    created = 0
+
+    def __init__(self, fail_start=False):
+        FakeSession.created += 1
+        self.fail_start = fail_start
+        self.healthy = True
+        self.recycled = 0
+        self.closed = False
+
+    def start_session(self):
+        return "Failed to launch browser" if self.fail_start else None
+
+    def is_healthy(self):
+        return self.healthy
+
+    def recycle_page(self):
+        self.recycled += 1
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def test_session_reused_between_jobs():
+    """Consecutive jobs get the same warm session without relaunching"""
+    print("🔥 Testing warm reuse...")
+    FakeSession.created = 0
+    slot = WarmSlot(FakeSession, "test", recycle_after=10)
+    assert slot.warm_up()
+
+    first = slot.acquire()
+    slot.release()
+    second = slot.acquire()
+    slot.release()
+
+    assert first is second
+    assert FakeSession.created == 1 and slot.launches == 1 and slot.total_jobs == 2
+    print("✅ One launch served two jobs")
+
+
+def test_page_recycled_after_n_jobs():
+    """The page is recycled every `recycle_after` jobs"""
+    print("\n🧹 Testing page recycling...")
+    slot = WarmSlot(FakeSession, "test", recycle_after=3)
+    for _ in range(7):
+        slot.acquire()
+        slot.release()
+
+    assert slot.session.recycled == 2 and slot.recycles == 2
+    assert slot.jobs_on_page == 1
+    print("✅ Recycled after jobs 3 and 6")
+
+
+def test_crashed_session_relaunched():
+    """A session failing its health check is closed and replaced"""
+    print("\n♻️ Testing relaunch on crash...")
+    slot = WarmSlot(FakeSession, "test")
+    crashed = slot.acquire()
+    slot.release()
+    crashed.healthy = False
+
+    replacement = slot.acquire()
+
+    assert replacement is not crashed and crashed.closed
+    assert slot.relaunches == 1
+    print("✅ Crashed session replaced")
+
+
+def test_launch_failure_raises():
+    """acquire() raises with the session's error when no browser can start"""
+    print("\n🚫 Testing launch failure...")
+    slot = WarmSlot(lambda: FakeSession(fail_start=True), "test")
+    try:
+        slot.acquire()
+        assert False, "acquire should have raised"
+    except RuntimeError as e:
+        assert "Failed to launch browser" in str(e)
+    assert not slot.busy and slot.session is None
+    print("✅ Launch failure reported")
+
+
+def test_pool_status():
+    """Each slot gets its own session from the indexed factory"""
+    print("\n📊 Testing pool status...")
+    indexes = []
+    pool = WarmBrowserPool(lambda index: indexes.append(index) or FakeSession(), size=2, name="dreamina")
+    for slot in pool.slots:
+        slot.warm_up()
+    pool.slots[0].acquire()
+
+    status = pool.status()
+    assert indexes == [0, 1]
+    assert [s['name'] for s in status] == ["dreamina-1", "dreamina-2"]
+    assert pool.busy_count() == 1
+    print("✅ Pool status reported per slot")
+
+
+def test_unlogged_profile_fails_fast():
+    """A slot whose profile never logged in refuses to start instead of failing every pair"""
+    print("\n🔑 Testing profile login check...")
+    with tempfile.TemporaryDirectory() as workdir:
+        profile = os.path.join(workdir, "vpn_browser_session_2")
+        slot = WarmSlot(lambda: dreamina.DreaminaUploadAPI(user_data_dir=profile, slot=1), "dreamina-2")
+        try:
+            slot.acquire()
+            assert False, "acquire should have raised"
+        except RuntimeError as e:
+            assert "never logged in" in str(e) and "open_dreamina_session.py 2" in str(e)
+        assert slot.session is None
+
+        os.makedirs(os.path.join(profile, "Default", "Network"))
+        assert not dreamina.profile_has_login(profile)
+        with open(os.path.join(profile, "Default", "Network", "Cookies"), "wb") as f:
+            f.write(b"SQLite format 3\x00")
+        assert dreamina.profile_has_login(profile)
+    assert dreamina.slot_profile(0) == "vpn_browser_session" and dreamina.slot_profile(2) == "vpn_browser_session_3"
+    print("✅ Unlogged profile refused before launching")
+
+
+def test_shutdown_stops_every_worker():
+    """Shutdown sends one signal per worker thread, not one in total"""
+    real_queue, real_threads = dreamina.request_queue, dreamina.queue_threads
+    dreamina.request_queue = queue.Queue()
+    stopped = []
+
+    def worker():
+        while dreamina.request_queue.get() is not None:
+            pass
+        stopped.append(threading.current_thread().name)
+
+    dreamina.queue_threads = [threading.Thread(target=worker, daemon=True) for _ in range(3)]
+    try:
+        for thread in dreamina.queue_threads:
+            thread.start()
+        dreamina.stop_queue_workers(timeout=5)
+        assert len(stopped) == 3 and not any(thread.is_alive() for thread in dreamina.queue_threads)
+    finally:
+        dreamina.request_queue, dreamina.queue_threads = real_queue, real_threads
+    print("✅ All workers stopped")
+
+
+if __name__ == "__main__":
+    test_session_reused_between_jobs()
+    test_page_recycled_after_n_jobs()
+    test_crashed_session_relaunched()
+    test_launch_failure_raises()
+    test_pool_status()
+    test_unlogged_profile_fails_fast()
+    test_shutdown_stops_every_worker()
+    print("\n🎉 All browser pool tests passed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the Dreamina generation tracker
+Feeds recorded-style JSON payloads through the tracker - no browser needed
+"""
+
+import os
+import tempfile
+
+from dreamina_tracker import DreaminaGenerationTracker, extract_tasks
+
+
+class FakeRequest:
+    def __init__(self, method):
+        self.method = method
+        self.resource_type = "fetch"
+
+
+class FakeResponse:
+    def __init__(self, payload, method="GET", url="https://dreamina.capcut.com/mweb/v1/get_history"):
+        self.payload = payload
+        self.request = FakeRequest(method)
+        self.url = url
+        self.headers = {"content-type": "application/json; charset=utf-8"}
+
+    def json(self):
+        return self.payload
+
+
+def make_tracker():
+    return DreaminaGenerationTracker(db_path=os.path.join(tempfile.mkdtemp(), "tasks.db"))
+
+
+def test_extract_tasks_from_nested_payload():
+    """Task ids, states and video URLs are found anywhere in a payload"""
+    print("🔍 Testing payload extraction...")
+    payload = {"data": {"records": [
+        {"history_record_id": "h1", "status": 20},
+        {"history_record_id": "h2", "status": 50, "item": {"video": {"video_url": "https://cdn.example/2.mp4"}}}
+    ]}}
+
+    tasks = extract_tasks(payload)
+
+    assert [t['task_id'] for t in tasks] == ["h1", "h2"]
+    assert tasks[1]['state'] == "50"
+    assert tasks[1]['video_url'] == "https://cdn.example/2.mp4"
+    print("✅ Extracted both tasks")
+
+
+def test_submission_label_and_completion():
+    """The submit response labels the task; later poll responses complete it"""
+    print("\n🛰️ Testing submission tracking...")
+    tracker = make_tracker()
+    page_key = 1
+
+    # An older task in a poll response must not steal the label
+    tracker.pending[page_key] = ("42", 3, 1000.0)
+    tracker._on_response(page_key, FakeResponse({"history_record_id": "old", "status": 50}))
+    # Dreamina's history poll is a POST as well; only the submit URL may claim the label
+    tracker._on_response(page_key, FakeResponse({"history_record_id": "older", "status": 50}, method="POST"))
+    assert page_key not in tracker.page_tasks
+    tracker._on_response(page_key, FakeResponse({"data": {"history_record_id": "new", "status": 20}}, method="POST",
+                                                url="https://dreamina.capcut.com/mweb/v1/aigc_draft/generate"))
+    assert tracker.page_tasks[page_key] == "new"
+
+    tracker._on_response(page_key, FakeResponse({"history_record_id": "new", "status": 50,
+                                                 "video_url": "https://cdn.example/new.mp4"}))
+
+    tasks = tracker.tasks("42")
+    assert len(tasks) == 1
+    assert tasks[0]['pair_number'] == 3
+    assert tasks[0]['completed_at'] is not None
+    assert tasks[0]['video_url'] == "https://cdn.example/new.mp4"
+    assert tracker.pending_tasks("42") == []
+    assert tracker.latency_stats("42")['finished'] == 1
+    print("✅ Task labelled, completed and timed")
+
+
+def test_tracking_ignores_earlier_runs():
+    """A run only waits on the tasks it submitted, not ones an earlier run left unfinished"""
+    print("\n⏱️ Testing tracking cutoff...")
+    import dreamina_upload_api_server as dreamina
+
+    tracker = make_tracker()
+    tracker.pending[1] = ("42", 1, 100.0)
+    tracker.record(1, "stale", "processing")
+    assert [t['task_id'] for t in tracker.pending_tasks("42", since=150.0)] == []
+
+    # Skip the browser setup in __init__; the page only needs to wait
+    waits = []
+    api = dreamina.DreaminaUploadAPI.__new__(dreamina.DreaminaUploadAPI)
+    api.tracker, api.reel_number = tracker, "42"
+    api.page = type("FakePage", (), {"wait_for_timeout": lambda self, ms: waits.append(ms)})()
+    api.track_generations(60, since=150.0)
+    assert waits == [], "nothing from this run is pending"
+
+    tracker.pending[1] = ("42", 2, 200.0)
+    tracker.record(1, "fresh", "processing")
+    assert [t['task_id'] for t in tracker.pending_tasks("42", since=150.0)] == ["fresh"]
+    assert len(tracker.pending_tasks("42")) == 2
+    print("✅ Only this run's tasks tracked")
+
+
+if __name__ == "__main__":
+    test_extract_tasks_from_nested_payload()
+    test_submission_label_and_completion()
+    test_tracking_ignores_earlier_runs()
+    print("\n🎉 All tracker tests passed!")
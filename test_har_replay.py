@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test script for HAR record-and-replay
+Uses fake routes, contexts and pages - no browser needed
+"""
+
+import os
+import json
+import base64
+import tempfile
+
+import har_replay
+from har_replay import HarReplayRouter, HarSession, compare_steps, get_har_session
+
+
+def har_entry(method, url, status, text, mime="application/json", encoding=None):
+    content = {"mimeType": mime, "text": text}
+    if encoding:
+        content["encoding"] = encoding
+    return {
+        "request": {"method": method, "url": url},
+        "response": {"status": status, "content": content, "headers": [
+            {"name": "Content-Type", "value": mime},
+            {"name": "Content-Encoding", "value": "br"},
+            {"name": "Content-Length", "value": "999"},
+        ]}
+    }
+
+
+def write_har(path, entries):
+    with open(path, "w") as f:
+        json.dump({"log": {"version": "1.2", "entries": entries}}, f)
+
+
+class FakeRequest:
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self):
+        self.outcome = None
+
+    def fulfill(self, status, headers, body):
+        self.outcome = ("fulfill", status, headers, body)
+
+    def abort(self):
+        self.outcome = ("abort",)
+
+    def fallback(self):
+        self.outcome = ("fallback",)
+
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+        self.har_updates = []
+
+    def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    def route_from_har(self, path, **options):
+        self.har_updates.append((path, options))
+
+
+class FakePage:
+    url = "https://dreamina.capcut.com/ai-tool/generate"
+
+    def content(self):
+        return "<html><body><div class='reference-upload-vSJ7So'></div></body></html>"
+
+
+def serve(router, method, url):
+    route = FakeRoute()
+    router(route, FakeRequest(method, url))
+    return route.outcome
+
+
+def test_polling_replays_in_order():
+    """Repeated requests get the recorded responses in order, then the last one again"""
+    print("\n📼 Testing ordered replay...")
+    status_url = "https://dreamina.capcut.com/dreamina/mweb/v1/get_history_by_ids?ids=1"
+    with tempfile.TemporaryDirectory() as workdir:
+        har_path = os.path.join(workdir, "session.har")
+        write_har(har_path, [
+            har_entry("GET", status_url, 200, '{"status": "processing"}'),
+            har_entry("GET", status_url, 200, '{"status": "finished"}'),
+            har_entry("GET", "https://dreamina.capcut.com/logo.png", 200,
+                      base64.b64encode(b"\x89PNG").decode(), mime="image/png", encoding="base64"),
+        ])
+        router = HarReplayRouter(har_path)
+        bodies = [serve(router, "GET", status_url)[3] for _ in range(3)]
+        assert bodies == [b'{"status": "processing"}', b'{"status": "finished"}', b'{"status": "finished"}']
+
+        outcome = serve(router, "GET", "https://dreamina.capcut.com/logo.png#top")
+        assert outcome[1] == 200 and outcome[3] == b"\x89PNG"
+        assert outcome[2] == {"Content-Type": "image/png"}
+    print("✅ Polling saw processing, then finished; binary bodies decoded")
+
+
+def test_unrecorded_requests():
+    """Requests missing from the recording are aborted, or sent on with fallback"""
+    with tempfile.TemporaryDirectory() as workdir:
+        har_path = os.path.join(workdir, "session.har")
+        write_har(har_path, [])
+        router = HarReplayRouter(har_path)
+        assert serve(router, "POST", "https://dreamina.capcut.com/upload") == ("abort",)
+        assert router.missed == ["POST https://dreamina.capcut.com/upload"]
+        assert serve(HarReplayRouter(har_path, not_found="fallback"), "GET", "https://x.test/") == ("fallback",)
+    print("✅ Unrecorded requests aborted by default")
+
+
+def test_session_records_steps():
+    """Record mode updates the HAR on the context and snapshots each step"""
+    print("\n🎙️ Testing a recording session...")
+    with tempfile.TemporaryDirectory() as workdir:
+        session = HarSession("dreamina", "record", base_dir=workdir)
+        context = FakeContext()
+        session.attach(context)
+        assert context.har_updates[0][0] == session.har_path
+        assert context.har_updates[0][1]["update"] is True
+
+        path = session.snapshot(FakePage(), "form_loaded")
+        session.snapshot(FakePage(), "pair_1_submitted")
+        assert os.path.basename(path) == "001-form_loaded.html"
+        with open(os.path.join(session.steps_dir, "steps.json")) as f:
+            steps = json.load(f)
+        assert [s["label"] for s in steps] == ["form_loaded", "pair_1_submitted"]
+
+        replay = HarSession("dreamina", "replay", base_dir=workdir)
+        try:
+            replay.attach(FakeContext())
+            assert False, "replay without a recording should fail"
+        except FileNotFoundError:
+            pass
+    print("✅ HAR update attached and step snapshots written")
+
+
+def test_signed_urls_match():
+    """Signing and token parameters differ per run; the rest of the query still has to match"""
+    with tempfile.TemporaryDirectory() as workdir:
+        har_path = os.path.join(workdir, "session.har")
+        write_har(har_path, [har_entry(
+            "GET", "https://dreamina.capcut.com/mweb/v1/get_history?aid=513695&msToken=abc&a_bogus=x1", 200, '{"ok": 1}')])
+        router = HarReplayRouter(har_path)
+        outcome = serve(router, "GET", "https://dreamina.capcut.com/mweb/v1/get_history?a_bogus=y2&aid=513695&msToken=def")
+        assert outcome[0] == "fulfill" and outcome[3] == b'{"ok": 1}'
+        assert serve(router, "GET", "https://dreamina.capcut.com/mweb/v1/get_history?aid=1&msToken=def") == ("abort",)
+    print("✅ Volatile query parameters ignored when matching")
+
+
+def test_slots_and_relaunches_keep_steps():
+    """Each pool slot has its own session; a relaunch records a new HAR and keeps earlier steps"""
+    print("\n🔁 Testing slots and relaunches...")
+    real_mode, real_sessions = har_replay.HAR_MODE, dict(har_replay._sessions)
+    har_replay.HAR_MODE = "record"
+    har_replay._sessions.clear()
+    try:
+        first, second = get_har_session("dreamina"), get_har_session("dreamina", 1)
+        assert first is get_har_session("dreamina") and first is not second
+        assert (first.flow, second.flow) == ("dreamina", "dreamina-2")
+    finally:
+        har_replay.HAR_MODE = real_mode
+        har_replay._sessions.clear()
+        har_replay._sessions.update(real_sessions)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        session = HarSession("whatsapp", "record", base_dir=workdir)
+        first_context, second_context = FakeContext(), FakeContext()
+        session.attach(first_context)
+        session.snapshot(FakePage(), "chat_open")
+        session.attach(second_context)
+        session.snapshot(FakePage(), "chat_open")
+        assert first_context.har_updates[0][0] == session.har_path
+        assert os.path.basename(second_context.har_updates[0][0]) == "session-2.har"
+        with open(os.path.join(session.steps_dir, "steps.json")) as f:
+            assert [(s["step"], s["launch"]) for s in json.load(f)] == [(1, 1), (2, 2)]
+        assert sorted(os.listdir(session.steps_dir)) == ["001-chat_open.html", "002-chat_open.html", "steps.json"]
+
+        # A replay with more launches than the recording falls back to the first HAR
+        write_har(session.har_path, [])
+        replay = HarSession("whatsapp", "replay", base_dir=workdir)
+        for _ in range(2):
+            replay.attach(FakeContext())
+        assert replay.launches == 2
+    print("✅ Sessions per slot, HAR per launch, steps kept")
+
+
+def test_compare_steps():
+    recorded = [{"label": "form_loaded", "seconds": 12.0}, {"label": "pair_1_submitted", "seconds": 95.5}]
+    replayed = [{"label": "form_loaded", "seconds": 1.2}]
+    assert compare_steps(recorded, replayed) == [("form_loaded", 12.0, 1.2), ("pair_1_submitted", 95.5, None)]
+    print("✅ Recorded and replayed steps lined up")
+
+
+if __name__ == "__main__":
+    test_polling_replays_in_order()
+    test_unrecorded_requests()
+    test_session_records_steps()
+    test_signed_urls_match()
+    test_slots_and_relaunches_keep_steps()
+    test_compare_steps()
+    print("\n🎉 All HAR replay tests passed!")
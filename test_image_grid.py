@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script for prompt packing and grid splitting
+Uses synthetic grids and the benchmark's fake chat - no browser needed
+"""
+
+import os
+import zlib
+import struct
+import tempfile
+
+import numpy as np
+
+import image_grid
+import chatgpt_image_api_server as whatsapp
+from bench_hot_paths import FakeChatPage, _NoSleep
+from image_grid import decode_png, encode_png, grid_layout, grid_prompt, split_grid, split_grid_file
+from stage_ledger import StageLedger
+
+
+def panel(height, width, seed):
+    """A textured panel: a gradient with noise, so no row or column inside it is uniform"""
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 200, height)[:, None, None]
+    x = np.linspace(0, 120, width)[None, :, None]
+    base = (y + x + rng.integers(0, 40, (height, width, 3))) % 256
+    return base.astype(np.uint8)
+
+
+def make_grid(rows, cols, size=60, gutter=6, margin=10, seed=0):
+    """rows x cols panels of size x size on white, with gutters between and a margin around"""
+    height = rows * size + (rows - 1) * gutter + 2 * margin
+    width = cols * size + (cols - 1) * gutter + 2 * margin
+    grid = np.full((height, width, 3), 255, dtype=np.uint8)
+    panels = []
+    for r in range(rows):
+        for c in range(cols):
+            tile = panel(size, size, seed + r * cols + c)
+            top, left = margin + r * (size + gutter), margin + c * (size + gutter)
+            grid[top:top + size, left:left + size] = tile
+            panels.append(tile)
+    return grid, panels
+
+
+def test_split_removes_gutters():
+    """Each tile is exactly one panel: no gutter or margin pixels left on it"""
+    print("\n🔲 Testing grid splitting...")
+    for rows, cols in ((2, 2), (3, 3)):
+        grid, panels = make_grid(rows, cols)
+        tiles = split_grid(grid, rows, cols)
+        assert len(tiles) == rows * cols
+        for tile, expected in zip(tiles, panels):
+            assert tile.shape == expected.shape, (rows, cols, tile.shape)
+            assert np.array_equal(tile, expected)
+    print("✅ 2x2 and 3x3 grids split into exact panels")
+
+
+def test_uneven_and_seamless_grids():
+    """Gutters off the even split are still found; a grid without gutters is cut at its seams"""
+    grid = np.full((120, 130, 3), 255, dtype=np.uint8)
+    grid[:, :58] = panel(120, 58, 1)
+    grid[:, 66:] = panel(120, 64, 2)
+    left, right = split_grid(grid, 1, 2)
+    assert left.shape[1] == 58 and right.shape[1] == 64
+
+    seamless = np.concatenate([np.full((50, 47, 3), 30, np.uint8), np.full((50, 53, 3), 220, np.uint8)], axis=1)
+    seamless[::2] += 20  # rows vary, so nothing counts as a gutter
+    left, right = split_grid(seamless, 1, 2)
+    assert left.shape[1] == 47 and right.shape[1] == 53
+    print("✅ Off-centre gutters and seamless cuts found")
+
+
+def test_png_round_trip():
+    """The built-in PNG codec reads what it writes, and every scanline filter"""
+    image = panel(17, 23, 7)
+    assert np.array_equal(decode_png(encode_png(image)), image)
+
+    # Re-encode with filters 1-4 on alternating rows
+    height, width, _ = image.shape
+    raw = image.astype(np.int32).reshape(height, width * 3)
+    lines = []
+    for y in range(height):
+        kind = y % 5
+        row, up = raw[y], raw[y - 1] if y else np.zeros(width * 3, np.int32)
+        left = np.concatenate([np.zeros(3, np.int32), row[:-3]])
+        upper_left = np.concatenate([np.zeros(3, np.int32), up[:-3]])
+        if kind == 1:
+            predictor = left
+        elif kind == 2:
+            predictor = up
+        elif kind == 3:
+            predictor = (left + up) // 2
+        elif kind == 4:
+            estimate = left + up - upper_left
+            pa, pb, pc = abs(estimate - left), abs(estimate - up), abs(estimate - upper_left)
+            predictor = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upper_left))
+        else:
+            predictor = 0
+        lines.append(bytes([kind]) + ((row - predictor) % 256).astype(np.uint8).tobytes())
+
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+    data = (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"".join(lines))) + chunk(b"IEND", b""))
+    assert np.array_equal(decode_png(data), image)
+    print("✅ PNG encode/decode round-trips with all filters")
+
+
+def test_packing():
+    """Consecutive lines of a reel share a grid; reels never mix and a lone line stays plain"""
+    prompts = [{"prompt": f"scene {n}", "line_no": f"{n:03d}", "reel_no": "1"} for n in range(1, 7)]
+    prompts.append({"prompt": "other reel", "line_no": "001", "reel_no": "2"})
+    packed = whatsapp.pack_prompts(prompts, 2)
+    assert [item["line_no"] for item in packed] == ["grid-001-004", "grid-005-006", "001"]
+    assert [len(item.get("members", [])) for item in packed] == [4, 2, 0]
+    assert grid_layout(2, 2) == (1, 2) and grid_layout(7, 3) == (3, 3)
+    text = grid_prompt(["a cat", "a dog", "a fox"], 2)
+    assert "2x2 grid" in text and "Panel 3 (row 2, column 1): a fox" in text and "remaining" in text
+    print("✅ Prompts packed per reel")
+
+
+def test_grid_reply_saved_per_line():
+    """A grid reply in the chat becomes images/<reel>/<line>.png for each packed line"""
+    print("\n💬 Testing a packed reply in the download loop...")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            os.makedirs("downloads")
+            page = FakeChatPage(20, 2, downloads_dir=os.path.abspath("downloads"))
+            grid, panels = make_grid(2, 2)
+            page.image_bytes = encode_png(grid)
+            lines = [{"prompt": f"scene {n}", "line_no": f"{n:03d}", "reel_no": "1"} for n in range(1, 6)]
+            prompts = whatsapp.pack_prompts(lines, 2)
+            for item in prompts:
+                item["sent_at"] = 0
+            # The lone fifth line gets the newest image; a real reply would be a single panel
+            ledger = StageLedger("ledger.db")
+            saved = []
+            with _NoSleep():
+                results, downloaded, missing = whatsapp.download_replies_bottom_up(
+                    page, prompts, ledger, on_image_saved=lambda reel, line, path: saved.append(line))
+            assert (downloaded, missing) == (5, 0)
+            assert sorted(r["line_no"] for r in results) == ["001", "002", "003", "004", "005"]
+            assert sorted(saved) == ["001", "002", "003", "004", "005"]
+            for n, expected in enumerate(panels, start=1):
+                with open(os.path.join("images", "1", f"00{n}.png"), "rb") as f:
+                    assert np.array_equal(decode_png(f.read()), expected)
+            assert os.path.exists(os.path.join("images", "1", "grids", "grid-001-004.png"))
+            assert ledger.done("1", "003", "image", artifact_path=os.path.join("images", "1", "003.png"))
+        finally:
+            os.chdir(cwd)
+    print("✅ Grid split into per-line images and recorded in the ledger")
+
+
+def test_jpeg_grid_splits():
+    """WhatsApp downloads JPEG: the grid is read with Pillow and split near the gutters"""
+    print("\n🖼️ Testing a JPEG grid...")
+    grid, panels = make_grid(2, 2, size=120, gutter=12)
+    with tempfile.TemporaryDirectory() as workdir:
+        grid_path = os.path.join(workdir, "grid.png")  # saved under .png, like the chat download
+        image_grid.Image.fromarray(grid).save(grid_path, format="JPEG", quality=85)
+        out_paths = [os.path.join(workdir, f"{n}.png") for n in range(1, 5)]
+        split_grid_file(grid_path, out_paths, 2)
+        for path in out_paths:
+            with open(path, "rb") as f:
+                height, width, _ = decode_png(f.read()).shape
+            # JPEG ringing can blur a pixel or two of each gutter edge
+            assert abs(height - 120) <= 3 and abs(width - 120) <= 3, (height, width)
+    print("✅ JPEG grid split into four panels")
+
+
+def test_grid_size_refused_without_pillow():
+    """Without Pillow the endpoint refuses grid_size instead of failing every line later"""
+    client = whatsapp.app.test_client()
+    real_image = image_grid.Image
+    image_grid.Image = None
+    try:
+        response = client.post('/batch-generate-images', json={
+            "rows": [{"prompt": "a", "line_no": 1, "reel_no": "1"}], "grid_size": 2})
+    finally:
+        image_grid.Image = real_image
+    assert response.status_code == 400 and "Pillow" in response.get_json()["error"]
+    print("✅ grid_size refused without Pillow")
+
+
+if __name__ == "__main__":
+    test_split_removes_gutters()
+    test_uneven_and_seamless_grids()
+    test_png_round_trip()
+    test_packing()
+    test_grid_reply_saved_per_line()
+    test_jpeg_grid_splits()
+    test_grid_size_refused_without_pillow()
+    print("\n🎉 All image grid tests passed!")
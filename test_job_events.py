@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for job progress events and the SSE stream
+Uses a local HTTP server and subprocesses - no browser needed
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from flask import Flask
+
+import job_store
+from job_store import JobStore, get_job_store, jobs_blueprint
+from job_events import bind_job, publish, run_with_events
+from download_reel_audio import download_audio_file
+
+AUDIO_BYTES = os.urandom(200 * 1024)
+
+
+class AudioHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(AUDIO_BYTES)))
+        self.end_headers()
+        self.wfile.write(AUDIO_BYTES)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_publish_goes_to_bound_job():
+    """Events published on a worker thread land on the bound job only"""
+    print("📣 Testing publish...")
+    job = JobStore().create('batch-generate-images', {})
+    publish("prompt_sent", line_no="001")  # no job bound: dropped
+    with bind_job(job):
+        publish("prompt_sent", line_no="002")
+    publish("prompt_sent", line_no="003")
+
+    assert [e['line_no'] for e in job.events] == ["002"]
+    assert job.events[0]['id'] == 0 and job.events[0]['type'] == "prompt_sent"
+    print("✅ Only the bound event recorded")
+
+
+def test_subprocess_events_relayed():
+    """EVENT lines from a script become job events and are removed from stdout"""
+    print("\n🔁 Testing subprocess relay...")
+    job = JobStore().create('download-reel-audio', {})
+    script = (
+        "import sys\n"
+        "from job_events import publish\n"
+        "publish('audio_saved', audio_number=1, bytes=10)\n"
+        "print('SUCCESS: done')\n"
+        "sys.stderr.write('log line\\n')\n"
+    )
+
+    result = run_with_events([sys.executable, "-c", script], job, timeout=30)
+
+    assert result.returncode == 0
+    assert result.stdout.strip() == "SUCCESS: done"
+    assert "log line" in result.stderr
+    assert job.events[0]['type'] == "audio_saved" and job.events[0]['bytes'] == 10
+    print("✅ Event relayed, stdout kept clean")
+
+
+def test_audio_download_publishes_speed():
+    """download_audio_file reports bytes and speed for the current job"""
+    print("\n🎵 Testing audio event...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        job = JobStore().create('download-reel-audio', {})
+        save_path = os.path.join(tempfile.mkdtemp(), "1.mp3")
+        with bind_job(job):
+            assert download_audio_file(f"http://127.0.0.1:{server.server_address[1]}/1.mp3", save_path, 1)
+
+        event = job.events[-1]
+        assert event['type'] == "audio_saved" and event['bytes'] == len(AUDIO_BYTES)
+        assert event['bytes_per_second'] > 0
+        print(f"✅ audio_saved at {event['bytes_per_second']:,} bytes/s")
+    finally:
+        server.shutdown()
+
+
+def test_sse_stream_follows_job():
+    """GET /jobs/<id>/events streams events live and ends when the job finishes"""
+    print("\n📡 Testing SSE stream...")
+    app = Flask(__name__)
+    app.register_blueprint(jobs_blueprint)
+    store = get_job_store()
+    job = store.create('upload-reel-to-dreamina', {'reel_number': 5})
+
+    def run_job():
+        store.start(job, stage="uploading pairs")
+        for pair in (1, 2):
+            time.sleep(0.05)
+            with bind_job(job):
+                publish("pair_submitted", pair_number=pair)
+        store.finish(job, {"success": True})
+
+    threading.Thread(target=run_job).start()
+    body = app.test_client().get(f"/jobs/{job.id}/events").get_data(as_text=True)
+
+    types = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert types == ["job_started", "pair_submitted", "pair_submitted", "job_finished", "end"]
+    last = [line for line in body.splitlines() if line.startswith("data: ")][-1]
+    assert json.loads(last[len("data: "):])['status'] == "succeeded"
+
+    # Reconnecting with Last-Event-ID only replays what was missed
+    resumed = app.test_client().get(f"/jobs/{job.id}/events", headers={"Last-Event-ID": "2"}).get_data(as_text=True)
+    assert [l for l in resumed.splitlines() if l.startswith("event: ")] == ["event: job_finished", "event: end"]
+    print("✅ Stream delivered every event and closed")
+
+
+def test_event_cap_keeps_finish():
+    """A chatty job drops middle events, never the terminal one; a negative Last-Event-ID replays everything"""
+    print("\n🧹 Testing the event cap...")
+    app = Flask(__name__)
+    app.register_blueprint(jobs_blueprint)
+    store = get_job_store()
+    job = store.create('batch-generate-images', {})
+    real_cap = job_store.MAX_JOB_EVENTS
+    job_store.MAX_JOB_EVENTS = 6
+    try:
+        store.start(job)
+        with bind_job(job):
+            for n in range(10):
+                publish("prompt_sent", line_no=f"{n:03d}")
+        store.finish(job, {"success": True})
+    finally:
+        job_store.MAX_JOB_EVENTS = real_cap
+
+    assert len(job.events) == 6
+    assert job.events[0]['type'] == "job_started" and job.events[-1]['type'] == "job_finished"
+    assert [e['id'] for e in job.events] == [0, 1, 2, 9, 10, 11]
+
+    body = app.test_client().get(f"/jobs/{job.id}/events", headers={"Last-Event-ID": "-5"}).get_data(as_text=True)
+    ids = [int(line[4:]) for line in body.splitlines() if line.startswith("id: ")]
+    assert ids == [0, 1, 2, 9, 10, 11]
+    resumed = app.test_client().get(f"/jobs/{job.id}/events", headers={"Last-Event-ID": "5"}).get_data(as_text=True)
+    assert [line for line in resumed.splitlines() if line.startswith("id: ")] == ["id: 9", "id: 10", "id: 11"]
+    print("✅ job_finished kept past the cap")
+
+
+if __name__ == "__main__":
+    test_publish_goes_to_bound_job()
+    test_subprocess_events_relayed()
+    test_audio_download_publishes_speed()
+    test_sse_stream_follows_job()
+    test_event_cap_keeps_finish()
+    print("\n🎉 All job event tests passed!")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for the asynchronous job API
+Uses a Flask test client and a local callback server - no browser needed
+"""
+
+import json
+import time
+import queue
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from flask import Flask
+
+import job_store
+from job_store import JobStore, WorkerState, get_job_store, jobs_blueprint
+
+
+class CallbackHandler(BaseHTTPRequestHandler):
+    """Collects the JSON bodies POSTed to it"""
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        CallbackHandler.received.append(json.loads(body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_job_lifecycle():
+    """A job moves queued -> running -> succeeded and keeps its result"""
+    print("🧾 Testing job lifecycle...")
+    store = JobStore()
+    first = store.create('download-reel-audio', {'reel_number': 1})
+    second = store.create('download-reel-audio', {'reel_number': 2})
+
+    assert store.queue_position(first) == 1 and store.queue_position(second) == 2
+    store.start(first, stage="downloading audio")
+    assert store.queue_position(first) == 0 and store.queue_position(second) == 1
+
+    store.update(first, done=3)
+    store.finish(first, {"success": True}, 200)
+    assert first.status == "succeeded" and first.progress == {"stage": "downloading audio", "done": 3}
+
+    store.finish(second, {"success": False, "error": "boom"}, 500)
+    assert second.status == "failed" and second.error == "boom"
+    print("✅ Statuses, progress and queue positions tracked")
+
+
+def test_wait_wakes_on_finish():
+    """A waiting thread is released as soon as the job finishes, not on a poll tick"""
+    print("\n⏰ Testing completion wake-up...")
+    store = JobStore()
+    job = store.create('generate-reel-images', {'reel_number': 1})
+    assert not job.wait(0.01)
+
+    finished_at = []
+    threading.Thread(target=lambda: (time.sleep(0.2), finished_at.append(time.time()), store.finish(job, {"success": True}))).start()
+    assert job.wait(5)
+    woke_after = time.time() - finished_at[0]
+
+    assert woke_after < 0.1, f"waiter woke {woke_after:.3f}s after finish"
+    print(f"✅ Waiter woke {woke_after * 1000:.1f} ms after finish")
+
+
+def test_worker_state_counts_running_jobs():
+    """is_processing stays true while any worker is still inside a job"""
+    print("\n🔒 Testing worker state...")
+    state = WorkerState()
+    with state.running():
+        with state.running():
+            assert state.active == 2
+        assert state.is_processing
+    assert not state.is_processing
+    print("✅ Running jobs counted under a lock")
+
+
+def test_finished_jobs_pruned():
+    """Only the newest finished jobs are kept"""
+    print("\n🧹 Testing pruning...")
+    store = JobStore(max_finished=2)
+    for n in range(4):
+        store.finish(store.create('x', {'n': n}), {"success": True})
+    store.create('x', {'n': 4})
+
+    assert sorted(job.params['n'] for job in store.list()) == [2, 3, 4]
+    print("✅ Oldest finished jobs dropped")
+
+
+def test_jobs_endpoint():
+    """GET /jobs/<id> returns the job, unknown ids are 404"""
+    print("\n🌐 Testing /jobs endpoint...")
+    app = Flask(__name__)
+    app.register_blueprint(jobs_blueprint)
+    client = app.test_client()
+    job = get_job_store().create('generate-reel-images', {'reel_number': 7})
+
+    response = client.get(f"/jobs/{job.id}")
+    assert response.status_code == 200
+    assert response.get_json()['status'] == "queued" and response.get_json()['queue_position'] >= 1
+    assert client.get("/jobs/nope").status_code == 404
+    print("✅ Job status served")
+
+
+def test_callback_posted():
+    """A finished job is POSTed to its callback URL"""
+    print("\n📮 Testing completion callback...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CallbackHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        store = JobStore()
+        job = store.create('upload-reel-to-dreamina', {'reel_number': 3},
+                           callback_url=f"http://127.0.0.1:{server.server_address[1]}/hook")
+        store.finish(job, {"success": True, "uploaded_pairs": 4})
+
+        deadline = time.time() + 5
+        while not CallbackHandler.received and time.time() < deadline:
+            time.sleep(0.05)
+        assert CallbackHandler.received[0]['job_id'] == job.id
+        assert CallbackHandler.received[0]['result']['uploaded_pairs'] == 4
+        print("✅ Callback received")
+    finally:
+        server.shutdown()
+
+
+def test_wait_is_bounded():
+    """A "wait": true request gets the 202 job body once the wait limit passes, on every server"""
+    print("\n⏳ Testing bounded wait...")
+    import chatgpt_image_api_server as whatsapp
+    import simple_http_server as images
+    import audio_download_api_server as audio
+
+    endpoints = [
+        (whatsapp, '/batch-generate-images', {"rows": [{"prompt": "a panda", "line_no": 1, "reel_no": "1"}]}),
+        (images, '/generate-reel-images', {"reel_number": "1"}),
+        (audio, '/download-reel-audio', {"reel_number": "1"}),
+    ]
+    real_limit = job_store.MAX_WAIT_SECONDS
+    job_store.MAX_WAIT_SECONDS = 0.1
+    try:
+        for server, path, body in endpoints:
+            real_queue = server.request_queue
+            server.request_queue = queue.Queue()  # no worker picks the job up
+            try:
+                started = time.time()
+                response = server.app.test_client().post(path, json=dict(body, wait=True))
+                assert time.time() - started < 5, path
+                result = response.get_json()
+                assert response.status_code == 202 and result['status'] == "queued", path
+                assert result['status_url'] == f"/jobs/{result['job_id']}"
+            finally:
+                server.request_queue = real_queue
+    finally:
+        job_store.MAX_WAIT_SECONDS = real_limit
+    print("✅ Wait gave up with the job id")
+
+
+if __name__ == "__main__":
+    test_job_lifecycle()
+    test_wait_wakes_on_finish()
+    test_worker_state_counts_running_jobs()
+    test_finished_jobs_pruned()
+    test_jobs_endpoint()
+    test_callback_posted()
+    test_wait_is_bounded()
+    print("\n🎉 All job API tests passed!")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for the load-test harness
+Runs a short load test against the stubbed gateway - no browser or scripts needed
+"""
+
+import simple_http_server
+import chatgpt_image_api_server
+from load_test_servers import arrival_schedule, parse_rates, percentiles, run_load_test
+
+
+def test_arrivals_are_seeded():
+    """Same seed, same schedule; rates set how many arrivals each endpoint gets"""
+    schedule = arrival_schedule({"audio": 20, "batch": 2}, duration=10, seed=4)
+    assert schedule == arrival_schedule({"audio": 20, "batch": 2}, duration=10, seed=4)
+    audio = sum(1 for _, name in schedule if name == "audio")
+    batch = sum(1 for _, name in schedule if name == "batch")
+    assert 140 < audio < 260 and batch < 50, (audio, batch)
+    assert all(0 <= offset < 10 for offset, _ in schedule)
+    assert parse_rates("audio=4,batch") == {"audio": 4.0, "batch": 1.0}
+    print("✅ Poisson arrivals are reproducible")
+
+
+def test_percentiles():
+    stats = percentiles([i / 100 for i in range(1, 101)])
+    assert stats["p50"] == 0.51 and stats["p95"] == 0.96 and stats["p99"] == 1.0 and stats["count"] == 100
+    assert percentiles([]) is None
+    print("✅ Percentiles computed")
+
+
+def test_short_load_run():
+    """Every endpoint accepts, queues and finishes its jobs; real workers are restored after"""
+    print("\n🔥 Running a 2s load test...")
+    real_script_runner = simple_http_server.run_with_events
+    real_batch = chatgpt_image_api_server.run_batch_in_whatsapp
+    report = run_load_test({"images": 3, "audio": 5, "dreamina": 3, "batch": 3}, duration=2,
+                           service_seconds=0.01, drain_seconds=30, seed=1)
+    assert report["requests"] > 0 and report["rejection_rate"] == 0
+    for name, endpoint in report["endpoints"].items():
+        if endpoint["requests"]:
+            assert endpoint["statuses"] == {"202": endpoint["requests"]}, (name, endpoint["statuses"])
+            assert endpoint["completed"] == endpoint["requests"], (name, endpoint)
+            assert endpoint["latency_seconds"]["p50"] <= endpoint["latency_seconds"]["p99"]
+            assert endpoint["service_seconds"]["count"] == endpoint["requests"]
+    assert report["process"]["threads"]["start"] > 0
+    assert simple_http_server.run_with_events is real_script_runner
+    assert chatgpt_image_api_server.run_batch_in_whatsapp is real_batch
+    print(f"✅ {report['requests']} requests completed, workers restored")
+
+
+if __name__ == "__main__":
+    test_arrivals_are_seeded()
+    test_percentiles()
+    test_short_load_run()
+    print("\n🎉 All load-test harness tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the metrics registry and /metrics output
+No browser or server needed
+"""
+
+from flask import Flask
+
+from metrics import MetricsRegistry, Counter, Gauge, Histogram, REGISTRY, metrics_blueprint, histogram
+
+
+def test_counter_and_gauge_render():
+    """Counters and gauges render with HELP/TYPE lines and labels"""
+    print("🔢 Testing counters and gauges...")
+    registry = MetricsRegistry()
+    jobs = registry.register(Counter, "test_jobs_total", "Jobs", ["status"])
+    depth = registry.register(Gauge, "test_queue_depth", "Depth")
+    jobs.labels(status="failed").inc()
+    jobs.labels(status="succeeded").inc(2)
+    depth.set_function(lambda: 7)
+
+    text = registry.render()
+
+    assert "# TYPE test_jobs_total counter" in text
+    assert 'test_jobs_total{status="succeeded"} 2' in text
+    assert "test_queue_depth 7" in text
+    print("✅ Rendered in Prometheus text format")
+
+
+def test_histogram_buckets_are_cumulative():
+    """Histogram buckets count cumulatively and end with +Inf, _sum and _count"""
+    print("\n📊 Testing histogram...")
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram, "test_seconds", "Latency", ["step"], buckets=(1, 5))
+    for value in (0.5, 2, 3, 10):
+        latency.labels(step="upload_image").observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert 'test_seconds_bucket{step="upload_image",le="1"} 1' in lines
+    assert 'test_seconds_bucket{step="upload_image",le="5"} 3' in lines
+    assert 'test_seconds_bucket{step="upload_image",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{step="upload_image"} 15.5' in lines
+    assert 'test_seconds_count{step="upload_image"} 4' in lines
+    print("✅ Buckets, sum and count correct")
+
+
+def test_timer_as_decorator_and_block():
+    """time() works on functions and with-blocks, and re-declaring returns the same metric"""
+    print("\n⏱️ Testing timers...")
+    registry = MetricsRegistry()
+    step = registry.register(Histogram, "test_step_seconds", "Step", ["step"])
+    assert registry.register(Histogram, "test_step_seconds", "Step", ["step"]) is step
+
+    @step.time(step="submit")
+    def submit():
+        return "ok"
+
+    assert submit() == "ok" and submit() == "ok"
+    with step.time(step="wait"):
+        pass
+
+    assert step.labels(step="submit").count == 2
+    assert step.labels(step="wait").count == 1
+    try:
+        step.labels(other="x")
+        assert False, "wrong labels should raise"
+    except ValueError:
+        pass
+    print("✅ Timers observed every call")
+
+
+def test_metrics_endpoint():
+    """GET /metrics serves the process registry"""
+    print("\n🌐 Testing /metrics endpoint...")
+    histogram("test_endpoint_seconds", "Endpoint test").observe(0.2)
+    app = Flask(__name__)
+    app.register_blueprint(metrics_blueprint)
+
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    assert "test_endpoint_seconds_count 1" in response.get_data(as_text=True)
+    assert REGISTRY.metrics["test_endpoint_seconds"].labels().count == 1
+    print("✅ Registry served")
+
+
+if __name__ == "__main__":
+    test_counter_and_gauge_render()
+    test_histogram_buckets_are_cumulative()
+    test_timer_as_decorator_and_block()
+    test_metrics_endpoint()
+    print("\n🎉 All metrics tests passed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for pipelined multi-tab Dreamina submissions
+Uses fake tabs in place of AI Avatar pages - no browser needed
+"""
+
+import queue
+
+import dreamina_upload_api_server as dreamina
+from dreamina_upload_api_server import MultiTabSubmitter, MAX_TAB_COUNT, MAX_TRACK_SECONDS
+
+
+class FakePage:
+    def __init__(self, tab):
+        self.tab = tab
+
+    def bring_to_front(self):
+        pass
+
+    def wait_for_timeout(self, ms):
+        # One event-loop turn: every submitted tab gets one check closer to being accepted
+        for tab in self.tab.root.all_tabs:
+            if tab.pending_checks:
+                tab.pending_checks -= 1
+
+
+class FakeTracker:
+    def submitted_task(self, page):
+        tab = page.tab
+        return f"task-{tab.submitted[-1]}" if tab.submitted and not tab.pending_checks else None
+
+
+class FakeTab:
+    """One AI Avatar tab; `accept_after` maps pair number -> checks before Dreamina accepts it"""
+
+    def __init__(self, root=None, accept_after=None, error_pairs=(), broken_tabs=()):
+        self.root = root or self
+        if root is None:
+            self.all_tabs = []
+            self.accept_after = accept_after or {}
+            self.error_pairs = set(error_pairs)
+            self.broken_tabs = set(broken_tabs)
+            self.recorded = []
+            self.reel_number = "9"
+        self.root.all_tabs.append(self)
+        self.id = len(self.root.all_tabs)
+        self.page = FakePage(self)
+        self.tracker = FakeTracker()
+        self.submitted = []
+        self.pending_checks = 0
+        self.closed = False
+
+    def open_tab(self):
+        return FakeTab(root=self)
+
+    def open_ai_avatar_form(self):
+        return self.id not in self.root.broken_tabs
+
+    def submit_file_pair(self, image, audio, number):
+        self.submitted.append(number)
+        self.pending_checks = self.root.accept_after.get(number, 1)
+        return True, "submitted"
+
+    def check_for_errors(self):
+        if self.submitted and self.submitted[-1] in self.root.error_pairs:
+            return True, "Too many requests"
+        return False, None
+
+    def report_progress(self, **progress):
+        pass
+
+    def record_pair(self, pair_number, success, status_message, task_id=None, files=None):
+        self.recorded.append((pair_number, success, task_id))
+
+    def close(self):
+        self.closed = True
+
+
+def pairs(count):
+    return [{'number': n, 'image': f"/reel/Images/{n}.png", 'audio': f"/reel/Audio/{n}.mp3"} for n in range(1, count + 1)]
+
+
+def test_pairs_fan_out_and_merge_in_order():
+    """Pairs spread over every tab, finish out of order and come back sorted by pair number"""
+    print("\n🗂️ Testing tab fan-out...")
+    # Pair 1 is slow to be accepted, so later pairs on other tabs finish first
+    root = FakeTab(accept_after={1: 4, 2: 1, 3: 2, 4: 1, 5: 1}, error_pairs={3})
+    results = MultiTabSubmitter(root, tab_count=3, max_tab_errors=5).run(pairs(5))
+
+    assert [r['pair_number'] for r in results] == [1, 2, 3, 4, 5]
+    assert [r['success'] for r in results] == [True, True, False, True, True]
+    assert results[2]['status'] == "Too many requests"
+    # Free tabs take the next pair while tab 1 still waits on pair 1
+    assert [tab.submitted for tab in root.all_tabs] == [[1], [2, 5], [3, 4]]
+    assert [r['tab'] for r in results] == [1, 2, 3, 3, 2]
+    assert [number for number, _, _ in root.recorded] == [3, 2, 4, 5, 1]
+    assert root.recorded[0] == (3, False, None) and root.recorded[-1] == (1, True, "task-1")
+    assert all(tab.closed for tab in root.all_tabs[1:]) and not root.closed
+    print("✅ 3 tabs used, results merged in pair order")
+
+
+def test_tab_that_cannot_open_is_skipped():
+    """A tab whose form fails to open is closed and the others carry its pairs"""
+    root = FakeTab(broken_tabs={2})
+    results = MultiTabSubmitter(root, tab_count=3).run(pairs(4))
+    assert [r['pair_number'] for r in results] == [1, 2, 3, 4] and all(r['success'] for r in results)
+    assert {r['tab'] for r in results} == {1, 3}
+    print("✅ Broken tab skipped")
+
+
+def test_tab_count_bounded():
+    """Tab counts are clamped to MAX_TAB_COUNT, and bad values are refused with a 400"""
+    assert MultiTabSubmitter(FakeTab(), tab_count=50).tab_count == MAX_TAB_COUNT
+    client = dreamina.app.test_client()
+    for tabs in ("three", 0, -2, None):
+        response = client.post('/upload-reel-to-dreamina', json={"reel_number": "9", "tabs": tabs})
+        assert response.status_code == 400, tabs
+        assert "'tabs'" in response.get_json()["error"]
+    print("✅ Tab count validated")
+
+
+def test_track_seconds_bounded():
+    """Bad track_seconds values are refused with a 400, and huge ones are clamped to MAX_TRACK_SECONDS"""
+    client = dreamina.app.test_client()
+    for track_seconds in ("forever", -1, None, [60]):
+        response = client.post('/upload-reel-to-dreamina', json={"reel_number": "9", "track_seconds": track_seconds})
+        assert response.status_code == 400, track_seconds
+        assert "'track_seconds'" in response.get_json()["error"]
+
+    real_queue = dreamina.request_queue
+    dreamina.request_queue = queue.Queue()  # no worker picks the job up
+    try:
+        response = client.post('/upload-reel-to-dreamina', json={"reel_number": "9", "track_seconds": 10 ** 9})
+        assert response.status_code == 202
+        assert dreamina.request_queue.get_nowait().params['track_seconds'] == MAX_TRACK_SECONDS
+    finally:
+        dreamina.request_queue = real_queue
+    print("✅ Tracking time validated")
+
+
+if __name__ == "__main__":
+    test_pairs_fan_out_and_merge_in_order()
+    test_tab_that_cannot_open_is_skipped()
+    test_tab_count_bounded()
+    test_track_seconds_bounded()
+    print("\n🎉 All multi-tab submitter tests passed!")
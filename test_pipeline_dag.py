@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the stage DAG executor
+Uses sleeping fake stages - no browser or network needed
+"""
+
+import time
+import threading
+
+from pipeline_dag import PipelineDAG
+
+
+def build_fake_reel(dag, lines, events, image_delay=0.05, audio_delay=0.02, upload_delay=0.01):
+    """Same shape as main.build_reel_dag with sleeps instead of WhatsApp/Drive/Dreamina"""
+    lock = threading.Lock()
+    running = {"audio": 0, "dreamina": 0}
+    peaks = {"audio": 0, "dreamina": 0}
+    threads = set()
+
+    def track(stage, delay, name):
+        with lock:
+            running[stage] += 1
+            peaks[stage] = max(peaks[stage], running[stage])
+            events.append((time.time(), "start", name))
+        time.sleep(delay)
+        with lock:
+            running[stage] -= 1
+            events.append((time.time(), "end", name))
+        return name
+
+    image_tasks = []
+    for line in lines:
+        image_tasks.append(dag.add(f"image:{line}", "images").name)
+        dag.add(f"audio:{line}", "audio", lambda line=line: track("audio", audio_delay, f"audio:{line}"))
+
+        def upload(line=line):
+            threads.add(threading.current_thread().name)
+            return track("dreamina", upload_delay, f"dreamina:{line}")
+
+        dag.add(f"dreamina:{line}", "dreamina", upload, deps=[f"image:{line}", f"audio:{line}"])
+
+    def generate_images():
+        for line in lines:
+            time.sleep(image_delay)
+            events.append((time.time(), "end", f"image:{line}"))
+            dag.complete(f"image:{line}", f"images/{line}.png")
+
+    dag.add("images:batch", "images", generate_images, produces=image_tasks)
+    return peaks, threads
+
+
+def test_dreamina_starts_before_images_finish():
+    """Line 1 is submitted while later images are still rendering"""
+    print("🕸️ Testing overlapping stages...")
+    events = []
+    lines = [f"{n:03d}" for n in range(1, 7)]
+    dag = PipelineDAG({"images": 1, "audio": 3, "dreamina": 1})
+    peaks, threads = build_fake_reel(dag, lines, events)
+
+    start = time.time()
+    summary = dag.run(timeout=10)
+    elapsed = time.time() - start
+    dag.shutdown()
+
+    assert summary["success"], summary
+    assert summary["stages"]["dreamina"]["succeeded"] == 6
+    first_upload = min(t for t, kind, name in events if kind == "start" and name.startswith("dreamina"))
+    last_image = max(t for t, kind, name in events if kind == "end" and name.startswith("image"))
+    assert first_upload < last_image, "Dreamina should start before the last image lands"
+
+    # Audio ran on its bounded pool, Dreamina one at a time on one thread
+    assert 1 < peaks["audio"] <= 3 and peaks["dreamina"] == 1
+    assert len(threads) == 1
+    # Close to the image batch alone (6 × 0.05s) instead of the sum of all stages
+    print(f"   {elapsed:.2f}s for 6 lines")
+    assert elapsed < 0.6
+    print("✅ Stages overlapped within their limits")
+
+
+def test_failures_skip_downstream():
+    """A failed audio download skips only that line's Dreamina task"""
+    print("\n⏭️ Testing failure propagation...")
+    dag = PipelineDAG({"audio": 2})
+    dag.add("image:001", "images")
+    dag.add("image:002", "images")
+    dag.add("audio:001", "audio", lambda: "ok")
+
+    def broken():
+        raise RuntimeError("HTTP 404")
+
+    dag.add("audio:002", "audio", broken)
+    dag.add("dreamina:001", "dreamina", lambda: "sent", deps=["image:001", "audio:001"])
+    dag.add("dreamina:002", "dreamina", lambda: "sent", deps=["image:002", "audio:002"])
+    # The batch only manages line 1; line 2's image is failed for it
+    dag.add("images:batch", "images", lambda: dag.complete("image:001", "1.png"),
+            produces=["image:001", "image:002"])
+
+    summary = dag.run(timeout=5)
+    dag.shutdown()
+    tasks = summary["tasks"]
+    assert not summary["success"]
+    assert tasks["dreamina:001"]["status"] == "succeeded"
+    assert tasks["audio:002"]["status"] == "failed" and tasks["audio:002"]["error"] == "HTTP 404"
+    assert tasks["image:002"]["status"] == "failed"
+    assert tasks["dreamina:002"]["status"] == "skipped"
+    print("✅ Line 2 skipped, line 1 submitted")
+
+
+def test_unknown_dependency_rejected():
+    print("\n🚫 Testing validation...")
+    dag = PipelineDAG()
+    dag.add("dreamina:001", "dreamina", lambda: None, deps=["image:001"])
+    try:
+        dag.run()
+        assert False, "Expected ValueError"
+    except ValueError as e:
+        assert "image:001" in str(e)
+    print("✅ Unknown dependency rejected")
+
+
+if __name__ == "__main__":
+    test_dreamina_starts_before_images_finish()
+    test_failures_skip_downstream()
+    test_unknown_dependency_rejected()
+    print("\n🎉 All pipeline DAG tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared pipeline scheduler
+Runs fake jobs on threads - no browser or server needed
+"""
+
+import time
+import threading
+
+from pipeline_scheduler import PipelineScheduler
+
+
+def run_jobs(scheduler, jobs, hold=0.2):
+    """Run each (name, resources) job on its own thread and return the peak overlap per job pair"""
+    running = set()
+    overlaps = set()
+    lock = threading.Lock()
+
+    def work(name, resources):
+        with scheduler.slot(*resources):
+            with lock:
+                overlaps.update(frozenset((name, other)) for other in running)
+                running.add(name)
+            time.sleep(hold)
+            with lock:
+                running.discard(name)
+
+    threads = [threading.Thread(target=work, args=job) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return overlaps
+
+
+def test_browser_jobs_serialised():
+    """Browser jobs from different endpoints never run together"""
+    print("🚦 Testing shared browser lane...")
+    scheduler = PipelineScheduler({"whatsapp": 1, "dreamina": 1, "downloads": 2, "browser": 1})
+
+    overlaps = run_jobs(scheduler, [
+        ("images", ("whatsapp", "browser")),
+        ("dreamina", ("dreamina", "browser")),
+        ("audio", ("downloads",)),
+    ])
+
+    assert frozenset(("images", "dreamina")) not in overlaps
+    assert any("audio" in pair for pair in overlaps), "downloads should run alongside a browser job"
+    assert scheduler.status()["browser"]["completed"] == 2
+    print("✅ Browser jobs took turns, downloads ran alongside")
+
+
+def test_lane_limits():
+    """A lane with limit 2 lets two jobs in at once but not three"""
+    print("\n🔢 Testing lane limit...")
+    scheduler = PipelineScheduler({"downloads": 2})
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with scheduler.slot("downloads"):
+            with lock:
+                peak.append(scheduler.status()["downloads"]["running"])
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=work) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    print("✅ At most 2 downloads at once")
+
+
+def test_no_deadlock_on_overlapping_lanes():
+    """Jobs asking for the same lanes in opposite order still finish"""
+    print("\n🔁 Testing lane ordering...")
+    scheduler = PipelineScheduler({"whatsapp": 1, "browser": 1})
+    threads = [
+        threading.Thread(target=run_jobs, args=(scheduler, [("a", ("whatsapp", "browser"))], 0.05)),
+        threading.Thread(target=run_jobs, args=(scheduler, [("b", ("browser", "whatsapp"))], 0.05)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    print("✅ No deadlock")
+
+
+if __name__ == "__main__":
+    test_browser_jobs_serialised()
+    test_lane_limits()
+    test_no_deadlock_on_overlapping_lanes()
+    print("\n🎉 All scheduler tests passed!")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive per-service rate governors
+Uses a fake clock - no browser, network or real waiting needed
+"""
+
+import os
+import tempfile
+
+from flask import Flask
+
+import rate_governor
+import chatgpt_image_api_server as whatsapp
+from bench_hot_paths import FakeChatPage, _NoSleep, chat_prompts
+from rate_governor import RateGovernor, governors_blueprint, get_governor
+from stage_ledger import StageLedger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(round(seconds, 3))
+        self.now += seconds
+
+
+def make_governor(clock, **settings):
+    options = dict(interval=10, min_interval=2, max_interval=80, increase=0.01)
+    options.update(settings)
+    return RateGovernor("test", clock=clock, sleep=clock.sleep, **options)
+
+
+def test_clean_replies_speed_up():
+    """Each clean reply shortens the gap until the floor"""
+    print("🚀 Testing additive increase...")
+    clock = FakeClock()
+    governor = make_governor(clock)
+
+    assert governor.wait() == 0, "The first request goes straight out"
+    assert governor.wait() == 10
+    for _ in range(10):
+        governor.success()
+    assert abs(governor.interval - 5) < 1e-9, governor.interval
+    for _ in range(100):
+        governor.success()
+    assert abs(governor.interval - 2) < 1e-9, "Never faster than min_interval"
+    print("✅ Gap went 10s -> 5s -> 2s")
+
+
+def test_errors_back_off():
+    """An error halves the rate and delays the next request by the new gap"""
+    print("\n🐢 Testing multiplicative decrease...")
+    clock = FakeClock()
+    governor = make_governor(clock)
+
+    governor.wait()
+    clock.now += 10
+    governor.backoff("Sorry, I can't generate that image")
+    assert governor.interval == 20
+    assert governor.wait() == 20, "The next request waits out the new gap"
+    for _ in range(10):
+        governor.backoff()
+    assert governor.interval == 80, "Never slower than max_interval"
+
+    status = governor.status()
+    assert status["backoffs"] == 11 and status["interval_seconds"] == 80
+    assert status["last_backoff"]["reason"] is None
+    print("✅ Gap doubled per error, capped at 80s")
+
+
+def test_governors_endpoint():
+    """Dashboards can read every service's pace"""
+    print("\n📊 Testing /governors...")
+    # Start from fresh governors; other tests' downloads may have sped WhatsApp up
+    with rate_governor._governors_lock:
+        rate_governor._governors.clear()
+    app = Flask(__name__)
+    app.register_blueprint(governors_blueprint)
+    response = app.test_client().get('/governors')
+    data = response.get_json()
+    assert response.status_code == 200 and data["success"]
+    assert set(data["governors"]) == {"whatsapp", "drive", "dreamina"}
+    assert data["governors"]["whatsapp"]["interval_seconds"] == 10
+    print("✅ /governors lists whatsapp, drive and dreamina")
+
+
+class FakeReplyPage:
+    """Chat replies for wait_for_replies: every reply has arrived"""
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def evaluate(self, script, start):
+        return self.texts[start:] if "innerText" in script else len(self.texts[start:])
+
+
+def test_whatsapp_batch_path_signals_governor():
+    """The server's batch path backs off on refusals and speeds up on downloaded images"""
+    print("\n🚦 Testing governor signals on the batch path...")
+    with rate_governor._governors_lock:
+        rate_governor._governors.clear()
+    governor = get_governor("whatsapp")
+    page = FakeReplyPage(["old", "", "Sorry, I can't generate that image.", ""])
+    assert whatsapp.wait_for_replies(page, 1, 3, wait_minutes=1)
+    assert governor.backoffs == 1 and governor.successes == 0
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            os.makedirs("downloads")
+            chat = FakeChatPage(10, 2, downloads_dir=os.path.abspath("downloads"))
+            with _NoSleep():
+                whatsapp.download_replies_bottom_up(chat, chat_prompts(2), StageLedger("ledger.db"))
+        finally:
+            os.chdir(cwd)
+    assert governor.successes == 2
+    with rate_governor._governors_lock:
+        rate_governor._governors.clear()
+    print("✅ Refusal backed off, downloads counted as clean replies")
+
+
+if __name__ == "__main__":
+    test_clean_replies_speed_up()
+    test_errors_back_off()
+    test_governors_endpoint()
+    test_whatsapp_batch_path_signals_governor()
+    print("\n🎉 All rate governor tests passed!")
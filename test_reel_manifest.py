@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for manifest-driven image/audio pairing
+Builds throwaway reel directories - no browser or server needed
+"""
+
+import os
+import time
+import tempfile
+
+from reel_manifest import pair_files, parse_line_number, record_file, load_manifest
+
+
+def make_reel(image_names, audio_names):
+    base = tempfile.mkdtemp()
+    images_dir = os.path.join(base, "Images")
+    audio_dir = os.path.join(base, "Audio")
+    os.makedirs(images_dir)
+    os.makedirs(audio_dir)
+    for name in image_names:
+        with open(os.path.join(images_dir, name), 'wb') as f:
+            f.write(b"png")
+    for name in audio_names:
+        with open(os.path.join(audio_dir, name), 'wb') as f:
+            f.write(b"mp3")
+    return images_dir, audio_dir
+
+
+def test_parse_line_number():
+    """Numeric stems are parsed exactly, with zero padding and prefixes"""
+    print("🔢 Testing line number parsing...")
+    assert parse_line_number("7.png") == 7
+    assert parse_line_number("007.mp3") == 7
+    assert parse_line_number("image_12.png") == 12
+    assert parse_line_number("cover.png") is None
+    print("✅ Line numbers parsed")
+
+
+def test_no_substring_matches():
+    """Line 1 pairs with 1.png/1.mp3, never with 10.png or 11.mp3"""
+    print("\n🔗 Testing exact pairing...")
+    images_dir, audio_dir = make_reel(
+        ["1.png", "10.png", "11.png"],
+        ["11.mp3", "10.mp3", "1.mp3"]
+    )
+
+    pairs = pair_files(images_dir, audio_dir)
+
+    assert [p['number'] for p in pairs] == [1, 10, 11]
+    for pair in pairs:
+        assert parse_line_number(pair['image']) == parse_line_number(pair['audio']) == pair['number']
+    print("✅ Every pair matches on its exact line number")
+
+
+def test_missing_file_only_drops_its_pair():
+    """A missing audio file drops one pair instead of shifting the rest"""
+    print("\n🕳️ Testing missing file...")
+    images_dir, audio_dir = make_reel(["1.png", "2.png", "3.png"], ["1.mp3", "3.mp3"])
+
+    pairs = pair_files(images_dir, audio_dir)
+
+    assert [(p['number'], os.path.basename(p['audio'])) for p in pairs] == [(1, "1.mp3"), (3, "3.mp3")]
+    print("✅ Pair 2 dropped, pair 3 intact")
+
+
+def test_manifest_takes_precedence():
+    """When a manifest exists, its entries define the line numbers"""
+    print("\n📋 Testing manifest pairing...")
+    images_dir, audio_dir = make_reel(["a.png", "b.png"], ["1.mp3", "2.mp3"])
+    record_file(images_dir, 1, os.path.join(images_dir, "b.png"))
+    record_file(images_dir, 2, os.path.join(images_dir, "a.png"))
+
+    manifest = load_manifest(images_dir)
+    assert manifest[1]['size'] == 3 and len(manifest[1]['sha256']) == 64
+
+    pairs = pair_files(images_dir, audio_dir)
+    assert [os.path.basename(p['image']) for p in pairs] == ["b.png", "a.png"]
+    print("✅ Manifest entries used for pairing")
+
+
+def test_unrecorded_files_still_pair():
+    """Files saved before the manifest existed pair alongside the recorded ones"""
+    images_dir, audio_dir = make_reel(["1.png", "2.png", "3.png"], ["1.mp3", "2.mp3", "3.mp3"])
+    record_file(images_dir, 3, os.path.join(images_dir, "3.png"))
+
+    pairs = pair_files(images_dir, audio_dir)
+    assert [p['number'] for p in pairs] == [1, 2, 3]
+    print("✅ Manifest adds to the scan instead of replacing it")
+
+
+def test_pairs_carry_sheet_line():
+    """A file numbered by its place in the reel keeps the sheet line it was recorded with"""
+    images_dir, audio_dir = make_reel(["1.png", "2.png"], ["1.mp3", "2.mp3"])
+    record_file(images_dir, 1, os.path.join(images_dir, "1.png"), line_no="017")
+    record_file(audio_dir, 1, os.path.join(audio_dir, "1.mp3"), line_no="017")
+
+    pairs = pair_files(images_dir, audio_dir)
+    assert [(p['number'], p['line_no']) for p in pairs] == [(1, "017"), (2, "2")]
+    assert load_manifest(images_dir)[1]['line_no'] == "017"
+    print("✅ Sheet line carried on each pair")
+
+
+def test_malformed_manifest_falls_back_to_scan():
+    """A hand-edited manifest with a non-numeric key is ignored instead of breaking the reel"""
+    print("\n🩹 Testing malformed manifest...")
+    images_dir, audio_dir = make_reel(["1.png", "2.png"], ["1.mp3", "2.mp3"])
+    for content in ('{"1a": {"path": "1.png"}}', '["1.png"]', '{"1": "1.png"}'):
+        with open(os.path.join(images_dir, "manifest.json"), 'w') as f:
+            f.write(content)
+        assert load_manifest(images_dir) is None, content
+        assert [p['number'] for p in pair_files(images_dir, audio_dir)] == [1, 2]
+
+    # Recording a file replaces the bad manifest; a bad line number is skipped
+    record_file(images_dir, 2, os.path.join(images_dir, "2.png"))
+    record_file(images_dir, "two", os.path.join(images_dir, "2.png"))
+    assert list(load_manifest(images_dir)) == [2]
+    print("✅ Bad manifest ignored, directory scan used")
+
+
+def test_large_reel_is_instant():
+    """Pairing a 1,000-line reel stays well under a second"""
+    print("\n⚡ Testing large reel...")
+    count = 1000
+    images_dir, audio_dir = make_reel(
+        [f"{i}.png" for i in range(1, count + 1)],
+        [f"{i}.mp3" for i in range(1, count + 1)]
+    )
+
+    start = time.time()
+    pairs = pair_files(images_dir, audio_dir)
+    elapsed = time.time() - start
+
+    assert len(pairs) == count
+    assert elapsed < 1.0, f"pairing took {elapsed:.2f}s"
+    print(f"✅ Paired {count} lines in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    test_parse_line_number()
+    test_no_substring_matches()
+    test_missing_file_only_drops_its_pair()
+    test_manifest_takes_precedence()
+    test_unrecorded_files_still_pair()
+    test_pairs_carry_sheet_line()
+    test_malformed_manifest_falls_back_to_scan()
+    test_large_reel_is_instant()
+    print("\n🎉 All pairing tests passed!")
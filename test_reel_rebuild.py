@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for fingerprinted incremental rebuild plans
+Uses a temporary ledger and a local HTTP server for audio ETags - no browser needed
+"""
+
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import stage_ledger
+from stage_ledger import StageLedger, text_fingerprint, files_fingerprint
+from reel_rebuild import plan_reel, format_plan
+
+etags = {"/1.mp3": '"v1"', "/2.mp3": '"v1"'}
+heads = []
+
+
+class AudioHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        heads.append(self.path)
+        self.send_response(200)
+        self.send_header("ETag", etags[self.path])
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def build_line(ledger, row, image_fingerprint=None):
+    """Record a finished line the way the stages would"""
+    from main import line_image_path, line_audio_path
+    from download_reel_audio import audio_source_fingerprint
+
+    image_path, audio_path = line_image_path(row), line_audio_path(row)
+    for path, content in ((image_path, row["prompt"]), (audio_path, row["audio_link"])):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    ledger.succeed(row["reel_no"], row["line_no"], "image", image_path,
+                   fingerprint=image_fingerprint or text_fingerprint(row["prompt"]))
+    ledger.succeed(row["reel_no"], row["line_no"], "audio", audio_path,
+                   fingerprint=audio_source_fingerprint(row["audio_link"]))
+    ledger.succeed(row["reel_no"], row["line_no"], "dreamina", detail="task",
+                   fingerprint=files_fingerprint(image_path, audio_path))
+
+
+def rebuilds(plan):
+    return sorted((step["line_no"], step["stage"]) for step in plan if step["rebuild"])
+
+
+def test_plan_rebuilds_only_changed_inputs():
+    """A prompt edit rebuilds one image and one submission; a new ETag rebuilds one audio and one submission"""
+    print("🔨 Testing rebuild plan...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            ledger = StageLedger(os.path.join(directory, "ledger.db"))
+            rows = [
+                {"reel_no": "5", "line_no": "001", "prompt": "a panda eating tofu", "audio_link": f"{base}/1.mp3"},
+                {"reel_no": "5", "line_no": "002", "prompt": "a panda lifting", "audio_link": f"{base}/2.mp3"},
+            ]
+
+            assert len(rebuilds(plan_reel(rows, ledger))) == 6, "Nothing built yet"
+            for row in rows:
+                build_line(ledger, row)
+            del heads[:]
+            assert rebuilds(plan_reel(rows, ledger)) == []
+            assert heads == [], "planning from the ledger makes no requests"
+            assert rebuilds(plan_reel(rows, ledger, refresh_audio=True)) == []
+            assert len(heads) == 2
+
+            rows[0]["prompt"] = "a panda eating tempeh"
+            plan = plan_reel(rows, ledger)
+            print(format_plan(plan))
+            assert rebuilds(plan) == [("001", "dreamina"), ("001", "image")]
+            assert [s["reason"] for s in plan if s["rebuild"]] == ["inputs changed", "image changes"]
+
+            rows[0]["prompt"] = "a panda eating tofu"
+            etags["/2.mp3"] = '"v2"'
+            # Only a refreshed plan asks the source; the default plan goes by the ledger
+            assert rebuilds(plan_reel(rows, ledger)) == []
+            assert rebuilds(plan_reel(rows, ledger, refresh_audio=True)) == [("002", "audio"), ("002", "dreamina")]
+            etags["/2.mp3"] = '"v1"'
+
+            # Deleting an output rebuilds it too
+            from main import line_image_path
+            os.remove(line_image_path(rows[1]))
+            plan = plan_reel(rows, ledger)
+            assert rebuilds(plan) == [("002", "dreamina"), ("002", "image")]
+            assert "output missing" in format_plan(plan)
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+    print("✅ Only lines with changed inputs are rebuilt")
+
+
+def test_plan_matches_reference_image_batches():
+    """Images generated against a style reference are up to date in the plan until the reference changes"""
+    from chatgpt_image_api_server import ReferenceImageSession
+
+    print("\n🖼️ Testing rebuild plan with a reference image...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            ledger = StageLedger(os.path.join(directory, "ledger.db"))
+            reference = os.path.join(directory, "panda.png")
+            with open(reference, "wb") as f:
+                f.write(b"panda v1")
+            row = {"reel_no": "6", "line_no": "001", "prompt": "a panda eating tofu",
+                   "audio_link": f"http://127.0.0.1:{server.server_port}/1.mp3"}
+            # The fingerprint run_batch_in_whatsapp records with a reference set
+            build_line(ledger, row, ReferenceImageSession(reference).fingerprint(row["prompt"]))
+
+            assert rebuilds(plan_reel([row], ledger, reference_image=reference)) == []
+            with open(reference, "wb") as f:
+                f.write(b"panda v2")
+            assert rebuilds(plan_reel([row], ledger, reference_image=reference)) == [("001", "dreamina"), ("001", "image")]
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+    print("✅ Reference-image lines planned with the batch's fingerprint")
+
+
+def test_audio_version_from_drive_metadata():
+    """Drive audio is versioned by its checksum; an unknown version is stale, never unchanged"""
+    import download_reel_audio
+    from run_simulation import LocalServer
+    from sim_drive import FakeDrive
+
+    print("\n🎵 Testing Drive audio fingerprints...")
+    drive = FakeDrive(seed=3, file_bytes=512)
+    link = drive.add_file("drive1")
+    settings = download_reel_audio.DRIVE_API_URL, download_reel_audio.DRIVE_API_KEY
+    cwd = os.getcwd()
+    with LocalServer(drive.create_app()) as drive_server, tempfile.TemporaryDirectory() as directory:
+        download_reel_audio.DRIVE_API_URL = drive_server.url + "/drive/v3"
+        download_reel_audio.DRIVE_API_KEY = "test-key"
+        os.chdir(directory)
+        try:
+            ledger = StageLedger(os.path.join(directory, "ledger.db"))
+            row = {"reel_no": "7", "line_no": "001", "prompt": "a panda", "audio_link": link}
+            build_line(ledger, row)
+            assert rebuilds(plan_reel([row], ledger, refresh_audio=True)) == []
+
+            drive.add_file("drive1", b"ID3 re-recorded line")
+            assert rebuilds(plan_reel([row], ledger, refresh_audio=True)) == [("001", "audio"), ("001", "dreamina")]
+
+            # Without metadata (no key, or Drive unreachable) the audio is marked stale
+            download_reel_audio.DRIVE_API_KEY = ""
+            assert download_reel_audio.audio_source_fingerprint(link) is None
+            plan = plan_reel([row], ledger, refresh_audio=True)
+            assert rebuilds(plan) == [("001", "audio"), ("001", "dreamina")]
+            assert "source version unknown" in format_plan(plan)
+            assert download_reel_audio.audio_source_fingerprint("http://127.0.0.1:9/1.mp3") is None
+
+            # Audio recorded without a version stays stale even in a plan that doesn't refresh
+            build_line(ledger, row)
+            assert ledger.get("7", "001", "audio")["fingerprint"] is None
+            assert rebuilds(plan_reel([row], ledger)) == [("001", "audio"), ("001", "dreamina")]
+        finally:
+            os.chdir(cwd)
+            download_reel_audio.DRIVE_API_URL, download_reel_audio.DRIVE_API_KEY = settings
+    assert drive.stats()["downloads"] == 0
+    print("✅ Checksum changes rebuild; unknown versions don't")
+
+
+if __name__ == "__main__":
+    test_plan_rebuilds_only_changed_inputs()
+    test_plan_matches_reference_image_batches()
+    test_audio_version_from_drive_metadata()
+    print("\n🎉 All rebuild tests passed!")
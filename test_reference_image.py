@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the session-level style reference image
+Uses a fake chat page and uploader - no browser needed
+"""
+
+import os
+import time
+import tempfile
+
+import chatgpt_image_api_server as whatsapp
+from chatgpt_image_api_server import REFERENCE_PREFIX, ReferenceImageSession, upload_reference_image
+
+
+class FakeKeyboard:
+    def __init__(self):
+        self.typed = []
+
+    def type(self, text):
+        self.typed.append(text)
+
+
+class FakeAttachPage:
+    """Attach menu and media preview; sending the image adds ChatGPT's reply"""
+
+    def __init__(self, replies=True):
+        self.keyboard = FakeKeyboard()
+        self.replies = replies
+        self.messages = ["earlier reply"]
+        self.files = []
+        self.clicks = []
+
+    def click(self, selector, timeout=None):
+        if selector == "span[data-icon='plus-rounded']":
+            raise TimeoutError("not in this WhatsApp version")
+        self.clicks.append(selector)
+        if selector == whatsapp.MEDIA_SEND_SELECTOR and self.replies:
+            self.messages.append("Got it, I'll match this style.")
+
+    def set_input_files(self, selector, path):
+        self.files.append((selector, path))
+
+    def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    def query_selector_all(self, selector):
+        return list(self.messages)
+
+
+def write_reference(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_upload_waits_for_acknowledgement():
+    """The image goes through the attach menu with its caption, and the reply is awaited"""
+    print("\n🖼️ Testing the reference upload...")
+    page = FakeAttachPage()
+    assert upload_reference_image(page, "panda.png", "match this", reply_timeout=1)
+    assert page.clicks[0] == "span[data-icon='plus']" and page.clicks[-1] == whatsapp.MEDIA_SEND_SELECTOR
+    assert page.files == [(whatsapp.IMAGE_INPUT_SELECTOR, "panda.png")]
+    assert page.keyboard.typed == ["match this"]
+    real_poll = whatsapp.REPLY_POLL_SECONDS
+    whatsapp.REPLY_POLL_SECONDS = 0.01
+    try:
+        assert not upload_reference_image(FakeAttachPage(replies=False), "panda.png", "match this", reply_timeout=0.05)
+    finally:
+        whatsapp.REPLY_POLL_SECONDS = real_poll
+    print("✅ Uploaded from the attach menu and acknowledged")
+
+
+def test_attached_once_per_window():
+    """One upload serves the window; it is attached again after N prompts or a file change"""
+    print("\n🔁 Testing context window rollover...")
+    uploads = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "panda.png")
+        write_reference(path, b"panda v1")
+        session = ReferenceImageSession(path, window_prompts=3, window_hours=6,
+                                        uploader=lambda page, image, caption: uploads.append(image) or True)
+        assert session.wrap("a panda eating lentils") == "a panda eating lentils"
+
+        sent = []
+        for n in range(7):
+            session.ensure(None)
+            sent.append(session.wrap(f"line {n}"))
+            session.prompt_sent()
+        assert len(uploads) == 3, uploads  # before lines 0, 3 and 6
+        assert all(text.startswith(REFERENCE_PREFIX) for text in sent)
+
+        assert session.ensure(None) is False
+        write_reference(path, b"panda v2")
+        assert session.rollover_reason() == "reference image changed"
+        assert session.ensure(None) is True and len(uploads) == 4
+
+        session.attached_at = time.time() - 7 * 3600
+        assert session.rollover_reason().startswith("over 6h")
+    print("✅ Re-attached on rollover and on change, not per prompt")
+
+
+def test_failed_upload_sends_plain_prompts():
+    """Prompts never point at a reference that did not make it into the chat"""
+    def broken(page, image, caption):
+        raise TimeoutError("attach menu not found")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "panda.png")
+        write_reference(path, b"panda")
+        session = ReferenceImageSession(path, uploader=broken)
+        assert session.ensure(None) is False
+        assert session.wrap("line 1") == "line 1"
+
+        missing = ReferenceImageSession(os.path.join(workdir, "missing.png"), uploader=broken)
+        assert missing.ensure(None) is False and missing.wrap("line 1") == "line 1"
+
+        # A new reference makes earlier images out of date in the ledger
+        before = session.fingerprint("line 1")
+        write_reference(path, b"new panda")
+        assert session.fingerprint("line 1") != before
+    assert whatsapp.get_reference_session("") is None
+    print("✅ Failed uploads fall back to plain prompts")
+
+
+if __name__ == "__main__":
+    test_upload_waits_for_acknowledgement()
+    test_attached_once_per_window()
+    test_failed_upload_sends_plain_prompts()
+    print("\n🎉 All reference image tests passed!")
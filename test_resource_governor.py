@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test script for host-wide browser admission
+Uses a temporary lease directory and a fake memory/load probe - no browser needed
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+
+from browser_pool import WarmBrowserPool, SlotQueue, RECLAIM
+from resource_governor import ResourceGovernor
+
+
+class FakeProbe:
+    def __init__(self, free_mb=8000, load=0.5):
+        self.free = free_mb
+        self.load = load
+
+    def free_mb(self):
+        return self.free
+
+    def load_per_cpu(self):
+        return self.load
+
+
+def make_governor(directory, probe, **options):
+    settings = dict(max_browsers=2, min_free_mb=1000, max_load_per_cpu=1.5,
+                    reservations={"whatsapp": 1200, "dreamina": 1500})
+    settings.update(options)
+    return ResourceGovernor(lease_dir=directory, probe=probe, **settings)
+
+
+def test_admits_by_memory_load_and_cap():
+    """Launches queue on low memory, high load or too many browsers"""
+    print("🧮 Testing admission checks...")
+    with tempfile.TemporaryDirectory() as directory:
+        probe = FakeProbe(free_mb=3500)
+        governor = make_governor(directory, probe)
+
+        whatsapp, reason = governor.try_acquire("whatsapp")
+        assert whatsapp and reason is None
+        # 3500 free minus whatsapp's 1200 still warming up leaves less than 1500 + 1000
+        lease, reason = governor.try_acquire("dreamina")
+        assert lease is None and "MB needed" in reason, reason
+
+        probe.free = 8000
+        probe.load = 2.0
+        lease, reason = governor.try_acquire("dreamina")
+        assert lease is None and "load" in reason
+
+        probe.load = 0.5
+        dreamina, _ = governor.try_acquire("dreamina")
+        assert dreamina
+        lease, reason = governor.try_acquire("vpn")
+        assert lease is None and reason == "2/2 browsers running"
+
+        dreamina.release()
+        dreamina.release()  # releasing twice is harmless
+        assert [b["service"] for b in governor.status()["browsers"]] == ["whatsapp"]
+        whatsapp.release()
+    print("✅ Memory, load and the browser cap all gate launches")
+
+
+def test_queued_launch_waits_for_release():
+    """acquire() polls until a running browser closes"""
+    print("\n⏳ Testing queued launch...")
+    with tempfile.TemporaryDirectory() as directory:
+        polls = []
+        first = make_governor(directory, FakeProbe(), max_browsers=1).acquire("whatsapp")
+
+        def sleep(seconds):
+            polls.append(seconds)
+            if len(polls) == 3:
+                first.release()
+
+        second = make_governor(directory, FakeProbe(), max_browsers=1, poll_seconds=0.01, sleep=sleep)
+        lease = second.acquire("dreamina", timeout=60)
+        assert lease and len(polls) == 3
+        lease.release()
+
+        try:
+            blocker = second.acquire("whatsapp")
+            second.acquire("dreamina", timeout=0)
+            assert False, "should time out"
+        except TimeoutError as e:
+            assert "No room" in str(e)
+        blocker.release()
+    print("✅ Launch admitted once the other browser closed")
+
+
+def test_dead_process_leases_removed():
+    """Leases from crashed processes don't block launches forever"""
+    print("\n🧹 Testing stale leases...")
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "999999-dead.json"), "w") as f:
+            json.dump({"service": "dreamina", "pid": 999999, "reserved_mb": 1500, "admitted_at": 0}, f)
+        governor = make_governor(directory, FakeProbe(), max_browsers=1)
+        lease, reason = governor.try_acquire("whatsapp")
+        assert lease and reason is None
+        assert not os.path.exists(os.path.join(directory, "999999-dead.json"))
+        lease.release()
+    print("✅ Dead process lease cleaned up")
+
+
+class LeasedSession:
+    """A warm-pool session that holds a host lease while its browser is open"""
+
+    def __init__(self, governor):
+        self.governor = governor
+        self.browser_lease = None
+
+    def start_session(self):
+        self.browser_lease = self.governor.acquire("dreamina", timeout=0)
+        return None
+
+    def is_healthy(self):
+        return True
+
+    def recycle_page(self):
+        return True
+
+    def close(self):
+        if self.browser_lease:
+            self.browser_lease.release()
+            self.browser_lease = None
+
+
+def pool_worker(slot, jobs):
+    """What the server's queue workers do between jobs: block until a job or a reclaim arrives"""
+    while True:
+        job = jobs.get_for(slot)
+        if job is None:
+            return
+        if job is RECLAIM:
+            slot.close_if_reclaimed()
+
+
+def test_whatsapp_launch_reclaims_idle_pool_slot():
+    """A full warm Dreamina pool gives up an idle browser instead of starving WhatsApp"""
+    print("\n🏊 Testing warm pool plus WhatsApp...")
+    with tempfile.TemporaryDirectory() as directory:
+        governor = make_governor(directory, FakeProbe(), max_browsers=2)
+        jobs = SlotQueue()
+        pool = WarmBrowserPool(lambda index: LeasedSession(governor), size=2, name="dreamina", jobs=jobs)
+        for slot in pool.slots:
+            assert slot.warm_up()
+        busy = pool.slots[0]
+        busy.acquire()
+        # Only the idle slot's worker is waiting for jobs
+        worker = threading.Thread(target=pool_worker, args=(pool.slots[1], jobs), daemon=True)
+        worker.start()
+
+        whatsapp_governor = make_governor(directory, FakeProbe(), max_browsers=2, poll_seconds=0.01)
+        lease = whatsapp_governor.acquire("whatsapp", timeout=5)
+        assert lease
+        assert busy.session is not None, "a slot in the middle of a job keeps its browser"
+        assert pool.slots[1].session is None
+        services = sorted(b["service"] for b in governor.status()["browsers"])
+        assert services == ["dreamina", "whatsapp"]
+
+        jobs.put(None)
+        worker.join(5)
+        assert not worker.is_alive()
+        # The closed slot relaunches for its next job once WhatsApp is done
+        lease.release()
+        assert pool.slots[1].acquire() is not None
+        pool.slots[1].release()
+        busy.release()
+        for slot in pool.slots:
+            slot.close()
+    print("✅ Idle Dreamina browser closed, WhatsApp admitted")
+
+
+POOL_PROCESS = """
+import sys, threading
+from browser_pool import WarmBrowserPool, SlotQueue
+from test_resource_governor import make_governor, FakeProbe, LeasedSession, pool_worker
+
+jobs = SlotQueue()
+governor = make_governor(sys.argv[1], FakeProbe(), max_browsers=1)
+slot = WarmBrowserPool(lambda index: LeasedSession(governor), jobs=jobs).slots[0]
+slot.warm_up()
+worker = threading.Thread(target=pool_worker, args=(slot, jobs))
+worker.start()
+print("ready", flush=True)
+sys.stdin.readline()
+jobs.put(None)
+worker.join()
+print("closed" if slot.session is None else "open", flush=True)
+"""
+
+
+def test_reclaim_signals_other_process():
+    """A launch in one process wakes a blocked pool worker in another to close its browser"""
+    print("\n📡 Testing reclaim across processes...")
+    with tempfile.TemporaryDirectory() as directory:
+        child = subprocess.Popen([sys.executable, "-c", POOL_PROCESS, directory],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            assert child.stdout.readline().strip() == "ready"
+            started_at = time.time()
+            lease = make_governor(directory, FakeProbe(), max_browsers=1, poll_seconds=0.05).acquire("whatsapp", timeout=10)
+            assert time.time() - started_at < 5
+            assert [b["service"] for b in lease.governor.status()["browsers"]] == ["whatsapp"]
+            lease.release()
+            child.stdin.close()
+            assert child.stdout.readline().strip() == "closed"
+            assert child.wait(10) == 0
+        finally:
+            if child.poll() is None:
+                child.kill()
+    print("✅ Other process closed its idle browser on the signal")
+
+
+if __name__ == "__main__":
+    test_admits_by_memory_load_and_cap()
+    test_queued_launch_waits_for_release()
+    test_dead_process_leases_removed()
+    test_whatsapp_launch_reclaims_idle_pool_slot()
+    test_reclaim_signals_other_process()
+    print("\n🎉 All resource governor tests passed!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the Dreamina selector racing and preference cache
+Runs offline against a fake page object - no browser needed
+"""
+
+import os
+import tempfile
+
+from dreamina_selector_cache import SelectorPreferenceCache, race_selectors, race_selector_tiers
+
+
+class FakeHandle:
+    def is_visible(self):
+        return True
+
+
+class FakePage:
+    """Minimal stand-in for a Playwright page with a fixed set of live selectors"""
+
+    def __init__(self, live_selectors):
+        self.live_selectors = set(live_selectors)
+        self.waited_for = []
+
+    def wait_for_selector(self, selector, timeout=None):
+        self.waited_for.append(selector)
+        if not any(s in self.live_selectors for s in selector.split(", ")):
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+        return FakeHandle()
+
+    def query_selector(self, selector):
+        return FakeHandle() if selector in self.live_selectors else None
+
+
+def make_cache():
+    path = os.path.join(tempfile.mkdtemp(), "selector_cache.json")
+    return SelectorPreferenceCache(path=path)
+
+
+def test_race_picks_first_live_candidate():
+    """All candidates are raced in one wait and the first live one wins"""
+    print("🏁 Testing selector race...")
+    cache = make_cache()
+    page = FakePage(['button.new-submit'])
+    selectors = ['button.submit-button-bPnDkw', 'button.stale-xyz', 'button.new-submit']
+
+    handle, selector = race_selectors(page, 'submit_button', selectors, cache=cache)
+
+    assert handle is not None
+    assert selector == 'button.new-submit'
+    assert len(page.waited_for) == 1, "candidates should be raced in a single wait"
+    print("✅ Raced selectors resolved with one wait")
+
+
+def test_winner_is_tried_first_and_persisted():
+    """The learned winner moves to the front and survives a reload"""
+    print("\n💾 Testing persisted preferences...")
+    cache = make_cache()
+    page = FakePage(['button.new-submit'])
+    selectors = ['button.submit-button-bPnDkw', 'button.stale-xyz', 'button.new-submit']
+    race_selectors(page, 'submit_button', selectors, cache=cache)
+
+    reloaded = SelectorPreferenceCache(path=cache.path)
+    assert reloaded.order('submit_button', selectors)[0] == 'button.new-submit'
+
+    stats = reloaded.stats()['submit_button']
+    assert stats['preferred'] == 'button.new-submit'
+    assert stats['hit_rate'] == 1.0
+    assert stats['saved_ms'] > 0
+    print("✅ Winner persisted and ordered first")
+
+
+def test_miss_is_recorded():
+    """A lookup with no live candidate returns nothing and counts as a miss"""
+    print("\n❌ Testing miss accounting...")
+    cache = make_cache()
+    page = FakePage([])
+
+    handle, selector = race_selectors(page, 'create_tab', ['.create-tab', '#create'], timeout=10, cache=cache)
+
+    assert handle is None and selector is None
+    stats = cache.stats()['create_tab']
+    assert stats['lookups'] == 1
+    assert stats['hit_rate'] == 0.0
+    print("✅ Miss recorded")
+
+
+def test_generic_tier_waits_and_is_learned_on_confirm():
+    """Generic candidates are raced only after the specific tier misses, and learned only on confirm"""
+    print("\n🎚️ Testing tiered race...")
+    cache = make_cache()
+    specific = ['button.submit-button-bPnDkw']
+    generic = ['button.lv-btn:has(svg)']
+
+    page = FakePage(['button.submit-button-bPnDkw', 'button.lv-btn:has(svg)'])
+    handle, selector, confirm = race_selector_tiers(page, 'submit_button', [specific, generic], cache=cache)
+    assert selector == 'button.submit-button-bPnDkw' and len(page.waited_for) == 1
+    assert 'submit_button' not in cache.stats(), "nothing learned before confirm"
+    confirm()
+    assert cache.stats()['submit_button']['preferred'] == 'button.submit-button-bPnDkw'
+
+    page = FakePage(['button.lv-btn:has(svg)'])
+    handle, selector, confirm = race_selector_tiers(page, 'submit_button', [specific, generic], timeout=10, cache=cache)
+    assert selector == 'button.lv-btn:has(svg)' and len(page.waited_for) == 2
+    # Not confirmed (no submit response), so the generic button never becomes preferred
+    assert cache.stats()['submit_button']['preferred'] == 'button.submit-button-bPnDkw'
+    print("✅ Specific tier first; winners learned only when confirmed")
+
+
+if __name__ == "__main__":
+    test_race_picks_first_live_candidate()
+    test_winner_is_tried_first_and_persisted()
+    test_miss_is_recorded()
+    test_generic_tier_waits_and_is_learned_on_confirm()
+    print("\n🎉 All selector cache tests passed!")
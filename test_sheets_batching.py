@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-reel prompt batching
+Uses in-memory sheet records - no Google credentials or browser needed
+"""
+
+from sheets import prompts_by_reel_from_records
+
+RECORDS = [
+    {"Reel #": 12, "Image Prompt": "a panda eating tofu", "Audio File": "https://drive.google.com/a"},
+    {"Reel #": 13, "Image Prompt": "a panda lifting", "Audio File": "https://drive.google.com/b"},
+    {"Reel #": 12, "Image Prompt": "  ", "Audio File": ""},
+    {"Reel #": 12, "Image Prompt": "a panda sleeping ", "Audio File": "https://drive.google.com/c"},
+    {"Reel #": 14, "Image Prompt": "not requested", "Audio File": ""},
+]
+
+
+def test_groups_prompts_by_reel():
+    """Each reel keeps its sheet line numbers and its own image numbering"""
+    print("📋 Testing multi-reel grouping...")
+    grouped = prompts_by_reel_from_records(RECORDS, [12, "13", 15])
+    assert list(grouped) == ["12", "13", "15"]
+    assert [p["line_no"] for p in grouped["12"]] == ["001", "004"]
+    assert [p["image_number"] for p in grouped["12"]] == [1, 2]
+    assert grouped["12"][1]["prompt"] == "a panda sleeping"
+    assert grouped["13"] == [{"line_no": "002", "prompt": "a panda lifting",
+                              "audio_url": "https://drive.google.com/b", "image_number": 1}]
+    assert grouped["15"] == []
+    print("✅ Prompts grouped per reel from one snapshot")
+
+
+def test_rows_keep_reel_order():
+    """Batch rows carry their reel so images land in images/<reel>/"""
+    print("\n🧾 Testing batch rows...")
+    from chatgpt_image_api_server import rows_for_reels
+
+    rows = rows_for_reels(prompts_by_reel_from_records(RECORDS, ["13", "12"]))
+    assert [(row["reel_no"], row["line_no"]) for row in rows] == [("13", "002"), ("12", "001"), ("12", "004")]
+    print("✅ Rows keep reel order and numbers")
+
+
+if __name__ == "__main__":
+    test_groups_prompts_by_reel()
+    test_rows_keep_reel_order()
+    print("\n🎉 All batching tests passed!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for a full reel run against the offline fakes
+Drives the real main.run_reel through sim_whatsapp, sim_drive and sim_dreamina
+in headless Chromium - skipped when Playwright's Chromium is not installed
+"""
+
+import os
+import tempfile
+
+import pytest
+
+
+def chromium_available():
+    """True when Playwright can launch headless Chromium"""
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+        return True
+    except Exception:
+        return False
+
+
+# Short fake delays keep the run to a few seconds
+FAST_SIM = {
+    "SIM_REPLY_SECONDS": "0.5",
+    "SIM_DRIVE_DELAY_SECONDS": "0.05",
+    "SIM_UPLOAD_SECONDS": "0.2",
+    "SIM_RENDER_SECONDS": "1",
+}
+
+
+@pytest.mark.skipif(not chromium_available(), reason="Playwright Chromium is not installed")
+def test_reel_runs_end_to_end():
+    """Every line gets an image, an audio file and a Dreamina submission, and the run leaves no settings behind"""
+    import rate_governor
+    import stage_ledger
+    import chatgpt_image_api_server as chatgpt
+    import dreamina_upload_api_server as dreamina
+    import download_reel_audio
+    import sheets
+    from run_simulation import run_simulation, SIM_REEL
+
+    print("\n🧪 Running a simulated reel end to end...")
+    environ = dict(os.environ)
+    settings = {name: dict(values) for name, values in rate_governor.DEFAULT_SETTINGS.items()}
+    attributes = (chatgpt.WHATSAPP_WEB_URL, chatgpt.BROWSER_HEADLESS, dreamina.DREAMINA_AI_AVATAR_URL,
+                  dreamina.REQUIRE_PROFILE_LOGIN, download_reel_audio.DRIVE_BASE_URL, download_reel_audio.DRIVE_API_KEY)
+    ledger = stage_ledger._ledger
+
+    os.environ.update(FAST_SIM)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            result = run_simulation(lines=3, seed=0, workdir=workdir)
+            print(result["stages"])
+            assert result["success"], result
+            for n in ("001", "002", "003"):
+                assert os.path.getsize(os.path.join(workdir, "images", SIM_REEL, f"{n}.png")) > 0
+                assert os.path.getsize(os.path.join(workdir, "audio", SIM_REEL, f"{n}.mp3")) > 0
+            # One image task per line plus the WhatsApp batch task that produces them
+            assert result["stages"]["images"]["succeeded"] == 4
+            assert result["stages"]["audio"]["succeeded"] == 3
+            assert result["stages"]["dreamina"]["succeeded"] == 3
+            services = result["services"]
+            assert services["whatsapp"]["prompts"] == 3 and services["whatsapp"]["images"] == 3
+            assert services["drive"]["downloads"] == 3
+            assert services["dreamina"]["submissions"] == 3
+            assert os.path.exists(os.path.join(workdir, "pipeline_ledger.db"))
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
+    assert rate_governor.DEFAULT_SETTINGS == settings
+    assert (chatgpt.WHATSAPP_WEB_URL, chatgpt.BROWSER_HEADLESS, dreamina.DREAMINA_AI_AVATAR_URL,
+            dreamina.REQUIRE_PROFILE_LOGIN, download_reel_audio.DRIVE_BASE_URL, download_reel_audio.DRIVE_API_KEY) == attributes
+    assert stage_ledger._ledger is ledger
+    assert sheets._client_override is None
+    print("✅ Reel built through the fakes; settings restored")
+
+
+if __name__ == "__main__":
+    if chromium_available():
+        test_reel_runs_end_to_end()
+        print("\n🎉 End-to-end simulation test passed!")
+    else:
+        print("⏭️  Playwright Chromium is not installed - skipping the end-to-end run")
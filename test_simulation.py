@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline simulation stand-ins
+Checks each fake against the code that talks to the real service - no browser needed
+"""
+
+import os
+import struct
+import tempfile
+
+import download_reel_audio
+import sheets
+from dreamina_tracker import extract_tasks
+from run_simulation import LocalServer
+from sim_dreamina import FakeDreamina, RATE_LIMIT_TEXT
+from sim_drive import FakeDrive
+from sim_sheets import FakeSheetsClient, reel_records
+from sim_whatsapp import FakeWhatsApp, REFUSAL_TEXT, make_png
+
+
+def test_drive_download_through_interstitial():
+    """download_audio_file follows the fake's virus-scan page to the audio bytes"""
+    print("\n🎵 Testing Drive download...")
+    drive = FakeDrive(seed=1, file_bytes=1024)
+    link = drive.add_file("abc123")
+    base_url = download_reel_audio.DRIVE_BASE_URL
+    with LocalServer(drive.create_app()) as server, tempfile.TemporaryDirectory() as workdir:
+        download_reel_audio.DRIVE_BASE_URL = server.url
+        try:
+            save_path = os.path.join(workdir, "audio", "1.mp3")
+            assert download_reel_audio.download_audio_file(link, save_path, 1)
+            with open(save_path, "rb") as f:
+                assert f.read() == drive.files["abc123"]
+        finally:
+            download_reel_audio.DRIVE_BASE_URL = base_url
+    assert drive.stats() == {"files": 1, "interstitials": 1, "downloads": 1, "failures": 0}
+    print("✅ Interstitial followed and audio saved")
+
+
+def test_sheets_client_override():
+    """sheets.py reads reel rows from an installed client"""
+    print("\n📋 Testing Sheets client override...")
+    records = reel_records("7", ["a panda", "a chef"], ["link1", "link2"])
+    records += reel_records("8", ["a kitchen"], ["link3"])
+    client = FakeSheetsClient(records)
+    sheets.use_client(client)
+    try:
+        assert len(sheets.get_sheet_data()) == 3
+        prompts = sheets.get_prompts_by_reels(["7", "8"])
+        assert {reel: [row["prompt"] for row in rows] for reel, rows in prompts.items()} == {
+            "7": ["a panda", "a chef"], "8": ["a kitchen"]}
+        assert prompts["7"][1]["audio_url"] == "link2"
+    finally:
+        sheets.use_client(None)
+    assert client.stats()["fetches"] == 2
+    print("✅ Rows read from the fake client")
+
+
+def test_make_png():
+    """Generated replies are real PNGs of the requested size"""
+    data = make_png(32, 16, "prompt")
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    assert struct.unpack(">II", data[16:24]) == (32, 16)
+    assert make_png(32, 16, "prompt") == data and make_png(32, 16, "other") != data
+    print("✅ make_png writes deterministic PNGs")
+
+
+def test_whatsapp_replies_in_order():
+    """Every prompt gets one reply, in order, once its delay has passed"""
+    print("\n💬 Testing WhatsApp replies...")
+    fake = FakeWhatsApp(reply_seconds=0, reply_jitter=0, seed=3)
+    client = fake.create_app().test_client()
+    for text in ("first", "second"):
+        assert client.post('/api/send', json={"text": text}).get_json()["success"]
+    messages = client.get('/api/messages?since=0').get_json()
+    assert [m["direction"] for m in messages] == ["out", "in", "out", "in"]
+    assert client.get('/api/images/' + messages[1]["image"]).data == make_png(64, 64, "first")
+    assert client.get('/api/messages?since=2').get_json() == messages[2:]
+
+    slow = FakeWhatsApp(reply_seconds=60, failure_rate=1.0)
+    slow.send("a panda")
+    assert [m["direction"] for m in slow.visible_messages()] == ["out"]
+    assert slow.messages[-1]["text"] == REFUSAL_TEXT and slow.stats()["refusals"] == 1
+    print("✅ Replies arrive in order; refusals use ChatGPT's wording")
+
+
+def test_dreamina_generate_is_tracked():
+    """The generation tracker reads task ids from the fake's responses"""
+    print("\n🎬 Testing Dreamina generate...")
+    fake = FakeDreamina(render_seconds=0, seed=5)
+    client = fake.create_app().test_client()
+    response = client.post('/dreamina/mweb/v1/aigc_draft/generate', json={"image": "001.png", "audio": "1.mp3"})
+    tasks = extract_tasks(response.get_json())
+    assert len(tasks) == 1 and tasks[0]["state"] == "processing"
+    history = client.get('/dreamina/mweb/v1/get_history_by_ids?ids=' + tasks[0]["task_id"]).get_json()
+    finished = extract_tasks(history)
+    assert finished[0]["state"] == "finished" and finished[0]["video_url"].endswith(".mp4")
+
+    rejecting = FakeDreamina(failure_rate=1.0)
+    assert rejecting.submit("001.png", "1.mp3") == {"ret": "1180", "errmsg": RATE_LIMIT_TEXT}
+    assert rejecting.stats() == {"submissions": 0, "rejections": 1}
+    print("✅ Submissions tracked; rejections return an error")
+
+
+if __name__ == "__main__":
+    test_drive_download_through_interstitial()
+    test_sheets_client_override()
+    test_make_png()
+    test_whatsapp_replies_in_order()
+    test_dreamina_generate_is_tracked()
+    print("\n🎉 All simulation tests passed!")
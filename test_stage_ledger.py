@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-line stage ledger and resume behaviour
+Uses a temporary SQLite file and a local HTTP server - no browser needed
+"""
+
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import stage_ledger
+from stage_ledger import StageLedger, line_key
+
+AUDIO_BYTES = os.urandom(64 * 1024)
+hits = []
+
+
+class AudioHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        if self.path.startswith("/unversioned"):
+            self.send_error(405)
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+
+    def do_GET(self):
+        hits.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(AUDIO_BYTES)))
+        self.end_headers()
+        self.wfile.write(AUDIO_BYTES)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_records_and_verifies_artifacts():
+    """Only succeeded stages with an intact artifact count as done"""
+    print("📒 Testing ledger records...")
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = StageLedger(os.path.join(directory, "ledger.db"))
+        artifact = os.path.join(directory, "7.png")
+        with open(artifact, "wb") as f:
+            f.write(b"image")
+
+        assert ledger.done("12", "007", "image") is None
+        ledger.start("12", "007", "image")
+        assert ledger.get("12", 7, "image")["status"] == "running"
+        assert ledger.done("12", "007", "image") is None
+
+        ledger.succeed("12", "007", "image", artifact_path=artifact)
+        entry = ledger.done("12", 7, "image", artifact_path=artifact)
+        assert entry and entry["attempts"] == 1 and entry["line_no"] == "7"
+        # A different expected path (another stage layout) doesn't match
+        assert ledger.done("12", 7, "image", artifact_path=os.path.join(directory, "other.png")) is None
+
+        # Overwritten or deleted artifacts are redone
+        with open(artifact, "wb") as f:
+            f.write(b"different image")
+        assert ledger.done("12", 7, "image") is None
+        os.remove(artifact)
+        assert ledger.done("12", 7, "image") is None
+
+        # Failures keep the attempt count and error
+        ledger.start("12", 8, "dreamina")
+        ledger.fail("12", 8, "dreamina", "Upload button not found")
+        ledger.start("12", 8, "dreamina")
+        ledger.succeed("12", 8, "dreamina", detail="task-123")
+        entry = ledger.done("12", 8, "dreamina")
+        assert entry["attempts"] == 2 and entry["detail"] == "task-123" and entry["error"] is None
+
+        assert [e["line_no"] for e in ledger.entries("12")] == ["8", "7"]
+        assert ledger.reset("12", "dreamina") == 1
+        assert [e["stage"] for e in ledger.entries("12")] == ["image"]
+        assert line_key("010") == "10" and line_key("a1") == "a1"
+    print("✅ Ledger records, verifies and resets")
+
+
+def test_resume_skips_finished_audio():
+    """A rerun downloads only the lines that didn't finish"""
+    print("\n🔁 Testing resume...")
+    import main
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/audio.mp3"
+    previous = stage_ledger._ledger
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            stage_ledger._ledger = StageLedger(os.path.join(directory, "ledger.db"))
+            paths = {line: os.path.join(directory, f"{line}.mp3") for line in ("001", "002", "003")}
+
+            # First run "crashes" after line 2
+            for line in ("001", "002"):
+                main.download_line_audio("9", line, url, paths[line])
+            assert len(hits) == 2
+
+            # Rerun: lines 1-2 skipped, line 3 downloaded
+            for line in ("001", "002", "003"):
+                assert main.download_line_audio("9", line, url, paths[line]) == paths[line]
+            assert len(hits) == 3
+            assert all(e["status"] == "succeeded" for e in stage_ledger._ledger.entries("9", "audio"))
+
+            # A source whose version can't be checked may have changed, so it is fetched every run
+            unversioned = f"http://127.0.0.1:{server.server_port}/unversioned.mp3"
+            for _ in range(2):
+                main.download_line_audio("9", "004", unversioned, os.path.join(directory, "004.mp3"))
+            assert len(hits) == 5
+    finally:
+        stage_ledger._ledger = previous
+        server.shutdown()
+    print("✅ Only the unfinished line was downloaded again")
+
+
+def test_dreamina_pairs_keyed_by_sheet_line():
+    """Pairs numbered by their place in the reel are recorded under their sheet line, like main.py records them"""
+    print("\n🔑 Testing ledger keys...")
+    import dreamina_upload_api_server as dreamina
+
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = StageLedger(os.path.join(directory, "ledger.db"))
+        # Skip the browser setup in __init__; only the ledger bookkeeping is used
+        api = dreamina.DreaminaUploadAPI.__new__(dreamina.DreaminaUploadAPI)
+        api.ledger, api.governor, api.reel_number = ledger, dreamina.get_governor("dreamina"), "4"
+        api.pair_lines = {1: "017", 2: "018"}
+
+        api.record_pair(1, True, "submitted", task_id="task-1")
+        api.record_pair(2, False, "Too many requests")
+        assert ledger.done("4", "017", "dreamina")["detail"] == "task-1"
+        assert ledger.get("4", 18, "dreamina")["status"] == "failed"
+        assert ledger.get("4", 1, "dreamina") is None and ledger.get("4", 2, "dreamina") is None
+
+        # Pairs that are already numbered by sheet line (main.py's files) map to themselves
+        api.pair_lines = {}
+        api.record_pair(5, True, "submitted")
+        assert ledger.done("4", "005", "dreamina")
+    print("✅ Ledger rows keyed by sheet line")
+
+
+if __name__ == "__main__":
+    test_records_and_verifies_artifacts()
+    test_resume_skips_finished_audio()
+    test_dreamina_pairs_keyed_by_sheet_line()
+    print("\n🎉 All stage ledger tests passed!")
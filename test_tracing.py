@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for tracing spans, the JSONL exporter and the waterfall view
+No browser or network needed
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import tracing
+from tracing import span, traced, current_span, load_spans, format_waterfall, NOOP_SPAN
+from job_store import JobStore
+from job_events import bind_job, publish, run_with_events
+
+
+def enable(directory, **exporter_options):
+    path = os.path.join(directory, "traces.jsonl")
+    tracing.configure(enabled=True, path=path, **exporter_options)
+    return path
+
+
+def test_nested_spans_are_linked():
+    """Child spans share the trace id and point at their parent"""
+    print("🧵 Testing nested spans...")
+    with tempfile.TemporaryDirectory() as directory:
+        enable(directory)
+        try:
+            @traced("stage.inner")
+            def inner():
+                current_span().add_event("selector_fallback", selector="#b")
+
+            with span("stage.outer", trace_id="job-1", reel="7") as outer:
+                inner()
+                outer.set(rows=3)
+            try:
+                with span("stage.failing", trace_id="job-1"):
+                    raise ValueError("boom")
+            except ValueError:
+                pass
+
+            spans = {record["name"]: record for record in load_spans("job-1")}
+            assert spans["stage.outer"]["parent_id"] is None
+            assert spans["stage.outer"]["attributes"] == {"reel": "7", "rows": 3}
+            assert spans["stage.inner"]["parent_id"] == spans["stage.outer"]["span_id"]
+            assert spans["stage.inner"]["events"][0]["name"] == "selector_fallback"
+            assert spans["stage.failing"]["status"] == "error"
+            assert "boom" in spans["stage.failing"]["error"]
+
+            waterfall = format_waterfall(load_spans("job-1"))
+            print(waterfall)
+            assert "  stage.inner" in waterfall and "selector_fallback" in waterfall
+        finally:
+            tracing.configure(enabled=False)
+    print("✅ Spans linked and rendered")
+
+
+def test_job_and_subprocess_share_a_trace():
+    """bind_job opens the job's root span; a script's spans nest under it"""
+    print("\n🔗 Testing job and subprocess tracing...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = enable(directory)
+        try:
+            job = JobStore().create('download-reel-audio', {"reel_number": "7"})
+            script = (
+                "from tracing import span\n"
+                "from job_events import publish\n"
+                "with span('script.work'):\n"
+                "    publish('audio_saved', audio_number=1)\n"
+            )
+            with bind_job(job):
+                publish("prompt_sent", line_no="001")
+                run_with_events([sys.executable, "-c", script], job, timeout=30)
+
+            spans = {record["name"]: record for record in load_spans(job.id)}
+            assert set(spans) == {"job download-reel-audio", "script.work"}, spans
+            root = spans["job download-reel-audio"]
+            assert root["attributes"]["job_id"] == job.id
+            assert root["events"][0]["name"] == "prompt_sent"
+            assert spans["script.work"]["parent_id"] == root["span_id"]
+            assert spans["script.work"]["pid"] != os.getpid()
+            assert spans["script.work"]["events"][0]["name"] == "audio_saved"
+            assert os.path.exists(path)
+        finally:
+            tracing.configure(enabled=False)
+    print("✅ Subprocess spans joined the job trace")
+
+
+def test_exporter_rotates():
+    """The JSONL file rolls over into numbered backups"""
+    print("\n🔄 Testing rotation...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = enable(directory, max_bytes=2000, backups=2)
+        try:
+            for index in range(60):
+                with span("stage.tick", index=index):
+                    pass
+            assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+            assert not os.path.exists(path + ".3")
+            assert os.path.getsize(path) <= 2000
+            # Oldest spans were dropped, newest are still readable
+            indexes = [record["attributes"]["index"] for record in load_spans()]
+            assert indexes == sorted(indexes) and indexes[-1] == 59 and indexes[0] > 0
+        finally:
+            tracing.configure(enabled=False)
+    print("✅ Rotated with two backups")
+
+
+def test_disabled_is_noop():
+    """With tracing off nothing is written and the overhead stays tiny"""
+    print("\n💤 Testing disabled tracing...")
+    tracing.configure(enabled=False)
+    assert span("anything") is NOOP_SPAN
+    assert current_span() is NOOP_SPAN
+
+    @traced("stage.hot")
+    def hot(value):
+        return value + 1
+
+    start = time.perf_counter()
+    for value in range(100000):
+        hot(value)
+        with span("stage.hot_block"):
+            pass
+    per_call_us = (time.perf_counter() - start) / 100000 * 1e6
+    print(f"   {per_call_us:.2f}µs per traced call + span block")
+    assert per_call_us < 20
+    print("✅ Disabled tracing is a no-op")
+
+
+if __name__ == "__main__":
+    test_nested_spans_are_linked()
+    test_job_and_subprocess_share_a_trace()
+    test_exporter_rotates()
+    test_disabled_is_noop()
+    print("\n🎉 All tracing tests passed!")
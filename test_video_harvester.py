@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test script for the Dreamina video harvester
+Runs against a local range-capable HTTP server - no Dreamina account needed
+"""
+
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import dreamina_video_harvester
+from dreamina_video_harvester import download_ranged, harvest_videos
+
+VIDEO_BYTES = os.urandom(3 * 1024 * 1024 + 12345)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves VIDEO_BYTES with HTTP Range support and counts range requests"""
+    range_requests = 0
+
+    def do_GET(self):
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if not match:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(VIDEO_BYTES)))
+            self.end_headers()
+            self.wfile.write(VIDEO_BYTES)
+            return
+        RangeHandler.range_requests += 1
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(VIDEO_BYTES) - 1
+        body = VIDEO_BYTES[start:end + 1]
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(VIDEO_BYTES)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class NoRangeHandler(BaseHTTPRequestHandler):
+    """Serves VIDEO_BYTES in full whatever the Range header says, and counts requests"""
+    requests = 0
+
+    def do_GET(self):
+        NoRangeHandler.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(VIDEO_BYTES)))
+        self.end_headers()
+        self.wfile.write(VIDEO_BYTES)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(handler=RangeHandler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+
+
+def saved_segment(data, start, end, done):
+    """Segment state as download_ranged saves it, with the checksum of its first `done` bytes"""
+    return {'start': start, 'end': end, 'done': done,
+            'sha256': hashlib.sha256(data[start:start + done]).hexdigest()}
+
+
+def test_segmented_download():
+    """A large file is fetched as several ranges and reassembled exactly"""
+    print("⬇️ Testing segmented download...")
+    server, url = start_server()
+    original_min = dreamina_video_harvester.MIN_RANGED_BYTES
+    dreamina_video_harvester.MIN_RANGED_BYTES = 1024 * 1024
+    try:
+        save_path = os.path.join(tempfile.mkdtemp(), "1.mp4")
+        RangeHandler.range_requests = 0
+
+        size = download_ranged(url, save_path, segments=4)
+
+        assert size == len(VIDEO_BYTES)
+        with open(save_path, 'rb') as f:
+            assert f.read() == VIDEO_BYTES
+        assert RangeHandler.range_requests == 5, "1 probe + 4 segments expected"
+        assert not os.path.exists(f"{save_path}.part.json")
+        print("✅ 4 segments downloaded and reassembled")
+    finally:
+        dreamina_video_harvester.MIN_RANGED_BYTES = original_min
+        server.shutdown()
+
+
+def test_resume_from_state():
+    """A download with saved segment progress only fetches the missing bytes"""
+    print("\n🔁 Testing resume...")
+    server, url = start_server()
+    original_min = dreamina_video_harvester.MIN_RANGED_BYTES
+    dreamina_video_harvester.MIN_RANGED_BYTES = 1024 * 1024
+    try:
+        save_path = os.path.join(tempfile.mkdtemp(), "2.mp4")
+        half = len(VIDEO_BYTES) // 2
+        with open(f"{save_path}.part", 'wb') as f:
+            f.write(VIDEO_BYTES[:half])
+        with open(f"{save_path}.part.json", 'w') as f:
+            json.dump({'size': len(VIDEO_BYTES), 'segments': [
+                saved_segment(VIDEO_BYTES, 0, half - 1, half),
+                saved_segment(VIDEO_BYTES, half, len(VIDEO_BYTES) - 1, 0)
+            ]}, f)
+        RangeHandler.range_requests = 0
+
+        download_ranged(url, save_path, segments=2)
+
+        with open(save_path, 'rb') as f:
+            assert f.read() == VIDEO_BYTES
+        assert RangeHandler.range_requests == 2, "1 probe + only the unfinished segment expected"
+        print("✅ Resumed without refetching finished segments")
+    finally:
+        dreamina_video_harvester.MIN_RANGED_BYTES = original_min
+        server.shutdown()
+
+
+def test_lost_part_data_is_refetched():
+    """Saved progress is only kept while the part file still holds those exact bytes"""
+    print("\n🗑️ Testing stale resume state...")
+    server, url = start_server()
+    original_min = dreamina_video_harvester.MIN_RANGED_BYTES
+    dreamina_video_harvester.MIN_RANGED_BYTES = 1024 * 1024
+    try:
+        workdir = tempfile.mkdtemp()
+        half = len(VIDEO_BYTES) // 2
+        segments = [saved_segment(VIDEO_BYTES, 0, half - 1, half),
+                    saved_segment(VIDEO_BYTES, half, len(VIDEO_BYTES) - 1, 1024)]
+        unchecked = [{k: v for k, v in s.items() if k != 'sha256'} for s in segments]
+        cases = (
+            ("deleted", None, segments),
+            # Same size as the pre-sized part file, so only the checksums can tell
+            ("replaced", os.urandom(len(VIDEO_BYTES)), segments),
+            ("unchecked", VIDEO_BYTES, unchecked),
+        )
+        for name, part_bytes, saved in cases:
+            save_path = os.path.join(workdir, f"{name}.mp4")
+            if part_bytes is not None:
+                with open(f"{save_path}.part", 'wb') as f:
+                    f.write(part_bytes)
+            with open(f"{save_path}.part.json", 'w') as f:
+                json.dump({'size': len(VIDEO_BYTES), 'segments': saved}, f)
+            RangeHandler.range_requests = 0
+
+            download_ranged(url, save_path, segments=2)
+
+            with open(save_path, 'rb') as f:
+                assert f.read() == VIDEO_BYTES, name
+            assert RangeHandler.range_requests == 3, f"{name}: 1 probe + both segments refetched"
+            assert not os.path.exists(f"{save_path}.part.json"), name
+        print("✅ Deleted, replaced and unchecked part files downloaded again")
+    finally:
+        dreamina_video_harvester.MIN_RANGED_BYTES = original_min
+        server.shutdown()
+
+
+def test_download_without_range_support():
+    """A server that ignores Range gets one plain download, and stale segment state is cleared"""
+    print("\n📄 Testing server without Range support...")
+    server, url = start_server(NoRangeHandler)
+    try:
+        save_path = os.path.join(tempfile.mkdtemp(), "5.mp4")
+        with open(f"{save_path}.part.json", 'w') as f:
+            json.dump({'size': len(VIDEO_BYTES), 'segments': [
+                saved_segment(VIDEO_BYTES, 0, len(VIDEO_BYTES) - 1, 1024)]}, f)
+        NoRangeHandler.requests = 0
+
+        size = download_ranged(url, save_path, segments=4)
+
+        assert size == len(VIDEO_BYTES)
+        with open(save_path, 'rb') as f:
+            assert f.read() == VIDEO_BYTES
+        assert NoRangeHandler.requests == 2, "1 probe + 1 full download expected"
+        assert not os.path.exists(f"{save_path}.part")
+        assert not os.path.exists(f"{save_path}.part.json")
+        print("✅ Fell back to a single full download")
+    finally:
+        server.shutdown()
+
+
+def test_harvest_writes_manifest():
+    """Videos are saved as <reel>/Videos/<pair>.mp4 with a checksum manifest"""
+    print("\n📋 Testing harvest manifest...")
+    server, url = start_server()
+    try:
+        base_dir = tempfile.mkdtemp()
+        videos = [{'pair_number': n, 'video_url': url, 'task_id': f"t{n}"} for n in (1, 2, 3)]
+
+        summary = harvest_videos("7", videos, base_dir=base_dir)
+
+        assert summary['success'] and summary['downloaded'] == ["1", "2", "3"]
+        with open(os.path.join(base_dir, "7", "Videos", "manifest.json")) as f:
+            manifest = json.load(f)
+        assert manifest["2"]['sha256'] == hashlib.sha256(VIDEO_BYTES).hexdigest()
+        assert os.path.exists(os.path.join(base_dir, "7", "Videos", "3.mp4"))
+        print("✅ Videos and manifest written")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_segmented_download()
+    test_resume_from_state()
+    test_lost_part_data_is_refetched()
+    test_download_without_range_support()
+    test_harvest_writes_manifest()
+    print("\n🎉 All harvester tests passed!")
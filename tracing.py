@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Lightweight tracing spans for the pipeline
+
+Wrap a stage in a span to record how long it took, what it was working on
+and which stage it ran under:
+
+    with span("sheets.fetch", reel=reel_number) as s:
+        rows = ...
+        s.set(rows=len(rows))
+
+    @traced("dreamina.upload_image")
+    def upload_image(self, path): ...
+
+Spans are linked parent/child through a context variable. A server worker
+opens a root span per job whose trace id is the job id, and scripts that the
+servers run as subprocesses continue the same trace via PIPELINE_TRACE_PARENT.
+Finished spans are appended to a rotating JSONL file.
+
+Tracing is off unless PIPELINE_TRACING=1. When it is off, `span()` returns a
+shared no-op object and `@traced` calls straight through.
+
+Usage: python3 tracing.py               (list recent traces)
+       python3 tracing.py <trace_id>    (print a job's waterfall)
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+
+TRACE_FILE = os.getenv("PIPELINE_TRACE_FILE", "pipeline_traces.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("PIPELINE_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUPS = 3
+
+# "<trace_id>:<span_id>" of the span that launched this process
+TRACE_PARENT_ENV = "PIPELINE_TRACE_PARENT"
+
+_current_span = contextvars.ContextVar("pipeline_current_span", default=None)
+
+
+class JsonlExporter:
+    """Appends one JSON line per finished span, rotating at `max_bytes`"""
+
+    def __init__(self, path=TRACE_FILE, max_bytes=TRACE_MAX_BYTES, backups=TRACE_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def export(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError:
+                # Tracing must never break the pipeline
+                pass
+
+    def files(self):
+        """Trace files from oldest to newest"""
+        backups = [f"{self.path}.{index}" for index in range(self.backups, 0, -1)]
+        return [path for path in backups + [self.path] if os.path.exists(path)]
+
+
+class Span:
+    """One timed stage; use as a context manager"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "events",
+                 "start", "_start_perf", "_token")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.events = []
+        self.start = None
+        self._start_perf = None
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, **attributes):
+        """Mark a point inside the span (a selector fallback, a Drive interstitial)"""
+        offset_ms = round((time.perf_counter() - self._start_perf) * 1000, 1) if self._start_perf else 0
+        self.events.append({"name": name, "offset_ms": offset_ms, **attributes})
+
+    def __enter__(self):
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start_perf) * 1000
+        _current_span.reset(self._token)
+        # Scripts finish with sys.exit(0); only a non-zero exit is a failure
+        if exc_type is SystemExit and not exc.code:
+            exc_type = None
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(duration_ms, 1),
+            "status": "error" if exc_type else "ok",
+            "attributes": self.attributes,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        }
+        if exc_type:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        if self.events:
+            record["events"] = self.events
+        _exporter.export(record)
+        return False
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off"""
+
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_enabled = os.getenv("PIPELINE_TRACING", "0") == "1"
+_exporter = JsonlExporter()
+
+
+def _remote_parent():
+    value = os.getenv(TRACE_PARENT_ENV, "")
+    if ":" in value:
+        trace_id, span_id = value.split(":", 1)
+        return trace_id, span_id
+    return None, None
+
+
+def configure(enabled=None, path=None, max_bytes=None, backups=None):
+    """Turn tracing on or off and/or point it at another file"""
+    global _enabled, _exporter
+    if enabled is not None:
+        _enabled = enabled
+    if path is not None or max_bytes is not None or backups is not None:
+        _exporter = JsonlExporter(
+            path or _exporter.path,
+            max_bytes if max_bytes is not None else _exporter.max_bytes,
+            backups if backups is not None else _exporter.backups
+        )
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, trace_id=None, **attributes):
+    """Start a span under the current one.
+
+    Passing `trace_id` (e.g. a job id) starts that trace unless the current
+    span already belongs to it.
+    """
+    if not _enabled:
+        return NOOP_SPAN
+    parent = _current_span.get()
+    if parent is not None and trace_id in (None, parent.trace_id):
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+    if trace_id is None:
+        remote_trace_id, remote_span_id = _remote_parent()
+        if remote_trace_id:
+            return Span(name, remote_trace_id, remote_span_id, attributes)
+    return Span(name, trace_id or uuid.uuid4().hex, None, attributes)
+
+
+def current_span():
+    """The innermost open span, or a no-op span"""
+    return (_current_span.get() if _enabled else None) or NOOP_SPAN
+
+
+def traced(name=None, **attributes):
+    """Decorator that runs every call of the function inside a span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_parent_env():
+    """Environment entries that let a child process continue the current trace"""
+    current = _current_span.get() if _enabled else None
+    if current is None:
+        return {}
+    return {
+        TRACE_PARENT_ENV: f"{current.trace_id}:{current.span_id}",
+        "PIPELINE_TRACING": "1",
+        "PIPELINE_TRACE_FILE": os.path.abspath(_exporter.path),
+    }
+
+
+def load_spans(trace_id=None, exporter=None):
+    """Read finished spans back from the trace files, optionally for one trace"""
+    spans = []
+    for path in (exporter or _exporter).files():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if trace_id is None or record.get("trace_id") == trace_id:
+                    spans.append(record)
+    return spans
+
+
+def format_waterfall(spans, width=40):
+    """Render one trace as an indented waterfall, one line per span"""
+    if not spans:
+        return "No spans found"
+    by_id = {record["span_id"]: record for record in spans}
+    children = {}
+    roots = []
+    for record in sorted(spans, key=lambda r: r["start"]):
+        if record.get("parent_id") in by_id:
+            children.setdefault(record["parent_id"], []).append(record)
+        else:
+            roots.append(record)
+
+    trace_start = min(record["start"] for record in spans)
+    trace_end = max(record["start"] + record["duration_ms"] / 1000 for record in spans)
+    total = max(trace_end - trace_start, 1e-6)
+
+    lines = [f"Trace {spans[0]['trace_id']} - {total:.1f}s, {len(spans)} spans"]
+
+    def walk(record, depth):
+        offset = min(int((record["start"] - trace_start) / total * width), width - 1)
+        length = max(1, int(record["duration_ms"] / 1000 / total * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = ("  " * depth + record["name"])[:44]
+        marker = " ❌" if record.get("status") == "error" else ""
+        lines.append(f"{label:<44} {bar:<{width}} {record['duration_ms'] / 1000:8.2f}s{marker}")
+        for event in record.get("events", []):
+            lines.append(f"{'  ' * (depth + 1)}· {event['name']} @ {event['offset_ms'] / 1000:.2f}s")
+        for child in children.get(record["span_id"], []):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def summarize_traces(spans):
+    """One row per trace: id, root name, start time, span count and duration"""
+    traces = {}
+    for record in spans:
+        trace = traces.setdefault(record["trace_id"], {"trace_id": record["trace_id"], "name": None,
+                                                       "start": record["start"], "end": record["start"], "spans": 0})
+        trace["spans"] += 1
+        trace["start"] = min(trace["start"], record["start"])
+        trace["end"] = max(trace["end"], record["start"] + record["duration_ms"] / 1000)
+        if not record.get("parent_id"):
+            trace["name"] = record["name"]
+    return sorted(traces.values(), key=lambda trace: trace["start"])
+
+
+def main():
+    if len(sys.argv) > 1:
+        print(format_waterfall(load_spans(sys.argv[1])))
+        return
+    traces = summarize_traces(load_spans())
+    if not traces:
+        print(f"No traces in {_exporter.path} (set PIPELINE_TRACING=1 to record them)")
+        return
+    for trace in traces[-20:]:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(trace["start"]))
+        print(f"{trace['trace_id']}  {started}  {trace['end'] - trace['start']:8.1f}s  "
+              f"{trace['spans']:4d} spans  {trace['name'] or '?'}")
+
+
+if __name__ == "__main__":
+    main()
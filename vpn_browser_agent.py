@@ -3,6 +3,7 @@ import time
 import json
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
+from resource_governor import acquire_browser
 
 load_dotenv()
 
@@ -17,6 +18,7 @@ class VPNBrowserAgent:
         self.headless = headless
         self.context = None
         self.page = None
+        self.browser_lease = None
         
         # VPN Configuration
         self.vpn_extension_path = os.getenv("VPN_EXTENSION_PATH")
@@ -30,6 +32,8 @@ class VPNBrowserAgent:
     def launch_browser_with_vpn(self):
         """Launch browser with VPN extension loaded"""
         try:
+            # Wait for room on the host before adding another Chromium
+            self.browser_lease = acquire_browser("vpn")
             with sync_playwright() as p:
                 # Prepare browser arguments
                 args = [
@@ -72,6 +76,9 @@ class VPNBrowserAgent:
                 
         except Exception as e:
             print(f"❌ Failed to launch browser: {e}")
+            if self.browser_lease:
+                self.browser_lease.release()
+                self.browser_lease = None
             return False
     
     def _check_vpn_extension_status(self):
@@ -276,6 +283,10 @@ class VPNBrowserAgent:
             except Exception as e:
                 print(f"⚠️  Browser close error (ignored): {e}")
         
+        if self.browser_lease:
+            self.browser_lease.release()
+            self.browser_lease = None
+        
         if self.use_system_vpn:
             self.disconnect_system_vpn()
 